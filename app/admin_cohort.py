@@ -1,7 +1,7 @@
 import reflex as rx
 from app.states.cohort_state import CohortState
 from app.styles.glass_styles import GlassStyles
-from app.models import CohortPatient
+from app.models import CohortPatient, NoteHit, SnippetPart
 from app.enums import PatientStatus
 
 
@@ -18,6 +18,68 @@ def kpi_card(title: str, value: str, icon: str, subtext: str = "") -> rx.Compone
     )
 
 
+def snippet_part(part: SnippetPart) -> rx.Component:
+    return rx.cond(
+        part.highlight,
+        rx.el.mark(part.text, class_name="bg-teal-500/30 text-teal-100 rounded px-0.5"),
+        rx.el.span(part.text),
+    )
+
+
+def note_hit_row(hit: NoteHit) -> rx.Component:
+    return rx.el.div(
+        rx.el.div(
+            rx.el.span(
+                hit.kind,
+                class_name="text-xs font-bold uppercase tracking-wider text-teal-400",
+            ),
+            rx.el.span(hit.timestamp, class_name="text-xs text-slate-500"),
+            class_name="flex justify-between mb-1",
+        ),
+        rx.el.p(
+            rx.foreach(hit.snippet, snippet_part),
+            class_name="text-sm text-slate-300",
+        ),
+        class_name="p-3 rounded-lg bg-white/5 border border-white/5",
+    )
+
+
+def patient_notes_search() -> rx.Component:
+    return rx.el.div(
+        rx.el.h3(
+            "Search Notes",
+            class_name="text-sm font-bold text-white mb-4 uppercase tracking-wider",
+        ),
+        rx.el.div(
+            rx.icon("search", class_name="w-4 h-4 text-slate-500"),
+            rx.el.input(
+                placeholder="Check-ins, symptoms, conditions...",
+                value=CohortState.note_query,
+                on_change=CohortState.set_note_query,
+                class_name="w-full bg-transparent border-none text-white text-sm placeholder-slate-500 focus:outline-none",
+            ),
+            class_name="flex items-center gap-2 px-3 py-2 rounded-xl bg-white/5 border border-white/10 mb-3",
+        ),
+        rx.el.div(
+            rx.foreach(CohortState.note_hits, note_hit_row),
+            rx.cond(
+                CohortState.note_has_more,
+                rx.el.button(
+                    "Show more",
+                    on_click=CohortState.load_more_notes,
+                    class_name="w-full py-2 text-xs text-slate-400 hover:text-white transition-colors",
+                ),
+            ),
+            rx.cond(
+                (CohortState.note_query != "") & (CohortState.note_hits.length() == 0),
+                rx.el.p("No matching notes.", class_name="text-sm text-slate-500"),
+            ),
+            class_name="flex flex-col gap-2 max-h-64 overflow-y-auto",
+        ),
+        class_name="mb-8",
+    )
+
+
 def patient_detail_modal() -> rx.Component:
     return rx.radix.primitives.dialog.root(
         rx.radix.primitives.dialog.portal(
@@ -58,6 +120,25 @@ def patient_detail_modal() -> rx.Component:
                                 ),
                                 class_name="bg-white/5 rounded-xl p-4 border border-white/5",
                             ),
+                            rx.el.div(
+                                rx.el.p(
+                                    "Epigenetic Age",
+                                    class_name="text-xs text-slate-500 uppercase tracking-wider",
+                                ),
+                                rx.el.p(
+                                    rx.cond(
+                                        CohortState.selected_patient.epigenetic_age,
+                                        CohortState.selected_patient.epigenetic_age,
+                                        "--",
+                                    ),
+                                    class_name="text-xl font-bold text-white",
+                                ),
+                                rx.el.p(
+                                    CohortState.selected_patient.epigenetic_clock,
+                                    class_name="text-xs text-slate-500 capitalize",
+                                ),
+                                class_name="bg-white/5 rounded-xl p-4 border border-white/5",
+                            ),
                             rx.el.div(
                                 rx.el.p(
                                     "Chronological",
@@ -80,7 +161,7 @@ def patient_detail_modal() -> rx.Component:
                                 ),
                                 class_name="bg-white/5 rounded-xl p-4 border border-white/5",
                             ),
-                            class_name="grid grid-cols-3 gap-4 mb-8",
+                            class_name="grid grid-cols-2 md:grid-cols-4 gap-4 mb-8",
                         ),
                         rx.el.div(
                             rx.el.div(
@@ -169,6 +250,7 @@ def patient_detail_modal() -> rx.Component:
                             ),
                             class_name="grid grid-cols-2 gap-8 mb-8",
                         ),
+                        patient_notes_search(),
                         rx.el.div(
                             rx.radix.primitives.dialog.close(
                                 rx.el.button(
@@ -262,10 +344,23 @@ def admin_cohort_page() -> rx.Component:
             rx.el.h1(
                 "Patient Cohort", class_name=f"text-3xl font-bold {GlassStyles.HEADING}"
             ),
-            rx.el.button(
-                "+ Add Patient",
-                on_click=CohortState.edit_patient,
-                class_name=GlassStyles.BUTTON_PRIMARY,
+            rx.el.div(
+                rx.el.button(
+                    rx.cond(
+                        CohortState.is_running_clocks,
+                        "Scoring...",
+                        "Run Epigenetic Clocks",
+                    ),
+                    on_click=CohortState.run_epigenetic_clocks,
+                    disabled=CohortState.is_running_clocks,
+                    class_name="px-4 py-2 rounded-lg bg-white/5 hover:bg-teal-500/20 hover:text-teal-300 text-slate-300 border border-white/10 transition-all",
+                ),
+                rx.el.button(
+                    "+ Add Patient",
+                    on_click=CohortState.edit_patient,
+                    class_name=GlassStyles.BUTTON_PRIMARY,
+                ),
+                class_name="flex gap-3",
             ),
             class_name="flex justify-between items-center mb-8",
         ),
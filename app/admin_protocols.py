@@ -3,6 +3,7 @@ from app.components.navbar import navbar
 from app.states.protocol_state import ProtocolState
 from app.states.global_state import GlobalState
 from app.styles.glass_styles import GlassStyles
+from app.components.protocol_filters import protocol_filters
 from app.models import TreatmentProtocol, ProtocolRequest
 from app.enums import TreatmentCategory, TreatmentFrequency, _enum_values
 
@@ -37,7 +38,18 @@ def request_card(request: ProtocolRequest) -> rx.Component:
     return rx.el.div(
         rx.el.div(
             rx.el.div(
-                rx.el.p(request.patient_name, class_name="font-bold text-white"),
+                rx.el.div(
+                    rx.el.input(
+                        type="checkbox",
+                        checked=ProtocolState.selected_request_ids.contains(request.id),
+                        on_change=lambda _: ProtocolState.toggle_request_selection(
+                            request.id
+                        ),
+                        class_name="accent-teal-500 mr-2",
+                    ),
+                    rx.el.p(request.patient_name, class_name="font-bold text-white"),
+                    class_name="flex items-center",
+                ),
                 rx.el.p(
                     f"Requested: {request.protocol_name}",
                     class_name="text-sm text-teal-400 mt-1",
@@ -67,6 +79,70 @@ def request_card(request: ProtocolRequest) -> rx.Component:
     )
 
 
+def bulk_actions_panel() -> rx.Component:
+    return rx.el.div(
+        rx.el.div(
+            rx.el.span(
+                f"{ProtocolState.selected_request_ids.length()} selected",
+                class_name="text-xs text-slate-400",
+            ),
+            rx.el.div(
+                rx.el.button(
+                    "Reject",
+                    on_click=ProtocolState.reject_selected,
+                    class_name="px-2 py-1 text-xs text-red-300 hover:bg-red-500/10 rounded-lg transition-colors",
+                ),
+                rx.el.button(
+                    "Approve",
+                    on_click=ProtocolState.approve_selected,
+                    class_name="px-2 py-1 text-xs bg-teal-500/20 text-teal-300 hover:bg-teal-500/30 rounded-lg transition-colors",
+                ),
+                class_name="flex gap-2",
+            ),
+            class_name="flex justify-between items-center mb-3",
+        ),
+        rx.el.select(
+            rx.el.option("All protocols", value=""),
+            rx.foreach(
+                ProtocolState.visible_protocols,
+                lambda protocol: rx.el.option(protocol.name, value=protocol.id),
+            ),
+            value=ProtocolState.bulk_protocol_id,
+            on_change=ProtocolState.set_bulk_protocol_id,
+            class_name="w-full bg-slate-800 border border-white/10 rounded-lg px-3 py-1.5 mb-2 text-sm text-white",
+        ),
+        rx.el.div(
+            rx.el.input(
+                type="date",
+                value=ProtocolState.bulk_date_from,
+                on_change=ProtocolState.set_bulk_date_from,
+                class_name="w-full bg-white/5 border border-white/10 rounded-lg px-2 py-1 text-xs text-white",
+            ),
+            rx.el.input(
+                type="date",
+                value=ProtocolState.bulk_date_to,
+                on_change=ProtocolState.set_bulk_date_to,
+                class_name="w-full bg-white/5 border border-white/10 rounded-lg px-2 py-1 text-xs text-white",
+            ),
+            class_name="grid grid-cols-2 gap-2 mb-2",
+        ),
+        rx.el.div(
+            rx.el.button(
+                "Reject matching",
+                on_click=ProtocolState.reject_matching,
+                class_name="px-2 py-1 text-xs text-red-300 hover:bg-red-500/10 rounded-lg transition-colors",
+            ),
+            rx.el.button(
+                "Approve matching",
+                on_click=ProtocolState.approve_matching,
+                class_name="px-2 py-1 text-xs bg-teal-500/20 text-teal-300 hover:bg-teal-500/30 rounded-lg transition-colors",
+            ),
+            class_name="flex justify-end gap-2",
+        ),
+        class_name="bg-white/5 border border-white/10 rounded-xl p-3 mb-4",
+    )
+
+
 def add_protocol_modal() -> rx.Component:
     return rx.radix.primitives.dialog.root(
         rx.radix.primitives.dialog.trigger(
@@ -163,6 +239,7 @@ def admin_protocols_page() -> rx.Component:
             add_protocol_modal(),
             class_name="flex justify-between items-center mb-8",
         ),
+        protocol_filters(),
         rx.el.div(
             rx.el.div(
                 rx.el.h2(
@@ -196,7 +273,7 @@ def admin_protocols_page() -> rx.Component:
                             ),
                             class_name="border-b border-white/10",
                         ),
-                        rx.el.tbody(rx.foreach(ProtocolState.protocols, protocol_row)),
+                        rx.el.tbody(rx.foreach(ProtocolState.visible_protocols, protocol_row)),
                         class_name="w-full",
                     ),
                     class_name=f"{GlassStyles.PANEL} overflow-hidden",
@@ -208,6 +285,7 @@ def admin_protocols_page() -> rx.Component:
                     "Pending Requests",
                     class_name="text-lg font-semibold text-white mb-4",
                 ),
+                rx.cond(ProtocolState.pending_requests, bulk_actions_panel()),
                 rx.el.div(
                     rx.cond(
                         ProtocolState.pending_requests,
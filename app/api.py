@@ -0,0 +1,117 @@
+"""
+Plain HTTP endpoints served alongside the Reflex backend.
+"""
+
+import asyncio
+import re
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route
+from app.config import settings
+from app.services.meal_photos import FORMATS, VARIANT_RE, variant_path
+from app.services.protocol_catalog import catalog
+from app.services.webhooks import (
+    Delivery,
+    delivery_key,
+    verify_signature,
+    webhook_queue,
+)
+
+# Source ids end up in chunk headers, which hold 16 bytes, so only ASCII.
+_SOURCE_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,16}")
+
+
+async def protocol_catalog(request: Request) -> Response:
+    """
+    Versioned protocol catalog. Clients revalidate with If-None-Match and get a
+    304 while the content hash is unchanged; `?since=<version>` returns only the
+    diffs after that version when the change log still covers it.
+    """
+    etag = f'"{catalog.content_hash}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    since = request.query_params.get("since", "")
+    if since.isdigit():
+        changes = catalog.changes_since(int(since))
+        if changes is not None:
+            return JSONResponse(
+                {
+                    "version": catalog.version,
+                    "hash": catalog.content_hash,
+                    "changes": [change.model_dump(mode="json") for change in changes],
+                },
+                headers=headers,
+            )
+    return JSONResponse(catalog.snapshot(), headers=headers)
+
+
+async def ingest_webhook(request: Request) -> Response:
+    """
+    Vendor push endpoint. Answers 202 once the delivery is queued, 200 for a
+    redelivery of an already accepted one and 429 with Retry-After when the
+    ingest backlog is full. The body must be signed with
+    `settings.webhook_secret` in `X-Signature`; without a secret configured
+    every delivery is refused with 503.
+    """
+    if not settings.webhook_secret:
+        return JSONResponse({"error": "webhooks not configured"}, status_code=503)
+    source_id = request.path_params["source_id"]
+    if not _SOURCE_ID_RE.fullmatch(source_id):
+        return JSONResponse({"error": "unknown source"}, status_code=404)
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > settings.webhook_max_bytes:
+        return JSONResponse({"error": "payload too large"}, status_code=413)
+    body = await request.body()
+    if len(body) > settings.webhook_max_bytes:
+        return JSONResponse({"error": "payload too large"}, status_code=413)
+    if not verify_signature(
+        body, request.headers.get("x-signature", ""), settings.webhook_secret
+    ):
+        return JSONResponse({"error": "invalid signature"}, status_code=401)
+    key = delivery_key(source_id, request.headers.get("idempotency-key", ""), body)
+    try:
+        accepted = webhook_queue.accept(Delivery(source_id, key, body))
+    except asyncio.QueueFull:
+        return JSONResponse(
+            {"error": "ingest backlog full"},
+            status_code=429,
+            headers={"Retry-After": "1"},
+        )
+    if not accepted:
+        return JSONResponse({"status": "duplicate"}, status_code=200)
+    return JSONResponse({"status": "accepted"}, status_code=202)
+
+
+async def meal_photo(request: Request) -> Response:
+    """
+    A meal photo variant, as WebP when the client accepts it and JPEG
+    otherwise. Names are content hashes, so responses are cached for good.
+    """
+    match = VARIANT_RE.fullmatch(request.path_params["name"])
+    if match is None or match[2] not in settings.meal_photo_sizes:
+        return JSONResponse({"error": "not found"}, status_code=404)
+    ext = "webp" if "image/webp" in request.headers.get("accept", "") else "jpg"
+    path = variant_path(match[1], match[2], ext)
+    if not path.is_file():
+        return JSONResponse({"error": "not found"}, status_code=404)
+    etag = f'"{match[0]}.{ext}"'
+    headers = {
+        "Cache-Control": f"public, max-age={settings.media_max_age}, immutable",
+        "ETag": etag,
+        "Vary": "Accept",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    media_type = f"image/{FORMATS[ext][0].lower()}"
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+api = Starlette(
+    routes=[
+        Route("/api/protocols/catalog", protocol_catalog, methods=["GET"]),
+        Route("/api/webhooks/{source_id}", ingest_webhook, methods=["POST"]),
+        Route("/api/media/meals/{name}", meal_photo, methods=["GET"]),
+    ]
+)
@@ -107,6 +107,25 @@ from app.patient_analytics import patient_analytics_page
 from app.admin_cohort import admin_cohort_page
 from app.login import login_page
 from app.components.layout import dashboard_layout
+from app.states.protocol_state import ProtocolState
+from app.states.cohort_state import CohortState
+from app.states.datasource_state import (
+    CGM_SOURCE_ID,
+    GENOME_SOURCE_ID,
+    LAB_SOURCE_ID,
+)
+from app.states.recovery_state import RecoveryState
+from app.api import api
+from app.services.sentiment import sentiment_batcher
+from app.services.transcription import transcription_queue
+from app.services.cgm import read_cgm_source
+from app.services.lab_import import lab_batches, read_lab_source
+from app.services.meal_photos import meal_photos
+from app.services.vcf_import import read_genome_source
+from app.services.sync_scheduler import sync_scheduler
+from app.services.webhooks import webhook_queue
+from app.services.wearable_sync import wearable_sync
+from app.enums import DataSourceType
 
 
 def protected_page(page_component: rx.Component) -> rx.Component:
@@ -118,6 +137,22 @@ app = rx.App(
     stylesheets=[
         "https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap"
     ],
+    api_transformer=api,
+)
+app.register_lifespan_task(sentiment_batcher.lifespan)
+app.register_lifespan_task(transcription_queue.lifespan)
+app.register_lifespan_task(sync_scheduler.lifespan)
+app.register_lifespan_task(webhook_queue.lifespan)
+app.register_lifespan_task(meal_photos.lifespan)
+app.register_lifespan_task(lab_batches.lifespan)
+wearable_sync.register_reader(
+    DataSourceType.FILE, read_lab_source, source_id=LAB_SOURCE_ID
+)
+wearable_sync.register_reader(
+    DataSourceType.FILE, read_genome_source, source_id=GENOME_SOURCE_ID
+)
+wearable_sync.register_reader(
+    DataSourceType.WEARABLE, read_cgm_source, source_id=CGM_SOURCE_ID
 )
 app.add_page(login_page, route="/login")
 app.add_page(lambda: protected_page(index()), route="/", on_load=GlobalState.check_auth)
@@ -129,12 +164,20 @@ app.add_page(
 app.add_page(
     lambda: protected_page(admin_protocols_page()),
     route="/admin/protocols",
-    on_load=GlobalState.check_auth,
+    on_load=[
+        GlobalState.check_auth,
+        ProtocolState.sync_catalog,
+        ProtocolState.watch_requests,
+    ],
 )
 app.add_page(
     lambda: protected_page(patient_protocols_page()),
     route="/patient/protocols",
-    on_load=GlobalState.check_auth,
+    on_load=[
+        GlobalState.check_auth,
+        ProtocolState.sync_catalog,
+        ProtocolState.load_recommendations,
+    ],
 )
 app.add_page(
     lambda: protected_page(admin_analytics_page()),
@@ -144,10 +187,10 @@ app.add_page(
 app.add_page(
     lambda: protected_page(admin_cohort_page()),
     route="/admin/cohort",
-    on_load=GlobalState.check_auth,
+    on_load=[GlobalState.check_auth, CohortState.load_epigenetic_ages],
 )
 app.add_page(
     lambda: protected_page(patient_analytics_page()),
     route="/patient/analytics",
-    on_load=GlobalState.check_auth,
+    on_load=[GlobalState.check_auth, RecoveryState.load_recovery],
 )
\ No newline at end of file
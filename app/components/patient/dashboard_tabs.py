@@ -7,7 +7,10 @@ from app.components.patient.nutrition import nutrition_tab
 from app.components.patient.medication import medication_tab
 from app.states.nutrition_state import NutritionState
 from app.states.medication_state import MedicationState
-from app.states.checkin_state import CheckInState
+from app.states.checkin_state import CheckInState, VOICE_UPLOAD_ID
+from app.states.glucose_state import GlucoseState
+from app.schemas.checkin import CheckIn
+from app.models import GlucoseDay
 from app.patient_intake import patient_intake_page
 
 
@@ -32,26 +35,86 @@ def tab_button(label: str, value: str, icon: str) -> rx.Component:
     )
 
 
+def checkin_row(c: CheckIn) -> rx.Component:
+    return rx.el.div(
+        rx.icon(
+            rx.cond(c.type == "Voice", "mic", "message-square"),
+            class_name="w-5 h-5 text-teal-400 mr-3 mt-1",
+        ),
+        rx.el.div(
+            rx.el.p(
+                c.content,
+                class_name="text-slate-200 text-sm font-medium",
+            ),
+            rx.cond(
+                c.audio_url,
+                rx.el.audio(
+                    src=rx.get_upload_url(c.audio_url.to(str)),
+                    controls=True,
+                    preload="none",
+                    class_name="w-full h-8 mt-2",
+                ),
+            ),
+            rx.el.p(
+                c.timestamp,
+                class_name="text-xs text-slate-500 mt-1",
+            ),
+            class_name="flex-1",
+        ),
+        rx.icon(
+            rx.cond(
+                c.sentiment_score > 0.2,
+                "smile",
+                rx.cond(c.sentiment_score < -0.2, "frown", "meh"),
+            ),
+            class_name=rx.cond(
+                c.sentiment_score > 0.2,
+                "w-4 h-4 text-teal-400 mt-1",
+                rx.cond(
+                    c.sentiment_score < -0.2,
+                    "w-4 h-4 text-red-400 mt-1",
+                    "w-4 h-4 text-slate-500 mt-1",
+                ),
+            ),
+        ),
+        class_name="flex items-start p-3 rounded-lg bg-white/5 mb-2 border border-white/5",
+    )
+
+
 def check_in_logger() -> rx.Component:
     return rx.el.div(
         rx.el.h3("Daily Check-in", class_name="text-lg font-bold text-white mb-4"),
         rx.el.div(
-            rx.el.button(
+            rx.upload.root(
                 rx.el.div(
                     rx.icon(
-                        rx.cond(CheckInState.is_voice_recording, "loader-2", "mic"),
-                        class_name=f"w-6 h-6 mb-2 {rx.cond(CheckInState.is_voice_recording, 'animate-spin text-red-400', 'text-teal-400')}",
+                        rx.cond(
+                            CheckInState.pending_transcriptions > 0, "loader-2", "mic"
+                        ),
+                        class_name=rx.cond(
+                            CheckInState.pending_transcriptions > 0,
+                            "w-6 h-6 mb-2 animate-spin text-teal-400",
+                            "w-6 h-6 mb-2 text-teal-400",
+                        ),
                     ),
                     rx.el.span(
                         rx.cond(
-                            CheckInState.is_voice_recording, "Recording...", "Voice Log"
+                            CheckInState.pending_transcriptions > 0,
+                            "Transcribing...",
+                            "Voice Log",
                         ),
                         class_name="text-xs font-bold uppercase tracking-wider text-slate-300",
                     ),
-                    class_name="flex flex-col items-center",
+                    class_name="flex flex-col items-center justify-center h-full",
                 ),
-                on_click=CheckInState.toggle_voice_recording,
-                class_name=f"flex-1 p-6 rounded-xl bg-white/5 border border-white/10 hover:bg-white/10 transition-all {rx.cond(CheckInState.is_voice_recording, 'border-red-500/50 bg-red-500/10', '')}",
+                id=VOICE_UPLOAD_ID,
+                accept={"audio/*": [".webm", ".ogg", ".mp3", ".m4a", ".wav"]},
+                max_files=1,
+                multiple=False,
+                on_drop=CheckInState.upload_voice_note(
+                    rx.upload_files(upload_id=VOICE_UPLOAD_ID)
+                ),
+                class_name="flex-1 p-6 rounded-xl bg-white/5 border border-white/10 hover:bg-white/10 transition-all cursor-pointer",
             ),
             rx.el.div(
                 rx.el.div(
@@ -79,6 +142,69 @@ def check_in_logger() -> rx.Component:
     )
 
 
+def glucose_stat(label: str, value: rx.Var, unit: str) -> rx.Component:
+    return rx.el.div(
+        rx.el.p(label, class_name="text-xs text-slate-500 uppercase tracking-wider"),
+        rx.el.p(
+            value.to_string(),
+            rx.el.span(unit, class_name="text-xs text-slate-400 font-medium ml-1"),
+            class_name="text-xl font-bold text-white",
+        ),
+        class_name="bg-white/5 rounded-xl p-4 border border-white/5",
+    )
+
+
+def glucose_day_row(day: GlucoseDay) -> rx.Component:
+    return rx.el.div(
+        rx.el.span(day.date, class_name="w-14 text-xs text-slate-400"),
+        rx.el.div(
+            rx.el.div(class_name="h-2 bg-red-400", style={"width": f"{day.tbr}%"}),
+            rx.el.div(class_name="h-2 bg-teal-500", style={"width": f"{day.tir}%"}),
+            rx.el.div(class_name="h-2 bg-yellow-400", style={"width": f"{day.tar}%"}),
+            class_name="flex flex-1 h-2 rounded-full overflow-hidden bg-slate-700",
+        ),
+        rx.el.span(
+            f"{day.tir}%", class_name="w-14 text-right text-xs text-slate-300"
+        ),
+        class_name="flex items-center gap-3",
+    )
+
+
+def glucose_panel() -> rx.Component:
+    return rx.el.div(
+        rx.el.div(
+            rx.el.h3("Glucose (CGM)", class_name="text-lg font-bold text-white"),
+            rx.el.span(
+                GlucoseState.latest_glucose.date,
+                class_name="text-xs text-slate-500",
+            ),
+            class_name="flex justify-between items-center mb-4",
+        ),
+        rx.cond(
+            GlucoseState.glucose_days.length() > 0,
+            rx.el.div(
+                rx.el.div(
+                    glucose_stat("Time in Range", GlucoseState.latest_glucose.tir, "%"),
+                    glucose_stat("Mean", GlucoseState.latest_glucose.mean, "mg/dL"),
+                    glucose_stat("CV", GlucoseState.latest_glucose.cv, "%"),
+                    glucose_stat("MAGE", GlucoseState.latest_glucose.mage, "mg/dL"),
+                    class_name="grid grid-cols-2 md:grid-cols-4 gap-4",
+                ),
+                rx.el.div(
+                    rx.foreach(GlucoseState.glucose_days, glucose_day_row),
+                    class_name="space-y-2",
+                ),
+                class_name="grid grid-cols-1 lg:grid-cols-2 gap-8",
+            ),
+            rx.el.p(
+                "Connect a CGM under Data Sources to see daily time in range.",
+                class_name="text-sm text-slate-500",
+            ),
+        ),
+        class_name=f"{GlassStyles.PANEL} p-6 mb-8",
+    )
+
+
 def dashboard_overview() -> rx.Component:
     return rx.el.div(
         rx.el.h2("Health Overview", class_name="text-2xl font-bold text-white mb-6"),
@@ -113,13 +239,17 @@ def dashboard_overview() -> rx.Component:
                     class_name="text-3xl font-bold text-teal-400",
                 ),
                 rx.el.div(
-                    rx.el.div(class_name="h-2 rounded-full bg-teal-500 w-[88%]"),
+                    rx.el.div(
+                        class_name="h-2 rounded-full bg-teal-500",
+                        style={"width": f"{MedicationState.overall_efficacy_score}%"},
+                    ),
                     class_name="h-2 rounded-full bg-slate-700 mt-2",
                 ),
                 class_name=f"{GlassStyles.PANEL} p-6",
             ),
             class_name="grid grid-cols-1 md:grid-cols-3 gap-6 mb-8",
         ),
+        glucose_panel(),
         rx.el.div(
             rx.el.div(
                 check_in_logger(),
@@ -129,24 +259,22 @@ def dashboard_overview() -> rx.Component:
                         class_name="text-lg font-bold text-white mb-4",
                     ),
                     rx.el.div(
-                        rx.foreach(
-                            CheckInState.checkins,
-                            lambda c: rx.el.div(
-                                rx.icon(
-                                    rx.cond(c.type == "Voice", "mic", "message-square"),
-                                    class_name="w-5 h-5 text-teal-400 mr-3 mt-1",
-                                ),
-                                rx.el.div(
-                                    rx.el.p(
-                                        c.content,
-                                        class_name="text-slate-200 text-sm font-medium",
-                                    ),
-                                    rx.el.p(
-                                        c.timestamp,
-                                        class_name="text-xs text-slate-500 mt-1",
-                                    ),
-                                ),
-                                class_name="flex items-start p-3 rounded-lg bg-white/5 mb-2 border border-white/5",
+                        rx.foreach(CheckInState.checkins, checkin_row),
+                        rx.cond(
+                            CheckInState.history_page > 1,
+                            rx.el.button(
+                                "Newer check-ins",
+                                on_click=CheckInState.load_newer,
+                                class_name="w-full py-2 text-xs text-slate-400 hover:text-white transition-colors",
+                            ),
+                        ),
+                        rx.foreach(CheckInState.history, checkin_row),
+                        rx.cond(
+                            CheckInState.history_cursor != 0,
+                            rx.el.button(
+                                "Load older check-ins",
+                                on_click=CheckInState.load_older,
+                                class_name="w-full py-2 text-xs text-slate-400 hover:text-white transition-colors",
                             ),
                         ),
                         class_name="max-h-[300px] overflow-y-auto pr-2",
@@ -157,6 +285,11 @@ def dashboard_overview() -> rx.Component:
             ),
             class_name=f"{GlassStyles.PANEL} p-6",
         ),
+        on_mount=[
+            CheckInState.load_feed,
+            GlucoseState.load_glucose,
+            MedicationState.load_adherence,
+        ],
     )
 
 
@@ -1,8 +1,13 @@
 import reflex as rx
-from app.states.datasource_state import DataSourceState
+from app.states.datasource_state import (
+    DataSourceState,
+    GENOME_UPLOAD_ID,
+    HEALTH_EXPORT_UPLOAD_ID,
+)
 from app.styles.glass_styles import GlassStyles
 from app.schemas.datasource import DataSource
 from app.enums import DataSourceStatus
+from app.models import GenomeVariant
 
 
 def datasource_card(source: DataSource) -> rx.Component:
@@ -12,7 +17,7 @@ def datasource_card(source: DataSource) -> rx.Component:
             rx.el.div(
                 rx.el.span(
                     source.status,
-                    class_name=f"text-xs font-bold uppercase tracking-wider px-2 py-1 rounded-full border {rx.cond(source.status == DataSourceStatus.CONNECTED, 'bg-teal-500/10 text-teal-400 border-teal-500/20', rx.cond(source.status == DataSourceStatus.SYNCING, 'bg-blue-500/10 text-blue-400 border-blue-500/20', 'bg-slate-500/10 text-slate-400 border-slate-500/20'))}",
+                    class_name=f"text-xs font-bold uppercase tracking-wider px-2 py-1 rounded-full border {rx.cond(source.status == DataSourceStatus.CONNECTED, 'bg-teal-500/10 text-teal-400 border-teal-500/20', rx.cond(source.status == DataSourceStatus.SYNCING, 'bg-blue-500/10 text-blue-400 border-blue-500/20', rx.cond(source.status == DataSourceStatus.ERROR, 'bg-red-500/10 text-red-400 border-red-500/20', 'bg-slate-500/10 text-slate-400 border-slate-500/20')))}",
                 ),
                 class_name="mb-4",
             ),
@@ -22,15 +27,140 @@ def datasource_card(source: DataSource) -> rx.Component:
         rx.el.p(
             f"Last synced: {source.last_sync}", class_name="text-sm text-slate-400 mb-6"
         ),
+        rx.cond(
+            source.status == DataSourceStatus.SYNCING,
+            rx.el.div(
+                rx.el.div(
+                    rx.el.div(
+                        class_name="h-1.5 rounded-full bg-blue-400 transition-all duration-300",
+                        style={"width": f"{source.sync_progress}%"},
+                    ),
+                    class_name="h-1.5 rounded-full bg-slate-700 mb-2",
+                ),
+                rx.el.p(
+                    f"{source.synced_records} records",
+                    class_name="text-xs text-slate-400",
+                ),
+                class_name="mb-4",
+            ),
+        ),
         rx.el.button(
-            rx.cond(source.status == DataSourceStatus.CONNECTED, "Sync Now", "Connect"),
+            rx.cond(
+                source.status == DataSourceStatus.SYNCING,
+                "Syncing...",
+                rx.cond(
+                    source.status == DataSourceStatus.DISCONNECTED, "Connect", "Sync Now"
+                ),
+            ),
             on_click=lambda: DataSourceState.sync_source(source.id),
+            disabled=source.status == DataSourceStatus.SYNCING,
             class_name="w-full py-2 rounded-lg bg-white/5 hover:bg-teal-500/20 hover:text-teal-300 text-slate-300 border border-white/10 transition-all",
         ),
         class_name=f"{GlassStyles.CARD_INTERACTIVE} flex flex-col",
     )
 
 
+def health_export_upload() -> rx.Component:
+    return rx.upload.root(
+        rx.el.div(
+            rx.icon("upload", class_name="w-6 h-6 text-teal-400 mb-2"),
+            rx.el.p(
+                "Import Apple Health export",
+                class_name="text-sm font-medium text-slate-200",
+            ),
+            rx.el.p(
+                "Drop export.zip or export.xml here, or click to browse",
+                class_name="text-xs text-slate-500 mt-1",
+            ),
+            class_name="flex flex-col items-center",
+        ),
+        id=HEALTH_EXPORT_UPLOAD_ID,
+        accept={
+            "application/zip": [".zip"],
+            "application/xml": [".xml"],
+            "text/xml": [".xml"],
+        },
+        max_files=1,
+        multiple=False,
+        on_drop=DataSourceState.upload_health_export(
+            rx.upload_files(upload_id=HEALTH_EXPORT_UPLOAD_ID)
+        ),
+        class_name="p-6 mb-6 rounded-xl border border-dashed border-white/20 bg-white/5 hover:bg-white/10 transition-all cursor-pointer",
+    )
+
+
+def genome_upload() -> rx.Component:
+    return rx.upload.root(
+        rx.el.div(
+            rx.icon("dna", class_name="w-6 h-6 text-teal-400 mb-2"),
+            rx.el.p(
+                "Import genome file",
+                class_name="text-sm font-medium text-slate-200",
+            ),
+            rx.el.p(
+                "Drop a .vcf or .vcf.gz here, or click to browse",
+                class_name="text-xs text-slate-500 mt-1",
+            ),
+            class_name="flex flex-col items-center",
+        ),
+        id=GENOME_UPLOAD_ID,
+        accept={
+            "text/plain": [".vcf"],
+            "text/vcard": [".vcf"],
+            "application/gzip": [".gz", ".bgz"],
+            "application/octet-stream": [".gz", ".bgz"],
+        },
+        max_files=1,
+        multiple=False,
+        on_drop=DataSourceState.upload_genome(
+            rx.upload_files(upload_id=GENOME_UPLOAD_ID)
+        ),
+        class_name="p-6 mb-6 rounded-xl border border-dashed border-white/20 bg-white/5 hover:bg-white/10 transition-all cursor-pointer",
+    )
+
+
+def genome_variant_row(variant: GenomeVariant) -> rx.Component:
+    return rx.el.tr(
+        rx.el.td(variant.gene, class_name="py-2 pr-4 font-medium text-white"),
+        rx.el.td(variant.rsid, class_name="py-2 pr-4 text-slate-400"),
+        rx.el.td(
+            f"{variant.chrom}:{variant.pos}", class_name="py-2 pr-4 text-slate-500"
+        ),
+        rx.el.td(
+            rx.cond(variant.genotype != "", variant.genotype, "No call"),
+            class_name="py-2 font-mono text-teal-300",
+        ),
+    )
+
+
+def genome_panel() -> rx.Component:
+    return rx.cond(
+        DataSourceState.genome_variants,
+        rx.el.div(
+            rx.el.div(
+                rx.el.h3(
+                    "Longevity Variants", class_name="text-lg font-bold text-white"
+                ),
+                rx.cond(
+                    DataSourceState.apoe_genotype != "",
+                    rx.el.span(
+                        f"APOE {DataSourceState.apoe_genotype}",
+                        class_name="text-xs font-bold px-2 py-1 rounded-full bg-teal-500/10 text-teal-400 border border-teal-500/20",
+                    ),
+                ),
+                class_name="flex justify-between items-center mb-4",
+            ),
+            rx.el.table(
+                rx.el.tbody(
+                    rx.foreach(DataSourceState.genome_variants, genome_variant_row)
+                ),
+                class_name="w-full text-sm text-left",
+            ),
+            class_name=f"{GlassStyles.PANEL} p-6 mb-6",
+        ),
+    )
+
+
 def data_sources_tab() -> rx.Component:
     return rx.el.div(
         rx.el.div(
@@ -53,6 +183,17 @@ def data_sources_tab() -> rx.Component:
             ),
             class_name="flex flex-wrap gap-2 mb-6 bg-white/5 p-1 rounded-xl w-fit",
         ),
+        rx.cond(
+            DataSourceState.filter_type == "File Imports",
+            rx.el.div(
+                rx.el.div(
+                    health_export_upload(),
+                    genome_upload(),
+                    class_name="grid grid-cols-1 md:grid-cols-2 gap-6",
+                ),
+                genome_panel(),
+            ),
+        ),
         rx.el.div(
             rx.cond(
                 DataSourceState.filtered_sources,
@@ -71,4 +212,5 @@ def data_sources_tab() -> rx.Component:
             class_name="min-h-[300px]",
         ),
         class_name="animate-in fade-in duration-500",
+        on_mount=DataSourceState.load_sources,
     )
\ No newline at end of file
@@ -1,4 +1,5 @@
 import reflex as rx
+from app.config import settings
 from app.states.medication_state import MedicationState
 from app.schemas.medication import Medication
 from app.styles.glass_styles import GlassStyles
@@ -31,6 +32,13 @@ def medication_card(med: Medication) -> rx.Component:
                 rx.el.p(
                     f"{med.adherence_score}%", class_name="text-sm font-bold text-white"
                 ),
+                rx.el.div(
+                    rx.foreach(
+                        med.adherence_windows,
+                        lambda window: rx.el.span(f"{window.days}d {window.percent}%"),
+                    ),
+                    class_name="flex gap-2 text-xs text-slate-500",
+                ),
             ),
             rx.el.div(
                 rx.el.p(
@@ -80,9 +88,21 @@ def medication_tab() -> rx.Component:
                         class_name="text-4xl font-bold text-teal-400",
                     ),
                     rx.el.p(
-                        "Excellent consistency",
+                        rx.cond(
+                            MedicationState.overall_efficacy_score >= 90,
+                            "Excellent consistency",
+                            rx.cond(
+                                MedicationState.overall_efficacy_score >= 75,
+                                "Good consistency",
+                                "Some doses were missed",
+                            ),
+                        ),
                         class_name="text-sm text-green-400 mt-1",
                     ),
+                    rx.el.p(
+                        f"Last {settings.adherence_overall_window} days",
+                        class_name="text-xs text-slate-500 mt-1",
+                    ),
                     class_name="mb-4",
                 ),
                 class_name=f"{GlassStyles.PANEL} p-6 mb-8 flex flex-col items-center justify-center text-center",
@@ -94,4 +114,5 @@ def medication_tab() -> rx.Component:
             class_name="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6",
         ),
         class_name="animate-in fade-in duration-500",
+        on_mount=MedicationState.load_adherence,
     )
\ No newline at end of file
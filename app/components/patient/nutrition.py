@@ -1,7 +1,13 @@
 import reflex as rx
-from app.states.nutrition_state import NutritionState
-from app.schemas.nutrition import Meal, FoodItem
+from app.states.nutrition_state import MEAL_PHOTO_UPLOAD_ID, NutritionState
+from app.schemas.nutrition import Meal, FoodItem, FoodMatch
+from app.enums import MealType
 from app.styles.glass_styles import GlassStyles
+from app.components.analytics_charts import TOOLTIP_PROPS, custom_legend_item
+
+
+# Meal photos are served by the backend's /api/media route.
+BACKEND_URL = rx.config.get_config().api_url
 
 
 def food_item_row(item: FoodItem) -> rx.Component:
@@ -24,6 +30,11 @@ def food_item_row(item: FoodItem) -> rx.Component:
                 f"F: {item.fat}g",
                 class_name="text-xs text-yellow-400 bg-yellow-500/10 px-1.5 py-0.5 rounded border border-yellow-500/20",
             ),
+            rx.el.button(
+                rx.icon("x", class_name="w-3.5 h-3.5"),
+                on_click=NutritionState.remove_food_item(item.id),
+                class_name="ml-2 text-slate-500 hover:text-red-400 transition-colors",
+            ),
             class_name="flex items-center",
         ),
         class_name="flex justify-between items-center py-2 border-b border-white/5 last:border-0",
@@ -37,6 +48,15 @@ def meal_card(meal: Meal) -> rx.Component:
             rx.el.span(meal.time, class_name="text-xs text-slate-400"),
             class_name="flex justify-between items-center mb-3",
         ),
+        rx.cond(
+            meal.image_url != "/placeholder.svg",
+            rx.el.img(
+                src=BACKEND_URL + meal.image_url,
+                alt=meal.type,
+                loading="lazy",
+                class_name="w-full h-40 object-cover rounded-xl mb-3",
+            ),
+        ),
         rx.el.div(rx.foreach(meal.food_items, food_item_row), class_name="mb-3"),
         rx.el.div(
             rx.el.span("Total:", class_name="text-sm text-slate-400"),
@@ -50,8 +70,201 @@ def meal_card(meal: Meal) -> rx.Component:
     )
 
 
+def food_result_row(food: FoodMatch) -> rx.Component:
+    return rx.el.button(
+        rx.el.div(
+            rx.el.p(food.name, class_name="text-sm text-slate-200 text-left"),
+            rx.el.p(food.category, class_name="text-xs text-slate-500 text-left"),
+            class_name="flex flex-col min-w-0",
+        ),
+        rx.el.span(
+            f"{food.calories} kcal / 100 g",
+            class_name="text-xs text-teal-400 whitespace-nowrap ml-3",
+        ),
+        type="button",
+        on_click=NutritionState.add_food(food.fdc_id),
+        class_name="w-full flex justify-between items-center px-3 py-2 hover:bg-white/5 rounded-lg transition-colors",
+    )
+
+
+def draft_food_row(food: FoodMatch, index: int) -> rx.Component:
+    return rx.el.div(
+        rx.el.div(
+            rx.el.p(food.name, class_name="text-sm text-slate-200 truncate"),
+            rx.el.p(
+                f"P {food.protein}g · C {food.carbs}g · F {food.fat}g per 100 g",
+                class_name="text-xs text-slate-500",
+            ),
+            class_name="flex flex-col min-w-0 flex-1",
+        ),
+        rx.el.input(
+            type="number",
+            min="1",
+            default_value=food.grams.to_string(),
+            on_blur=lambda value: NutritionState.set_draft_grams(index, value),
+            class_name="w-20 bg-white/5 border border-white/10 rounded-lg px-2 py-1 text-sm text-white text-right mx-2",
+        ),
+        rx.el.span("g", class_name="text-xs text-slate-500 mr-2"),
+        rx.el.button(
+            rx.icon("x", class_name="w-4 h-4"),
+            type="button",
+            on_click=NutritionState.remove_draft_food(index),
+            class_name="text-slate-500 hover:text-red-400 transition-colors",
+        ),
+        class_name="flex items-center py-2 border-b border-white/5 last:border-0",
+    )
+
+
+def weekly_macros_chart() -> rx.Component:
+    return rx.el.div(
+        rx.el.div(
+            rx.el.h3("Weekly Macros", class_name="text-lg font-bold text-white"),
+            rx.el.div(
+                custom_legend_item("#60a5fa", "Protein"),
+                custom_legend_item("#4ade80", "Carbs"),
+                custom_legend_item("#facc15", "Fat"),
+                class_name="flex",
+            ),
+            class_name="flex justify-between items-center mb-4",
+        ),
+        rx.recharts.bar_chart(
+            rx.recharts.cartesian_grid(
+                stroke_dasharray="3 3", stroke="#475569", opacity=0.3, vertical=False
+            ),
+            rx.recharts.graphing_tooltip(**TOOLTIP_PROPS),
+            rx.recharts.x_axis(
+                data_key="week",
+                stroke="#94a3b8",
+                tick_line=False,
+                axis_line=False,
+                tick={"fontSize": 12},
+                dy=10,
+            ),
+            rx.recharts.y_axis(
+                stroke="#94a3b8",
+                tick_line=False,
+                axis_line=False,
+                tick={"fontSize": 12},
+                dx=-10,
+                unit="g",
+            ),
+            rx.recharts.bar(data_key="protein", stack_id="macros", fill="#60a5fa"),
+            rx.recharts.bar(data_key="carbs", stack_id="macros", fill="#4ade80"),
+            rx.recharts.bar(
+                data_key="fat", stack_id="macros", fill="#facc15", radius=[4, 4, 0, 0]
+            ),
+            data=NutritionState.weekly_macros,
+            width="100%",
+            height=240,
+        ),
+        class_name=f"{GlassStyles.PANEL} p-6 mb-8",
+    )
+
+
+def meal_photo_upload() -> rx.Component:
+    return rx.upload.root(
+        rx.cond(
+            NutritionState.meal_photo != "",
+            rx.el.img(
+                src=BACKEND_URL + NutritionState.meal_photo_thumb,
+                class_name="w-16 h-16 object-cover rounded-lg mr-3",
+            ),
+            rx.icon(
+                rx.cond(NutritionState.is_processing_photo, "loader-2", "camera"),
+                class_name=rx.cond(
+                    NutritionState.is_processing_photo,
+                    "w-5 h-5 mr-3 animate-spin text-teal-400",
+                    "w-5 h-5 mr-3 text-teal-400",
+                ),
+            ),
+        ),
+        rx.el.span(
+            rx.cond(NutritionState.meal_photo != "", "Replace photo", "Add a photo"),
+            class_name="text-sm text-slate-300",
+        ),
+        id=MEAL_PHOTO_UPLOAD_ID,
+        accept={"image/*": [".jpg", ".jpeg", ".png", ".webp"]},
+        max_files=1,
+        multiple=False,
+        on_drop=NutritionState.upload_meal_photo(
+            rx.upload_files(upload_id=MEAL_PHOTO_UPLOAD_ID)
+        ),
+        class_name="flex items-center p-3 mb-4 rounded-xl bg-white/5 border border-white/10 hover:bg-white/10 transition-all cursor-pointer",
+    )
+
+
+def log_meal_modal() -> rx.Component:
+    return rx.radix.primitives.dialog.root(
+        rx.radix.primitives.dialog.portal(
+            rx.radix.primitives.dialog.overlay(
+                class_name="fixed inset-0 bg-slate-900/80 backdrop-blur-sm z-50"
+            ),
+            rx.radix.primitives.dialog.content(
+                rx.radix.primitives.dialog.title(
+                    "Log Meal", class_name="text-xl font-bold text-white mb-2"
+                ),
+                rx.radix.primitives.dialog.description(
+                    "Search the food database and set each portion in grams.",
+                    class_name="text-slate-400 mb-4 text-sm",
+                ),
+                rx.el.select(
+                    rx.foreach(
+                        [meal_type.value for meal_type in MealType],
+                        lambda meal_type: rx.el.option(meal_type, value=meal_type),
+                    ),
+                    value=NutritionState.meal_type,
+                    on_change=NutritionState.set_meal_type,
+                    class_name="w-full bg-white/5 border border-white/10 rounded-xl px-4 py-2 text-white mb-3 focus:outline-none focus:border-teal-500/50",
+                ),
+                rx.el.input(
+                    placeholder="Search foods, e.g. greek yogurt",
+                    value=NutritionState.food_query,
+                    on_change=NutritionState.set_food_query,
+                    class_name="w-full bg-white/5 border border-white/10 rounded-xl px-4 py-2 text-white placeholder-slate-500 focus:outline-none focus:border-teal-500/50 mb-2",
+                ),
+                rx.el.div(
+                    rx.foreach(NutritionState.food_results, food_result_row),
+                    class_name="max-h-56 overflow-y-auto mb-4",
+                ),
+                rx.el.div(
+                    rx.foreach(NutritionState.meal_draft, draft_food_row),
+                    class_name="mb-4",
+                ),
+                meal_photo_upload(),
+                rx.el.div(
+                    rx.el.span(
+                        f"{NutritionState.draft_calories} kcal",
+                        class_name="text-sm font-bold text-teal-400",
+                    ),
+                    rx.el.div(
+                        rx.radix.primitives.dialog.close(
+                            rx.el.button(
+                                "Cancel",
+                                type="button",
+                                class_name="px-4 py-2 text-slate-400 hover:text-white transition-colors mr-2",
+                            )
+                        ),
+                        rx.el.button(
+                            "Save Meal",
+                            type="button",
+                            on_click=NutritionState.save_meal,
+                            class_name=GlassStyles.BUTTON_PRIMARY,
+                        ),
+                        class_name="flex items-center",
+                    ),
+                    class_name="flex justify-between items-center",
+                ),
+                class_name=f"fixed top-1/2 left-1/2 -translate-x-1/2 -translate-y-1/2 w-[90vw] max-w-lg p-6 {GlassStyles.PANEL} z-50",
+            ),
+        ),
+        open=NutritionState.is_meal_dialog_open,
+        on_open_change=NutritionState.handle_meal_dialog_open_change,
+    )
+
+
 def nutrition_tab() -> rx.Component:
     return rx.el.div(
+        log_meal_modal(),
         rx.el.div(
             rx.el.div(
                 rx.el.h2("Food Tracker", class_name="text-2xl font-bold text-white"),
@@ -90,7 +303,8 @@ def nutrition_tab() -> rx.Component:
                             class_name="text-xs text-slate-500 uppercase tracking-wider",
                         ),
                         rx.el.h4(
-                            "45g / 180g", class_name="text-xl font-bold text-blue-400"
+                            f"{NutritionState.total_protein}g / 180g",
+                            class_name="text-xl font-bold text-blue-400",
                         ),
                         class_name="bg-white/5 p-3 rounded-xl",
                     ),
@@ -100,18 +314,32 @@ def nutrition_tab() -> rx.Component:
                             class_name="text-xs text-slate-500 uppercase tracking-wider",
                         ),
                         rx.el.h4(
-                            "120g / 250g", class_name="text-xl font-bold text-green-400"
+                            f"{NutritionState.total_carbs}g / 250g",
+                            class_name="text-xl font-bold text-green-400",
+                        ),
+                        class_name="bg-white/5 p-3 rounded-xl",
+                    ),
+                    rx.el.div(
+                        rx.el.p(
+                            "Fat",
+                            class_name="text-xs text-slate-500 uppercase tracking-wider",
+                        ),
+                        rx.el.h4(
+                            f"{NutritionState.total_fat}g / 80g",
+                            class_name="text-xl font-bold text-yellow-400",
                         ),
                         class_name="bg-white/5 p-3 rounded-xl",
                     ),
-                    class_name="grid grid-cols-3 gap-4 mb-6",
+                    class_name="grid grid-cols-2 md:grid-cols-4 gap-4 mb-6",
                 ),
                 class_name="mb-8",
             ),
+            weekly_macros_chart(),
             rx.el.div(
                 rx.foreach(NutritionState.current_day.meals, meal_card),
                 class_name="grid grid-cols-1 md:grid-cols-2 gap-6",
             ),
         ),
         class_name="animate-in fade-in duration-500",
+        on_mount=NutritionState.load_nutrition,
     )
\ No newline at end of file
@@ -0,0 +1,72 @@
+import reflex as rx
+from app.states.protocol_state import ProtocolState
+from app.models import FacetCount
+
+
+def facet_chip(field: str, facet: FacetCount, selected: rx.Var) -> rx.Component:
+    return rx.el.button(
+        facet.value,
+        rx.el.span(facet.count, class_name="ml-1.5 text-[10px] text-slate-500"),
+        on_click=lambda: ProtocolState.toggle_facet(field, facet.value),
+        disabled=(facet.count == 0) & (selected != facet.value),
+        class_name=rx.cond(
+            selected == facet.value,
+            "px-3 py-1 rounded-full text-xs font-medium bg-teal-500/20 text-teal-300 border border-teal-500/30 transition-all",
+            "px-3 py-1 rounded-full text-xs font-medium text-slate-400 border border-white/10 hover:text-white hover:bg-white/5 disabled:opacity-40 transition-all",
+        ),
+    )
+
+
+def facet_group(label: str, field: str, facets: rx.Var, selected: rx.Var) -> rx.Component:
+    return rx.el.div(
+        rx.el.p(
+            label,
+            class_name="text-xs text-slate-500 uppercase tracking-wider mb-2",
+        ),
+        rx.el.div(
+            rx.foreach(facets, lambda facet: facet_chip(field, facet, selected)),
+            class_name="flex flex-wrap gap-2",
+        ),
+    )
+
+
+def protocol_filters() -> rx.Component:
+    return rx.el.div(
+        rx.el.div(
+            rx.icon("search", class_name="w-4 h-4 text-slate-500"),
+            rx.el.input(
+                placeholder="Search protocols, descriptions or biomarkers...",
+                value=ProtocolState.search_query,
+                on_change=ProtocolState.set_search_query,
+                class_name="w-full bg-transparent border-none text-white placeholder-slate-500 focus:outline-none focus:ring-0 p-0",
+            ),
+            rx.el.button(
+                "Clear",
+                on_click=ProtocolState.clear_filters,
+                class_name="text-xs text-slate-400 hover:text-white transition-colors",
+            ),
+            class_name="flex items-center gap-3 bg-white/5 border border-white/10 rounded-xl px-4 py-2.5 mb-4",
+        ),
+        rx.el.div(
+            facet_group(
+                "Category",
+                "category",
+                ProtocolState.category_facets,
+                ProtocolState.category_filter,
+            ),
+            facet_group(
+                "Frequency",
+                "frequency",
+                ProtocolState.frequency_facets,
+                ProtocolState.frequency_filter,
+            ),
+            facet_group(
+                "Status",
+                "status",
+                ProtocolState.status_facets,
+                ProtocolState.status_filter,
+            ),
+            class_name="grid grid-cols-1 lg:grid-cols-3 gap-4",
+        ),
+        class_name="mb-8",
+    )
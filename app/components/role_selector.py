@@ -1,5 +1,7 @@
 import reflex as rx
+from app.states.condition_state import ConditionState
 from app.states.global_state import GlobalState
+from app.states.symptom_state import SymptomState
 from app.styles.glass_styles import GlassStyles
 
 
@@ -39,7 +41,11 @@ def role_selector() -> rx.Component:
                         "Patient Portal",
                         "Access your biomarkers, longevity score, and treatment protocols.",
                         "user",
-                        GlobalState.set_role_patient,
+                        [
+                            GlobalState.set_role_patient,
+                            SymptomState.index_notes,
+                            ConditionState.index_notes,
+                        ],
                     ),
                     role_card(
                         "Clinician Portal",
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from app.enums import BiomarkerMetricName, MeasurementUnit
 
 
@@ -8,6 +8,7 @@ class BiomarkerConfig(BaseModel):
     optimal_range_min: float
     optimal_range_max: float
     description: str
+    aliases: list[str] = []
 
 
 class TreatmentCategoryConfig(BaseModel):
@@ -24,6 +25,92 @@ class RoleConfig(BaseModel):
 class AppSettings(BaseModel):
     clinic_name: str = "Aether Longevity Institute"
     version: str = "1.0.0"
+    data_dir: str = ".data"
+    database_name: str = "aether.db"
+    session_check_interval: float = 15.0
+    checkin_feed_size: int = 20
+    checkin_page_size: int = 20
+    notes_search_page_size: int = 10
+    transcription_backend: str = "stub"
+    transcription_model: str = "base.en"
+    transcription_queue_size: int = 32
+    transcription_workers: int = 2
+    voice_upload_max_bytes: int = 50 << 20
+    import_dir: str = "imports"
+    sync_batch_size: int = 5000
+    sync_progress_interval: float = 0.25
+    lab_import_workers: int = 0
+    lab_batch_dir: str = "lab_batches"
+    lab_batch_source: str = "ds3"
+    lab_batch_interval: float = 3600.0
+    source_priority: dict[str, int] = {"ds1": 3, "ds2": 2, "ds3": 1, "ds5": 4}
+    sample_bucket_seconds: dict[str, int] = {
+        "heart_rate": 60,
+        "hrv": 300,
+        "steps": 3600,
+        "sleep": 3600,
+        "glucose": 300,
+        "sleep_stage": 30,
+    }
+    dedup_max_patients: int = 256
+    dedup_horizon_seconds: int = 7 * 86400
+    series_dir: str = "series"
+    chunked_metrics: list[str] = ["heart_rate", "hrv", "glucose", "rr_interval"]
+    series_chunk_points: int = 1024
+    millisecond_metrics: list[str] = ["rr_interval"]
+    daily_metrics: list[str] = ["glucose", "heart_rate", "rr_interval", "sleep_stage"]
+    sleep_epoch_seconds: int = 30
+    sleep_day_offset: int = 12 * 3600
+    recovery_summary_days: int = 14
+    cgm_interval_seconds: int = 300
+    glucose_range_min: float = 70.0
+    glucose_range_max: float = 180.0
+    glucose_summary_days: int = 14
+    food_db_path: str = "app/data/foods.csv"
+    food_index_name: str = "food_index.bin"
+    food_search_limit: int = 8
+    nutrition_trend_weeks: int = 8
+    media_dir: str = "media"
+    media_max_age: int = 31_536_000
+    meal_photo_sizes: dict[str, int] = {"thumb": 160, "card": 800}
+    meal_photo_max_bytes: int = 25 << 20
+    meal_photo_workers: int = 1
+    adherence_windows: list[int] = [7, 30, 90]
+    adherence_overall_window: int = 30
+    webhook_secret: str = ""
+    webhook_max_bytes: int = 1_048_576
+    webhook_queue_size: int = 10_000
+    webhook_workers: int = 2
+    webhook_batch_size: int = 200
+    webhook_retry_interval: float = 60.0
+    webhook_max_attempts: int = 8
+    webhook_idempotency_ttl: float = 86_400.0
+    webhook_idempotency_max_keys: int = 1_000_000
+    genome_dir: str = "genomes"
+    methylation_dir: str = "methylation"
+    epigenetic_clock_dir: str = "clocks"
+    epigenetic_clocks: dict[str, str] = {"horvath": "horvath", "hannum": "linear"}
+    epigenetic_workers: int = 0
+    epigenetic_chunk_bytes: int = 64 << 20
+    epigenetic_min_coverage: float = 0.8
+    genome_panel: dict[str, str] = {
+        "rs429358": "APOE",
+        "rs7412": "APOE",
+        "rs2802292": "FOXO3",
+        "rs2764264": "FOXO3",
+        "rs13217795": "FOXO3",
+        "rs5882": "CETP",
+        "rs1042522": "TP53",
+        "rs1800795": "IL6",
+        "rs4880": "SOD2",
+        "rs1801133": "MTHFR",
+    }
+    sync_interval: float = 900.0
+    sync_jitter: float = 0.1
+    sync_error_backoff: float = 300.0
+    sync_poll_interval: float = 5.0
+    sync_max_concurrency: int = 8
+    sync_rate_limits: dict[str, float] = {"Wearable": 60.0, "API": 20.0, "File": 30.0}
     supported_biomarkers: list[BiomarkerConfig] = [
         BiomarkerConfig(
             name=BiomarkerMetricName.NAD_PLUS,
@@ -31,6 +118,7 @@ class AppSettings(BaseModel):
             optimal_range_min=20.0,
             optimal_range_max=40.0,
             description="Cellular energy and repair",
+            aliases=["Sirtuin Activity"],
         ),
         BiomarkerConfig(
             name=BiomarkerMetricName.HS_CRP,
@@ -38,6 +126,7 @@ class AppSettings(BaseModel):
             optimal_range_min=0.0,
             optimal_range_max=1.0,
             description="Inflammation marker",
+            aliases=["Inflammation", "CRP"],
         ),
         BiomarkerConfig(
             name=BiomarkerMetricName.CORTISOL_AM,
@@ -45,6 +134,7 @@ class AppSettings(BaseModel):
             optimal_range_min=6.0,
             optimal_range_max=23.0,
             description="Stress hormone",
+            aliases=["Stress", "Cortisol"],
         ),
         BiomarkerConfig(
             name=BiomarkerMetricName.VITAMIN_D,
@@ -52,6 +142,7 @@ class AppSettings(BaseModel):
             optimal_range_min=40.0,
             optimal_range_max=80.0,
             description="Immune function and bone health",
+            aliases=["Immune Function", "Bone Health"],
         ),
     ]
     treatment_categories: list[TreatmentCategoryConfig] = [
@@ -78,5 +169,11 @@ class AppSettings(BaseModel):
         "guest": RoleConfig(role_name="Guest", permissions=[]),
     }
 
+    @model_validator(mode="after")
+    def _check_adherence_windows(self) -> "AppSettings":
+        if self.adherence_overall_window not in self.adherence_windows:
+            raise ValueError("adherence_overall_window must be in adherence_windows")
+        return self
+
 
 settings = AppSettings()
\ No newline at end of file
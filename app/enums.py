@@ -23,6 +23,12 @@ class TreatmentStatus(StrEnum):
     DRAFT = "Draft"
 
 
+class ProtocolRequestStatus(StrEnum):
+    PENDING = "pending"
+    APPROVED = "approved"
+    REJECTED = "rejected"
+
+
 class PatientStatus(StrEnum):
     ACTIVE = "Active"
     INACTIVE = "Inactive"
@@ -149,6 +155,22 @@ class DataSourceStatus(StrEnum):
     ERROR = "Error"
 
 
+class SampleMetric(StrEnum):
+    HEART_RATE = "heart_rate"
+    HRV = "hrv"
+    STEPS = "steps"
+    SLEEP = "sleep"
+    GLUCOSE = "glucose"
+    RR_INTERVAL = "rr_interval"
+    SLEEP_STAGE = "sleep_stage"
+
+
 class CheckInType(StrEnum):
     VOICE = "Voice"
-    TEXT = "Text"
\ No newline at end of file
+    TEXT = "Text"
+
+
+class NoteKind(StrEnum):
+    CHECKIN = "Check-in"
+    SYMPTOM = "Symptom"
+    CONDITION = "Condition"
\ No newline at end of file
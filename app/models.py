@@ -2,7 +2,9 @@ from typing import Optional
 from pydantic import BaseModel
 from app.enums import (
     BiomarkerMetricName,
+    NoteKind,
     PatientStatus,
+    ProtocolRequestStatus,
     TreatmentCategory,
     TreatmentFrequency,
     TreatmentStatus,
@@ -36,16 +38,73 @@ class TreatmentProtocol(BaseModel):
     status: TreatmentStatus | str = TreatmentStatus.ACTIVE
 
 
+class FacetCount(BaseModel):
+    value: str
+    count: int = 0
+
+
 class ProtocolRequest(BaseModel):
     id: str
     patient_name: str
     protocol_id: str
     protocol_name: str
-    status: str = "pending"
+    status: ProtocolRequestStatus | str = ProtocolRequestStatus.PENDING
     reason: str = ""
     date: str = ""
 
 
+class ProtocolRecommendation(BaseModel):
+    protocol_id: str
+    protocol_name: str
+    score: float
+    markers: list[str] = []
+
+
+class SnippetPart(BaseModel):
+    text: str
+    highlight: bool = False
+
+
+class NoteHit(BaseModel):
+    kind: NoteKind | str
+    ref_id: str
+    timestamp: str = ""
+    score: float = 0.0
+    snippet: list[SnippetPart] = []
+
+
+class GenomeVariant(BaseModel):
+    rsid: str
+    gene: str
+    chrom: str
+    pos: int
+    ref: str
+    alt: str
+    genotype: str = ""
+
+
+class GlucoseDay(BaseModel):
+    date: str = ""
+    readings: int = 0
+    mean: float = 0.0
+    cv: float = 0.0
+    tir: float = 0.0
+    tbr: float = 0.0
+    tar: float = 0.0
+    mage: float = 0.0
+
+
+class RecoveryDay(BaseModel):
+    date: str = ""
+    rmssd: float | None = None
+    sdnn: float | None = None
+    resting_hr: float | None = None
+    asleep: float = 0.0
+    efficiency: float | None = None
+    deep: float = 0.0
+    rem: float = 0.0
+
+
 class CohortPatient(BaseModel):
     id: str
     name: str
@@ -54,6 +113,8 @@ class CohortPatient(BaseModel):
     status: PatientStatus | str
     age: int
     biological_age: float
+    epigenetic_age: float | None = None
+    epigenetic_clock: str = ""
     active_protocols: list[str]
     last_visit: str
     longevity_score: int
@@ -5,6 +5,7 @@ from app.components.analytics_charts import (
     patient_inflammation_chart,
 )
 from app.states.analytics_state import AnalyticsState
+from app.states.recovery_state import RecoveryState
 from app.styles.glass_styles import GlassStyles
 
 
@@ -117,8 +118,16 @@ def patient_analytics_page() -> rx.Component:
             biomarker_summary_card("Biological Age", "34.2", "OPTIMAL"),
             biomarker_summary_card("NAD+ Levels", "38.2 µM", "HIGH"),
             biomarker_summary_card("Inflammation", "0.3 mg/L", "LOW"),
-            biomarker_summary_card("Sleep Score", "92/100", "EXCELLENT"),
-            class_name="grid grid-cols-2 md:grid-cols-4 gap-4 mb-8",
+            biomarker_summary_card(
+                "HRV (RMSSD)", RecoveryState.hrv_value, RecoveryState.hrv_status
+            ),
+            biomarker_summary_card(
+                "Resting Heart Rate", RecoveryState.resting_hr_value, "LOWEST 30 MIN"
+            ),
+            biomarker_summary_card(
+                "Sleep", RecoveryState.sleep_value, RecoveryState.sleep_status
+            ),
+            class_name="grid grid-cols-2 md:grid-cols-3 lg:grid-cols-6 gap-4 mb-8",
         ),
         rx.el.div(
             rx.el.div(
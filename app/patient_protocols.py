@@ -3,7 +3,8 @@ from app.components.navbar import navbar
 from app.states.protocol_state import ProtocolState
 from app.states.global_state import GlobalState
 from app.styles.glass_styles import GlassStyles
-from app.models import TreatmentProtocol
+from app.components.protocol_filters import protocol_filters
+from app.models import ProtocolRecommendation, TreatmentProtocol
 
 
 def protocol_card(protocol: TreatmentProtocol) -> rx.Component:
@@ -74,6 +75,51 @@ def protocol_card(protocol: TreatmentProtocol) -> rx.Component:
     )
 
 
+def recommendation_card(recommendation: ProtocolRecommendation) -> rx.Component:
+    return rx.el.div(
+        rx.el.div(
+            rx.icon("sparkles", class_name="w-4 h-4 text-teal-400 mr-2"),
+            rx.el.p(
+                recommendation.protocol_name,
+                class_name="font-semibold text-white text-sm",
+            ),
+            class_name="flex items-center mb-2",
+        ),
+        rx.el.p(
+            "Targets your out-of-range markers:",
+            class_name="text-xs text-slate-500 mb-2",
+        ),
+        rx.el.div(
+            rx.foreach(
+                recommendation.markers,
+                lambda marker: rx.el.span(
+                    marker,
+                    class_name="px-2 py-0.5 bg-yellow-500/10 rounded text-xs text-yellow-300 border border-yellow-500/20",
+                ),
+            ),
+            class_name="flex flex-wrap gap-2",
+        ),
+        class_name="bg-white/5 border border-teal-500/20 rounded-xl p-4",
+    )
+
+
+def recommendations_section() -> rx.Component:
+    return rx.cond(
+        ProtocolState.recommendations,
+        rx.el.div(
+            rx.el.h2(
+                "Recommended for You",
+                class_name="text-lg font-semibold text-white mb-4",
+            ),
+            rx.el.div(
+                rx.foreach(ProtocolState.recommendations, recommendation_card),
+                class_name="grid grid-cols-1 md:grid-cols-3 gap-4",
+            ),
+            class_name="mb-10",
+        ),
+    )
+
+
 def request_modal() -> rx.Component:
     return rx.radix.primitives.dialog.root(
         rx.radix.primitives.dialog.portal(
@@ -138,8 +184,10 @@ def patient_protocols_page() -> rx.Component:
                 "Explore longevity protocols tailored to optimize your biological age.",
                 class_name="text-slate-400 mb-10",
             ),
+            recommendations_section(),
+            protocol_filters(),
             rx.el.div(
-                rx.foreach(ProtocolState.protocols, protocol_card),
+                rx.foreach(ProtocolState.visible_protocols, protocol_card),
                 class_name="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6",
             ),
         ),
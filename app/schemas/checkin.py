@@ -8,4 +8,5 @@ class CheckIn(BaseModel):
     content: str
     timestamp: str
     audio_url: str | None = None
-    sentiment_score: float = 0.0
\ No newline at end of file
+    sentiment_score: float = 0.0
+    seq: int = 0
\ No newline at end of file
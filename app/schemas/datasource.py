@@ -8,4 +8,6 @@ class DataSource(BaseModel):
     type: DataSourceType
     status: DataSourceStatus
     last_sync: str
-    icon: str = "cpu"
\ No newline at end of file
+    icon: str = "cpu"
+    sync_progress: int = 0
+    synced_records: int = 0
\ No newline at end of file
@@ -2,6 +2,11 @@ from pydantic import BaseModel
 from app.enums import TreatmentFrequency
 
 
+class WindowAdherence(BaseModel):
+    days: int
+    percent: int
+
+
 class Medication(BaseModel):
     id: str
     name: str
@@ -10,4 +15,5 @@ class Medication(BaseModel):
     efficacy_rating: int
     is_active: bool = True
     next_refill: str
-    adherence_score: int
\ No newline at end of file
+    adherence_score: int
+    adherence_windows: list[WindowAdherence] = []
\ No newline at end of file
@@ -3,6 +3,7 @@ from app.enums import MealType
 
 
 class FoodItem(BaseModel):
+    id: int = 0
     name: str
     calories: int
     protein: float
@@ -22,4 +23,16 @@ class Meal(BaseModel):
 class DailyNutrition(BaseModel):
     date: str
     meals: list[Meal]
-    nutrition_score: int
\ No newline at end of file
+    nutrition_score: int
+
+class FoodMatch(BaseModel):
+    """A food database hit; macros are per 100 g, `grams` is the portion."""
+
+    fdc_id: int
+    name: str
+    category: str = ""
+    calories: float
+    protein: float
+    carbs: float
+    fat: float
+    grams: float = 100.0
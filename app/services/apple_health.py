@@ -0,0 +1,98 @@
+"""
+Streaming importer for Apple Health `export.xml` (or the `export.zip` the
+Health app produces).
+"""
+
+import contextlib
+import datetime
+import zipfile
+from pathlib import Path
+from typing import IO, Iterator
+from xml.etree.ElementTree import iterparse
+from app.config import settings
+from app.enums import SampleMetric
+from app.services.timeseries import Sample
+from app.services.wearable_sync import SyncBatch
+
+QUANTITY_TYPES: dict[str, SampleMetric] = {
+    "HKQuantityTypeIdentifierHeartRate": SampleMetric.HEART_RATE,
+    "HKQuantityTypeIdentifierHeartRateVariabilitySDNN": SampleMetric.HRV,
+    "HKQuantityTypeIdentifierStepCount": SampleMetric.STEPS,
+}
+SLEEP_TYPE = "HKCategoryTypeIdentifierSleepAnalysis"
+ASLEEP_PREFIX = "HKCategoryValueSleepAnalysisAsleep"
+
+
+def parse_export_date(raw: str) -> int:
+    """Epoch seconds from Health's "2024-02-01 08:00:00 -0800" format."""
+    iso = f"{raw[:10]}T{raw[11:19]}{raw[20:23]}:{raw[23:25]}"
+    return int(datetime.datetime.fromisoformat(iso).timestamp())
+
+
+@contextlib.contextmanager
+def open_export(path: Path) -> Iterator[tuple[IO[bytes], int]]:
+    """The export XML stream and its uncompressed size."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            member = next(
+                (i for i in archive.infolist() if i.filename.endswith("export.xml")),
+                None,
+            )
+            if member is None:
+                raise ValueError("Archive does not contain export.xml")
+            with archive.open(member) as handle:
+                yield handle, member.file_size
+    else:
+        with path.open("rb") as handle:
+            yield handle, path.stat().st_size
+
+
+def read_export(
+    path: Path,
+    patient_id: str,
+    source_id: str,
+    batch_size: int = settings.sync_batch_size,
+) -> Iterator[SyncBatch]:
+    """
+    Heart rate, HRV, step and sleep records as sample batches, parsed with
+    iterparse. Every element is cleared once handled and detached from the
+    root, so memory stays flat however large the export is. Sleep records
+    become minutes asleep at the interval start.
+    """
+    with open_export(path) as (handle, total):
+        events = iterparse(handle, events=("start", "end"))
+        _, root = next(events)
+        batch: list[Sample] = []
+        for event, elem in events:
+            if event != "end" or elem.tag != "Record":
+                continue
+            record_type = elem.get("type")
+            metric = QUANTITY_TYPES.get(record_type)
+            try:
+                if metric is not None:
+                    batch.append(
+                        Sample(
+                            patient_id,
+                            metric,
+                            parse_export_date(elem.get("startDate")),
+                            float(elem.get("value")),
+                            source_id,
+                        )
+                    )
+                elif record_type == SLEEP_TYPE and elem.get("value", "").startswith(
+                    ASLEEP_PREFIX
+                ):
+                    start = parse_export_date(elem.get("startDate"))
+                    end = parse_export_date(elem.get("endDate"))
+                    minutes = (end - start) / 60
+                    batch.append(
+                        Sample(patient_id, SampleMetric.SLEEP, start, minutes, source_id)
+                    )
+            except (TypeError, ValueError):
+                pass
+            elem.clear()
+            root.clear()
+            if len(batch) >= batch_size:
+                yield SyncBatch(batch, handle.tell(), total)
+                batch = []
+        yield SyncBatch(batch, total, total)
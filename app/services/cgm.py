@@ -0,0 +1,367 @@
+"""
+Continuous glucose monitor data and its daily glycemic-variability
+summaries. A CGM source syncs vendor CSV exports (Dexcom Clarity, LibreView)
+from its import directory, or a simulated 5-minute sensor when there is none.
+
+Each UTC day is summarized with the consensus CGM metrics: time in range
+(`glucose_range_min`-`glucose_range_max` mg/dL), below and above it, mean
+glucose, the coefficient of variation and MAGE. Summaries are stored per
+day and only the days the time-series store marked as touched since the
+last refresh are recomputed, so a sync adding one day of readings costs one
+day of work however long the history is.
+"""
+
+import csv
+import datetime
+import math
+import operator
+import random
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Iterator, NamedTuple
+from app.config import settings
+from app.enums import SampleMetric
+from app.services import db
+from app.services.timeseries import Sample, TimeSeriesStore, day_runs, timeseries
+from app.services.wearable_sync import (
+    SyncBatch,
+    import_directory,
+    parse_timestamp,
+)
+
+MMOL_TO_MG_DL = 18.016
+# Readings outside the sensor's range are exported as "Low" / "High".
+SENSOR_LIMITS = {"low": 40.0, "high": 400.0}
+TIMESTAMP_FORMATS = ("%m-%d-%Y %H:%M", "%m-%d-%Y %I:%M %p", "%d-%m-%Y %H:%M")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS glucose_days (
+    patient_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    readings INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    sd REAL NOT NULL,
+    cv REAL NOT NULL,
+    tir REAL NOT NULL,
+    tbr REAL NOT NULL,
+    tar REAL NOT NULL,
+    mage REAL NOT NULL,
+    PRIMARY KEY (patient_id, day)
+) WITHOUT ROWID;
+"""
+
+
+class ExportColumns(NamedTuple):
+    timestamp: int
+    glucose: list[int]
+    scale: float
+    event_type: int | None
+
+
+class DailyGlucose(NamedTuple):
+    """One UTC day (`ts // 86400`); glucose in mg/dL, time shares in percent."""
+
+    day: int
+    readings: int
+    mean: float
+    sd: float
+    cv: float
+    tir: float
+    tbr: float
+    tar: float
+    mage: float
+
+
+def export_columns(header: list[str]) -> ExportColumns | None:
+    """
+    Column positions of a CGM export header, or None if it is not one.
+    Dexcom has one glucose column and an event type ("EGV" rows are sensor
+    readings); LibreView has one per record type, of which a row fills one.
+    """
+    names = [name.strip().lower() for name in header]
+    timestamp = next((i for i, name in enumerate(names) if "timestamp" in name), None)
+    glucose = [
+        i
+        for i, name in enumerate(names)
+        if "glucose" in name
+        and "rate" not in name
+        and ("mg/dl" in name or "mmol/l" in name)
+    ]
+    if timestamp is None or not glucose:
+        return None
+    scale = MMOL_TO_MG_DL if "mmol/l" in names[glucose[0]] else 1.0
+    event_type = names.index("event type") if "event type" in names else None
+    return ExportColumns(timestamp, glucose, scale, event_type)
+
+
+def parse_export_time(raw: str) -> int:
+    """Epoch seconds from ISO 8601 or LibreView's month-first timestamps."""
+    try:
+        return parse_timestamp(raw)
+    except ValueError:
+        pass
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            parsed = datetime.datetime.strptime(raw, fmt)
+        except ValueError:
+            continue
+        return int(parsed.replace(tzinfo=datetime.timezone.utc).timestamp())
+    raise ValueError(f"Unrecognized timestamp {raw!r}")
+
+
+def parse_reading(
+    row: list[str], columns: ExportColumns, patient_id: str, source_id: str
+) -> Sample | None:
+    try:
+        if (
+            columns.event_type is not None
+            and row[columns.event_type].strip().lower() != "egv"
+        ):
+            return None
+        filled = (row[i].strip() for i in columns.glucose if i < len(row))
+        raw = next((value for value in filled if value), "")
+        if not raw:
+            return None
+        value = SENSOR_LIMITS.get(raw.lower())
+        if value is None:
+            value = float(raw) * columns.scale
+        return Sample(
+            patient_id,
+            SampleMetric.GLUCOSE,
+            parse_export_time(row[columns.timestamp].strip()),
+            round(value, 1),
+            source_id,
+        )
+    except (IndexError, ValueError):
+        return None
+
+
+def read_cgm_exports(
+    directory: Path,
+    patient_id: str,
+    source_id: str,
+    since: int = 0,
+    batch_size: int = settings.sync_batch_size,
+) -> Iterator[SyncBatch]:
+    """
+    Glucose readings newer than `since` from the CSV exports in `directory`,
+    with progress in bytes read. Lines before the header row (LibreView
+    starts with a report title) and files without CGM columns are skipped.
+    """
+    files = sorted(
+        path
+        for path in directory.iterdir()
+        if path.is_file() and path.suffix.lower() == ".csv"
+    )
+    total = sum(path.stat().st_size for path in files)
+    done = 0
+    batch: list[Sample] = []
+    for path in files:
+        columns = None
+        with path.open("rb") as handle:
+            for raw in handle:
+                done += len(raw)
+                line = raw.decode("utf-8-sig", errors="replace").strip()
+                if not line:
+                    continue
+                row = next(csv.reader([line]))
+                if columns is None:
+                    columns = export_columns(row)
+                    continue
+                sample = parse_reading(row, columns, patient_id, source_id)
+                if sample is not None and sample.ts > since:
+                    batch.append(sample)
+                if len(batch) >= batch_size:
+                    yield SyncBatch(batch, done, total)
+                    batch = []
+    yield SyncBatch(batch, done, total)
+
+
+def simulated_cgm(
+    patient_id: str,
+    source_id: str,
+    since: int = 0,
+    days: int = 14,
+    batch_size: int = settings.sync_batch_size,
+) -> Iterator[SyncBatch]:
+    """
+    Stand-in for a sensor when the source has no import directory: readings
+    every `cgm_interval_seconds` with a dawn rise, three meal peaks of
+    varying size per day and slowly drifting noise.
+    """
+    rng = random.Random(f"{patient_id}:{source_id}:{since}")
+    step = settings.cgm_interval_seconds
+    end = int(time.time()) // step * step
+    start = max(end - days * 86400, since // step * step + step)
+    total = max(0, (end - start) // step)
+    meals: list[tuple[float, float]] = []
+    day = None
+    drift = 0.0
+    batch: list[Sample] = []
+    for i, ts in enumerate(range(start, end, step)):
+        if ts // 86400 != day:
+            day = ts // 86400
+            meals = [(hour, rng.uniform(25, 75)) for hour in (7.5, 12.5, 19.0)]
+        hour = ts % 86400 / 3600
+        glucose = 90 + 10 * math.exp(-(((hour - 6) / 1.5) ** 2))
+        for meal_hour, rise in meals:
+            # Gamma-shaped response peaking 45 minutes after the meal.
+            t = (hour - meal_hour) / 0.75
+            if 0 < t < 6:
+                glucose += rise * t * math.exp(1 - t)
+        drift = 0.95 * drift + rng.gauss(0, 1.5)
+        batch.append(
+            Sample(
+                patient_id,
+                SampleMetric.GLUCOSE,
+                ts,
+                round(glucose + drift, 1),
+                source_id,
+            )
+        )
+        if len(batch) >= batch_size:
+            yield SyncBatch(batch, i + 1, total)
+            batch = []
+    yield SyncBatch(batch, total, total)
+
+
+def read_cgm_source(patient_id: str, source_id: str, since: int) -> Iterator[SyncBatch]:
+    directory = import_directory(patient_id, source_id)
+    if directory.is_dir():
+        return read_cgm_exports(directory, patient_id, source_id, since)
+    return simulated_cgm(patient_id, source_id, since)
+
+
+def mage(values: list[float], sd: float) -> float:
+    """
+    Mean amplitude of glycemic excursions: the mean height of the rises and
+    falls between turning points, where a turning point only counts once
+    glucose has reversed from it by more than one SD, so sensor noise does
+    not split an excursion.
+    """
+    if not values or sd <= 0:
+        return 0.0
+    low = high = values[0]
+    pivot = extreme = values[0]
+    direction = 0
+    amplitudes = []
+    for value in values:
+        if not direction:
+            low, high = min(low, value), max(high, value)
+            if value - low > sd:
+                direction, pivot, extreme = 1, low, value
+            elif high - value > sd:
+                direction, pivot, extreme = -1, high, value
+        elif (value - extreme) * direction > 0:
+            extreme = value
+        elif abs(extreme - value) > sd:
+            amplitudes.append(abs(extreme - pivot))
+            direction, pivot, extreme = -direction, extreme, value
+    if direction:
+        amplitudes.append(abs(extreme - pivot))
+    return math.fsum(amplitudes) / len(amplitudes) if amplitudes else 0.0
+
+
+def summarize_day(
+    day: int,
+    values: list[float],
+    low: float = settings.glucose_range_min,
+    high: float = settings.glucose_range_max,
+) -> DailyGlucose:
+    """
+    Metrics of one day's readings in time order. Sums run in `math.fsum`
+    and the range shares are two bisections of the sorted values, so only
+    MAGE walks the readings in Python.
+    """
+    n = len(values)
+    mean = math.fsum(values) / n
+    squares = math.fsum(map(operator.mul, values, values))
+    sd = math.sqrt(max(0.0, (squares - n * mean * mean) / (n - 1))) if n > 1 else 0.0
+    ordered = sorted(values)
+    below = bisect_left(ordered, low)
+    above = n - bisect_right(ordered, high)
+    return DailyGlucose(
+        day,
+        n,
+        round(mean, 1),
+        round(sd, 1),
+        round(100 * sd / mean, 1) if mean else 0.0,
+        round(100 * (n - below - above) / n, 1),
+        round(100 * below / n, 1),
+        round(100 * above / n, 1),
+        round(mage(values, sd), 1),
+    )
+
+
+def summarize_days(timestamps: list[int], values: list[float]) -> list[DailyGlucose]:
+    """Summaries of every day in a ts-ordered series, split by bisection."""
+    summaries = []
+    start = 0
+    while start < len(timestamps):
+        day = timestamps[start] // 86400
+        end = bisect_left(timestamps, (day + 1) * 86400, start)
+        summaries.append(summarize_day(day, values[start:end]))
+        start = end
+    return summaries
+
+
+class GlucoseSummaries:
+    def __init__(self, store: TimeSeriesStore = timeseries):
+        self._store = store
+        self._lock = threading.Lock()
+
+    def refresh(self, patient_id: str) -> int:
+        """
+        Recompute the days touched since the last refresh, reading each run
+        of consecutive days in one range query. Returns the number of days.
+        """
+        with self._lock:
+            days = self._store.take_touched_days(patient_id, SampleMetric.GLUCOSE)
+            if not days:
+                return 0
+            try:
+                summaries = []
+                for first, last in day_runs(days):
+                    timestamps, values = self._store.series(
+                        patient_id,
+                        SampleMetric.GLUCOSE,
+                        first * 86400,
+                        (last + 1) * 86400,
+                    )
+                    summaries.extend(summarize_days(timestamps, values))
+                self._save(patient_id, days, summaries)
+            except Exception:
+                self._store.touch_days(patient_id, SampleMetric.GLUCOSE, days)
+                raise
+            return len(days)
+
+    def _save(self, patient_id: str, days: list[int], summaries: list[DailyGlucose]):
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.executemany(
+                "DELETE FROM glucose_days WHERE patient_id = ? AND day = ?",
+                ((patient_id, day) for day in days),
+            )
+            conn.executemany(
+                "INSERT INTO glucose_days VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((patient_id, *summary) for summary in summaries),
+            )
+
+    def recent(
+        self, patient_id: str, limit: int = settings.glucose_summary_days
+    ) -> list[DailyGlucose]:
+        """The latest `limit` days, oldest first, after a refresh."""
+        self.refresh(patient_id)
+        db.ensure_schema(SCHEMA)
+        rows = db.connection().execute(
+            "SELECT day, readings, mean, sd, cv, tir, tbr, tar, mage "
+            "FROM glucose_days WHERE patient_id = ? ORDER BY day DESC LIMIT ?",
+            (patient_id, limit),
+        )
+        return [DailyGlucose(*row) for row in reversed(rows.fetchall())]
+
+
+glucose_summaries = GlucoseSummaries()
@@ -0,0 +1,181 @@
+"""
+Check-in history in SQLite with a bounded in-memory feed of the latest
+entries per patient.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from app.config import settings
+from app.enums import CheckInType, NoteKind
+from app.schemas.checkin import CheckIn
+from app.services import db
+from app.services.notes_index import notes_index
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkins (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    patient_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    audio_url TEXT,
+    sentiment_score REAL NOT NULL DEFAULT 0,
+    UNIQUE (patient_id, id)
+);
+CREATE INDEX IF NOT EXISTS checkins_patient_seq ON checkins (patient_id, seq);
+"""
+
+
+def _from_row(row) -> CheckIn:
+    return CheckIn(
+        id=row["id"],
+        type=CheckInType(row["type"]),
+        content=row["content"],
+        timestamp=row["timestamp"],
+        audio_url=row["audio_url"],
+        sentiment_score=row["sentiment_score"],
+        seq=row["seq"],
+    )
+
+
+class CheckInFeed:
+    """
+    Every check-in is written to storage; the newest `feed_size` per patient are
+    also kept in a fixed-size ring so the dashboard feed never grows. Older
+    entries are read back a page at a time with a seq cursor.
+    """
+
+    def __init__(
+        self,
+        feed_size: int = settings.checkin_feed_size,
+        max_patients: int = 1024,
+    ):
+        self._feed_size = feed_size
+        self._max_patients = max_patients
+        self._feeds: OrderedDict[str, deque[CheckIn]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def feed_size(self) -> int:
+        return self._feed_size
+
+    def append(self, patient_id: str, checkin: CheckIn) -> CheckIn:
+        if not patient_id:
+            raise ValueError("check-ins need a patient id")
+        with self._lock:
+            feed = self._feed(patient_id)
+        conn = db.connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO checkins (id, patient_id, type, content, timestamp, "
+                "audio_url, sentiment_score) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    checkin.id,
+                    patient_id,
+                    str(checkin.type),
+                    checkin.content,
+                    checkin.timestamp,
+                    checkin.audio_url,
+                    checkin.sentiment_score,
+                ),
+            )
+        notes_index.upsert(
+            patient_id, NoteKind.CHECKIN, checkin.id, checkin.content, checkin.timestamp
+        )
+        stored = checkin.model_copy(update={"seq": cursor.lastrowid})
+        with self._lock:
+            feed.appendleft(stored)
+        return stored
+
+    def seed(self, patient_id: str, checkins: list[CheckIn]):
+        """Store `checkins` (newest first) if the patient has no history yet."""
+        db.ensure_schema(SCHEMA)
+        row = (
+            db.connection()
+            .execute("SELECT 1 FROM checkins WHERE patient_id = ? LIMIT 1", (patient_id,))
+            .fetchone()
+        )
+        if row is None:
+            for checkin in reversed(checkins):
+                self.append(patient_id, checkin)
+
+    def recent(self, patient_id: str) -> list[CheckIn]:
+        with self._lock:
+            return list(self._feed(patient_id))
+
+    def history(
+        self, patient_id: str, before_seq: int, limit: int = settings.checkin_page_size
+    ) -> tuple[list[CheckIn], int]:
+        """
+        Up to `limit` check-ins older than `before_seq`, newest first, and the
+        cursor for the next page (0 when there is nothing older).
+        """
+        db.ensure_schema(SCHEMA)
+        rows = (
+            db.connection()
+            .execute(
+                "SELECT * FROM checkins WHERE patient_id = ? AND seq < ? "
+                "ORDER BY seq DESC LIMIT ?",
+                (patient_id, before_seq, limit + 1),
+            )
+            .fetchall()
+        )
+        page = [_from_row(row) for row in rows[:limit]]
+        next_cursor = page[-1].seq if len(rows) > limit else 0
+        return page, next_cursor
+
+    def update(self, patient_id: str, checkin_id: str, **fields) -> CheckIn | None:
+        """Write changed fields to storage and to the cached feed entry, if any."""
+        db.ensure_schema(SCHEMA)
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn = db.connection()
+        with conn:
+            conn.execute(
+                f"UPDATE checkins SET {assignments} WHERE patient_id = ? AND id = ?",
+                (*fields.values(), patient_id, checkin_id),
+            )
+        if "content" in fields:
+            row = conn.execute(
+                "SELECT timestamp FROM checkins WHERE patient_id = ? AND id = ?",
+                (patient_id, checkin_id),
+            ).fetchone()
+            if row is not None:
+                notes_index.upsert(
+                    patient_id,
+                    NoteKind.CHECKIN,
+                    checkin_id,
+                    fields["content"],
+                    row["timestamp"],
+                )
+        with self._lock:
+            feed = self._feed(patient_id)
+            for i, entry in enumerate(feed):
+                if entry.id == checkin_id:
+                    feed[i] = entry.model_copy(update=fields)
+                    return feed[i]
+        return None
+
+    def _feed(self, patient_id: str) -> deque[CheckIn]:
+        feed = self._feeds.get(patient_id)
+        if feed is None:
+            db.ensure_schema(SCHEMA)
+            rows = (
+                db.connection()
+                .execute(
+                    "SELECT * FROM checkins WHERE patient_id = ? "
+                    "ORDER BY seq DESC LIMIT ?",
+                    (patient_id, self._feed_size),
+                )
+                .fetchall()
+            )
+            feed = deque((_from_row(row) for row in rows), maxlen=self._feed_size)
+            self._feeds[patient_id] = feed
+            if len(self._feeds) > self._max_patients:
+                self._feeds.popitem(last=False)
+        else:
+            self._feeds.move_to_end(patient_id)
+        return feed
+
+
+checkin_feed = CheckInFeed()
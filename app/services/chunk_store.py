@@ -0,0 +1,168 @@
+"""
+Compressed chunk files for high-frequency series, one file per
+(patient, metric) under `data_dir/series_dir`. A file is a sequence of
+chunks, each a fixed header followed by the Gorilla-encoded points of one
+source. Files are append-only and read through mmap, so a range query
+decodes only the chunks that overlap it.
+"""
+
+import mmap
+import os
+import re
+import struct
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterator, NamedTuple
+from app.config import settings
+from app.services import gorilla
+
+# source, point count, first ts, last ts, payload bytes
+HEADER = struct.Struct("<16sIqqI")
+SUFFIX = ".chunks"
+
+_UNSAFE_RE = re.compile(r"[^\w.-]")
+
+
+def safe_name(name: str) -> str:
+    return _UNSAFE_RE.sub("_", name) or "_"
+
+
+class ChunkInfo(NamedTuple):
+    offset: int
+    source: str
+    count: int
+    first_ts: int
+    last_ts: int
+    nbytes: int
+
+
+class SeriesFile:
+    """
+    One (patient, metric) file. The chunk index is rebuilt from the headers
+    when the file is opened; a chunk cut short by a crash is truncated away.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._chunks: list[ChunkInfo] = []
+        self._last_ts: dict[str, int] = {}
+        self._size = 0
+        self._map: mmap.mmap | None = None
+        self._scan()
+
+    @property
+    def chunks(self) -> list[ChunkInfo]:
+        return list(self._chunks)
+
+    def last_ts(self, source: str) -> int | None:
+        return self._last_ts.get(source)
+
+    def nbytes(self) -> int:
+        return self._size
+
+    def append(self, source: str, timestamps: list[int], values: list[float]):
+        """Write points of one source, sorted by ts, as one or more chunks."""
+        size = settings.series_chunk_points
+        label = source.encode()
+        if len(label) > 16:
+            raise ValueError(f"Source id too long for a chunk header: {source!r}")
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            added = []
+            with open(self.path, "ab") as f:
+                offset = self._size
+                for i in range(0, len(timestamps), size):
+                    ts = timestamps[i : i + size]
+                    payload = gorilla.encode(ts, values[i : i + size])
+                    f.write(HEADER.pack(label, len(ts), ts[0], ts[-1], len(payload)))
+                    f.write(payload)
+                    offset += HEADER.size
+                    added.append(
+                        ChunkInfo(offset, source, len(ts), ts[0], ts[-1], len(payload))
+                    )
+                    offset += len(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            self._size = offset
+            for chunk in added:
+                self._add(chunk)
+
+    def read(
+        self, start: int, end: int
+    ) -> Iterator[tuple[str, list[int], list[float]]]:
+        """(source, timestamps, values) per chunk, trimmed to `start <= ts < end`."""
+        with self._lock:
+            chunks = [
+                c for c in self._chunks if c.last_ts >= start and c.first_ts < end
+            ]
+            data = self._mapped() if chunks else None
+        for chunk in chunks:
+            payload = data[chunk.offset : chunk.offset + chunk.nbytes]
+            ts, values = gorilla.decode(payload, chunk.first_ts, chunk.count)
+            lo = bisect_left(ts, start) if chunk.first_ts < start else 0
+            hi = bisect_left(ts, end) if chunk.last_ts >= end else len(ts)
+            if lo < hi:
+                yield chunk.source, ts[lo:hi], values[lo:hi]
+
+    def _mapped(self) -> mmap.mmap:
+        if self._map is None or len(self._map) != self._size:
+            # Readers may still hold the old map; it closes once released.
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), self._size, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _add(self, chunk: ChunkInfo):
+        self._chunks.append(chunk)
+        self._last_ts[chunk.source] = max(
+            chunk.last_ts, self._last_ts.get(chunk.source, chunk.last_ts)
+        )
+
+    def _scan(self):
+        if not self.path.exists():
+            return
+        size = self.path.stat().st_size
+        offset = 0
+        with open(self.path, "rb") as f:
+            while offset + HEADER.size <= size:
+                f.seek(offset)
+                label, count, first_ts, last_ts, nbytes = HEADER.unpack(
+                    f.read(HEADER.size)
+                )
+                if offset + HEADER.size + nbytes > size:
+                    break
+                source = label.rstrip(b"\0").decode()
+                offset += HEADER.size
+                self._add(ChunkInfo(offset, source, count, first_ts, last_ts, nbytes))
+                offset += nbytes
+        if offset != size:
+            os.truncate(self.path, offset)
+        self._size = offset
+
+
+class ChunkStore:
+    def __init__(self):
+        self._files: dict[Path, SeriesFile] = {}
+        self._lock = threading.Lock()
+
+    def root(self) -> Path:
+        return Path(settings.data_dir) / settings.series_dir
+
+    def series(self, patient_id: str, metric: str) -> SeriesFile:
+        path = self.root() / safe_name(patient_id) / f"{safe_name(metric)}{SUFFIX}"
+        with self._lock:
+            series = self._files.get(path)
+            if series is None:
+                series = self._files[path] = SeriesFile(path)
+            return series
+
+    def metrics(self, patient_id: str) -> list[str]:
+        """Metrics with a chunk file for the patient."""
+        directory = self.root() / safe_name(patient_id)
+        if not directory.is_dir():
+            return []
+        return sorted(path.stem for path in directory.glob(f"*{SUFFIX}"))
+
+
+chunk_store = ChunkStore()
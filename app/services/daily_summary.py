@@ -0,0 +1,271 @@
+"""
+Daily recovery summaries from raw wearable streams: RMSSD and SDNN from
+beat-to-beat RR intervals, resting heart rate from minute heart rate, and
+sleep efficiency and stage durations from 30-second sleep stage epochs.
+
+A summary day runs from `settings.sleep_day_offset` before midnight to the
+same time the next day and is named after the day it ends on, so a night
+and the HRV recorded during it share a row. Rows are recomputed only for
+the days the time-series store marked as touched by a sync, and the
+dashboard reads the stored rows, never the raw samples.
+"""
+
+import math
+import operator
+import threading
+from bisect import bisect_left
+from collections import Counter
+from typing import Iterator, NamedTuple
+from app.config import settings
+from app.enums import SampleMetric
+from app.services import db
+from app.services.timeseries import TimeSeriesStore, day_runs, timeseries
+
+SLEEP_STAGES = ("awake", "light", "deep", "rem")
+SUMMARY_METRICS = (
+    SampleMetric.HEART_RATE,
+    SampleMetric.RR_INTERVAL,
+    SampleMetric.SLEEP_STAGE,
+)
+RR_RANGE_MS = (300, 2000)
+# A beat is adjacent to the previous one if it arrived one interval later;
+# an adjacent interval changing by more than MAX_RR_CHANGE is an artifact.
+ADJACENT_TOLERANCE_MS = 50
+MAX_RR_CHANGE = 0.2
+RESTING_WINDOW = 1800
+RESTING_MIN_SAMPLES = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_summaries (
+    patient_id TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    beats INTEGER NOT NULL,
+    rmssd REAL,
+    sdnn REAL,
+    resting_hr REAL,
+    time_in_bed REAL NOT NULL,
+    asleep REAL NOT NULL,
+    efficiency REAL,
+    awake REAL NOT NULL,
+    light REAL NOT NULL,
+    deep REAL NOT NULL,
+    rem REAL NOT NULL,
+    PRIMARY KEY (patient_id, day)
+) WITHOUT ROWID;
+"""
+
+
+class DailySummary(NamedTuple):
+    """HRV in ms, resting HR in bpm, sleep in minutes, efficiency in percent."""
+
+    day: int
+    beats: int
+    rmssd: float | None
+    sdnn: float | None
+    resting_hr: float | None
+    time_in_bed: float
+    asleep: float
+    efficiency: float | None
+    awake: float
+    light: float
+    deep: float
+    rem: float
+
+
+def hrv(
+    timestamps: list[int], intervals: list[float]
+) -> tuple[int, float | None, float | None]:
+    """
+    Normal-to-normal beat count, RMSSD and SDNN of a beat series (beat times
+    in ms, each with the interval ending at it). Implausible intervals and
+    artifacts are dropped, and successive differences are only taken between
+    adjacent beats, so gaps between recordings don't count as variability.
+    """
+    nn: list[float] = []
+    diffs: list[float] = []
+    prev_ts = prev_rr = None
+    for ts, rr in zip(timestamps, intervals):
+        if not RR_RANGE_MS[0] <= rr <= RR_RANGE_MS[1]:
+            prev_ts = None
+            continue
+        adjacent = (
+            prev_ts is not None and abs(ts - prev_ts - rr) <= ADJACENT_TOLERANCE_MS
+        )
+        if adjacent and abs(rr - prev_rr) > MAX_RR_CHANGE * prev_rr:
+            prev_ts = None
+            continue
+        nn.append(rr)
+        if adjacent:
+            diffs.append(rr - prev_rr)
+        prev_ts, prev_rr = ts, rr
+    n = len(nn)
+    rmssd = None
+    if diffs:
+        rmssd = math.sqrt(math.fsum(map(operator.mul, diffs, diffs)) / len(diffs))
+    if n < 2:
+        return n, rmssd, None
+    mean = math.fsum(nn) / n
+    squares = math.fsum(map(operator.mul, nn, nn))
+    return n, rmssd, math.sqrt(max(0.0, (squares - n * mean * mean) / (n - 1)))
+
+
+def resting_heart_rate(timestamps: list[int], values: list[float]) -> float | None:
+    """The lowest mean heart rate over any RESTING_WINDOW seconds."""
+    best = None
+    total = 0.0
+    lo = 0
+    for hi, ts in enumerate(timestamps):
+        total += values[hi]
+        while ts - timestamps[lo] >= RESTING_WINDOW:
+            total -= values[lo]
+            lo += 1
+        count = hi - lo + 1
+        if count >= RESTING_MIN_SAMPLES and (best is None or total / count < best):
+            best = total / count
+    return best
+
+
+def sleep_minutes(
+    stages: list[float], epoch: int = settings.sleep_epoch_seconds
+) -> list[float]:
+    """Minutes per entry of SLEEP_STAGES from one epoch per stage sample."""
+    counts = Counter(map(int, stages))
+    return [counts[code] * epoch / 60 for code in range(len(SLEEP_STAGES))]
+
+
+def summarize_day(
+    day: int,
+    heart_rate: tuple[list[int], list[float]],
+    beats: tuple[list[int], list[float]],
+    stages: tuple[list[int], list[float]],
+) -> DailySummary | None:
+    """One day's row from its slices of each stream, or None if all are empty."""
+    if not (heart_rate[0] or beats[0] or stages[0]):
+        return None
+    count, rmssd, sdnn = hrv(*beats)
+    resting = resting_heart_rate(*heart_rate)
+    awake, light, deep, rem = sleep_minutes(stages[1])
+    asleep = light + deep + rem
+    in_bed = awake + asleep
+    return DailySummary(
+        day,
+        count,
+        _rounded(rmssd),
+        _rounded(sdnn),
+        _rounded(resting),
+        in_bed,
+        asleep,
+        round(100 * asleep / in_bed, 1) if in_bed else None,
+        awake,
+        light,
+        deep,
+        rem,
+    )
+
+
+def _rounded(value: float | None) -> float | None:
+    return round(value, 1) if value is not None else None
+
+
+def summary_days(utc_day: int, offset: int = settings.sleep_day_offset) -> range:
+    """The summary days overlapping a UTC day."""
+    start = utc_day * 86400 + offset
+    return range(start // 86400, (start + 86399) // 86400 + 1)
+
+
+def _day_slices(
+    timestamps: list[int], values: list[float], first: int, last: int, scale: int
+) -> Iterator[tuple[list[int], list[float]]]:
+    """Each summary day's part of a ts-ordered series, split by bisection."""
+    lo = 0
+    for day in range(first, last + 1):
+        hi = bisect_left(
+            timestamps, ((day + 1) * 86400 - settings.sleep_day_offset) * scale, lo
+        )
+        yield timestamps[lo:hi], values[lo:hi]
+        lo = hi
+
+
+class DailySummaries:
+    def __init__(self, store: TimeSeriesStore = timeseries):
+        self._store = store
+        self._lock = threading.Lock()
+
+    def refresh(self, patient_id: str) -> int:
+        """
+        Recompute the summary days overlapping the UTC days touched since
+        the last refresh, reading each stream once per run of consecutive
+        days. Returns the number of days.
+        """
+        with self._lock:
+            touched = {
+                metric: self._store.take_touched_days(patient_id, metric)
+                for metric in SUMMARY_METRICS
+            }
+            days = sorted(
+                {
+                    day
+                    for utc_days in touched.values()
+                    for utc_day in utc_days
+                    for day in summary_days(utc_day)
+                }
+            )
+            if not days:
+                return 0
+            try:
+                summaries = []
+                for first, last in day_runs(days):
+                    summaries.extend(self._summarize(patient_id, first, last))
+                self._save(patient_id, days, summaries)
+            except Exception:
+                for metric, utc_days in touched.items():
+                    self._store.touch_days(patient_id, metric, utc_days)
+                raise
+            return len(days)
+
+    def _summarize(self, patient_id: str, first: int, last: int) -> list[DailySummary]:
+        start = first * 86400 - settings.sleep_day_offset
+        end = (last + 1) * 86400 - settings.sleep_day_offset
+        slices = []
+        for metric in SUMMARY_METRICS:
+            scale = 1000 if metric in settings.millisecond_metrics else 1
+            timestamps, values = self._store.series(
+                patient_id, metric, start * scale, end * scale
+            )
+            slices.append(_day_slices(timestamps, values, first, last, scale))
+        return [
+            summary
+            for day, parts in zip(range(first, last + 1), zip(*slices))
+            if (summary := summarize_day(day, *parts)) is not None
+        ]
+
+    def _save(self, patient_id: str, days: list[int], summaries: list[DailySummary]):
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.executemany(
+                "DELETE FROM daily_summaries WHERE patient_id = ? AND day = ?",
+                ((patient_id, day) for day in days),
+            )
+            conn.executemany(
+                "INSERT INTO daily_summaries "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((patient_id, *summary) for summary in summaries),
+            )
+
+    def recent(
+        self, patient_id: str, limit: int = settings.recovery_summary_days
+    ) -> list[DailySummary]:
+        """The latest `limit` days, oldest first, after a refresh."""
+        self.refresh(patient_id)
+        db.ensure_schema(SCHEMA)
+        rows = db.connection().execute(
+            "SELECT day, beats, rmssd, sdnn, resting_hr, time_in_bed, asleep, "
+            "efficiency, awake, light, deep, rem FROM daily_summaries "
+            "WHERE patient_id = ? ORDER BY day DESC LIMIT ?",
+            (patient_id, limit),
+        )
+        return [DailySummary(*row) for row in reversed(rows.fetchall())]
+
+
+daily_summaries = DailySummaries()
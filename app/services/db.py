@@ -0,0 +1,45 @@
+"""
+Local SQLite storage shared by the backend services.
+Connections are per thread; every store declares its own tables with
+`ensure_schema`, so modules only create what they use.
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from app.config import settings
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_applied_schemas: set[tuple[str, str]] = set()
+
+
+def database_path() -> Path:
+    path = Path(settings.data_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path / settings.database_name
+
+
+def connection() -> sqlite3.Connection:
+    path = str(database_path())
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != path:
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+        _local.path = path
+    return conn
+
+
+def ensure_schema(ddl: str):
+    """Run idempotent DDL once per database file and process."""
+    conn = connection()
+    key = (_local.path, ddl)
+    if key in _applied_schemas:
+        return
+    with _schema_lock:
+        if key not in _applied_schemas:
+            conn.executescript(ddl)
+            _applied_schemas.add(key)
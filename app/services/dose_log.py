@@ -0,0 +1,273 @@
+"""
+Medication adherence from an append-only dose event log.
+
+Every dose marked as taken is appended to `dose_events`, which triggers keep
+from being updated or deleted. A medication's schedule divides time into
+dose slots (a UTC day for daily medications, a week for weekly ones) and its
+adherence over a window is the share of the window's slots with a dose
+logged; the current slot only counts once it has one.
+
+Per medication, an `AdherenceTracker` holds the taken slots of the longest
+window and, per window, how many of them are inside it. Logging a dose bumps
+the counters and time moving on expires slots from the front, so each dose
+is counted and expired once per window and reading adherence never rescans
+the log. Trackers are loaded once per process from the log's last longest
+window.
+"""
+
+import random
+import threading
+import time
+from bisect import insort
+from collections import deque
+from app.config import settings
+from app.enums import TreatmentFrequency
+from app.services import db
+
+DAY = 86400
+SLOT_SECONDS: dict[str, int] = {
+    TreatmentFrequency.DAILY: DAY,
+    TreatmentFrequency.WEEKLY: 7 * DAY,
+    TreatmentFrequency.BI_WEEKLY: 14 * DAY,
+    TreatmentFrequency.MONTHLY: 30 * DAY,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dose_schedules (
+    patient_id TEXT NOT NULL,
+    medication_id TEXT NOT NULL,
+    slot_seconds INTEGER NOT NULL,
+    started INTEGER NOT NULL,
+    PRIMARY KEY (patient_id, medication_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dose_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    patient_id TEXT NOT NULL,
+    medication_id TEXT NOT NULL,
+    ts INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dose_events_medication
+    ON dose_events (patient_id, medication_id, ts);
+CREATE TRIGGER IF NOT EXISTS dose_events_no_update
+BEFORE UPDATE ON dose_events BEGIN
+    SELECT RAISE(ABORT, 'dose_events is append-only');
+END;
+CREATE TRIGGER IF NOT EXISTS dose_events_no_delete
+BEFORE DELETE ON dose_events BEGIN
+    SELECT RAISE(ABORT, 'dose_events is append-only');
+END;
+"""
+
+
+class AdherenceTracker:
+    def __init__(
+        self,
+        slot_seconds: int,
+        started: int,
+        windows: list[int] = settings.adherence_windows,
+    ):
+        self._slot_seconds = slot_seconds
+        self._start = started // slot_seconds
+        self._now = self._start
+        # A window shorter than one slot still covers the latest slot.
+        self._sizes = {w: max(1, w * DAY // slot_seconds) for w in windows}
+        self._longest = max(self._sizes.values())
+        self._taken: deque[int] = deque()
+        self._counts = dict.fromkeys(windows, 0)
+
+    def add(self, ts: int):
+        """Count a dose; further doses in the same slot don't count again."""
+        slot = ts // self._slot_seconds
+        self._start = min(self._start, slot)
+        if slot <= self._now - self._longest:
+            return
+        if not self._taken or slot > self._taken[-1]:
+            self._taken.append(slot)
+        elif slot in self._taken:
+            return
+        else:
+            # A dose logged late, after a newer one; the rare path.
+            insort(self._taken, slot)
+        for window, size in self._sizes.items():
+            if slot > self._now - size:
+                self._counts[window] += 1
+
+    def advance(self, ts: int):
+        """Move the windows to end at the slot containing `ts`."""
+        now = ts // self._slot_seconds
+        if now <= self._now:
+            return
+        self._now = now
+        taken = self._taken
+        for window, size in self._sizes.items():
+            first = now - size + 1
+            while self._counts[window] and taken[-self._counts[window]] < first:
+                self._counts[window] -= 1
+        while taken and taken[0] <= now - self._longest:
+            taken.popleft()
+
+    def counts(self, window: int) -> tuple[int, int]:
+        """Slots taken and slots due in a window, as of the last advance."""
+        due = min(self._sizes[window], self._now - self._start + 1)
+        if not (self._taken and self._taken[-1] == self._now):
+            due -= 1
+        return self._counts[window], max(0, due)
+
+    def adherence(self, window: int) -> float | None:
+        taken, due = self.counts(window)
+        return min(1.0, taken / due) if due else None
+
+
+class DoseLog:
+    def __init__(self, windows: list[int] = settings.adherence_windows):
+        self._windows = windows
+        self._trackers: dict[tuple[str, str], AdherenceTracker | None] = {}
+        self._lock = threading.Lock()
+
+    def schedule(
+        self, patient_id: str, medication_id: str, frequency: str, started: int = 0
+    ):
+        """
+        Start tracking a medication taken on a schedule; as-needed ones have
+        no slots and are not tracked. Rescheduling keeps the first start.
+        """
+        slot_seconds = SLOT_SECONDS.get(frequency)
+        if slot_seconds is None:
+            return
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO dose_schedules VALUES (?, ?, ?, ?)",
+                (patient_id, medication_id, slot_seconds, started or int(time.time())),
+            )
+        with self._lock:
+            if self._trackers.get((patient_id, medication_id), 0) is None:
+                del self._trackers[(patient_id, medication_id)]
+
+    def record(self, patient_id: str, medication_id: str, ts: int = 0) -> int:
+        ts = ts or int(time.time())
+        db.ensure_schema(SCHEMA)
+        with self._lock:
+            tracker = self._tracker(patient_id, medication_id)
+            conn = db.connection()
+            with conn:
+                conn.execute(
+                    "INSERT INTO dose_events (patient_id, medication_id, ts) "
+                    "VALUES (?, ?, ?)",
+                    (patient_id, medication_id, ts),
+                )
+            if tracker is not None:
+                tracker.add(ts)
+        return ts
+
+    def adherence(
+        self, patient_id: str, medication_id: str, now: int = 0
+    ) -> dict[int, float | None]:
+        """Adherence per window in [0, 1], None where no dose was due yet."""
+        with self._lock:
+            tracker = self._tracker(patient_id, medication_id)
+            if tracker is None:
+                return dict.fromkeys(self._windows)
+            tracker.advance(now or int(time.time()))
+            return {window: tracker.adherence(window) for window in self._windows}
+
+    def overall(
+        self,
+        patient_id: str,
+        medication_ids: list[str],
+        window: int = settings.adherence_overall_window,
+        now: int = 0,
+    ) -> float | None:
+        """Doses taken over doses due across the medications in one window."""
+        taken = due = 0
+        with self._lock:
+            for medication_id in medication_ids:
+                tracker = self._tracker(patient_id, medication_id)
+                if tracker is None:
+                    continue
+                tracker.advance(now or int(time.time()))
+                counts = tracker.counts(window)
+                taken += counts[0]
+                due += counts[1]
+        return min(1.0, taken / due) if due else None
+
+    def _tracker(self, patient_id: str, medication_id: str) -> AdherenceTracker | None:
+        """The loaded tracker, or one built from the log's longest window."""
+        key = (patient_id, medication_id)
+        if key in self._trackers:
+            return self._trackers[key]
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        row = conn.execute(
+            "SELECT slot_seconds, started FROM dose_schedules "
+            "WHERE patient_id = ? AND medication_id = ?",
+            key,
+        ).fetchone()
+        tracker = None
+        if row is not None:
+            slot_seconds = row["slot_seconds"]
+            tracker = AdherenceTracker(slot_seconds, row["started"], self._windows)
+            now = int(time.time())
+            tracker.advance(now)
+            since = now - max(max(self._windows) * DAY, slot_seconds) - slot_seconds
+            for (ts,) in conn.execute(
+                "SELECT ts FROM dose_events WHERE patient_id = ? "
+                "AND medication_id = ? AND ts >= ? ORDER BY ts",
+                (*key, since),
+            ):
+                tracker.add(ts)
+        self._trackers[key] = tracker
+        return tracker
+
+    def seed(
+        self,
+        patient_id: str,
+        schedules: dict[str, str],
+        days: int = max(settings.adherence_windows),
+        rate: float = 0.92,
+    ):
+        """
+        Simulated history for a patient with no schedules yet: each of
+        `schedules` (medication id to frequency) started `days` ago and
+        taken in about `rate` of its slots since.
+        """
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        row = conn.execute(
+            "SELECT 1 FROM dose_schedules WHERE patient_id = ? LIMIT 1", (patient_id,)
+        ).fetchone()
+        if row is not None:
+            return
+        rng = random.Random(patient_id)
+        now = int(time.time())
+        started = (now - days * DAY) // DAY * DAY
+        events = []
+        for medication_id, frequency in schedules.items():
+            slot_seconds = SLOT_SECONDS.get(frequency)
+            if slot_seconds is None:
+                continue
+            for slot_start in range(started, now - slot_seconds, slot_seconds):
+                if rng.random() < rate:
+                    ts = slot_start + rng.randint(7 * 3600, 10 * 3600)
+                    events.append((patient_id, medication_id, ts))
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO dose_schedules VALUES (?, ?, ?, ?)",
+                (
+                    (patient_id, medication_id, SLOT_SECONDS[frequency], started)
+                    for medication_id, frequency in schedules.items()
+                    if frequency in SLOT_SECONDS
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO dose_events (patient_id, medication_id, ts) "
+                "VALUES (?, ?, ?)",
+                sorted(events, key=lambda event: event[2]),
+            )
+        with self._lock:
+            for medication_id in schedules:
+                self._trackers.pop((patient_id, medication_id), None)
+
+
+dose_log = DoseLog()
@@ -0,0 +1,333 @@
+"""
+Epigenetic clocks over methylation array beta values. A clock is a linear
+model over a few hundred CpGs, so scoring a matrix of hundreds of thousands
+of CpGs x samples is a sparse dot product: only the rows of the clock's CpGs
+are parsed, and each adds `coefficient x beta` to every sample's sum.
+
+Matrices are CSV/TSV exports with one CpG per row and one sample per column
+(the ID_REF layout of GEO series matrices and minfi). They are split into
+byte ranges scored in parallel worker processes; each worker streams its
+range in blocks and returns per-sample partial sums, so memory per worker
+is bounded by the block size and the sample count, not the matrix size.
+
+Coefficients are read from `data_dir/epigenetic_clock_dir/<clock>.csv`,
+e.g. the supplementary tables of Horvath (2013) or Hannum et al. (2013):
+the first column is the CpG id, the coefficient is taken from the first
+column whose name contains "coef" (else the second) and the intercept row
+is named "(Intercept)" or "Intercept".
+"""
+
+import csv
+import math
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, NamedTuple
+from app.config import settings
+from app.services import db
+
+BLOCK_SIZE = 8 << 20
+MATRIX_SUFFIXES = (".csv", ".tsv", ".txt")
+MISSING_VALUES = frozenset({b"", b"na", b"nan", b"null", b"."})
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS epigenetic_ages (
+    patient_id TEXT NOT NULL,
+    clock TEXT NOT NULL,
+    sample_id TEXT NOT NULL,
+    age REAL NOT NULL,
+    coverage REAL NOT NULL,
+    computed_at INTEGER NOT NULL,
+    PRIMARY KEY (patient_id, clock, sample_id)
+) WITHOUT ROWID;
+"""
+
+
+class Clock(NamedTuple):
+    name: str
+    intercept: float
+    weights: dict[str, float]
+    transform: str = "linear"
+
+
+class EpigeneticAge(NamedTuple):
+    patient_id: str
+    clock: str
+    sample_id: str
+    age: float
+    coverage: float
+
+
+class RangeSums(NamedTuple):
+    """Partial dot products of one byte range: per clock, one sum per sample."""
+
+    sums: dict[str, list[float]]
+    matched: dict[str, int]
+
+
+def horvath_age(score: float, adult_age: float = 20.0) -> float:
+    """Inverse of Horvath's log-linear age transform."""
+    if score < 0:
+        return (1 + adult_age) * math.exp(score) - 1
+    return score * (1 + adult_age) + adult_age
+
+
+TRANSFORMS = {"linear": lambda score: score, "horvath": horvath_age}
+
+
+def load_clock(path: Path, transform: str = "linear") -> Clock:
+    with path.open(newline="", encoding="utf-8") as f:
+        rows = csv.reader(f)
+        header = [name.strip().lower() for name in next(rows)]
+        column = next((i for i, name in enumerate(header) if "coef" in name), 1)
+        intercept = 0.0
+        weights = {}
+        for row in rows:
+            if len(row) <= column or not row[0].strip():
+                continue
+            cpg, coefficient = row[0].strip(), float(row[column])
+            if cpg.strip("()").lower() == "intercept":
+                intercept = coefficient
+            elif coefficient:
+                weights[cpg] = coefficient
+    return Clock(path.stem, intercept, weights, transform)
+
+
+def load_clocks(
+    directory: Path | None = None,
+    transforms: dict[str, str] = settings.epigenetic_clocks,
+) -> list[Clock]:
+    """The configured clocks whose coefficient files are present."""
+    directory = directory or Path(settings.data_dir) / settings.epigenetic_clock_dir
+    return [
+        load_clock(directory / f"{name}.csv", transform)
+        for name, transform in transforms.items()
+        if (directory / f"{name}.csv").is_file()
+    ]
+
+
+def read_header(path: Path) -> tuple[list[str], bytes, int]:
+    """Sample ids, the field delimiter and the offset of the first data row."""
+    with path.open("rb") as f:
+        line = f.readline()
+        offset = f.tell()
+    delimiter = b"\t" if b"\t" in line else b","
+    names = line.rstrip(b"\r\n").split(delimiter)[1:]
+    return [name.strip().strip(b'"').decode() for name in names], delimiter, offset
+
+
+def byte_ranges(start: int, size: int, chunk: int) -> list[tuple[int, int]]:
+    return [(offset, min(offset + chunk, size)) for offset in range(start, size, chunk)]
+
+
+def _blocks(path: Path, start: int, end: int) -> Iterator[bytes]:
+    """
+    Whole lines starting in [start, end), in blocks of about BLOCK_SIZE.
+    A line belongs to the range its first byte falls in.
+    """
+    with path.open("rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()
+        pos = f.tell()
+        while pos < end:
+            data = f.read(min(BLOCK_SIZE, end - pos))
+            if not data:
+                return
+            if not data.endswith(b"\n"):
+                data += f.readline()
+            pos = f.tell()
+            yield data
+
+
+def _beta(field: bytes) -> float | None:
+    field = field.strip().strip(b'"')
+    if field.lower() in MISSING_VALUES:
+        return None
+    try:
+        return float(field)
+    except ValueError:
+        return None
+
+
+def score_range(
+    path: str,
+    start: int,
+    end: int,
+    samples: int,
+    delimiter: bytes,
+    clocks: list[Clock],
+) -> RangeSums:
+    """
+    Sum `coefficient x beta` per clock and sample over the CpG rows in one
+    byte range. Runs in worker processes. A missing beta is imputed with
+    the mean of the CpG's other samples; a CpG missing in every sample does
+    not count as matched.
+    """
+    # Row ids as they may appear, bare or quoted; a set lookup on each line's
+    # first field skips the rows of other CpGs without splitting them.
+    wanted = {}
+    for cpg in {cpg for clock in clocks for cpg in clock.weights}:
+        wanted[cpg.encode()] = wanted[f'"{cpg}"'.encode()] = cpg
+    sums = {clock.name: [0.0] * samples for clock in clocks}
+    matched = dict.fromkeys(sums, 0)
+    for data in _blocks(Path(path), start, end):
+        for line in data.split(b"\n"):
+            cpg = wanted.get(line[: line.find(delimiter)])
+            if cpg is None:
+                continue
+            fields = line.rstrip(b"\r").split(delimiter)[1 : samples + 1]
+            betas = [_beta(field) for field in fields]
+            present = [beta for beta in betas if beta is not None]
+            if not present:
+                continue
+            if len(present) < samples:
+                mean = sum(present) / len(present)
+                betas = [mean if beta is None else beta for beta in betas]
+                betas += [mean] * (samples - len(betas))
+            for clock in clocks:
+                coefficient = clock.weights.get(cpg)
+                if coefficient is None:
+                    continue
+                sums[clock.name] = [
+                    acc + coefficient * beta
+                    for acc, beta in zip(sums[clock.name], betas)
+                ]
+                matched[clock.name] += 1
+    return RangeSums(sums, matched)
+
+
+def score_matrices(
+    paths: list[Path],
+    clocks: list[Clock],
+    workers: int = settings.epigenetic_workers,
+    chunk_bytes: int = settings.epigenetic_chunk_bytes,
+) -> Iterator[tuple[Path, list[str], RangeSums]]:
+    """Per file: sample ids and the summed ranges, scored in a process pool."""
+    if not paths or not clocks:
+        return
+    jobs = []
+    for path in paths:
+        samples, delimiter, start = read_header(path)
+        ranges = byte_ranges(start, path.stat().st_size, chunk_bytes)
+        jobs.append((path, samples, delimiter, ranges))
+    workers = workers or os.cpu_count() or 1
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [
+            (
+                path,
+                samples,
+                [
+                    pool.submit(
+                        score_range, str(path), lo, hi, len(samples), delimiter, clocks
+                    )
+                    for lo, hi in ranges
+                ],
+            )
+            for path, samples, delimiter, ranges in jobs
+        ]
+        for path, samples, parts in futures:
+            sums = {clock.name: [0.0] * len(samples) for clock in clocks}
+            matched = dict.fromkeys(sums, 0)
+            for part in parts:
+                result = part.result()
+                for name, values in result.sums.items():
+                    sums[name] = [a + b for a, b in zip(sums[name], values)]
+                    matched[name] += result.matched[name]
+            yield path, samples, RangeSums(sums, matched)
+
+
+def clock_ages(
+    samples: list[str],
+    totals: RangeSums,
+    clocks: list[Clock],
+    patient_id: str = "",
+    min_coverage: float = settings.epigenetic_min_coverage,
+) -> list[EpigeneticAge]:
+    """
+    Ages from summed dot products. Sample ids are taken as patient ids
+    unless `patient_id` is given. Clocks covering less than `min_coverage`
+    of their CpGs are skipped, as their missing terms would bias the age.
+    """
+    return [
+        EpigeneticAge(
+            patient_id or sample,
+            clock.name,
+            sample,
+            round(TRANSFORMS[clock.transform](clock.intercept + score), 2),
+            round(totals.matched[clock.name] / len(clock.weights), 4),
+        )
+        for clock in clocks
+        if clock.weights
+        and totals.matched[clock.name] >= min_coverage * len(clock.weights)
+        for sample, score in zip(samples, totals.sums[clock.name])
+    ]
+
+
+class EpigeneticAgeStore:
+    def save(self, ages: list[EpigeneticAge]):
+        db.ensure_schema(SCHEMA)
+        now = int(time.time())
+        conn = db.connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO epigenetic_ages VALUES (?, ?, ?, ?, ?, ?)",
+                ((*age, now) for age in ages),
+            )
+
+    def latest(self, clock: str) -> dict[str, EpigeneticAge]:
+        """Each patient's most recent age from `clock`."""
+        db.ensure_schema(SCHEMA)
+        rows = db.connection().execute(
+            "SELECT patient_id, clock, sample_id, age, coverage FROM epigenetic_ages "
+            "WHERE clock = ? ORDER BY computed_at",
+            (clock,),
+        )
+        return {row[0]: EpigeneticAge(*row) for row in rows}
+
+
+epigenetic_ages = EpigeneticAgeStore()
+
+
+def methylation_directory() -> Path:
+    return Path(settings.data_dir) / settings.import_dir / settings.methylation_dir
+
+
+def run_clocks(
+    paths: list[Path],
+    patient_id: str = "",
+    store: EpigeneticAgeStore = epigenetic_ages,
+) -> list[EpigeneticAge]:
+    """Score `paths` with every configured clock and store the ages."""
+    clocks = load_clocks()
+    ages = []
+    for _, samples, totals in score_matrices(paths, clocks):
+        ages.extend(clock_ages(samples, totals, clocks, patient_id))
+    store.save(ages)
+    return ages
+
+
+def run_clock_directory(directory: Path | None = None) -> list[EpigeneticAge]:
+    """
+    Score the matrices waiting in the methylation import directory, then
+    move them to `processed/`. Files stay in place when no clock is
+    configured, so they are scored once coefficients are added.
+    """
+    directory = directory or methylation_directory()
+    if not directory.is_dir() or not load_clocks():
+        return []
+    paths = sorted(
+        path
+        for path in directory.iterdir()
+        if path.is_file() and path.suffix.lower() in MATRIX_SUFFIXES
+    )
+    ages = run_clocks(paths)
+    processed = directory / "processed"
+    processed.mkdir(exist_ok=True)
+    for path in paths:
+        shutil.move(str(path), processed / path.name)
+    return ages
@@ -0,0 +1,330 @@
+"""
+Local food-composition database for meal logging. Foods are read from a
+flattened USDA FoodData Central style CSV (`settings.food_db_path`, one food
+per row with its macros per 100 g) and compiled once into a binary index
+under `data_dir` that is memory-mapped on first search, so neither startup
+nor each worker pays for parsing the dataset. The index is rebuilt when the
+CSV's size or mtime no longer match the ones it was compiled from.
+
+The index holds two sorted tables over one array of postings:
+
+- the vocabulary of description words, each with the ids of the foods it
+  occurs in. Sorted, every prefix's words are one contiguous range found by
+  bisection, which makes the table a flattened prefix trie.
+- the padded trigrams of those words, each with the ids of the words it
+  occurs in, to correct a typed word that matches no prefix to the
+  vocabulary words sharing most of its trigrams.
+
+Food ids are assigned shortest description first, the generic foods
+("Apples, raw") before their variants, so walking postings in id order
+visits foods in default rank order and a search stops after a bounded
+number of matches however many foods share the query's prefix.
+"""
+
+import csv
+import heapq
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import groupby
+from pathlib import Path
+from struct import Struct
+from typing import Iterable, Iterator, NamedTuple
+from app.config import settings
+from app.services.notes_index import tokenize
+
+MAGIC = b"AEFOOD01"
+# Native-endian like the postings array; the index is a local cache.
+_HEADER = Struct("=8sqqIIII")
+_FOOD = Struct("=IIHIHIH5f")
+_ENTRY = Struct("=IHII")
+GRAM_PAD = "$"
+# Matches ranked per search before the top `limit` are picked by relevance.
+CANDIDATE_FACTOR = 8
+FUZZY_MIN_LENGTH = 3
+FUZZY_MIN_SIMILARITY = 0.5
+FUZZY_TERMS = 8
+MACRO_COLUMNS = ("energy_kcal", "protein_g", "carbohydrate_g", "fat_g", "fiber_g")
+
+
+class Food(NamedTuple):
+    """Macros are per 100 g: energy in kcal, the rest in grams."""
+
+    fdc_id: int
+    name: str
+    category: str
+    calories: float
+    protein: float
+    carbs: float
+    fat: float
+    fiber: float
+
+
+class _Match(NamedTuple):
+    """The vocabulary words one query token stands for."""
+
+    terms: range | list[int]
+    prefix: str
+    words: frozenset[str]
+
+    def accepts(self, words: list[str]) -> bool:
+        if self.prefix:
+            return any(word.startswith(self.prefix) for word in words)
+        return not self.words.isdisjoint(words)
+
+
+def trigrams(word: str) -> set[str]:
+    """
+    Trigrams of a word padded at the start only, so a prefix of a word
+    shares all of its trigrams with the word.
+    """
+    padded = GRAM_PAD + word
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def read_foods(path: Path) -> list[tuple[int, str, str, tuple[float, ...]]]:
+    """(fdc_id, description, category, macros) rows; blank macros are 0."""
+    foods = []
+    with path.open(newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            name = (row.get("description") or "").strip()
+            if not name:
+                continue
+            macros = tuple(float(row.get(column) or 0) for column in MACRO_COLUMNS)
+            fdc_id = int(row.get("fdc_id") or 0)
+            foods.append((fdc_id, name, (row.get("category") or "").strip(), macros))
+    return foods
+
+
+class _Blob:
+    def __init__(self):
+        self.data = bytearray()
+        self._offsets: dict[str, int] = {}
+
+    def add(self, text: str) -> tuple[int, int]:
+        raw = text.encode()
+        offset = self._offsets.get(text)
+        if offset is None:
+            offset = self._offsets[text] = len(self.data)
+            self.data += raw
+        return offset, len(raw)
+
+
+def compile_index(source: Path, target: Path):
+    """Write the index of `source` to `target`, replacing it atomically."""
+    stat = source.stat()
+    foods = sorted(read_foods(source), key=lambda food: (len(food[1]), food[1]))
+    blob = _Blob()
+    postings = array("I")
+    records = bytearray()
+    words: dict[str, list[int]] = {}
+    for food_id, (fdc_id, name, category, macros) in enumerate(foods):
+        key = " ".join(tokenize(name))
+        for word in dict.fromkeys(key.split()):
+            words.setdefault(word, []).append(food_id)
+        records += _FOOD.pack(
+            fdc_id, *blob.add(name), *blob.add(key), *blob.add(category), *macros
+        )
+    terms = bytearray()
+    grams: dict[str, list[int]] = {}
+    for term_id, word in enumerate(sorted(words, key=str.encode)):
+        terms += _ENTRY.pack(*blob.add(word), len(postings), len(words[word]))
+        postings.extend(words[word])
+        for gram in trigrams(word):
+            grams.setdefault(gram, []).append(term_id)
+    gram_table = bytearray()
+    for gram in sorted(grams, key=str.encode):
+        gram_table += _ENTRY.pack(*blob.add(gram), len(postings), len(grams[gram]))
+        postings.extend(grams[gram])
+    header = _HEADER.pack(
+        MAGIC,
+        stat.st_mtime_ns,
+        stat.st_size,
+        len(foods),
+        len(words),
+        len(grams),
+        len(postings),
+    )
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_suffix(".tmp")
+    with partial.open("wb") as f:
+        for section in (header, postings, records, terms, gram_table, blob.data):
+            f.write(section)
+    os.replace(partial, target)
+
+
+class _Table:
+    """A sorted table of (string, postings) entries, indexable by string."""
+
+    def __init__(self, buf: memoryview, offset: int, count: int, blob: int):
+        self._buf = buf
+        self._offset = offset
+        self._count = count
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> bytes:
+        start, length, _, _ = self.entry(i)
+        return bytes(self._buf[self._blob + start : self._blob + start + length])
+
+    def entry(self, i: int) -> tuple[int, int, int, int]:
+        return _ENTRY.unpack_from(self._buf, self._offset + i * _ENTRY.size)
+
+    def find(self, key: bytes) -> int | None:
+        i = bisect_left(self, key)
+        return i if i < self._count and self[i] == key else None
+
+    def prefix_range(self, prefix: bytes) -> range:
+        # 0xff never occurs in UTF-8, so it sorts after every continuation.
+        lo = bisect_left(self, prefix)
+        return range(lo, bisect_left(self, prefix + b"\xff", lo))
+
+
+class FoodDatabase:
+    def __init__(self, source: Path | None = None, index: Path | None = None):
+        self._source = source or Path(settings.food_db_path)
+        self._index = index or Path(settings.data_dir) / settings.food_index_name
+        self._lock = threading.Lock()
+        self._mmap: mmap.mmap | None = None
+
+    def _is_current(self) -> bool:
+        try:
+            with self._index.open("rb") as f:
+                header = f.read(_HEADER.size)
+        except FileNotFoundError:
+            return False
+        if len(header) < _HEADER.size:
+            return False
+        magic, mtime_ns, size = _HEADER.unpack(header)[:3]
+        stat = self._source.stat()
+        return (magic, mtime_ns, size) == (MAGIC, stat.st_mtime_ns, stat.st_size)
+
+    def load(self):
+        """Compile the index if it is missing or stale, then map it."""
+        with self._lock:
+            if self._mmap is not None:
+                return
+            if not self._is_current():
+                compile_index(self._source, self._index)
+            with self._index.open("rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            buf = memoryview(mapped)
+            _, _, _, foods, terms, grams, postings = _HEADER.unpack_from(buf)
+            offset = _HEADER.size
+            self._postings = buf[offset : offset + 4 * postings].cast("I")
+            offset += 4 * postings
+            self._foods, self._food_count = offset, foods
+            offset += _FOOD.size * foods
+            blob = offset + _ENTRY.size * (terms + grams)
+            self._terms = _Table(buf, offset, terms, blob)
+            self._grams = _Table(buf, offset + _ENTRY.size * terms, grams, blob)
+            self._buf, self._blob = buf, blob
+            self._mmap = mapped
+
+    def __len__(self) -> int:
+        self.load()
+        return self._food_count
+
+    def _text(self, offset: int, length: int) -> str:
+        start = self._blob + offset
+        return str(self._buf[start : start + length], "utf-8")
+
+    def _record(self, food_id: int) -> tuple:
+        return _FOOD.unpack_from(self._buf, self._foods + food_id * _FOOD.size)
+
+    def food(self, food_id: int) -> Food:
+        fdc_id, name_off, name_len, _, _, cat_off, cat_len, *macros = self._record(
+            food_id
+        )
+        return Food(
+            fdc_id,
+            self._text(name_off, name_len),
+            self._text(cat_off, cat_len),
+            *(round(value, 2) for value in macros),
+        )
+
+    def _key_words(self, food_id: int) -> list[str]:
+        _, _, _, key_off, key_len, *_ = self._record(food_id)
+        return self._text(key_off, key_len).split()
+
+    def _postings_of(self, table: _Table, i: int) -> memoryview:
+        _, _, start, count = table.entry(i)
+        return self._postings[start : start + count]
+
+    def _fuzzy_terms(self, token: str) -> list[int]:
+        """
+        Vocabulary words sharing at least FUZZY_MIN_SIMILARITY of the
+        token's trigrams, most similar and then most common first.
+        """
+        grams = trigrams(token)
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            i = self._grams.find(gram.encode())
+            if i is not None:
+                shared.update(self._postings_of(self._grams, i))
+        needed = FUZZY_MIN_SIMILARITY * len(grams)
+        close = [term for term, count in shared.items() if count >= needed]
+        close.sort(key=lambda term: (-shared[term], -self._terms.entry(term)[3]))
+        return close[:FUZZY_TERMS]
+
+    def _match(self, token: str) -> _Match | None:
+        terms = self._terms.prefix_range(token.encode())
+        if terms:
+            return _Match(terms, token, frozenset())
+        if len(token) < FUZZY_MIN_LENGTH:
+            return None
+        close = self._fuzzy_terms(token)
+        if not close:
+            return None
+        words = frozenset(self._terms[term].decode() for term in close)
+        return _Match(close, "", words)
+
+    def _food_ids(self, match: _Match) -> Iterator[int]:
+        """Ids of the foods containing any of the match's words, ascending."""
+        lists = [self._postings_of(self._terms, term) for term in match.terms]
+        if len(lists) == 1:
+            return iter(lists[0])
+        return (food_id for food_id, _ in groupby(heapq.merge(*lists)))
+
+    def search(self, query: str, limit: int = settings.food_search_limit) -> list[Food]:
+        """
+        Foods whose description has a word starting with each query token,
+        or a close spelling of it when no word does. The first matches in
+        default rank order are re-ranked by exact word matches and by the
+        first token starting the description.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or limit <= 0:
+            return []
+        self.load()
+        matches = []
+        for token in tokens:
+            match = self._match(token)
+            if match is None:
+                return []
+            matches.append(match)
+        # Walk the token with the fewest postings and check the others on the
+        # description words, so the cost follows the rarest token.
+        matches.sort(key=lambda match: self._posting_count(match.terms))
+        driver, rest = matches[0], matches[1:]
+        found: list[tuple[tuple[int, int, int], int]] = []
+        for food_id in self._food_ids(driver):
+            words = self._key_words(food_id)
+            if all(match.accepts(words) for match in rest):
+                exact = sum(token in words for token in tokens)
+                first = not words[0].startswith(tokens[0])
+                found.append(((-exact, first, food_id), food_id))
+                if len(found) >= limit * CANDIDATE_FACTOR:
+                    break
+        return [self.food(food_id) for _, food_id in sorted(found)[:limit]]
+
+    def _posting_count(self, terms: Iterable[int]) -> int:
+        return sum(self._terms.entry(term)[3] for term in terms)
+
+
+food_db = FoodDatabase()
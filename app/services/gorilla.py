@@ -0,0 +1,138 @@
+"""
+Gorilla-style compression for time-series chunks: delta-of-delta encoded
+timestamps and XOR encoded float64 values (Pelkonen et al., VLDB 2015).
+
+Bits are handled as strings of "0"/"1" characters: a chunk is converted to
+or from one Python int in a single step, and each field is a string slice
+parsed with `int(..., 2)`, which is far faster in pure Python than shifting
+through a large int.
+"""
+
+import struct
+
+_DOUBLE = struct.Struct(">d")
+_UINT64 = struct.Struct(">Q")
+# A 32-bit delta-of-delta field holding INT32_MIN is followed by the real
+# delta-of-delta in 64 bits, for gaps of about 24.8 days and more in ms.
+_WIDE = 1 << 31
+
+
+def _float_bits(value: float) -> int:
+    return _UINT64.unpack(_DOUBLE.pack(value))[0]
+
+
+def _bits_float(bits: int) -> float:
+    return _DOUBLE.unpack(_UINT64.pack(bits))[0]
+
+
+def encode(timestamps: list[int], values: list[float]) -> bytes:
+    """
+    Payload for strictly increasing `timestamps` (seconds) and their values.
+    The first timestamp is not stored; callers keep it in the chunk header.
+    Raises ValueError if a delta-of-delta does not fit in 64 bits.
+    """
+    if not timestamps:
+        return b""
+    parts: list[str] = []
+    append = parts.append
+    prev_ts = timestamps[0]
+    prev_delta = 0
+    prev_bits = _float_bits(values[0])
+    append(format(prev_bits, "064b"))
+    leading, trailing = 65, 0
+    for ts, value in zip(timestamps[1:], values[1:]):
+        delta = ts - prev_ts
+        dod = delta - prev_delta
+        prev_ts, prev_delta = ts, delta
+        if dod == 0:
+            append("0")
+        elif -63 <= dod <= 64:
+            append("10" + format(dod + 63, "07b"))
+        elif -255 <= dod <= 256:
+            append("110" + format(dod + 255, "09b"))
+        elif -2047 <= dod <= 2048:
+            append("1110" + format(dod + 2047, "012b"))
+        elif -_WIDE < dod < _WIDE:
+            append("1111" + format(dod & 0xFFFFFFFF, "032b"))
+        elif -(1 << 63) <= dod < 1 << 63:
+            append("1111" + format(_WIDE, "032b") + format(dod & (2**64 - 1), "064b"))
+        else:
+            raise ValueError(f"Timestamp gap too wide to encode: {dod}")
+
+        bits = _float_bits(value)
+        xor = bits ^ prev_bits
+        prev_bits = bits
+        if xor == 0:
+            append("0")
+            continue
+        lead = min(64 - xor.bit_length(), 31)
+        trail = (xor & -xor).bit_length() - 1
+        if lead >= leading and trail >= trailing:
+            size = 64 - leading - trailing
+            append("10" + format(xor >> trailing, f"0{size}b"))
+        else:
+            leading, trailing = lead, trail
+            size = 64 - lead - trail
+            append(
+                "11"
+                + format(lead, "05b")
+                + format(size - 1, "06b")
+                + format(xor >> trail, f"0{size}b")
+            )
+    stream = "".join(parts)
+    padding = -len(stream) % 8
+    return int(stream + "0" * padding, 2).to_bytes((len(stream) + padding) // 8, "big")
+
+
+def decode(
+    payload: bytes, first_ts: int, count: int
+) -> tuple[list[int], list[float]]:
+    """Timestamps and values of a chunk encoded by `encode`."""
+    if count == 0:
+        return [], []
+    stream = format(int.from_bytes(payload, "big"), f"0{len(payload) * 8}b")
+    prev_bits = int(stream[:64], 2)
+    timestamps = [first_ts]
+    values = [_bits_float(prev_bits)]
+    ts, delta = first_ts, 0
+    leading = trailing = 0
+    pos = 64
+    for _ in range(count - 1):
+        if stream[pos] == "0":
+            pos += 1
+        elif stream[pos + 1] == "0":
+            delta += int(stream[pos + 2 : pos + 9], 2) - 63
+            pos += 9
+        elif stream[pos + 2] == "0":
+            delta += int(stream[pos + 3 : pos + 12], 2) - 255
+            pos += 12
+        elif stream[pos + 3] == "0":
+            delta += int(stream[pos + 4 : pos + 16], 2) - 2047
+            pos += 16
+        else:
+            dod = int(stream[pos + 4 : pos + 36], 2)
+            pos += 36
+            if dod == _WIDE:
+                dod = int(stream[pos : pos + 64], 2)
+                delta += dod - (1 << 64) if dod >= 1 << 63 else dod
+                pos += 64
+            else:
+                delta += dod - (1 << 32) if dod >= _WIDE else dod
+        ts += delta
+        timestamps.append(ts)
+
+        if stream[pos] == "0":
+            pos += 1
+        else:
+            if stream[pos + 1] == "1":
+                leading = int(stream[pos + 2 : pos + 7], 2)
+                size = int(stream[pos + 7 : pos + 13], 2) + 1
+                trailing = 64 - leading - size
+                pos += 13
+            else:
+                size = 64 - leading - trailing
+                pos += 2
+            prev_bits ^= int(stream[pos : pos + size], 2) << trailing
+            pos += size
+        values.append(_bits_float(prev_bits))
+    return timestamps, values
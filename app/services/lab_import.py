@@ -0,0 +1,499 @@
+"""
+Importer for lab result files: CSV exports and HL7 v2 ORU^R01 messages.
+Analytes are mapped to `BiomarkerMetricName` and values normalized to the
+unit each biomarker is stored in.
+"""
+
+import asyncio
+import contextlib
+import csv
+import datetime
+import io
+import math
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Iterator, NamedTuple
+from app.config import settings
+from app.enums import BiomarkerMetricName as M, MeasurementUnit as U
+from app.services.timeseries import Sample, TimeSeriesStore, timeseries
+from app.services.wearable_sync import SyncBatch, import_directory
+
+LAB_SUFFIXES = (".csv", ".hl7", ".oru", ".txt")
+
+CANONICAL_UNITS: dict[M, U] = {
+    M.RED_BLOOD_CELLS: U.MILLIONS_PER_MICROLITER,
+    M.WHITE_BLOOD_CELLS: U.THOUSANDS_PER_MICROLITER,
+    M.HEMOGLOBIN: U.GRAMS_PER_DECILITER,
+    M.HEMATOCRIT: U.PERCENT,
+    M.PLATELETS: U.THOUSANDS_PER_MICROLITER,
+    M.GLUCOSE_FASTING: U.MILLIGRAMS_PER_DECILITER,
+    M.HBA1C: U.PERCENT,
+    M.INSULIN: U.MICROINTERNATIONAL_UNITS_PER_ML,
+    M.CREATININE: U.MILLIGRAMS_PER_DECILITER,
+    M.TOTAL_CHOLESTEROL: U.MILLIGRAMS_PER_DECILITER,
+    M.LDL_CHOLESTEROL: U.MILLIGRAMS_PER_DECILITER,
+    M.HDL_CHOLESTEROL: U.MILLIGRAMS_PER_DECILITER,
+    M.TRIGLYCERIDES: U.MILLIGRAMS_PER_DECILITER,
+    M.TESTOSTERONE_TOTAL: U.NANOGRAMS_PER_ML,
+    M.ESTRADIOL: U.PICOGRAMS_PER_ML,
+    M.CORTISOL_AM: U.MICROGRAMS_PER_DECILITER,
+    M.TSH: U.MILLIINTERNATIONAL_UNITS_PER_L,
+    M.VITAMIN_D: U.NANOGRAMS_PER_ML,
+    M.VITAMIN_B12: U.PICOGRAMS_PER_ML,
+    M.FERRITIN: U.NANOGRAMS_PER_ML,
+    M.MAGNESIUM: U.MILLIGRAMS_PER_DECILITER,
+    M.HS_CRP: U.MILLIGRAMS_PER_LITER,
+    M.HOMOCYSTEINE: U.MICROMOLES_PER_LITER,
+    M.NAD_PLUS: U.MICROMOLAR,
+}
+
+# Lower-cased analyte names, lab abbreviations and LOINC codes.
+ANALYTE_ALIASES: dict[str, M] = {
+    **{str(metric).lower(): metric for metric in M},
+    "rbc": M.RED_BLOOD_CELLS,
+    "789-8": M.RED_BLOOD_CELLS,
+    "wbc": M.WHITE_BLOOD_CELLS,
+    "6690-2": M.WHITE_BLOOD_CELLS,
+    "hgb": M.HEMOGLOBIN,
+    "718-7": M.HEMOGLOBIN,
+    "hct": M.HEMATOCRIT,
+    "4544-3": M.HEMATOCRIT,
+    "plt": M.PLATELETS,
+    "777-3": M.PLATELETS,
+    "glucose": M.GLUCOSE_FASTING,
+    "fasting glucose": M.GLUCOSE_FASTING,
+    "1558-6": M.GLUCOSE_FASTING,
+    "2345-7": M.GLUCOSE_FASTING,
+    "hemoglobin a1c": M.HBA1C,
+    "a1c": M.HBA1C,
+    "4548-4": M.HBA1C,
+    "fasting insulin": M.INSULIN,
+    "20448-7": M.INSULIN,
+    "2160-0": M.CREATININE,
+    "cholesterol, total": M.TOTAL_CHOLESTEROL,
+    "2093-3": M.TOTAL_CHOLESTEROL,
+    "ldl": M.LDL_CHOLESTEROL,
+    "ldl chol calc (nih)": M.LDL_CHOLESTEROL,
+    "13457-7": M.LDL_CHOLESTEROL,
+    "2089-1": M.LDL_CHOLESTEROL,
+    "hdl": M.HDL_CHOLESTEROL,
+    "2085-9": M.HDL_CHOLESTEROL,
+    "2571-8": M.TRIGLYCERIDES,
+    "testosterone": M.TESTOSTERONE_TOTAL,
+    "testosterone, total": M.TESTOSTERONE_TOTAL,
+    "2986-8": M.TESTOSTERONE_TOTAL,
+    "estradiol, sensitive": M.ESTRADIOL,
+    "2243-4": M.ESTRADIOL,
+    "cortisol": M.CORTISOL_AM,
+    "cortisol - am": M.CORTISOL_AM,
+    "2143-6": M.CORTISOL_AM,
+    "3016-3": M.TSH,
+    "vitamin d, 25-hydroxy": M.VITAMIN_D,
+    "25-oh vitamin d": M.VITAMIN_D,
+    "1989-3": M.VITAMIN_D,
+    "b12": M.VITAMIN_B12,
+    "2132-9": M.VITAMIN_B12,
+    "2276-4": M.FERRITIN,
+    "mg": M.MAGNESIUM,
+    "19123-9": M.MAGNESIUM,
+    "2601-3": M.MAGNESIUM,
+    "crp, high sensitivity": M.HS_CRP,
+    "c-reactive protein, cardiac": M.HS_CRP,
+    "hscrp": M.HS_CRP,
+    "30522-7": M.HS_CRP,
+    "13965-9": M.HOMOCYSTEINE,
+    "nad": M.NAD_PLUS,
+}
+
+# Unit spellings seen in lab files, lower-cased, mapped to MeasurementUnit.
+UNIT_ALIASES: dict[str, str] = {
+    **{str(unit).lower(): str(unit) for unit in U},
+    "x10e6/ul": U.MILLIONS_PER_MICROLITER,
+    "10*6/ul": U.MILLIONS_PER_MICROLITER,
+    "10^12/l": U.MILLIONS_PER_MICROLITER,
+    "x10e3/ul": U.THOUSANDS_PER_MICROLITER,
+    "10*3/ul": U.THOUSANDS_PER_MICROLITER,
+    "10^9/l": U.THOUSANDS_PER_MICROLITER,
+    "ug/dl": U.MICROGRAMS_PER_DECILITER,
+    "µg/dl": U.MICROGRAMS_PER_DECILITER,
+    "uiu/ml": U.MICROINTERNATIONAL_UNITS_PER_ML,
+    "µiu/ml": U.MICROINTERNATIONAL_UNITS_PER_ML,
+    "miu/l": U.MILLIINTERNATIONAL_UNITS_PER_L,
+    "ug/l": U.NANOGRAMS_PER_ML,
+    "µmol/l": U.MICROMOLES_PER_LITER,
+    "µm": U.MICROMOLAR,
+    "um": U.MICROMOLAR,
+}
+
+# (metric, source unit) -> converter into the canonical unit. Units that are
+# numerically identical to the canonical one (e.g. uIU/mL and mIU/L) map to
+# the identity.
+def _same(value: float) -> float:
+    return value
+
+
+UNIT_CONVERSIONS: dict[tuple[M, str], Callable[[float], float]] = {
+    (M.HEMOGLOBIN, "g/l"): lambda v: v / 10,
+    (M.HEMATOCRIT, "l/l"): lambda v: v * 100,
+    (M.GLUCOSE_FASTING, "mmol/l"): lambda v: v * 18.016,
+    (M.HBA1C, "mmol/mol"): lambda v: v * 0.09148 + 2.152,
+    (M.INSULIN, "pmol/l"): lambda v: v / 6.0,
+    (M.INSULIN, U.MILLIINTERNATIONAL_UNITS_PER_L): _same,
+    (M.CREATININE, U.MICROMOLES_PER_LITER): lambda v: v / 88.42,
+    (M.TOTAL_CHOLESTEROL, "mmol/l"): lambda v: v * 38.67,
+    (M.LDL_CHOLESTEROL, "mmol/l"): lambda v: v * 38.67,
+    (M.HDL_CHOLESTEROL, "mmol/l"): lambda v: v * 38.67,
+    (M.TRIGLYCERIDES, "mmol/l"): lambda v: v * 88.57,
+    (M.TESTOSTERONE_TOTAL, "ng/dl"): lambda v: v / 100,
+    (M.TESTOSTERONE_TOTAL, "nmol/l"): lambda v: v / 3.467,
+    (M.ESTRADIOL, "pmol/l"): lambda v: v / 3.671,
+    (M.CORTISOL_AM, "nmol/l"): lambda v: v / 27.59,
+    (M.TSH, U.MICROINTERNATIONAL_UNITS_PER_ML): _same,
+    (M.VITAMIN_D, "nmol/l"): lambda v: v / 2.496,
+    (M.VITAMIN_B12, "pmol/l"): lambda v: v * 1.355,
+    (M.MAGNESIUM, "mmol/l"): lambda v: v * 2.431,
+    (M.HS_CRP, U.MILLIGRAMS_PER_DECILITER): lambda v: v * 10,
+    (M.HOMOCYSTEINE, U.MICROMOLAR): _same,
+    (M.NAD_PLUS, U.MICROMOLES_PER_LITER): _same,
+}
+
+
+class LabParseResult(NamedTuple):
+    path: str
+    samples: list[Sample]
+    rejected: int
+
+
+class LabImportResult(NamedTuple):
+    files: int
+    readings: int
+    inserted: int
+    rejected: int
+    seconds: float
+
+
+def normalize_unit(raw: str) -> str:
+    unit = raw.strip().replace("μ", "µ")
+    return UNIT_ALIASES.get(unit.lower(), unit.lower())
+
+
+def to_canonical(metric: M, value: float, unit: str) -> float | None:
+    """`value` in the biomarker's canonical unit, or None if the unit is unknown."""
+    unit = normalize_unit(unit)
+    canonical = CANONICAL_UNITS[metric]
+    if unit == canonical or (not unit and metric in (M.HBA1C, M.HEMATOCRIT)):
+        return value
+    convert = UNIT_CONVERSIONS.get((metric, unit))
+    return convert(value) if convert is not None else None
+
+
+def parse_value(raw: str) -> float | None:
+    """Numeric result; comparators such as "<0.5" keep their bound."""
+    text = raw.strip().lstrip("<>=").replace(",", "")
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) and value >= 0 else None
+
+
+def parse_datetime(raw: str) -> int | None:
+    """Epoch seconds from HL7 TS (YYYYMMDD[HHMM[SS]][+ZZZZ]), MM/DD/YYYY or ISO."""
+    raw = raw.strip()
+    if not raw:
+        return None
+    try:
+        if raw[:8].isdigit() and "-" not in raw[:8]:
+            digits, _, offset = raw.partition("+")
+            if not offset and "-" in digits:
+                digits, offset = digits.split("-", 1)
+                offset = "-" + offset
+            elif offset:
+                offset = "+" + offset
+            digits = digits.split(".")[0].ljust(14, "0")[:14]
+            parsed = datetime.datetime.strptime(digits, "%Y%m%d%H%M%S")
+            if offset:
+                hours, minutes = int(offset[1:3]), int(offset[3:5] or 0)
+                sign = 1 if offset[0] == "+" else -1
+                parsed = parsed.replace(
+                    tzinfo=datetime.timezone(
+                        sign * datetime.timedelta(hours=hours, minutes=minutes)
+                    )
+                )
+        elif "/" in raw:
+            parsed = datetime.datetime.strptime(raw.split()[0], "%m/%d/%Y")
+        else:
+            parsed = datetime.datetime.fromisoformat(raw)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _reading(
+    patient_id: str, analyte: str, value: str, unit: str, ts: int | None, source_id: str
+) -> Sample | None:
+    metric = ANALYTE_ALIASES.get(analyte.strip().lower())
+    number = parse_value(value)
+    if metric is None or number is None or ts is None or not patient_id:
+        return None
+    canonical = to_canonical(metric, number, unit)
+    if canonical is None:
+        return None
+    return Sample(patient_id, str(metric), ts, round(canonical, 4), source_id)
+
+
+CSV_COLUMNS: dict[str, tuple[str, ...]] = {
+    "patient_id": ("patient_id", "patient", "mrn"),
+    "analyte": ("analyte", "test", "test_name", "loinc", "code"),
+    "value": ("value", "result"),
+    "unit": ("unit", "units"),
+    "date": ("date", "collected", "collection_date", "observed_at"),
+}
+
+
+def parse_csv(text: str, patient_id: str, source_id: str) -> tuple[list[Sample], int]:
+    reader = csv.DictReader(io.StringIO(text))
+    fields = {name.strip().lower(): name for name in reader.fieldnames or []}
+    columns = {
+        key: next((fields[a] for a in aliases if a in fields), None)
+        for key, aliases in CSV_COLUMNS.items()
+    }
+    samples, rejected = [], 0
+    for row in reader:
+        def get(key: str) -> str:
+            column = columns[key]
+            return (row.get(column) or "") if column else ""
+
+        sample = _reading(
+            get("patient_id").strip() or patient_id,
+            get("analyte"),
+            get("value"),
+            get("unit"),
+            parse_datetime(get("date")),
+            source_id,
+        )
+        if sample is None:
+            rejected += 1
+        else:
+            samples.append(sample)
+    return samples, rejected
+
+
+def parse_hl7(text: str, patient_id: str, source_id: str) -> tuple[list[Sample], int]:
+    """
+    Numeric OBX results from ORU^R01 messages. The patient comes from PID-3,
+    the analyte from OBX-3 (LOINC code, then text), the time from OBX-14 or
+    else OBR-7. Results not final or corrected (OBX-11) are skipped.
+    """
+    samples, rejected = [], 0
+    field_sep, component_sep = "|", "^"
+    message_patient, observed = patient_id, None
+    for segment in text.replace("\r\n", "\r").replace("\n", "\r").split("\r"):
+        if segment.startswith("MSH"):
+            field_sep = segment[3]
+            component_sep = segment[4]
+            message_patient, observed = patient_id, None
+            continue
+        fields = segment.split(field_sep)
+
+        def field(index: int) -> str:
+            return fields[index] if len(fields) > index else ""
+
+        kind = fields[0]
+        if kind == "PID":
+            message_patient = field(3).split(component_sep)[0] or patient_id
+        elif kind == "OBR":
+            observed = parse_datetime(field(7))
+        elif kind == "OBX":
+            if field(2) not in ("NM", "SN") or field(11) not in ("", "F", "C"):
+                continue
+            code, text_name, *_ = field(3).split(component_sep) + ["", ""]
+            analyte = code if code.lower() in ANALYTE_ALIASES else text_name
+            value = field(5).replace(component_sep, "")
+            unit = field(6).split(component_sep)[0]
+            ts = parse_datetime(field(14)) or observed
+            sample = _reading(
+                patient_id or message_patient, analyte, value, unit, ts, source_id
+            )
+            if sample is None:
+                rejected += 1
+            else:
+                samples.append(sample)
+    return samples, rejected
+
+
+def parse_lab_file(path: str, patient_id: str, source_id: str) -> LabParseResult:
+    """
+    Parse one file. A non-empty `patient_id` overrides ids found in the file,
+    as for uploads into a single patient's account. Runs in worker processes.
+    """
+    text = Path(path).read_text(encoding="utf-8", errors="replace")
+    if text.lstrip().startswith("MSH"):
+        samples, rejected = parse_hl7(text, patient_id, source_id)
+    else:
+        samples, rejected = parse_csv(text, patient_id, source_id)
+    return LabParseResult(path, samples, rejected)
+
+
+def parse_lab_files(
+    paths: list[Path],
+    patient_id: str,
+    source_id: str,
+    workers: int = settings.lab_import_workers,
+) -> Iterator[LabParseResult]:
+    """Parse `paths` in a process pool, yielding results as files finish."""
+    if not paths:
+        return
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [
+            pool.submit(parse_lab_file, str(path), patient_id, source_id)
+            for path in paths
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def read_lab_files(
+    paths: list[Path], patient_id: str, source_id: str
+) -> Iterator[SyncBatch]:
+    """
+    Sync batches for the wearable pipeline. Progress batches carry no samples;
+    every validated reading arrives in the final batch so the store writes
+    the whole import in one transaction.
+    """
+    samples: list[Sample] = []
+    for done, result in enumerate(parse_lab_files(paths, patient_id, source_id), 1):
+        samples.extend(result.samples)
+        if done < len(paths):
+            yield SyncBatch([], done, len(paths))
+    yield SyncBatch(samples, len(paths), len(paths))
+
+
+def import_lab_batch(
+    paths: list[Path],
+    source_id: str,
+    patient_id: str = "",
+    store: TimeSeriesStore = timeseries,
+) -> LabImportResult:
+    """
+    Import a nightly batch of result files for any number of patients,
+    taking patient ids from the files unless `patient_id` is given.
+    """
+    started = time.perf_counter()
+    samples: list[Sample] = []
+    rejected = 0
+    for result in parse_lab_files(paths, patient_id, source_id):
+        samples.extend(result.samples)
+        rejected += result.rejected
+    inserted = store.insert_many(samples)
+    return LabImportResult(
+        len(paths), len(samples), inserted, rejected, time.perf_counter() - started
+    )
+
+
+def lab_files(directory: Path) -> list[Path]:
+    if not directory.is_dir():
+        return []
+    return sorted(
+        path
+        for path in directory.iterdir()
+        if path.is_file() and path.suffix.lower() in LAB_SUFFIXES
+    )
+
+
+def read_lab_directory(
+    directory: Path, patient_id: str, source_id: str
+) -> Iterator[SyncBatch]:
+    """
+    Import the lab files waiting in `directory`, then move them to
+    `processed/` so the next sync only sees new files. Yields nothing when
+    no files are waiting or the directory does not exist yet.
+    """
+    paths = lab_files(directory)
+    if not paths:
+        return
+    yield from read_lab_files(paths, patient_id, source_id)
+    _move_processed(directory, paths)
+
+
+def _move_processed(directory: Path, paths: list[Path]):
+    processed = directory / "processed"
+    processed.mkdir(parents=True, exist_ok=True)
+    for path in paths:
+        shutil.move(path, processed / path.name)
+
+
+def read_lab_source(
+    patient_id: str, source_id: str, since: int = 0
+) -> Iterator[SyncBatch]:
+    """
+    Reader for file sources. Imported files are moved aside, so every file
+    left in the directory is new whatever the cursor says.
+    """
+    directory = import_directory(patient_id, source_id)
+    return read_lab_directory(directory, patient_id, source_id)
+
+
+
+class LabBatchImporter:
+    """
+    Imports the clinic-wide drop of lab result files the lab delivers each
+    night into `settings.lab_batch_dir`, for any number of patients, with
+    patient ids taken from the files. The directory is checked every
+    `interval` seconds; imported files are moved to `processed/`, and files
+    of a batch that failed stay in place for the next run.
+    """
+
+    def __init__(
+        self,
+        source_id: str = settings.lab_batch_source,
+        interval: float = settings.lab_batch_interval,
+    ):
+        self._source_id = source_id
+        self._interval = interval
+        self._task: asyncio.Task | None = None
+        self.last_result: LabImportResult | None = None
+
+    def inbox(self) -> Path:
+        return Path(settings.data_dir) / settings.lab_batch_dir
+
+    def run_once(self) -> LabImportResult | None:
+        """Import the files waiting in the inbox; None when there are none."""
+        directory = self.inbox()
+        paths = lab_files(directory)
+        if not paths:
+            return None
+        result = import_lab_batch(paths, self._source_id)
+        _move_processed(directory, paths)
+        self.last_result = result
+        return result
+
+    async def run(self):
+        while True:
+            with contextlib.suppress(Exception):
+                await asyncio.to_thread(self.run_once)
+            await asyncio.sleep(self._interval)
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        self._task = asyncio.create_task(self.run())
+        try:
+            yield
+        finally:
+            self.close()
+
+
+lab_batches = LabBatchImporter()
@@ -0,0 +1,141 @@
+"""
+Meal photos. Uploads are streamed to disk, then decoded once in a process
+pool into one resized image per `settings.meal_photo_sizes` entry, each
+saved as WebP and as a JPEG fallback. Variants are named by the SHA-256 of
+the upload, so a name never changes content: /api/media serves them with
+immutable cache headers, and a photo uploaded twice is only processed once.
+The original is deleted after processing and never reaches the browser.
+"""
+
+import asyncio
+import contextlib
+import multiprocessing
+import os
+import re
+import uuid
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from pathlib import Path
+from PIL import Image, ImageOps
+from app.config import settings
+
+KEY_LENGTH = 24
+MEDIA_PREFIX = "/api/media/meals"
+PHOTO_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+# Format, Pillow save options; WebP first, as browsers prefer it.
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+VARIANT_RE = re.compile(r"([0-9a-f]{%d})-([a-z]+)" % KEY_LENGTH)
+
+
+def media_directory() -> Path:
+    return Path(settings.data_dir) / settings.media_dir / "meals"
+
+
+def photo_url(key: str, size: str = "card") -> str:
+    """Backend-relative URL of a variant; the format is negotiated on Accept."""
+    return f"{MEDIA_PREFIX}/{key}-{size}"
+
+
+def variant_path(key: str, size: str, ext: str) -> Path:
+    return media_directory() / f"{key}-{size}.{ext}"
+
+
+def render_variants(source: str, directory: str, key: str, sizes: dict[str, int]):
+    """
+    Write every size and format of one photo. Runs in worker processes.
+    JPEGs are decoded at the smallest DCT scale still covering the largest
+    size, and each size is reduced from the next larger one, so a 12 MP
+    phone photo is never resized at full resolution more than once. Each
+    call writes to its own temp files, so two uploads of the same photo
+    rendering at once both end with a complete file in place.
+    """
+    out = Path(directory)
+    with Image.open(source) as image:
+        image.draft("RGB", (max(sizes.values()),) * 2)
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        for size, edge in sorted(sizes.items(), key=lambda item: -item[1]):
+            image.thumbnail((edge, edge), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            for ext, (fmt, options) in FORMATS.items():
+                target = out / f"{key}-{size}.{ext}"
+                partial = out / f".{key}-{size}.{ext}.{uuid.uuid4().hex}.part"
+                try:
+                    image.save(partial, fmt, **options)
+                    os.replace(partial, target)
+                except BaseException:
+                    partial.unlink(missing_ok=True)
+                    raise
+
+
+class MealPhotoPipeline:
+    """
+    Runs `render_variants` in a spawned process pool so decoding and
+    resizing never hold the event loop or the GIL of the Reflex backend.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.meal_photo_workers,
+        sizes: dict[str, int] = settings.meal_photo_sizes,
+    ):
+        self._workers = workers
+        self._sizes = sizes
+        self._executor: ProcessPoolExecutor | None = None
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self._workers or os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def is_rendered(self, key: str) -> bool:
+        return all(
+            variant_path(key, size, ext).is_file()
+            for size in self._sizes
+            for ext in FORMATS
+        )
+
+    async def process(self, source: Path, digest: str) -> str:
+        """
+        Render the variants of an uploaded photo, delete the upload and
+        return the photo's key. Raises if the file is not a readable image.
+        """
+        key = digest[:KEY_LENGTH]
+        try:
+            if not self.is_rendered(key):
+                media_directory().mkdir(parents=True, exist_ok=True)
+                if self._executor is None:
+                    self._executor = self._new_executor()
+                try:
+                    await asyncio.get_running_loop().run_in_executor(
+                        self._executor,
+                        render_variants,
+                        str(source),
+                        str(media_directory()),
+                        key,
+                        self._sizes,
+                    )
+                except BrokenExecutor:
+                    self._executor = self._new_executor()
+                    raise
+        finally:
+            source.unlink(missing_ok=True)
+        return key
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        try:
+            yield
+        finally:
+            self.close()
+
+
+meal_photos = MealPhotoPipeline()
@@ -0,0 +1,228 @@
+"""
+Full-text index over patient notes: check-in content, symptom notes and
+condition descriptions, kept in SQLite FTS5.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from app.config import settings
+from app.enums import NoteKind
+from app.models import NoteHit, SnippetPart
+from app.services import db
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    ref_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL DEFAULT '',
+    body TEXT NOT NULL,
+    UNIQUE (patient_id, kind, ref_id)
+);
+DROP TABLE IF EXISTS notes_vocab;
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    patient_id,
+    body,
+    content='notes',
+    content_rowid='id',
+    tokenize="unicode61 tokenchars '_'"
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_terms USING fts5vocab(notes_fts, 'col');
+CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts (rowid, patient_id, body)
+    VALUES (new.id, new.patient_id, new.body);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, patient_id, body)
+    VALUES ('delete', old.id, old.patient_id, old.body);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE OF body ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, patient_id, body)
+    VALUES ('delete', old.id, old.patient_id, old.body);
+    INSERT INTO notes_fts (rowid, patient_id, body)
+    VALUES (new.id, new.patient_id, new.body);
+END;
+"""
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_TERMS = 32
+
+_TERM_RE = re.compile(r"\w+")
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+_SNIPPET_RE = re.compile(f"{_MARK_START}(.*?){_MARK_END}", re.S)
+
+
+def tokenize(text: str) -> list[str]:
+    """Same terms as the FTS5 unicode61 tokenizer: case and diacritics folded."""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    return _TERM_RE.findall("".join(c for c in folded if not unicodedata.combining(c)))
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def snippet_parts(snippet: str) -> list[SnippetPart]:
+    parts = []
+    for i, text in enumerate(_SNIPPET_RE.split(snippet)):
+        if text:
+            parts.append(SnippetPart(text=text, highlight=i % 2 == 1))
+    return parts
+
+
+class NotesIndex:
+    """
+    Notes are upserted into a plain table keyed by (patient, kind, ref_id);
+    triggers mirror each change into an external-content FTS5 index, so writes
+    are incremental and the text is stored once.
+
+    The patient id is an indexed column, so a query intersects that patient's
+    posting list with the query terms instead of filtering global matches.
+    Ranking is BM25 over the patient's own notes, computed here from the
+    matched rows: FTS5's bm25() would count document frequencies across every
+    patient on each query, which dominates latency at millions of notes.
+    The last query term matches as a prefix while the user is typing; it is
+    expanded through `notes_terms` rather than an FTS5 prefix scan, which
+    would merge the global posting lists of every matching term. That is an
+    fts5vocab table read straight from the index, so a term disappears as
+    soon as the last note containing it is removed or reindexed.
+    """
+
+    def upsert(
+        self,
+        patient_id: str,
+        kind: NoteKind,
+        ref_id: str,
+        body: str,
+        timestamp: str = "",
+    ):
+        self.upsert_many(patient_id, kind, [(ref_id, body, timestamp)])
+
+    def upsert_many(
+        self, patient_id: str, kind: NoteKind, notes: list[tuple[str, str, str]]
+    ):
+        """Index (ref_id, body, timestamp) rows; unchanged rows are not rewritten."""
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO notes (patient_id, kind, ref_id, body, timestamp) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (patient_id, kind, ref_id) DO UPDATE SET "
+                "body = excluded.body, timestamp = excluded.timestamp "
+                "WHERE body != excluded.body OR timestamp != excluded.timestamp",
+                [
+                    (patient_id, str(kind), ref_id, body, timestamp)
+                    for ref_id, body, timestamp in notes
+                ],
+            )
+
+    def remove(self, patient_id: str, kind: NoteKind, ref_id: str):
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM notes WHERE patient_id = ? AND kind = ? AND ref_id = ?",
+                (patient_id, str(kind), ref_id),
+            )
+
+    def search(
+        self,
+        patient_id: str,
+        query: str,
+        limit: int = settings.notes_search_page_size,
+        offset: int = 0,
+    ) -> tuple[list[NoteHit], bool]:
+        """
+        One page of the patient's notes matching every query term, best first,
+        and whether another page follows.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return [], False
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        groups = [[term] for term in terms]
+        if not query[-1:].isspace():
+            groups[-1] = self._expand_prefix(terms[-1])
+            if not groups[-1]:
+                return [], False
+        patient = f"patient_id : {_quote(patient_id)}"
+        clauses = [
+            "body : (" + " OR ".join(_quote(term) for term in group) + ")"
+            for group in groups
+        ]
+        expression = " AND ".join([patient, *clauses])
+        rows = conn.execute(
+            "SELECT notes.id, notes.kind, notes.ref_id, notes.timestamp, notes.body "
+            "FROM notes_fts JOIN notes ON notes.id = notes_fts.rowid "
+            "WHERE notes_fts MATCH ?",
+            (expression,),
+        ).fetchall()
+        if not rows:
+            return [], False
+
+        doc_count, avg_length = conn.execute(
+            "SELECT count(*), avg(length(body)) FROM notes WHERE patient_id = ?",
+            (patient_id,),
+        ).fetchone()
+        idf = []
+        for clause in clauses:
+            (df,) = conn.execute(
+                "SELECT count(*) FROM notes_fts WHERE notes_fts MATCH ?",
+                (f"{patient} AND {clause}",),
+            ).fetchone()
+            idf.append(math.log((doc_count - df + 0.5) / (df + 0.5) + 1))
+        scored = []
+        for row in rows:
+            counts = Counter(tokenize(row["body"]))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * len(row["body"]) / avg_length)
+            score = 0.0
+            for group, weight in zip(groups, idf):
+                tf = sum(counts[term] for term in group)
+                score += weight * tf * (BM25_K1 + 1) / (tf + norm)
+            scored.append((score, row))
+        scored.sort(key=lambda item: (item[0], item[1]["id"]), reverse=True)
+        page = scored[offset : offset + limit]
+
+        ids = [row["id"] for _, row in page]
+        snippets = dict(
+            conn.execute(
+                "SELECT rowid, "
+                f"snippet(notes_fts, 1, '{_MARK_START}', '{_MARK_END}', '…', 16) "
+                "FROM notes_fts WHERE notes_fts MATCH ? "
+                f"AND rowid IN ({', '.join('?' * len(ids))})",
+                (expression, *ids),
+            ).fetchall()
+        )
+        hits = [
+            NoteHit(
+                kind=row["kind"],
+                ref_id=row["ref_id"],
+                timestamp=row["timestamp"],
+                score=round(score, 3),
+                snippet=snippet_parts(snippets.get(row["id"], row["body"])),
+            )
+            for score, row in page
+        ]
+        return hits, len(scored) > offset + limit
+
+    def _expand_prefix(self, prefix: str) -> list[str]:
+        rows = (
+            db.connection()
+            .execute(
+                "SELECT term FROM notes_terms WHERE col = 'body' "
+                "AND term >= ? AND term < ? LIMIT ?",
+                (prefix, prefix + "\U0010ffff", MAX_PREFIX_TERMS),
+            )
+            .fetchall()
+        )
+        return [row["term"] for row in rows]
+
+
+notes_index = NotesIndex()
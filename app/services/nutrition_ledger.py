@@ -0,0 +1,307 @@
+"""
+Nutrition ledger: logged meals and their food items in SQLite, with macro
+totals per meal, per day and per week kept up to date by triggers as items
+are inserted or deleted. A total is adjusted by the one item that changed in
+the same transaction, so it always agrees with the items, and the tracker
+and trend charts read totals rather than summing meal lists.
+
+Days are local calendar dates (YYYY-MM-DD) and weeks are named after their
+Monday.
+"""
+
+import sqlite3
+from typing import NamedTuple
+from app.config import settings
+from app.enums import MealType
+from app.schemas.nutrition import FoodItem, Meal
+from app.services import db
+
+_ITEM_DELTA = """
+    items = items {op} 1,
+    calories = calories {op} {row}.calories,
+    protein = protein {op} {row}.protein,
+    carbs = carbs {op} {row}.carbs,
+    fat = fat {op} {row}.fat"""
+_WEEK = "date({row}.day, 'weekday 0', '-6 days')"
+
+
+def _rollup_triggers() -> str:
+    add = _ITEM_DELTA.format(op="+", row="excluded")
+    remove = _ITEM_DELTA.format(op="-", row="old")
+    return f"""
+CREATE TRIGGER IF NOT EXISTS meal_items_ai AFTER INSERT ON meal_items BEGIN
+    UPDATE meals SET {_ITEM_DELTA.format(op="+", row="new")}
+    WHERE patient_id = new.patient_id AND id = new.meal_id;
+    INSERT INTO nutrition_days
+    VALUES (new.patient_id, new.day, 1, new.calories, new.protein, new.carbs,
+            new.fat)
+    ON CONFLICT (patient_id, day) DO UPDATE SET {add};
+    INSERT INTO nutrition_weeks
+    VALUES (new.patient_id, {_WEEK.format(row="new")}, 1, new.calories,
+            new.protein, new.carbs, new.fat)
+    ON CONFLICT (patient_id, week) DO UPDATE SET {add};
+END;
+CREATE TRIGGER IF NOT EXISTS meal_items_ad AFTER DELETE ON meal_items BEGIN
+    UPDATE meals SET {remove}
+    WHERE patient_id = old.patient_id AND id = old.meal_id;
+    UPDATE nutrition_days SET {remove}
+    WHERE patient_id = old.patient_id AND day = old.day;
+    DELETE FROM nutrition_days
+    WHERE patient_id = old.patient_id AND day = old.day AND items = 0;
+    UPDATE nutrition_weeks SET {remove}
+    WHERE patient_id = old.patient_id AND week = {_WEEK.format(row="old")};
+    DELETE FROM nutrition_weeks
+    WHERE patient_id = old.patient_id AND week = {_WEEK.format(row="old")}
+    AND items = 0;
+END;
+"""
+
+
+_TOTALS = """
+    items INTEGER NOT NULL DEFAULT 0,
+    calories REAL NOT NULL DEFAULT 0,
+    protein REAL NOT NULL DEFAULT 0,
+    carbs REAL NOT NULL DEFAULT 0,
+    fat REAL NOT NULL DEFAULT 0"""
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS meals (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    patient_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    type TEXT NOT NULL,
+    time TEXT NOT NULL,
+    image_url TEXT NOT NULL,{_TOTALS},
+    UNIQUE (patient_id, id)
+);
+CREATE INDEX IF NOT EXISTS meals_patient_day ON meals (patient_id, day);
+CREATE TABLE IF NOT EXISTS meal_items (
+    id INTEGER PRIMARY KEY,
+    meal_id TEXT NOT NULL,
+    patient_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    name TEXT NOT NULL,
+    calories REAL NOT NULL,
+    protein REAL NOT NULL,
+    carbs REAL NOT NULL,
+    fat REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS meal_items_meal ON meal_items (patient_id, meal_id);
+CREATE TABLE IF NOT EXISTS nutrition_days (
+    patient_id TEXT NOT NULL,
+    day TEXT NOT NULL,{_TOTALS},
+    PRIMARY KEY (patient_id, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS nutrition_weeks (
+    patient_id TEXT NOT NULL,
+    week TEXT NOT NULL,{_TOTALS},
+    PRIMARY KEY (patient_id, week)
+) WITHOUT ROWID;
+{_rollup_triggers()}"""
+
+
+class MacroTotals(NamedTuple):
+    """Energy in kcal, macros in grams, over `items` food items."""
+
+    items: int = 0
+    calories: float = 0.0
+    protein: float = 0.0
+    carbs: float = 0.0
+    fat: float = 0.0
+
+
+class PeriodTotals(NamedTuple):
+    """Totals of one day, or of the week starting on `start`."""
+
+    start: str
+    totals: MacroTotals
+
+
+def _totals(row) -> MacroTotals:
+    # Rounded on read: repeated float additions and subtractions drift.
+    return MacroTotals(
+        row["items"],
+        round(row["calories"]),
+        round(row["protein"], 1),
+        round(row["carbs"], 1),
+        round(row["fat"], 1),
+    )
+
+
+def _item(row) -> FoodItem:
+    return FoodItem(
+        id=row["id"],
+        name=row["name"],
+        calories=round(row["calories"]),
+        protein=round(row["protein"], 1),
+        carbs=round(row["carbs"], 1),
+        fat=round(row["fat"], 1),
+    )
+
+
+class NutritionLedger:
+    def add_meal(self, patient_id: str, day: str, meal: Meal) -> Meal:
+        """Store a meal and its items; totals come from the stored items."""
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO meals (id, patient_id, day, type, time, image_url) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (meal.id, patient_id, day, str(meal.type), meal.time, meal.image_url),
+            )
+            self._insert_items(conn, patient_id, day, meal.id, meal.food_items)
+        return self.meal(patient_id, meal.id)
+
+    def add_items(self, patient_id: str, meal_id: str, items: list[FoodItem]):
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            row = conn.execute(
+                "SELECT day FROM meals WHERE id = ? AND patient_id = ?",
+                (meal_id, patient_id),
+            ).fetchone()
+            if row is None:
+                raise KeyError(meal_id)
+            self._insert_items(conn, patient_id, row["day"], meal_id, items)
+
+    def _insert_items(
+        self,
+        conn: sqlite3.Connection,
+        patient_id: str,
+        day: str,
+        meal_id: str,
+        items: list[FoodItem],
+    ):
+        conn.executemany(
+            "INSERT INTO meal_items (meal_id, patient_id, day, name, calories, "
+            "protein, carbs, fat) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    meal_id,
+                    patient_id,
+                    day,
+                    item.name,
+                    item.calories,
+                    item.protein,
+                    item.carbs,
+                    item.fat,
+                )
+                for item in items
+            ),
+        )
+
+    def remove_item(self, patient_id: str, item_id: int):
+        """Delete a food item, and its meal once the meal has no items left."""
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            row = conn.execute(
+                "DELETE FROM meal_items WHERE id = ? AND patient_id = ? "
+                "RETURNING meal_id",
+                (item_id, patient_id),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "DELETE FROM meals WHERE patient_id = ? AND id = ? AND items = 0",
+                    (patient_id, row["meal_id"]),
+                )
+
+    def meal(self, patient_id: str, meal_id: str) -> Meal:
+        db.ensure_schema(SCHEMA)
+        row = (
+            db.connection()
+            .execute(
+                "SELECT * FROM meals WHERE patient_id = ? AND id = ?",
+                (patient_id, meal_id),
+            )
+            .fetchone()
+        )
+        if row is None:
+            raise KeyError(meal_id)
+        return self._meals(patient_id, [row])[0]
+
+    def day_meals(self, patient_id: str, day: str) -> list[Meal]:
+        db.ensure_schema(SCHEMA)
+        rows = (
+            db.connection()
+            .execute(
+                "SELECT * FROM meals WHERE patient_id = ? AND day = ? ORDER BY seq",
+                (patient_id, day),
+            )
+            .fetchall()
+        )
+        return self._meals(patient_id, rows)
+
+    def _meals(self, patient_id: str, rows) -> list[Meal]:
+        ids = [row["id"] for row in rows]
+        items: dict[str, list[FoodItem]] = {meal_id: [] for meal_id in ids}
+        if ids:
+            placeholders = ", ".join("?" * len(ids))
+            for item in db.connection().execute(
+                "SELECT * FROM meal_items WHERE patient_id = ? "
+                f"AND meal_id IN ({placeholders}) ORDER BY id",
+                (patient_id, *ids),
+            ):
+                items[item["meal_id"]].append(_item(item))
+        return [
+            Meal(
+                id=row["id"],
+                type=MealType(row["type"]),
+                time=row["time"],
+                image_url=row["image_url"],
+                food_items=items[row["id"]],
+                total_calories=_totals(row).calories,
+            )
+            for row in rows
+        ]
+
+    def day_totals(self, patient_id: str, day: str) -> MacroTotals:
+        db.ensure_schema(SCHEMA)
+        row = (
+            db.connection()
+            .execute(
+                "SELECT * FROM nutrition_days WHERE patient_id = ? AND day = ?",
+                (patient_id, day),
+            )
+            .fetchone()
+        )
+        return _totals(row) if row is not None else MacroTotals()
+
+    def days(self, patient_id: str, first: str, last: str) -> list[PeriodTotals]:
+        """Totals of the days with food logged from `first` to `last`."""
+        db.ensure_schema(SCHEMA)
+        rows = db.connection().execute(
+            "SELECT * FROM nutrition_days WHERE patient_id = ? "
+            "AND day BETWEEN ? AND ? ORDER BY day",
+            (patient_id, first, last),
+        )
+        return [PeriodTotals(row["day"], _totals(row)) for row in rows]
+
+    def weeks(
+        self, patient_id: str, limit: int = settings.nutrition_trend_weeks
+    ) -> list[PeriodTotals]:
+        """The latest `limit` weeks with food logged, oldest first."""
+        db.ensure_schema(SCHEMA)
+        rows = db.connection().execute(
+            "SELECT * FROM nutrition_weeks WHERE patient_id = ? "
+            "ORDER BY week DESC LIMIT ?",
+            (patient_id, limit),
+        )
+        return [PeriodTotals(row["week"], _totals(row)) for row in rows][::-1]
+
+    def seed(self, patient_id: str, day: str, meals: list[Meal]):
+        """Store `meals` on `day` if the patient has not logged any yet."""
+        db.ensure_schema(SCHEMA)
+        row = (
+            db.connection()
+            .execute("SELECT 1 FROM meals WHERE patient_id = ? LIMIT 1", (patient_id,))
+            .fetchone()
+        )
+        if row is None:
+            for meal in meals:
+                self.add_meal(patient_id, day, meal)
+
+
+nutrition_ledger = NutritionLedger()
@@ -0,0 +1,156 @@
+"""
+Process-wide treatment protocol catalog exposed as a versioned resource.
+"""
+
+import hashlib
+import json
+import time
+from collections import deque
+from typing import Callable
+from pydantic import BaseModel
+from app.models import TreatmentProtocol
+from app.enums import TreatmentCategory, TreatmentFrequency, TreatmentStatus
+
+DEFAULT_PROTOCOLS: list[TreatmentProtocol] = [
+    TreatmentProtocol(
+        id="p1",
+        name="NAD+ Loading Phase",
+        category=TreatmentCategory.IV_THERAPY,
+        description="Intensive NAD+ therapy to restore cellular energy levels.",
+        duration="4 Weeks",
+        frequency=TreatmentFrequency.BI_WEEKLY,
+        biomarker_targets=["NAD+", "Sirtuin Activity"],
+        status=TreatmentStatus.ACTIVE,
+    ),
+    TreatmentProtocol(
+        id="p2",
+        name="Epithalon Cycle",
+        category=TreatmentCategory.PEPTIDES,
+        description="Telomere length restoration and circadian rhythm reset.",
+        duration="10 Days",
+        frequency=TreatmentFrequency.DAILY,
+        biomarker_targets=["Biological Age", "Melatonin"],
+        status=TreatmentStatus.ACTIVE,
+    ),
+    TreatmentProtocol(
+        id="p3",
+        name="Hyperbaric Oxygen 2.0",
+        category=TreatmentCategory.HYPERBARIC,
+        description="Deep tissue oxygenation for stem cell mobilization.",
+        duration="20 Sessions",
+        frequency=TreatmentFrequency.BI_WEEKLY,
+        biomarker_targets=["Stem Cells", "Inflammation"],
+        status=TreatmentStatus.ACTIVE,
+    ),
+]
+
+
+class CatalogChange(BaseModel):
+    version: int
+    op: str
+    protocol_id: str
+    protocol: TreatmentProtocol | None = None
+
+
+class ProtocolCatalog:
+    """
+    Protocols keyed by id with a monotonically increasing version, a content
+    hash of the current catalog and a bounded log of recent changes, so a
+    client holding an older version can catch up by replaying diffs.
+
+    The version starts at the process start time in microseconds rather than
+    at 1, so a version handed out before a restart is always older than any
+    version after it and gets a full snapshot instead of colliding with one.
+    """
+
+    def __init__(self, protocols: list[TreatmentProtocol], history: int = 256):
+        self._protocols: dict[str, TreatmentProtocol] = {p.id: p for p in protocols}
+        self._changes: deque[CatalogChange] = deque(maxlen=history)
+        self._version = time.time_ns() // 1000
+        self._content_hash = self._compute_hash()
+        self._listeners: list[Callable[[CatalogChange], None]] = []
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def content_hash(self) -> str:
+        return self._content_hash
+
+    def get(self, protocol_id: str) -> TreatmentProtocol | None:
+        return self._protocols.get(protocol_id)
+
+    def protocols(self) -> list[TreatmentProtocol]:
+        return list(self._protocols.values())
+
+    def add_listener(self, listener: Callable[[CatalogChange], None]):
+        """Call `listener` with every change right after it is applied."""
+        self._listeners.append(listener)
+
+    def add(self, protocol: TreatmentProtocol) -> CatalogChange:
+        self._protocols[protocol.id] = protocol
+        return self._record("add", protocol.id, protocol)
+
+    def delete(self, protocol_id: str) -> CatalogChange | None:
+        if self._protocols.pop(protocol_id, None) is None:
+            return None
+        return self._record("delete", protocol_id)
+
+    def changes_since(self, version: int) -> list[CatalogChange] | None:
+        """
+        Diffs needed to bring a client at `version` up to date, or None when the
+        log no longer reaches back that far and a full snapshot is required.
+        """
+        if version == self._version:
+            return []
+        if version <= 0 or version > self._version:
+            return None
+        if not self._changes or self._changes[0].version > version + 1:
+            return None
+        return [change for change in self._changes if change.version > version]
+
+    def snapshot(self) -> dict:
+        return {
+            "version": self._version,
+            "hash": self._content_hash,
+            "protocols": [p.model_dump(mode="json") for p in self._protocols.values()],
+        }
+
+    def _record(
+        self, op: str, protocol_id: str, protocol: TreatmentProtocol | None = None
+    ) -> CatalogChange:
+        self._version += 1
+        self._content_hash = self._compute_hash()
+        change = CatalogChange(
+            version=self._version, op=op, protocol_id=protocol_id, protocol=protocol
+        )
+        self._changes.append(change)
+        for listener in self._listeners:
+            listener(change)
+        return change
+
+    def _compute_hash(self) -> str:
+        payload = json.dumps(
+            [
+                self._protocols[protocol_id].model_dump(mode="json")
+                for protocol_id in sorted(self._protocols)
+            ],
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def apply_changes(
+    protocols: list[TreatmentProtocol], changes: list[CatalogChange]
+) -> list[TreatmentProtocol]:
+    by_id = {p.id: p for p in protocols}
+    for change in changes:
+        if change.op == "add" and change.protocol is not None:
+            by_id[change.protocol_id] = change.protocol
+        elif change.op == "delete":
+            by_id.pop(change.protocol_id, None)
+    return list(by_id.values())
+
+
+catalog = ProtocolCatalog(DEFAULT_PROTOCOLS)
@@ -0,0 +1,127 @@
+"""
+Process-wide protocol request queue shared by every patient and admin session.
+"""
+
+import asyncio
+from app.enums import ProtocolRequestStatus
+from app.models import ProtocolRequest
+from app.services.pubsub import PubSub, pubsub
+
+REQUESTS_TOPIC = "protocol_requests"
+
+
+class ProtocolRequestQueue:
+    """
+    Requests keyed by id, plus one insertion-ordered id bucket per status that
+    is updated on every transition, so each view is read in O(bucket size).
+    Stored requests are never mutated in place; a transition replaces the entry,
+    so sessions holding a previous snapshot are unaffected.
+    """
+
+    def __init__(self, bus: PubSub = pubsub):
+        self._requests: dict[str, ProtocolRequest] = {}
+        self._buckets: dict[str, dict[str, None]] = {
+            status: {} for status in ProtocolRequestStatus
+        }
+        self._lock = asyncio.Lock()
+        self._bus = bus
+
+    def get(self, request_id: str) -> ProtocolRequest | None:
+        return self._requests.get(request_id)
+
+    def all(self) -> list[ProtocolRequest]:
+        return list(self._requests.values())
+
+    def by_status(self, status: ProtocolRequestStatus) -> list[ProtocolRequest]:
+        return [self._requests[request_id] for request_id in self._buckets[status]]
+
+    def pending(self) -> list[ProtocolRequest]:
+        return self.by_status(ProtocolRequestStatus.PENDING)
+
+    def approved(self) -> list[ProtocolRequest]:
+        return self.by_status(ProtocolRequestStatus.APPROVED)
+
+    def rejected(self) -> list[ProtocolRequest]:
+        return self.by_status(ProtocolRequestStatus.REJECTED)
+
+    def counts(self) -> dict[str, int]:
+        return {status: len(bucket) for status, bucket in self._buckets.items()}
+
+    def select_pending(
+        self,
+        protocol_id: str = "",
+        date_from: str = "",
+        date_to: str = "",
+    ) -> list[str]:
+        """
+        Ids of pending requests matching a protocol and an inclusive
+        YYYY-MM-DD date range; empty arguments match everything.
+        """
+        matches = []
+        for request_id in self._buckets[ProtocolRequestStatus.PENDING]:
+            request = self._requests[request_id]
+            if protocol_id and request.protocol_id != protocol_id:
+                continue
+            if date_from and request.date < date_from:
+                continue
+            if date_to and request.date > date_to:
+                continue
+            matches.append(request_id)
+        return matches
+
+    async def submit(self, request: ProtocolRequest) -> ProtocolRequest:
+        async with self._lock:
+            previous = self._requests.get(request.id)
+            if previous is not None:
+                del self._buckets[previous.status][request.id]
+            self._requests[request.id] = request
+            self._buckets[request.status][request.id] = None
+        self._bus.publish(REQUESTS_TOPIC, request.id)
+        return request
+
+    async def transition(
+        self, request_id: str, status: ProtocolRequestStatus
+    ) -> ProtocolRequest | None:
+        """
+        Move a pending request to `status`.
+        Returns None if the request is unknown or was already decided, which is
+        how a second approval racing the first is rejected.
+        """
+        async with self._lock:
+            request = self._apply(request_id, status)
+        if request is not None:
+            self._bus.publish(REQUESTS_TOPIC, request_id)
+        return request
+
+    async def transition_many(
+        self, request_ids: list[str], status: ProtocolRequestStatus
+    ) -> list[ProtocolRequest]:
+        """
+        Apply one transition to many requests under a single lock acquisition
+        and announce them with a single publish. Ids that are unknown or no
+        longer pending are skipped.
+        """
+        changed = []
+        async with self._lock:
+            for request_id in request_ids:
+                request = self._apply(request_id, status)
+                if request is not None:
+                    changed.append(request)
+        if changed:
+            self._bus.publish(REQUESTS_TOPIC, [r.id for r in changed])
+        return changed
+
+    def _apply(
+        self, request_id: str, status: ProtocolRequestStatus
+    ) -> ProtocolRequest | None:
+        pending = self._buckets[ProtocolRequestStatus.PENDING]
+        if request_id not in pending:
+            return None
+        del pending[request_id]
+        request = self._requests[request_id].model_copy(update={"status": status})
+        self._requests[request_id] = request
+        self._buckets[status][request_id] = None
+        return request
+
+
+request_queue = ProtocolRequestQueue()
@@ -0,0 +1,136 @@
+"""
+Inverted index and facet counts over the protocol catalog.
+"""
+
+import bisect
+import re
+from collections import defaultdict
+from app.models import TreatmentProtocol
+from app.services.protocol_catalog import CatalogChange, ProtocolCatalog, catalog
+
+FACET_FIELDS: tuple[str, ...] = ("category", "frequency", "status")
+
+_TOKEN_RE = re.compile(r"[a-z0-9+]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class ProtocolSearchIndex:
+    """
+    Maps tokens from name, description and biomarker targets to protocol ids,
+    and each facet value to the ids that carry it. Kept up to date from catalog
+    changes, so queries and filter clicks never scan the protocol list.
+    Query tokens are ANDed; each one matches indexed tokens by prefix so
+    results narrow while the user types.
+    """
+
+    def __init__(self):
+        self._order: dict[str, None] = {}
+        self._postings: dict[str, set[str]] = defaultdict(set)
+        self._vocabulary: list[str] = []
+        self._tokens: dict[str, set[str]] = {}
+        self._facets: dict[str, dict[str, set[str]]] = {
+            field: defaultdict(set) for field in FACET_FIELDS
+        }
+        self._values: dict[str, dict[str, str]] = {}
+
+    @classmethod
+    def from_catalog(cls, source: ProtocolCatalog) -> "ProtocolSearchIndex":
+        index = cls()
+        for protocol in source.protocols():
+            index.add(protocol)
+        source.add_listener(index.apply)
+        return index
+
+    def apply(self, change: CatalogChange):
+        if change.op == "add" and change.protocol is not None:
+            self.add(change.protocol)
+        elif change.op == "delete":
+            self.remove(change.protocol_id)
+
+    def add(self, protocol: TreatmentProtocol):
+        # A replaced protocol keeps its place, as it does in the catalog.
+        self._unindex(protocol.id)
+        self._order[protocol.id] = None
+        text = " ".join(
+            [protocol.name, protocol.description, *protocol.biomarker_targets]
+        )
+        tokens = set(tokenize(text))
+        self._tokens[protocol.id] = tokens
+        for token in tokens:
+            if token not in self._postings:
+                bisect.insort(self._vocabulary, token)
+            self._postings[token].add(protocol.id)
+        values = {field: str(getattr(protocol, field)) for field in FACET_FIELDS}
+        self._values[protocol.id] = values
+        for field, value in values.items():
+            self._facets[field][value].add(protocol.id)
+
+    def remove(self, protocol_id: str):
+        self._unindex(protocol_id)
+        self._order.pop(protocol_id, None)
+
+    def _unindex(self, protocol_id: str):
+        if protocol_id not in self._tokens:
+            return
+        for token in self._tokens.pop(protocol_id):
+            ids = self._postings[token]
+            ids.discard(protocol_id)
+            if not ids:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+        for field, value in self._values.pop(protocol_id).items():
+            ids = self._facets[field][value]
+            ids.discard(protocol_id)
+            if not ids:
+                del self._facets[field][value]
+
+    def search(self, query: str = "", filters: dict[str, str] | None = None) -> list[str]:
+        """Matching protocol ids in catalog order."""
+        ids = self._filtered(self._match(query), filters or {})
+        return [protocol_id for protocol_id in self._order if protocol_id in ids]
+
+    def facet_counts(
+        self, query: str = "", filters: dict[str, str] | None = None
+    ) -> dict[str, dict[str, int]]:
+        """
+        Per-field value counts for the current query. Each field is counted
+        with the filters on the other fields applied but not its own, so every
+        option shows how many results selecting it would give.
+        """
+        filters = filters or {}
+        matched = self._match(query)
+        counts = {}
+        for field in FACET_FIELDS:
+            others = {f: v for f, v in filters.items() if f != field}
+            ids = self._filtered(matched, others)
+            counts[field] = {
+                value: len(ids & members)
+                for value, members in self._facets[field].items()
+            }
+        return counts
+
+    def _match(self, query: str) -> set[str]:
+        result: set[str] | None = None
+        for term in tokenize(query):
+            ids: set[str] = set()
+            start = bisect.bisect_left(self._vocabulary, term)
+            for token in self._vocabulary[start:]:
+                if not token.startswith(term):
+                    break
+                ids |= self._postings[token]
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        return set(self._order) if result is None else result
+
+    def _filtered(self, ids: set[str], filters: dict[str, str]) -> set[str]:
+        for field, value in filters.items():
+            if value:
+                ids = ids & self._facets[field].get(value, set())
+        return ids
+
+
+search_index = ProtocolSearchIndex.from_catalog(catalog)
@@ -0,0 +1,70 @@
+"""
+In-process publish/subscribe hub used to push events to connected sessions.
+All calls must happen on the backend event loop; queues are not thread-safe.
+"""
+
+import asyncio
+import contextlib
+from collections import defaultdict
+from typing import Any, AsyncIterator
+
+
+class PubSub:
+    """
+    Fans messages out to one bounded queue per subscriber.
+    A slow subscriber drops its oldest message rather than blocking publishers.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self._maxsize = maxsize
+        self._topics: dict[str, set[asyncio.Queue]] = defaultdict(set)
+
+    def subscribe(self, topic: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._maxsize)
+        self._topics[topic].add(queue)
+        return queue
+
+    def unsubscribe(self, topic: str, queue: asyncio.Queue):
+        subscribers = self._topics.get(topic)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._topics[topic]
+
+    def publish(self, topic: str, message: Any) -> int:
+        subscribers = self._topics.get(topic, ())
+        for queue in subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+        return len(subscribers)
+
+    def subscriber_count(self, topic: str) -> int:
+        return len(self._topics.get(topic, ()))
+
+    @contextlib.asynccontextmanager
+    async def listen(self, topic: str) -> AsyncIterator[asyncio.Queue]:
+        queue = self.subscribe(topic)
+        try:
+            yield queue
+        finally:
+            self.unsubscribe(topic, queue)
+
+
+async def drain(queue: asyncio.Queue, timeout: float | None = None) -> list[Any]:
+    """
+    Wait for the next message, then take everything already queued behind it,
+    so a burst of publishes is handled as a single update. Returns an empty
+    list if nothing arrives within `timeout` seconds.
+    """
+    try:
+        messages = [await asyncio.wait_for(queue.get(), timeout)]
+    except asyncio.TimeoutError:
+        return []
+    while not queue.empty():
+        messages.append(queue.get_nowait())
+    return messages
+
+
+pubsub = PubSub()
@@ -0,0 +1,129 @@
+"""
+Ranks treatment protocols for patients by how far their markers sit outside
+the optimal ranges in `settings.supported_biomarkers`.
+"""
+
+from app.config import BiomarkerConfig, settings
+from app.models import CohortPatient, ProtocolRecommendation, TreatmentProtocol
+from app.services.protocol_catalog import ProtocolCatalog, catalog
+
+
+def marker_gap(value: float, config: BiomarkerConfig) -> float:
+    """
+    Distance outside the optimal range in units of the range width;
+    zero when the value is inside it.
+    """
+    width = (config.optimal_range_max - config.optimal_range_min) or 1.0
+    if value < config.optimal_range_min:
+        return (config.optimal_range_min - value) / width
+    if value > config.optimal_range_max:
+        return (value - config.optimal_range_max) / width
+    return 0.0
+
+
+def matmul(left: list[list[float]], right: list[list[float]]) -> list[list[float]]:
+    """
+    `left @ right` for row-major lists. Each output row is accumulated from the
+    rows of `right` selected by the non-zero entries of the left row, so the
+    mostly-zero gap rows cost O(non-zero gaps x protocols).
+    """
+    width = len(right[0]) if right else 0
+    result = []
+    for row in left:
+        acc = [0.0] * width
+        for weight, right_row in zip(row, right):
+            if weight:
+                acc = [a + weight * b for a, b in zip(acc, right_row)]
+        result.append(acc)
+    return result
+
+
+class ProtocolRecommender:
+    """
+    Keeps a marker x protocol targeting matrix built from the catalog and a
+    per-patient ranking cache. Scores for a cohort are the single product
+    gaps (patients x markers) @ targets, taken over the patients whose markers
+    or the catalog version changed since their ranking was cached.
+    """
+
+    def __init__(
+        self,
+        source: ProtocolCatalog,
+        markers: list[BiomarkerConfig] = settings.supported_biomarkers,
+    ):
+        self._catalog = source
+        self._markers = markers
+        self._aliases = [
+            {str(m.name).lower(), *(alias.lower() for alias in m.aliases)}
+            for m in markers
+        ]
+        self._version = -1
+        self._protocols: list[TreatmentProtocol] = []
+        self._targets: list[list[float]] = []
+        self._cache: dict[str, tuple[tuple[float, ...], list[tuple[int, float]]]] = {}
+
+    def gap_vector(self, patient: CohortPatient) -> tuple[float, ...]:
+        return tuple(
+            marker_gap(patient.biomarkers[str(m.name)], m)
+            if str(m.name) in patient.biomarkers
+            else 0.0
+            for m in self._markers
+        )
+
+    def rank_cohort(self, patients: list[CohortPatient]):
+        """Score the catalog for every patient whose cached ranking is stale."""
+        self._refresh_matrix()
+        gaps = {p.id: self.gap_vector(p) for p in patients}
+        stale = [
+            patient_id
+            for patient_id, gap in gaps.items()
+            if patient_id not in self._cache or self._cache[patient_id][0] != gap
+        ]
+        if stale:
+            rows = [list(gaps[patient_id]) for patient_id in stale]
+            scores = matmul(rows, self._targets)
+            for patient_id, row in zip(stale, scores):
+                ranked = sorted(
+                    ((i, score) for i, score in enumerate(row) if score > 0),
+                    key=lambda item: item[1],
+                    reverse=True,
+                )
+                self._cache[patient_id] = (gaps[patient_id], ranked)
+
+    def recommendations(
+        self, patient: CohortPatient, limit: int = 3
+    ) -> list[ProtocolRecommendation]:
+        self.rank_cohort([patient])
+        gap, ranked = self._cache[patient.id]
+        return [
+            ProtocolRecommendation(
+                protocol_id=self._protocols[i].id,
+                protocol_name=self._protocols[i].name,
+                score=round(score, 3),
+                markers=[
+                    str(marker.name)
+                    for marker, g, targets in zip(self._markers, gap, self._targets)
+                    if g > 0 and targets[i] > 0
+                ],
+            )
+            for i, score in ranked[:limit]
+        ]
+
+    def _refresh_matrix(self):
+        if self._version == self._catalog.version:
+            return
+        self._protocols = self._catalog.protocols()
+        self._targets = [
+            [
+                1.0
+                if any(t.lower() in aliases for t in protocol.biomarker_targets)
+                else 0.0
+                for protocol in self._protocols
+            ]
+            for aliases in self._aliases
+        ]
+        self._version = self._catalog.version
+        self._cache.clear()
+
+
+recommender = ProtocolRecommender(catalog)
@@ -0,0 +1,242 @@
+"""
+Ingest-time deduplication of wearable samples. Re-synced windows replay
+samples already stored, and overlapping sources (e.g. Oura and Apple Health)
+report the same interval more than once. A sample is a replay when its
+(patient, metric, ts, source) was seen before; each (patient, metric, time
+bucket) keeps the samples of one source only, preferring the source with the
+highest priority, and a source may have any number of samples in a bucket.
+
+Re-syncs overlap the recent past, so only the last `dedup_horizon_seconds`
+are indexed in memory; samples older than that are checked against storage
+with one range read per (patient, metric) and batch.
+"""
+
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Iterable, NamedTuple
+from app.config import settings
+
+if TYPE_CHECKING:
+    from app.services.timeseries import Sample
+
+_EMPTY = 0
+_KEY_MASK = (1 << 63) - 1
+
+
+class BucketIndex:
+    """
+    Open-addressing hash table from 63-bit key hashes to small values,
+    stored in flat arrays: about 13 bytes per entry at the maximum load
+    factor, against well over 100 for a dict keyed by tuples. Keys are
+    hashes, so a collision (around 2^-63 per pair) can drop a sample; that is
+    the price of keeping millions of samples and buckets in memory.
+    """
+
+    __slots__ = ("_keys", "_values", "_size", "_mask")
+
+    def __init__(self, capacity: int = 1024):
+        capacity = 1 << max(4, (capacity - 1).bit_length())
+        self._keys = array("q", bytes(8 * capacity))
+        self._values = bytearray(capacity)
+        self._size = 0
+        self._mask = capacity - 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._keys) * 8 + len(self._values)
+
+    def get(self, key: int) -> int:
+        """Stored value for `key`, or -1 when absent."""
+        keys, mask = self._keys, self._mask
+        key = key & _KEY_MASK or 1
+        slot = key & mask
+        while True:
+            found = keys[slot]
+            if found == key:
+                return self._values[slot] - 1
+            if found == _EMPTY:
+                return -1
+            slot = (slot + 1) & mask
+
+    def put(self, key: int, value: int):
+        """Store `value` (0-254) for `key`."""
+        if (self._size + 1) * 10 > len(self._keys) * 7:
+            self._grow()
+        keys, mask = self._keys, self._mask
+        key = key & _KEY_MASK or 1
+        slot = key & mask
+        while True:
+            found = keys[slot]
+            if found == key:
+                self._values[slot] = value + 1
+                return
+            if found == _EMPTY:
+                keys[slot] = key
+                self._values[slot] = value + 1
+                self._size += 1
+                return
+            slot = (slot + 1) & mask
+
+    def _grow(self):
+        keys, values = self._keys, self._values
+        self.__init__(len(keys) * 2)
+        for key, value in zip(keys, values):
+            if key != _EMPTY:
+                self.put(key, value - 1)
+
+
+class _Window(NamedTuple):
+    index: BucketIndex
+    # Epoch seconds; buckets starting at or after it are in `index`.
+    floor: int
+
+
+class SampleDeduplicator:
+    """
+    Decides which incoming samples to store. Each patient's index holds a
+    key per stored sample of the last `horizon` seconds and, per bucket, the
+    source owning it; it is loaded from storage once (one query, via
+    `load`) and then kept up to date from what is written, so ingest never
+    reads before writing a recent sample. Samples in older buckets are
+    looked up with `lookup`, once per (patient, metric) and batch over the
+    batch's time span. An index is reloaded once its floor falls two
+    horizons behind, and indexes for the least recently active patients are
+    dropped past `max_patients`, so memory stays bounded by about
+    `max_patients` times two horizons of samples.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[str, int], Iterable[tuple[str, int, str]]],
+        lookup: Callable[[str, str, int, int], Iterable[tuple[int, str]]],
+        priorities: dict[str, int] = settings.source_priority,
+        bucket_seconds: dict[str, int] = settings.sample_bucket_seconds,
+        max_patients: int = settings.dedup_max_patients,
+        horizon: int = settings.dedup_horizon_seconds,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._load = load
+        self._lookup = lookup
+        self._priorities = priorities
+        self._bucket_seconds = bucket_seconds
+        self._max_patients = max_patients
+        self._horizon = horizon
+        self._clock = clock
+        self._windows: OrderedDict[str, _Window] = OrderedDict()
+        # Bucket owners are stored as small source numbers, not names.
+        self._source_ids: dict[str, int] = {}
+        self._source_priorities: list[int] = []
+        self._lock = threading.Lock()
+
+    def invalidate(self, patient_ids: Iterable[str]):
+        """Forget indexes that may no longer match storage, e.g. after a failed write."""
+        with self._lock:
+            for patient_id in patient_ids:
+                self._windows.pop(patient_id, None)
+
+    def bucket_bounds(self, metric: str, ts: int) -> tuple[int, int]:
+        width = self._bucket_seconds.get(metric, 1)
+        start = ts - ts % width
+        return start, start + width
+
+    def _source_id(self, source: str) -> int:
+        source_id = self._source_ids.get(source)
+        if source_id is None:
+            source_id = self._source_ids[source] = len(self._source_ids)
+            self._source_priorities.append(self._priorities.get(source, 0))
+        return source_id
+
+    def _add(self, index: BucketIndex, metric: str, ts: int, source: str):
+        """Index a stored sample, keeping the higher-priority bucket owner."""
+        index.put(hash((metric, ts, source)), 0)
+        start, _ = self.bucket_bounds(metric, ts)
+        bucket = hash((metric, start))
+        source_id = self._source_id(source)
+        owner = index.get(bucket)
+        priorities = self._source_priorities
+        if owner < 0 or priorities[source_id] > priorities[owner]:
+            index.put(bucket, source_id)
+
+    def filter(
+        self, samples: Iterable["Sample"]
+    ) -> tuple[list["Sample"], list["Sample"]]:
+        """
+        Split `samples` into those to store and, among them, those that
+        take a bucket over from a lower-priority source. Replays, and
+        samples in a bucket owned by another source of equal or higher
+        priority, are dropped.
+        """
+        samples = list(samples)
+        keep: list[Sample] = []
+        replacing: list[Sample] = []
+        bucket_seconds = self._bucket_seconds
+        ms_metrics = settings.millisecond_metrics
+        with self._lock:
+            now = int(self._clock())
+            windows = {
+                patient_id: self._window(patient_id, now)
+                for patient_id in {sample.patient_id for sample in samples}
+            }
+            # Buckets older than a patient's window, read from storage into a
+            # throwaway index per patient for this batch only.
+            spans: dict[tuple[str, str], tuple[int, int]] = {}
+            is_old = []
+            for sample in samples:
+                ts, metric = sample.ts, sample.metric
+                start = ts - ts % bucket_seconds.get(metric, 1)
+                seconds = start // 1000 if metric in ms_metrics else start
+                old = seconds < windows[sample.patient_id].floor
+                is_old.append(old)
+                if old:
+                    key = (sample.patient_id, metric)
+                    lo, hi = spans.get(key, (start, start))
+                    spans[key] = (min(lo, start), max(hi, start))
+            old_indexes: dict[str, BucketIndex] = {}
+            for (patient_id, metric), (lo, hi) in spans.items():
+                index = old_indexes.setdefault(patient_id, BucketIndex())
+                _, end = self.bucket_bounds(metric, hi)
+                for ts, source in self._lookup(patient_id, metric, lo, end):
+                    self._add(index, metric, ts, source)
+
+            for sample, old in zip(samples, is_old):
+                if old:
+                    index = old_indexes[sample.patient_id]
+                else:
+                    index = windows[sample.patient_id].index
+                ts, metric = sample.ts, sample.metric
+                key = hash((metric, ts, sample.source))
+                if index.get(key) >= 0:
+                    continue
+                source = self._source_id(sample.source)
+                bucket = hash((metric, ts - ts % bucket_seconds.get(metric, 1)))
+                owner = index.get(bucket)
+                if owner < 0 or owner == source:
+                    keep.append(sample)
+                elif self._source_priorities[source] > self._source_priorities[owner]:
+                    keep.append(sample)
+                    replacing.append(sample)
+                else:
+                    continue
+                index.put(key, 0)
+                index.put(bucket, source)
+        return keep, replacing
+
+    def _window(self, patient_id: str, now: int) -> _Window:
+        window = self._windows.get(patient_id)
+        if window is not None and window.floor >= now - 2 * self._horizon:
+            self._windows.move_to_end(patient_id)
+            return window
+        floor = now - self._horizon
+        index = BucketIndex()
+        for metric, ts, source in self._load(patient_id, floor):
+            self._add(index, metric, ts, source)
+        window = self._windows[patient_id] = _Window(index, floor)
+        self._windows.move_to_end(patient_id)
+        if len(self._windows) > self._max_patients:
+            self._windows.popitem(last=False)
+        return window
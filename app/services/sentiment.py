@@ -0,0 +1,197 @@
+"""
+Local, lexicon-based sentiment scoring for check-in notes.
+Scoring runs in a process pool and notes from all sessions are micro-batched,
+so neither the model nor the batching work runs on the Reflex event loop.
+"""
+
+import asyncio
+import contextlib
+import math
+import multiprocessing
+import re
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+LEXICON: dict[str, float] = {
+    "great": 3.0,
+    "good": 2.0,
+    "better": 2.0,
+    "best": 3.0,
+    "well": 1.5,
+    "energetic": 2.5,
+    "energized": 2.5,
+    "rested": 2.0,
+    "refreshed": 2.5,
+    "solid": 1.5,
+    "strong": 2.0,
+    "calm": 1.5,
+    "happy": 2.5,
+    "focused": 2.0,
+    "improved": 2.0,
+    "improving": 2.0,
+    "relief": 2.0,
+    "relieved": 2.0,
+    "amazing": 3.5,
+    "excellent": 3.5,
+    "fine": 1.0,
+    "okay": 0.5,
+    "ok": 0.5,
+    "motivated": 2.0,
+    "clear": 1.0,
+    "recovered": 2.0,
+    "bad": -2.5,
+    "worse": -2.5,
+    "worst": -3.5,
+    "tired": -1.5,
+    "exhausted": -2.5,
+    "fatigue": -2.0,
+    "fatigued": -2.0,
+    "pain": -2.5,
+    "painful": -2.5,
+    "ache": -1.5,
+    "aching": -1.5,
+    "headache": -2.0,
+    "migraine": -2.5,
+    "nausea": -2.0,
+    "nauseous": -2.0,
+    "dizzy": -2.0,
+    "anxious": -2.0,
+    "anxiety": -2.0,
+    "stressed": -2.0,
+    "stress": -1.5,
+    "sick": -2.5,
+    "poor": -2.0,
+    "sore": -1.5,
+    "bloated": -1.5,
+    "cramps": -2.0,
+    "insomnia": -2.5,
+    "restless": -1.5,
+    "sad": -2.5,
+    "low": -1.0,
+    "foggy": -1.5,
+    "weak": -2.0,
+    "irritable": -2.0,
+    "slump": -1.5,
+}
+NEGATIONS = frozenset(
+    {"not", "no", "never", "hardly", "without", "isn't", "wasn't", "don't", "didn't"}
+)
+INTENSIFIERS: dict[str, float] = {
+    "very": 1.3,
+    "really": 1.3,
+    "extremely": 1.5,
+    "so": 1.2,
+    "much": 1.2,
+    "slightly": 0.6,
+    "mild": 0.6,
+    "mildly": 0.6,
+    "somewhat": 0.7,
+    "bit": 0.7,
+}
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def score_text(text: str) -> float:
+    """Sentiment in [-1, 1]; negation flips and intensifiers scale the next term."""
+    total = 0.0
+    negate = False
+    boost = 1.0
+    for word in _WORD_RE.findall(text.lower()):
+        if word in NEGATIONS:
+            negate = True
+            continue
+        if word in INTENSIFIERS:
+            boost *= INTENSIFIERS[word]
+            continue
+        valence = LEXICON.get(word)
+        if valence is None:
+            continue
+        valence *= boost
+        total += -0.75 * valence if negate else valence
+        negate = False
+        boost = 1.0
+    return round(total / math.sqrt(total * total + 15), 3)
+
+
+def score_batch(texts: list[str]) -> list[float]:
+    return [score_text(text) for text in texts]
+
+
+class SentimentBatcher:
+    """
+    Collects notes into batches of up to `max_batch`, waiting at most
+    `max_delay` seconds after the first note, and scores each batch in a
+    single process-pool call.
+    """
+
+    def __init__(self, max_batch: int = 64, max_delay: float = 0.05, workers: int = 1):
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._workers = workers
+        self._queue: asyncio.Queue | None = None
+        self._executor: ProcessPoolExecutor | None = None
+        self._task: asyncio.Task | None = None
+
+    async def score(self, text: str) -> float:
+        if self._task is None or self._task.done():
+            self._start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    def _start(self):
+        self._queue = asyncio.Queue()
+        if self._executor is None:
+            self._executor = self._new_executor()
+        self._task = asyncio.create_task(self._run())
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self._workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._max_delay
+            while len(batch) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            texts = [text for text, _ in batch]
+            try:
+                scores = await loop.run_in_executor(self._executor, score_batch, texts)
+            except Exception as e:
+                if isinstance(e, BrokenExecutor):
+                    self._executor = self._new_executor()
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), score in zip(batch, scores):
+                if not future.done():
+                    future.set_result(score)
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        try:
+            yield
+        finally:
+            self.close()
+
+
+sentiment_batcher = SentimentBatcher()
@@ -0,0 +1,159 @@
+"""
+Persisted state of each patient's data source connections: status, the
+high-water-mark cursor of synced data and when the next sync is due.
+"""
+
+import random
+import time
+from typing import NamedTuple
+from app.config import settings
+from app.enums import DataSourceStatus
+from app.services import db
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS source_connections (
+    patient_id TEXT NOT NULL,
+    source_id TEXT NOT NULL,
+    source_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cursor INTEGER NOT NULL DEFAULT 0,
+    last_sync_at INTEGER,
+    next_sync_at REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (patient_id, source_id)
+);
+CREATE INDEX IF NOT EXISTS source_connections_due
+    ON source_connections (next_sync_at) WHERE status != 'Disconnected';
+"""
+
+
+class SourceConnection(NamedTuple):
+    patient_id: str
+    source_id: str
+    source_type: str
+    status: str
+    cursor: int
+    last_sync_at: int | None
+    next_sync_at: float
+
+
+def next_sync_time(
+    delay: float = settings.sync_interval, jitter: float = settings.sync_jitter
+) -> float:
+    """`delay` seconds from now, spread by +/- `jitter` so sources don't align."""
+    return time.time() + delay * random.uniform(1 - jitter, 1 + jitter)
+
+
+class SourceRegistry:
+    def connect(self, patient_id: str, source_id: str, source_type: str):
+        """Register a connected source; the first scheduled sync is jittered."""
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO source_connections "
+                "(patient_id, source_id, source_type, status, next_sync_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (patient_id, source_id) DO UPDATE SET "
+                "source_type = excluded.source_type, status = CASE "
+                "WHEN status = 'Disconnected' THEN excluded.status ELSE status END",
+                (
+                    patient_id,
+                    source_id,
+                    str(source_type),
+                    str(DataSourceStatus.CONNECTED),
+                    next_sync_time(settings.sync_interval, 1.0),
+                ),
+            )
+
+    def get(self, patient_id: str, source_id: str) -> SourceConnection | None:
+        db.ensure_schema(SCHEMA)
+        row = (
+            db.connection()
+            .execute(
+                "SELECT * FROM source_connections WHERE patient_id = ? AND source_id = ?",
+                (patient_id, source_id),
+            )
+            .fetchone()
+        )
+        return SourceConnection(*row) if row is not None else None
+
+    def connections(self, patient_id: str) -> list[SourceConnection]:
+        db.ensure_schema(SCHEMA)
+        rows = (
+            db.connection()
+            .execute(
+                "SELECT * FROM source_connections WHERE patient_id = ?", (patient_id,)
+            )
+            .fetchall()
+        )
+        return [SourceConnection(*row) for row in rows]
+
+    def cursor(self, patient_id: str, source_id: str) -> int:
+        connection = self.get(patient_id, source_id)
+        return connection.cursor if connection is not None else 0
+
+    def record_success(self, patient_id: str, source_id: str, cursor: int):
+        """Mark a completed sync; the cursor only ever moves forward."""
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.execute(
+                "UPDATE source_connections SET status = ?, "
+                "cursor = max(cursor, ?), last_sync_at = ?, next_sync_at = ? "
+                "WHERE patient_id = ? AND source_id = ?",
+                (
+                    str(DataSourceStatus.CONNECTED),
+                    cursor,
+                    int(time.time()),
+                    next_sync_time(),
+                    patient_id,
+                    source_id,
+                ),
+            )
+
+    def record_failure(self, patient_id: str, source_id: str):
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.execute(
+                "UPDATE source_connections SET status = ?, next_sync_at = ? "
+                "WHERE patient_id = ? AND source_id = ?",
+                (
+                    str(DataSourceStatus.ERROR),
+                    next_sync_time(settings.sync_error_backoff),
+                    patient_id,
+                    source_id,
+                ),
+            )
+
+    def postpone(self, patient_id: str, source_id: str, delay: float):
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.execute(
+                "UPDATE source_connections SET next_sync_at = ? "
+                "WHERE patient_id = ? AND source_id = ?",
+                (next_sync_time(delay), patient_id, source_id),
+            )
+
+    def due(
+        self, limit: int, now: float | None = None, skip_types: frozenset[str] = frozenset()
+    ) -> list[SourceConnection]:
+        """Connected or failed sources whose next sync is due, most overdue first."""
+        db.ensure_schema(SCHEMA)
+        placeholders = ", ".join("?" * len(skip_types))
+        rows = (
+            db.connection()
+            .execute(
+                "SELECT * FROM source_connections "
+                "WHERE status != 'Disconnected' AND next_sync_at <= ? "
+                f"AND source_type NOT IN ({placeholders}) "
+                "ORDER BY next_sync_at LIMIT ?",
+                (time.time() if now is None else now, *skip_types, limit),
+            )
+            .fetchall()
+        )
+        return [SourceConnection(*row) for row in rows]
+
+
+source_registry = SourceRegistry()
@@ -0,0 +1,158 @@
+"""
+Periodic background sync of every connected data source.
+"""
+
+import asyncio
+import contextlib
+import time
+from typing import Callable
+from app.config import settings
+from app.services.source_registry import (
+    SourceConnection,
+    SourceRegistry,
+    source_registry,
+)
+from app.services.wearable_sync import (
+    SyncInProgress,
+    SyncProgress,
+    WearableSync,
+    wearable_sync,
+)
+
+
+class TokenBucket:
+    """Allows `rate_per_minute` acquisitions per minute, with bursts up to `burst`."""
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        burst: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._rate = rate_per_minute / 60
+        self._capacity = burst if burst is not None else max(1.0, rate_per_minute / 6)
+        self._tokens = self._capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+    def available(self) -> bool:
+        self._refill()
+        return self._tokens >= 1
+
+    def try_acquire(self) -> bool:
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+async def _ignore_progress(progress: SyncProgress):
+    pass
+
+
+class SyncScheduler:
+    """
+    Polls the registry for due sources and starts their syncs, never running
+    more than `max_concurrency` at once and starting each source type no
+    faster than its token bucket allows. A source whose type is out of tokens
+    stays due and is retried on a later poll, so rate limits never hold a
+    concurrency slot. Only as many due rows as there are free slots are read
+    per poll, and all database work runs in worker threads, so thousands of
+    registered sources cost the event loop one small query per poll.
+    """
+
+    def __init__(
+        self,
+        sync: WearableSync = wearable_sync,
+        registry: SourceRegistry = source_registry,
+        max_concurrency: int = settings.sync_max_concurrency,
+        rate_limits: dict[str, float] = settings.sync_rate_limits,
+        poll_interval: float = settings.sync_poll_interval,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._sync = sync
+        self._registry = registry
+        self._max_concurrency = max_concurrency
+        self._buckets = {
+            source_type: TokenBucket(rate, clock=clock)
+            for source_type, rate in rate_limits.items()
+        }
+        self._poll_interval = poll_interval
+        self._running: dict[tuple[str, str], asyncio.Task] = {}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def active(self) -> int:
+        return len(self._running)
+
+    async def poll(self):
+        """Start syncs for due sources, up to the free concurrency slots."""
+        free = self._max_concurrency - len(self._running)
+        if free <= 0:
+            return
+        limited = frozenset(
+            source_type
+            for source_type, bucket in self._buckets.items()
+            if not bucket.available()
+        )
+        due = await asyncio.to_thread(self._registry.due, free * 2, None, limited)
+        for connection in due:
+            if free <= 0:
+                break
+            key = (connection.patient_id, connection.source_id)
+            if key in self._running or self._sync.is_running(*key):
+                continue
+            bucket = self._buckets.get(connection.source_type)
+            if bucket is not None and not bucket.try_acquire():
+                continue
+            task = asyncio.create_task(self._run_one(connection))
+            self._running[key] = task
+            task.add_done_callback(lambda _, key=key: self._running.pop(key, None))
+            free -= 1
+
+    async def _run_one(self, connection: SourceConnection):
+        try:
+            await self._sync.run(
+                connection.patient_id,
+                connection.source_id,
+                _ignore_progress,
+                connection.source_type,
+            )
+        except SyncInProgress:
+            await asyncio.to_thread(
+                self._registry.postpone,
+                connection.patient_id,
+                connection.source_id,
+                self._poll_interval,
+            )
+        except Exception:
+            # The failure is recorded on the connection, which backs off
+            # before its next scheduled attempt.
+            pass
+
+    async def run_forever(self):
+        while True:
+            with contextlib.suppress(Exception):
+                await self.poll()
+            await asyncio.sleep(self._poll_interval)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        self._task = asyncio.create_task(self.run_forever())
+        try:
+            yield
+        finally:
+            self._task.cancel()
+            for task in list(self._running.values()):
+                task.cancel()
+
+
+sync_scheduler = SyncScheduler()
@@ -0,0 +1,286 @@
+"""
+Time-series samples from wearables and imports. Samples are written one row
+per sample; for the high-frequency `settings.chunked_metrics` the rows only
+buffer each source's newest points until a full chunk can be sealed into the
+compressed chunk store, and reads merge both. For `settings.daily_metrics`
+every insert also marks the UTC days it touched, so daily summaries only
+recompute those days. Timestamps are epoch seconds, except for the
+beat-level `settings.millisecond_metrics`, which are epoch milliseconds.
+"""
+
+import sqlite3
+from itertools import groupby
+from typing import Iterable, Iterator, NamedTuple
+from app.config import settings
+from app.services import db
+from app.services.chunk_store import chunk_store
+from app.services.sample_dedup import SampleDeduplicator
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    patient_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (patient_id, metric, ts, source)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS touched_days (
+    patient_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    PRIMARY KEY (patient_id, metric, day)
+) WITHOUT ROWID;
+"""
+
+
+class Sample(NamedTuple):
+    """One reading; `ts` is seconds (or ms, see `epoch_seconds`) since the epoch."""
+
+    patient_id: str
+    metric: str
+    ts: int
+    value: float
+    source: str
+
+
+def epoch_seconds(metric: str, ts: int) -> int:
+    return ts // 1000 if metric in settings.millisecond_metrics else ts
+
+
+def day_runs(days: list[int]) -> Iterator[tuple[int, int]]:
+    """First and last day of each run of consecutive days in sorted `days`."""
+    start = 0
+    for i in range(1, len(days) + 1):
+        if i == len(days) or days[i] != days[i - 1] + 1:
+            yield days[start], days[i - 1]
+            start = i
+
+
+class TimeSeriesStore:
+    def __init__(self):
+        self._dedup = SampleDeduplicator(self._bucket_keys, self._stored_keys)
+
+    def insert_many(self, samples: Iterable[Sample]) -> int:
+        """
+        Bulk-insert in one transaction after deduplication: replays are
+        dropped, each (patient, metric, time bucket) keeps one source's
+        samples, and a higher-priority source replaces a lower one's samples
+        in that bucket. Returns the number of new rows.
+        """
+        keep, replacing = self._dedup.filter(samples)
+        if not keep:
+            return 0
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        try:
+            with conn:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO samples "
+                    "(patient_id, metric, ts, value, source) VALUES (?, ?, ?, ?, ?)",
+                    keep,
+                )
+                inserted = conn.total_changes - before
+                conn.executemany(
+                    "DELETE FROM samples WHERE patient_id = ? AND metric = ? "
+                    "AND ts >= ? AND ts < ? AND source != ?",
+                    (
+                        (
+                            s.patient_id,
+                            s.metric,
+                            *self._dedup.bucket_bounds(s.metric, s.ts),
+                            s.source,
+                        )
+                        for s in replacing
+                    ),
+                )
+                for patient_id, metric, source in {
+                    (s.patient_id, s.metric, s.source)
+                    for s in keep
+                    if s.metric in settings.chunked_metrics
+                }:
+                    self._seal(conn, patient_id, metric, source)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO touched_days VALUES (?, ?, ?)",
+                    {
+                        (
+                            s.patient_id,
+                            s.metric,
+                            epoch_seconds(s.metric, s.ts) // 86400,
+                        )
+                        for s in keep
+                        if s.metric in settings.daily_metrics
+                    },
+                )
+        except Exception:
+            self._dedup.invalidate({s.patient_id for s in keep})
+            raise
+        return inserted
+
+    def take_touched_days(self, patient_id: str, metric: str) -> list[int]:
+        """
+        Pop the UTC days written since the last call. A caller
+        that fails to summarize them should `touch_days` them again.
+        """
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            rows = conn.execute(
+                "DELETE FROM touched_days WHERE patient_id = ? AND metric = ? "
+                "RETURNING day",
+                (patient_id, metric),
+            ).fetchall()
+        return sorted(row[0] for row in rows)
+
+    def touch_days(self, patient_id: str, metric: str, days: Iterable[int]):
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO touched_days VALUES (?, ?, ?)",
+                ((patient_id, metric, day) for day in days),
+            )
+
+    def _seal(
+        self, conn: sqlite3.Connection, patient_id: str, metric: str, source: str
+    ):
+        """
+        Move whole chunks of the source's buffered rows newer than its last
+        sealed point into the chunk store. Runs inside the insert
+        transaction; if the commit fails after the chunk was written, reads
+        see the same points twice and keep each once.
+        """
+        series = chunk_store.series(patient_id, metric)
+        size = settings.series_chunk_points
+        after = series.last_ts(source)
+        after = -(2**63) if after is None else after
+        key = (patient_id, metric, source, after)
+        where = "WHERE patient_id = ? AND metric = ? AND source = ? AND ts > ?"
+        (pending,) = conn.execute(
+            f"SELECT COUNT(*) FROM samples {where}", key
+        ).fetchone()
+        if pending < size:
+            return
+        rows = conn.execute(
+            f"SELECT ts, value FROM samples {where} ORDER BY ts LIMIT ?",
+            (*key, pending - pending % size),
+        ).fetchall()
+        series.append(source, [row[0] for row in rows], [row[1] for row in rows])
+        conn.execute(
+            f"DELETE FROM samples {where} AND ts <= ?", (*key, rows[-1][0])
+        )
+
+    def _bucket_keys(
+        self, patient_id: str, since: int
+    ) -> Iterator[tuple[str, int, str]]:
+        """(metric, ts, source) of the patient's samples from `since` (seconds)."""
+        db.ensure_schema(SCHEMA)
+        ms_metrics = settings.millisecond_metrics
+        marks = ", ".join("?" * len(ms_metrics))
+        yield from db.connection().execute(
+            "SELECT metric, ts, source FROM samples WHERE patient_id = ? "
+            f"AND ts >= CASE WHEN metric IN ({marks}) THEN ? ELSE ? END",
+            (patient_id, *ms_metrics, since * 1000, since),
+        )
+        for metric in chunk_store.metrics(patient_id):
+            start = since * 1000 if metric in ms_metrics else since
+            series = chunk_store.series(patient_id, metric)
+            for source, timestamps, _ in series.read(start, 2**63 - 1):
+                for ts in timestamps:
+                    yield metric, ts, source
+
+    def _stored_keys(
+        self, patient_id: str, metric: str, start: int, end: int
+    ) -> Iterator[tuple[int, str]]:
+        """(ts, source) of every stored sample with `start <= ts < end`."""
+        db.ensure_schema(SCHEMA)
+        yield from db.connection().execute(
+            "SELECT ts, source FROM samples "
+            "WHERE patient_id = ? AND metric = ? AND ts >= ? AND ts < ?",
+            (patient_id, metric, start, end),
+        )
+        if metric in settings.chunked_metrics:
+            series = chunk_store.series(patient_id, metric)
+            for source, timestamps, _ in series.read(start, end):
+                for ts in timestamps:
+                    yield ts, source
+
+    def range(
+        self, patient_id: str, metric: str, start: int, end: int
+    ) -> list[Sample]:
+        """Samples with `start <= ts < end`, oldest first."""
+        timestamps, values, sources = self._merged(patient_id, metric, start, end)
+        return [
+            Sample(patient_id, metric, ts, value, source)
+            for ts, value, source in zip(timestamps, values, sources)
+        ]
+
+    def series(
+        self, patient_id: str, metric: str, start: int, end: int
+    ) -> tuple[list[int], list[float]]:
+        """Timestamps and values with `start <= ts < end`, for charts."""
+        timestamps, values, _ = self._merged(patient_id, metric, start, end)
+        return timestamps, values
+
+    def _merged(
+        self, patient_id: str, metric: str, start: int, end: int
+    ) -> tuple[list[int], list[float], list[str]]:
+        """
+        Chunked and buffered points in ts order. Points of a single source
+        that do not overlap are concatenated as they are; otherwise each
+        bucket keeps the points of its highest-priority source, once each,
+        as ingest would have.
+        """
+        parts = []
+        if metric in settings.chunked_metrics:
+            parts.extend(chunk_store.series(patient_id, metric).read(start, end))
+        db.ensure_schema(SCHEMA)
+        rows = db.connection().execute(
+            "SELECT source, ts, value FROM samples "
+            "WHERE patient_id = ? AND metric = ? AND ts >= ? AND ts < ? "
+            "ORDER BY source, ts",
+            (patient_id, metric, start, end),
+        )
+        for source, group in groupby(rows, key=lambda row: row[0]):
+            group = list(group)
+            parts.append(
+                (source, [row[1] for row in group], [row[2] for row in group])
+            )
+        parts.sort(key=lambda part: part[1][0])
+
+        timestamps: list[int] = []
+        values: list[float] = []
+        sources: list[str] = []
+        if len({source for source, _, _ in parts}) <= 1 and all(
+            prev[1][-1] < part[1][0] for prev, part in zip(parts, parts[1:])
+        ):
+            for source, ts, vals in parts:
+                timestamps += ts
+                values += vals
+                sources += [source] * len(ts)
+            return timestamps, values, sources
+
+        width = settings.sample_bucket_seconds.get(metric, 1)
+        priorities = settings.source_priority
+        owners: dict[int, tuple[int, str]] = {}
+        for source, ts, _ in parts:
+            priority = priorities.get(source, 0)
+            for t in ts:
+                bucket = t - t % width
+                owner = owners.get(bucket)
+                if owner is None or priority > owner[0]:
+                    owners[bucket] = (priority, source)
+        points: dict[tuple[int, str], float] = {}
+        for source, ts, vals in parts:
+            for t, value in zip(ts, vals):
+                if owners[t - t % width][1] == source:
+                    points.setdefault((t, source), value)
+        for (t, source), value in sorted(points.items()):
+            timestamps.append(t)
+            values.append(value)
+            sources.append(source)
+        return timestamps, values, sources
+
+
+timeseries = TimeSeriesStore()
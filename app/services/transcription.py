@@ -0,0 +1,132 @@
+"""
+Bounded job queue that transcribes voice check-ins with a local backend.
+"""
+
+import asyncio
+import contextlib
+import uuid
+from pathlib import Path
+from typing import Protocol
+from app.config import settings
+
+
+class TranscriptionBackend(Protocol):
+    def transcribe(self, audio_path: Path) -> str: ...
+
+
+class StubBackend:
+    """Placeholder used when no speech model is installed, and in tests."""
+
+    def transcribe(self, audio_path: Path) -> str:
+        size_kb = max(1, audio_path.stat().st_size // 1024)
+        return f"(Voice note, {size_kb} KB) Transcription is not enabled on this server."
+
+
+class FasterWhisperBackend:
+    """Runs a faster-whisper model on the CPU; the package is an optional extra."""
+
+    def __init__(self, model: str = settings.transcription_model):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError(
+                "The faster-whisper backend requires `pip install faster-whisper`."
+            ) from e
+        self._model = WhisperModel(model, device="cpu", compute_type="int8")
+
+    def transcribe(self, audio_path: Path) -> str:
+        segments, _ = self._model.transcribe(str(audio_path))
+        return " ".join(segment.text.strip() for segment in segments)
+
+
+BACKENDS: dict[str, type] = {
+    "stub": StubBackend,
+    "faster-whisper": FasterWhisperBackend,
+}
+
+
+def get_backend(name: str = settings.transcription_backend) -> TranscriptionBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend: {name}")
+    return BACKENDS[name]()
+
+
+class TranscriptionQueue:
+    """
+    At most `maxsize` jobs wait at once; `submit` raises asyncio.QueueFull
+    beyond that so callers can push back on the uploader instead of letting
+    work pile up. Workers run the blocking backend in threads.
+    """
+
+    def __init__(
+        self,
+        backend: TranscriptionBackend | None = None,
+        maxsize: int = settings.transcription_queue_size,
+        workers: int = settings.transcription_workers,
+    ):
+        self._backend = backend
+        self._maxsize = maxsize
+        self._workers = workers
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._jobs: dict[str, asyncio.Future] = {}
+
+    def is_full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    def submit(self, audio_path: Path) -> str:
+        self._ensure_started()
+        job_id = uuid.uuid4().hex[:12]
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((audio_path, future))
+        self._jobs[job_id] = future
+        return job_id
+
+    async def result(self, job_id: str) -> str:
+        try:
+            return await self._jobs[job_id]
+        finally:
+            self._jobs.pop(job_id, None)
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._maxsize)
+        if self._backend is None:
+            self._backend = get_backend()
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self._workers:
+            self._tasks.append(asyncio.create_task(self._work()))
+
+    async def _work(self):
+        while True:
+            audio_path, future = await self._queue.get()
+            try:
+                text = await asyncio.to_thread(self._backend.transcribe, audio_path)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(text)
+            finally:
+                self._queue.task_done()
+
+    def close(self):
+        """Stop the workers and fail every job that has not finished yet."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._queue = None
+        for future in self._jobs.values():
+            if not future.done():
+                future.set_exception(RuntimeError("Transcription queue closed"))
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        try:
+            yield
+        finally:
+            self.close()
+
+
+transcription_queue = TranscriptionQueue()
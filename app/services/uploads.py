@@ -0,0 +1,56 @@
+"""
+Helpers for persisting uploaded files without holding them in memory.
+"""
+
+import hashlib
+import uuid
+from pathlib import Path
+from typing import Protocol
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised by `save_upload` once an upload passes its `max_bytes` limit."""
+
+
+class AsyncReadable(Protocol):
+    async def read(self, size: int = -1) -> bytes: ...
+
+
+def safe_suffix(filename: str | None, allowed: set[str]) -> str:
+    suffix = Path(filename or "").suffix.lower()
+    return suffix if suffix in allowed else ""
+
+
+async def save_upload(
+    file: AsyncReadable,
+    directory: Path,
+    suffix: str = "",
+    max_bytes: int | None = None,
+) -> tuple[Path, str]:
+    """
+    Copy an upload to `directory` chunk by chunk under a random name.
+    Returns the final path and the SHA-256 of the content. Raises
+    UploadTooLarge as soon as more than `max_bytes` have been read, leaving
+    nothing on disk.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    name = uuid.uuid4().hex
+    partial = directory / f".{name}.part"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with partial.open("wb") as out:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+        path = directory / f"{name}{suffix}"
+        partial.rename(path)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return path, digest.hexdigest()
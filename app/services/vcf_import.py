@@ -0,0 +1,434 @@
+"""
+Streaming import of VCF genome files, plain or (b)gzip compressed.
+
+One pass reads the file block by block. The configured rsID panel is found
+with a single regex search per block, and each block contributes one index
+entry mapping its first record's (chrom, pos) to a virtual offset, the
+compressed block offset << 16 | offset within the block as in BGZF/tabix,
+so positions can be looked up later without rescanning. Memory stays
+bounded by the block size whatever the file size.
+"""
+
+import contextlib
+import re
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+from app.config import settings
+from app.models import GenomeVariant
+from app.services import db
+from app.services.wearable_sync import SyncBatch
+
+BGZF = "bgzf"
+GZIP = "gzip"
+PLAIN = "plain"
+
+BGZF_MAGIC = b"\x1f\x8b\x08\x04"
+GZIP_MAGIC = b"\x1f\x8b"
+PLAIN_BLOCK_SIZE = 65536
+# Largest BGZF input that still fits a 64 KiB block when incompressible.
+BGZF_BLOCK_SIZE = 65280
+INDEX_FLUSH_SIZE = 10_000
+PROGRESS_BYTES = 4 << 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS genome_files (
+    file_id TEXT PRIMARY KEY,
+    patient_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    format TEXT NOT NULL,
+    imported_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS genome_files_patient
+    ON genome_files (patient_id, imported_at);
+CREATE TABLE IF NOT EXISTS genome_index (
+    file_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    chrom TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    voffset INTEGER NOT NULL,
+    PRIMARY KEY (file_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS genome_index_locus
+    ON genome_index (file_id, chrom, pos);
+CREATE TABLE IF NOT EXISTS genome_variants (
+    patient_id TEXT NOT NULL,
+    rsid TEXT NOT NULL,
+    gene TEXT NOT NULL,
+    chrom TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    ref TEXT NOT NULL,
+    alt TEXT NOT NULL,
+    genotype TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    PRIMARY KEY (patient_id, rsid)
+) WITHOUT ROWID;
+"""
+
+_GT_SPLIT_RE = re.compile(r"[/|]")
+
+
+def genome_directory(patient_id: str) -> Path:
+    return Path(settings.data_dir) / settings.genome_dir / patient_id
+
+
+def normalize_chrom(chrom: str) -> str:
+    return chrom.removeprefix("chr")
+
+
+def detect_format(path: Path) -> str:
+    with path.open("rb") as f:
+        head = f.read(14)
+    if head[:4] == BGZF_MAGIC and head[12:14] == b"BC":
+        return BGZF
+    if head[:2] == GZIP_MAGIC:
+        return GZIP
+    return PLAIN
+
+
+def bgzf_block(data: bytes) -> bytes:
+    """One BGZF block holding `data`; an empty block marks end of file."""
+    # Level 1: re-blocking runs at import time, where speed matters more
+    # than the few percent of disk a higher level would save.
+    deflate = zlib.compressobj(1, zlib.DEFLATED, -15)
+    payload = deflate.compress(data) + deflate.flush()
+    header = BGZF_MAGIC + b"\0\0\0\0\0\xff\x06\0BC\x02\0"
+    size = len(header) + 2 + len(payload) + 8
+    return (
+        header
+        + struct.pack("<H", size - 1)
+        + payload
+        + struct.pack("<II", zlib.crc32(data), len(data))
+    )
+
+
+def read_blocks(f: BinaryIO, fmt: str) -> Iterator[tuple[int, bytes]]:
+    """
+    (offset, data) for each block from the current position. The offset is
+    where the block starts in the file; plain gzip has no addressable
+    blocks, so its offsets are always 0.
+    """
+    if fmt == BGZF:
+        while True:
+            offset = f.tell()
+            header = f.read(18)
+            if len(header) < 18:
+                return
+            if header[:4] != BGZF_MAGIC or header[12:14] != b"BC":
+                raise ValueError(f"Corrupt BGZF block at byte {offset}")
+            extra = int.from_bytes(header[10:12], "little")
+            size = int.from_bytes(header[16:18], "little") + 1
+            rest = f.read(size - 18)
+            yield offset, zlib.decompress(rest[extra - 6 : -8], -15)
+    elif fmt == GZIP:
+        stream = zlib.decompressobj(wbits=31)
+        while chunk := f.read(BGZF_BLOCK_SIZE):
+            while chunk:
+                data = stream.decompress(chunk, BGZF_BLOCK_SIZE)
+                chunk = stream.unconsumed_tail
+                if stream.eof:
+                    chunk = stream.unused_data
+                    stream = zlib.decompressobj(wbits=31)
+                if data:
+                    yield 0, data
+    else:
+        while True:
+            offset = f.tell()
+            data = f.read(PLAIN_BLOCK_SIZE)
+            if not data:
+                return
+            yield offset, data
+
+
+def iter_lines(path: Path, fmt: str, voffset: int = 0) -> Iterator[bytes]:
+    """Lines (without newline) from the record at `voffset` onwards."""
+    block_offset, skip = voffset >> 16, voffset & 0xFFFF
+    with path.open("rb") as f:
+        if fmt == PLAIN:
+            f.seek(block_offset + skip)
+            skip = 0
+        elif fmt == BGZF:
+            f.seek(block_offset)
+        carry = b""
+        for _, data in read_blocks(f, fmt):
+            if skip:
+                data, skip = data[skip:], 0
+            lines = (carry + data).split(b"\n")
+            carry = lines.pop()
+            yield from lines
+    if carry:
+        yield carry
+
+
+def _locus(line: bytes) -> tuple[str, int] | None:
+    fields = line.split(b"\t", 2)
+    if len(fields) < 3 or not fields[1].isdigit():
+        return None
+    return normalize_chrom(fields[0].decode()), int(fields[1])
+
+
+def parse_call(line: bytes, panel: dict[str, str]) -> GenomeVariant | None:
+    """The panel variant on a VCF data line, genotyped from the first sample."""
+    fields = line.split(b"\t", 10)
+    if len(fields) < 8 or line.startswith(b"#") or not fields[1].isdigit():
+        return None
+    rsid = next((i for i in fields[2].decode().split(";") if i in panel), None)
+    if rsid is None:
+        return None
+    ref = fields[3].decode()
+    alts = fields[4].decode().split(",")
+    genotype = ""
+    if len(fields) > 9:
+        keys = fields[8].decode().split(":")
+        values = fields[9].decode().split(":")
+        if "GT" in keys and keys.index("GT") < len(values):
+            alleles = [ref, *alts]
+            genotype = "/".join(
+                alleles[int(a)] if a.isdigit() and int(a) < len(alleles) else "."
+                for a in _GT_SPLIT_RE.split(values[keys.index("GT")])
+            )
+    return GenomeVariant(
+        rsid=rsid,
+        gene=panel[rsid],
+        chrom=normalize_chrom(fields[0].decode()),
+        pos=int(fields[1]),
+        ref=ref,
+        alt=",".join(alts),
+        genotype=genotype,
+    )
+
+
+def apoe_genotype(variants: Iterable[GenomeVariant]) -> str:
+    """
+    APOE allele pair (e.g. "ε3/ε4") from rs429358 (C marks ε4) and rs7412
+    (T marks ε2); empty unless both sites were genotyped.
+    """
+    calls = {v.rsid: v.genotype.split("/") for v in variants if v.genotype}
+    e4 = calls.get("rs429358", [])
+    e2 = calls.get("rs7412", [])
+    if len(e4) != 2 or len(e2) != 2 or "." in e4 + e2:
+        return ""
+    n4, n2 = e4.count("C"), e2.count("T")
+    if n4 + n2 > 2:
+        return ""
+    return "/".join(["ε2"] * n2 + ["ε3"] * (2 - n2 - n4) + ["ε4"] * n4)
+
+
+class GenomeStore:
+    def add_file(self, file_id: str, patient_id: str, path: Path, fmt: str):
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO genome_files VALUES (?, ?, ?, ?, ?)",
+                (file_id, patient_id, str(path), fmt, int(time.time())),
+            )
+
+    def add_index(self, file_id: str, entries: list[tuple[int, str, int, int]]):
+        """Append (seq, chrom, pos, voffset) entries for a file."""
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO genome_index VALUES (?, ?, ?, ?, ?)",
+                ((file_id, *entry) for entry in entries),
+            )
+
+    def save_variants(
+        self, patient_id: str, file_id: str, variants: Iterable[GenomeVariant]
+    ):
+        """Replace the patient's panel results with those from `file_id`."""
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM genome_variants WHERE patient_id = ?", (patient_id,)
+            )
+            conn.executemany(
+                "INSERT INTO genome_variants VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        patient_id,
+                        v.rsid,
+                        v.gene,
+                        v.chrom,
+                        v.pos,
+                        v.ref,
+                        v.alt,
+                        v.genotype,
+                        file_id,
+                    )
+                    for v in variants
+                ),
+            )
+
+    def remove_file(self, file_id: str):
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.execute("DELETE FROM genome_index WHERE file_id = ?", (file_id,))
+            conn.execute("DELETE FROM genome_files WHERE file_id = ?", (file_id,))
+
+    def variants(self, patient_id: str) -> list[GenomeVariant]:
+        db.ensure_schema(SCHEMA)
+        rows = db.connection().execute(
+            "SELECT rsid, gene, chrom, pos, ref, alt, genotype "
+            "FROM genome_variants WHERE patient_id = ? ORDER BY gene, rsid",
+            (patient_id,),
+        )
+        return [
+            GenomeVariant(
+                rsid=rsid,
+                gene=gene,
+                chrom=chrom,
+                pos=pos,
+                ref=ref,
+                alt=alt,
+                genotype=genotype,
+            )
+            for rsid, gene, chrom, pos, ref, alt, genotype in rows
+        ]
+
+    def lookup(self, patient_id: str, chrom: str, pos: int) -> list[bytes]:
+        """
+        Records at `chrom:pos` in the patient's latest genome file. Reading
+        starts at the last indexed block beginning before `pos`, or the block
+        before the chromosome's first indexed one.
+        """
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        latest = conn.execute(
+            "SELECT file_id, path, format FROM genome_files WHERE patient_id = ? "
+            "ORDER BY imported_at DESC LIMIT 1",
+            (patient_id,),
+        ).fetchone()
+        if latest is None:
+            return []
+        file_id, path, fmt = latest
+        chrom = normalize_chrom(chrom)
+        row = conn.execute(
+            "SELECT voffset FROM genome_index WHERE file_id = ? AND chrom = ? "
+            "AND pos < ? ORDER BY pos DESC, seq DESC LIMIT 1",
+            (file_id, chrom, pos),
+        ).fetchone()
+        if row is None:
+            row = conn.execute(
+                "SELECT voffset FROM genome_index WHERE file_id = ? AND seq < "
+                "(SELECT MIN(seq) FROM genome_index WHERE file_id = ? AND chrom = ?) "
+                "ORDER BY seq DESC LIMIT 1",
+                (file_id, file_id, chrom),
+            ).fetchone()
+        matches = []
+        seen = False
+        for line in iter_lines(Path(path), fmt, row[0] if row else 0):
+            locus = _locus(line) if not line.startswith(b"#") else None
+            if locus is None:
+                continue
+            if locus[0] != chrom:
+                if seen:
+                    break
+                continue
+            seen = True
+            if locus[1] > pos:
+                break
+            if locus[1] == pos:
+                matches.append(line)
+        return matches
+
+
+genome_store = GenomeStore()
+
+
+def read_vcf(
+    path: Path,
+    patient_id: str,
+    source_id: str,
+    panel: dict[str, str] = settings.genome_panel,
+    store: GenomeStore = genome_store,
+) -> Iterator[SyncBatch]:
+    """
+    Scan a VCF for the panel and index it, reporting progress in bytes of
+    the uploaded file. Plain gzip is re-blocked into a BGZF copy on the way
+    through, which replaces the upload, so every stored genome is indexed.
+    Batches carry no samples; the panel calls replace the patient's previous
+    results, and the file becomes the one used for lookups, only once the
+    scan completes; a failed import deletes the file.
+    """
+    fmt = detect_format(path)
+    file_id = path.name.split(".")[0]
+    stored, stored_fmt = path, fmt
+    if fmt == GZIP:
+        stored, stored_fmt = path.with_name(f"{file_id}.vcf.bgz"), BGZF
+    # No lookbehind, so the shared "rs" prefix drives a fast literal search;
+    # parse_call checks the candidate really is in the ID column.
+    pattern = re.compile(
+        rb"(?:" + b"|".join(re.escape(rsid.encode()) for rsid in panel) + rb")[\t;]"
+    )
+    total = path.stat().st_size
+    calls: dict[str, GenomeVariant] = {}
+    entries: list[tuple[int, str, int, int]] = []
+    seq = 0
+    reported = 0
+    try:
+        with path.open("rb") as f, contextlib.ExitStack() as stack:
+            out = stack.enter_context(stored.open("wb")) if stored != path else None
+            carry = b""
+            for offset, data in read_blocks(f, fmt):
+                if out is not None:
+                    offset = out.tell()
+                    out.write(bgzf_block(data))
+                # First line starting in this block; 0 with a carry means the
+                # block is all one continued line.
+                start = data.find(b"\n") + 1 if carry else 0
+                end = data.find(b"\n", start)
+                if (start or not carry) and end > start:
+                    line = data[start:end]
+                    locus = None if line.startswith(b"#") else _locus(line)
+                    if locus is not None:
+                        entries.append((seq, *locus, offset << 16 | start))
+                        seq += 1
+                if len(entries) >= INDEX_FLUSH_SIZE:
+                    store.add_index(file_id, entries)
+                    entries = []
+                buffer = carry + data
+                complete = buffer.rfind(b"\n") + 1
+                for match in pattern.finditer(buffer, 0, complete):
+                    line_start = buffer.rfind(b"\n", 0, match.start()) + 1
+                    line_end = buffer.find(b"\n", match.end())
+                    call = parse_call(buffer[line_start:line_end], panel)
+                    if call is not None:
+                        calls.setdefault(call.rsid, call)
+                carry = buffer[complete:]
+                done = f.tell()
+                if done - reported >= PROGRESS_BYTES:
+                    reported = done
+                    yield SyncBatch([], done, total)
+            if carry:
+                call = parse_call(carry, panel)
+                if call is not None:
+                    calls.setdefault(call.rsid, call)
+            if out is not None:
+                out.write(bgzf_block(b""))
+        store.add_index(file_id, entries)
+        store.add_file(file_id, patient_id, stored, stored_fmt)
+    except BaseException:
+        store.remove_file(file_id)
+        stored.unlink(missing_ok=True)
+        path.unlink(missing_ok=True)
+        raise
+    if stored != path:
+        path.unlink(missing_ok=True)
+    store.save_variants(patient_id, file_id, calls.values())
+    yield SyncBatch([], total, total)
+
+
+def read_genome_source(
+    patient_id: str, source_id: str, since: int = 0
+) -> Iterator[SyncBatch]:
+    """
+    Reader for the genome source. Genomes only arrive as uploads, imported
+    by `read_vcf`, so a scheduled sync has nothing to read.
+    """
+    yield from ()
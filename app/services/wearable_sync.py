@@ -0,0 +1,348 @@
+"""
+Sync pipeline for connected data sources: streams records from the source's
+local import directory (or a simulated device when there is none), parses
+them in worker threads and bulk-inserts them into the time-series store.
+"""
+
+import asyncio
+import contextlib
+import csv
+import datetime
+import json
+import math
+import random
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Iterator, NamedTuple
+from app.config import settings
+from app.enums import DataSourceType, SampleMetric
+from app.services.source_registry import SourceRegistry, source_registry
+from app.services.timeseries import (
+    Sample,
+    TimeSeriesStore,
+    epoch_seconds,
+    timeseries,
+)
+
+SUPPORTED_SUFFIXES = (".jsonl", ".csv")
+METRICS = frozenset(str(m) for m in SampleMetric)
+
+
+class SyncProgress(NamedTuple):
+    records: int
+    inserted: int
+    done: int
+    total: int
+    latest_ts: int = 0
+
+    @property
+    def percent(self) -> int:
+        return min(100, self.done * 100 // self.total) if self.total else 100
+
+
+class SyncBatch(NamedTuple):
+    samples: list[Sample]
+    done: int
+    total: int
+
+
+class SyncInProgress(Exception):
+    pass
+
+
+class ProgressThrottle:
+    """Lets at most one update through per `interval` seconds."""
+
+    def __init__(
+        self,
+        interval: float = settings.sync_progress_interval,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._interval = interval
+        self._clock = clock
+        self._last = -math.inf
+
+    def ready(self) -> bool:
+        now = self._clock()
+        if now - self._last < self._interval:
+            return False
+        self._last = now
+        return True
+
+
+def import_directory(patient_id: str, source_id: str) -> Path:
+    return Path(settings.data_dir) / settings.import_dir / patient_id / source_id
+
+
+def parse_timestamp(raw: str, scale: int = 1) -> int:
+    """
+    Epoch seconds, or 1/`scale` seconds, from epoch seconds or ISO 8601;
+    naive times are UTC.
+    """
+    try:
+        seconds = float(raw)
+    except ValueError:
+        parsed = datetime.datetime.fromisoformat(raw)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        seconds = parsed.timestamp()
+    return round(seconds * scale) if scale != 1 else int(seconds)
+
+
+def parse_record(fields: dict, patient_id: str, source_id: str) -> Sample | None:
+    metric = str(fields.get("metric", "")).strip().lower()
+    if metric not in METRICS:
+        return None
+    try:
+        return Sample(
+            patient_id,
+            metric,
+            parse_timestamp(
+                str(fields["timestamp"]).strip(),
+                1000 if metric in settings.millisecond_metrics else 1,
+            ),
+            float(fields["value"]),
+            source_id,
+        )
+    except (KeyError, ValueError):
+        return None
+
+
+def read_import_files(
+    directory: Path,
+    patient_id: str,
+    source_id: str,
+    since: int = 0,
+    batch_size: int = settings.sync_batch_size,
+) -> Iterator[SyncBatch]:
+    """
+    Batches of samples newer than `since` from every `.jsonl` / `.csv` file in
+    `directory`, with progress measured in bytes read. Lines are read one at a
+    time, so memory stays bounded by the batch size. Unparseable lines are
+    skipped.
+    """
+    files = sorted(
+        path
+        for path in directory.iterdir()
+        if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES
+    )
+    total = sum(path.stat().st_size for path in files)
+    done = 0
+    batch: list[Sample] = []
+    for path in files:
+        with path.open("rb") as handle:
+            header = None
+            for raw in handle:
+                done += len(raw)
+                line = raw.decode("utf-8", errors="replace").strip()
+                if not line:
+                    continue
+                if path.suffix.lower() == ".csv":
+                    row = next(csv.reader([line]))
+                    if header is None:
+                        header = [name.strip().lower() for name in row]
+                        continue
+                    fields = dict(zip(header, row))
+                else:
+                    try:
+                        fields = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                sample = parse_record(fields, patient_id, source_id)
+                if (
+                    sample is not None
+                    and epoch_seconds(sample.metric, sample.ts) > since
+                ):
+                    batch.append(sample)
+                if len(batch) >= batch_size:
+                    yield SyncBatch(batch, done, total)
+                    batch = []
+    yield SyncBatch(batch, done, total)
+
+
+def simulated_device(
+    patient_id: str,
+    source_id: str,
+    since: int = 0,
+    days: int = 7,
+    batch_size: int = settings.sync_batch_size,
+) -> Iterator[SyncBatch]:
+    """
+    Stand-in for a device API when a source has no import directory:
+    minute-level heart rate plus hourly HRV and steps after `since`, going
+    back at most `days` days. Nights from 22:00 also get 30-second sleep
+    stage epochs and a 5-minute beat-to-beat RR recording every half hour.
+    """
+    rng = random.Random(f"{patient_id}:{source_id}:{since}")
+    end = int(time.time()) // 60 * 60
+    start = max(end - days * 86400, since // 60 * 60 + 60)
+    total = max(0, (end - start) // 60)
+    batch: list[Sample] = []
+    for i, ts in enumerate(range(start, end, 60)):
+        hour = ts // 3600 % 24
+        awake = 7 <= hour <= 21
+        heart_rate = (72 if awake else 58) + rng.gauss(0, 4)
+        batch.append(Sample(patient_id, SampleMetric.HEART_RATE, ts, heart_rate, source_id))
+        if ts % 3600 == 0:
+            steps = max(0.0, rng.gauss(400, 300)) if awake else 0.0
+            hrv = rng.gauss(55, 8)
+            batch.append(Sample(patient_id, SampleMetric.HRV, ts, hrv, source_id))
+            batch.append(Sample(patient_id, SampleMetric.STEPS, ts, steps, source_id))
+        if not awake:
+            batch.extend(_simulated_night_minute(rng, patient_id, source_id, ts))
+        if len(batch) >= batch_size:
+            yield SyncBatch(batch, i + 1, total)
+            batch = []
+    yield SyncBatch(batch, total, total)
+
+
+def _simulated_night_minute(
+    rng: random.Random, patient_id: str, source_id: str, ts: int
+) -> list[Sample]:
+    # Stage codes as in `daily_summary.SLEEP_STAGES`: 0 awake, 1 light,
+    # 2 deep, 3 REM, in 90-minute cycles whose deep sleep shortens overnight.
+    asleep_for = (ts - 22 * 3600) % 86400 // 60
+    cycle = asleep_for % 90
+    deep_end = max(15, 45 - 10 * (asleep_for // 90))
+    stage = 1 if cycle < 10 else 2 if cycle < deep_end else 1 if cycle < 70 else 3
+    samples = [
+        Sample(
+            patient_id,
+            SampleMetric.SLEEP_STAGE,
+            ts + offset,
+            0 if rng.random() < 0.04 else stage,
+            source_id,
+        )
+        for offset in (0, 30)
+    ]
+    if ts // 60 % 30 == 0:
+        beat = ts * 1000
+        while beat < (ts + 300) * 1000:
+            rr = round(1000 + 40 * math.sin(beat / 4000) + rng.gauss(0, 25))
+            beat += rr
+            samples.append(
+                Sample(patient_id, SampleMetric.RR_INTERVAL, beat, rr, source_id)
+            )
+    return samples
+
+
+SourceReader = Callable[[str, str, int], Iterator[SyncBatch]]
+
+
+def default_reader(patient_id: str, source_id: str, since: int) -> Iterator[SyncBatch]:
+    directory = import_directory(patient_id, source_id)
+    if directory.is_dir():
+        return read_import_files(directory, patient_id, source_id, since)
+    return simulated_device(patient_id, source_id, since)
+
+
+class WearableSync:
+    """
+    Runs one sync per (patient, source) at a time. Each batch is parsed and
+    written in a worker thread so a large sync never blocks the event loop,
+    and progress callbacks are throttled so the UI gets a few updates per
+    second however fast batches complete. Each source's feed is read from
+    its persisted cursor, which advances to the newest synced sample when a
+    sync completes.
+    """
+
+    def __init__(
+        self,
+        store: TimeSeriesStore = timeseries,
+        registry: SourceRegistry = source_registry,
+    ):
+        self._store = store
+        self._registry = registry
+        self._readers: dict[str, SourceReader] = {}
+        self._running: set[tuple[str, str]] = set()
+
+    def register_reader(
+        self, source_type: DataSourceType, reader: SourceReader, source_id: str = ""
+    ):
+        """
+        Read sources of `source_type` with `reader` instead of the default,
+        or only the source `source_id` when given.
+        """
+        self._readers[source_id or str(source_type)] = reader
+
+    def is_running(self, patient_id: str, source_id: str) -> bool:
+        return (patient_id, source_id) in self._running
+
+    async def run(
+        self,
+        patient_id: str,
+        source_id: str,
+        on_progress: Callable[[SyncProgress], Awaitable[None]],
+        source_type: DataSourceType | str = DataSourceType.WEARABLE,
+        batches: Iterator[SyncBatch] | None = None,
+    ) -> SyncProgress:
+        """
+        Store every batch from `batches`, by default the source's own feed
+        after its cursor.
+        """
+        key = (patient_id, source_id)
+        if key in self._running:
+            raise SyncInProgress(f"{source_id} is already syncing")
+        self._running.add(key)
+        try:
+            await asyncio.to_thread(
+                self._registry.connect, patient_id, source_id, source_type
+            )
+            if batches is None:
+                since = await asyncio.to_thread(
+                    self._registry.cursor, patient_id, source_id
+                )
+                reader = self._readers.get(
+                    source_id, self._readers.get(str(source_type), default_reader)
+                )
+                batches = reader(patient_id, source_id, since)
+            progress = await self._consume(batches, on_progress)
+        except Exception:
+            await asyncio.to_thread(self._registry.record_failure, patient_id, source_id)
+            raise
+        finally:
+            self._running.discard(key)
+        await asyncio.to_thread(
+            self._registry.record_success, patient_id, source_id, progress.latest_ts
+        )
+        return progress
+
+    async def _consume(
+        self,
+        batches: Iterator[SyncBatch],
+        on_progress: Callable[[SyncProgress], Awaitable[None]],
+    ) -> SyncProgress:
+        throttle = ProgressThrottle()
+        progress = SyncProgress(0, 0, 0, 0)
+        try:
+            while True:
+                step = await asyncio.to_thread(self._step, batches)
+                if step is None:
+                    return progress
+                batch, inserted = step
+                progress = SyncProgress(
+                    progress.records + len(batch.samples),
+                    progress.inserted + inserted,
+                    batch.done,
+                    batch.total,
+                    max(
+                        [
+                            progress.latest_ts,
+                            *(epoch_seconds(s.metric, s.ts) for s in batch.samples),
+                        ]
+                    ),
+                )
+                if throttle.ready():
+                    await on_progress(progress)
+        finally:
+            with contextlib.suppress(ValueError):
+                batches.close()
+
+    def _step(self, batches: Iterator[SyncBatch]) -> tuple[SyncBatch, int] | None:
+        batch = next(batches, None)
+        if batch is None:
+            return None
+        return batch, self._store.insert_many(batch.samples)
+
+
+wearable_sync = WearableSync()
@@ -0,0 +1,309 @@
+"""
+Ingestion of vendor webhook deliveries. Requests are acknowledged as soon as
+they are queued; workers parse and store them off the event loop.
+Redeliveries are dropped by idempotency key. A vendor never retries a
+delivery that was acknowledged, so one that fails to store is kept in
+`webhook_retries` and stored again later instead of being dropped; after
+`settings.webhook_max_attempts` tries it is moved to `webhook_failed`.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import hmac
+import json
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple
+from app.config import settings
+from app.services import db
+from app.services.timeseries import Sample, TimeSeriesStore, timeseries
+from app.services.wearable_sync import parse_record
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_retries (
+    key TEXT PRIMARY KEY,
+    source_id TEXT NOT NULL,
+    body BLOB NOT NULL,
+    attempts INTEGER NOT NULL,
+    next_attempt_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS webhook_retries_due
+    ON webhook_retries (next_attempt_at);
+CREATE TABLE IF NOT EXISTS webhook_failed (
+    key TEXT PRIMARY KEY,
+    source_id TEXT NOT NULL,
+    body BLOB NOT NULL,
+    attempts INTEGER NOT NULL,
+    failed_at REAL NOT NULL
+);
+"""
+
+
+class Delivery(NamedTuple):
+    source_id: str
+    key: str
+    body: bytes
+
+
+def delivery_key(source_id: str, idempotency_key: str, body: bytes) -> str:
+    """
+    The vendor's idempotency key, or a hash of the body when there is none,
+    scoped to the source so vendors cannot collide.
+    """
+    return f"{source_id}:{idempotency_key or hashlib.sha256(body).hexdigest()}"
+
+
+def verify_signature(body: bytes, signature: str, secret: str) -> bool:
+    """HMAC-SHA256 of the raw body, hex encoded, optionally `sha256=` prefixed."""
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature.removeprefix("sha256="), expected)
+
+
+def parse_delivery(delivery: Delivery) -> list[Sample]:
+    """
+    Samples from a `{"patient_id": ..., "records": [{"metric", "timestamp",
+    "value"}, ...]}` body; malformed bodies and records are skipped.
+    """
+    try:
+        payload = json.loads(delivery.body)
+        patient_id = str(payload["patient_id"])
+        records = payload["records"]
+    except (ValueError, KeyError, TypeError):
+        return []
+    if not isinstance(records, list):
+        return []
+    samples = []
+    for fields in records:
+        if isinstance(fields, dict):
+            sample = parse_record(fields, patient_id, delivery.source_id)
+            if sample is not None:
+                samples.append(sample)
+    return samples
+
+
+class IdempotencyStore:
+    """
+    Keys seen in the last `ttl` seconds. Every key lives for the same time,
+    so insertion order is expiry order and expired keys are popped from the
+    front; past `max_keys` the oldest keys go first.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.webhook_idempotency_ttl,
+        max_keys: int = settings.webhook_idempotency_max_keys,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._ttl = ttl
+        self._max_keys = max_keys
+        self._clock = clock
+        self._expiry: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def claim(self, key: str) -> bool:
+        """Record `key`; False when it was already seen and has not expired."""
+        now = self._clock()
+        expiry = self._expiry
+        while expiry:
+            oldest, expires = next(iter(expiry.items()))
+            if expires > now:
+                break
+            del expiry[oldest]
+        if key in expiry:
+            return False
+        if len(expiry) >= self._max_keys:
+            expiry.popitem(last=False)
+        expiry[key] = now + self._ttl
+        return True
+
+    def release(self, key: str):
+        """Forget `key` so a redelivery is accepted, e.g. after a failed write."""
+        self._expiry.pop(key, None)
+
+
+class WebhookQueue:
+    """
+    At most `maxsize` deliveries wait at once; `submit` raises
+    asyncio.QueueFull beyond that so the endpoint can answer 429 and the
+    vendor retries later. Each worker drains up to `batch_size` deliveries
+    and stores them in a thread, each in its own transaction so one bad
+    delivery fails alone. Failed deliveries are retried with exponential
+    backoff from `retry_interval`; one still failing after `max_attempts`
+    tries in all is moved to the `webhook_failed` dead-letter table.
+    """
+
+    def __init__(
+        self,
+        store: TimeSeriesStore = timeseries,
+        maxsize: int = settings.webhook_queue_size,
+        workers: int = settings.webhook_workers,
+        batch_size: int = settings.webhook_batch_size,
+        retry_interval: float = settings.webhook_retry_interval,
+        max_attempts: int = settings.webhook_max_attempts,
+    ):
+        self._store = store
+        self._maxsize = maxsize
+        self._workers = workers
+        self._batch_size = batch_size
+        self._retry_interval = retry_interval
+        self._max_attempts = max_attempts
+        self._queue: asyncio.Queue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._retry_task: asyncio.Task | None = None
+        self.idempotency = IdempotencyStore()
+
+    def accept(self, delivery: Delivery) -> bool:
+        """
+        Queue a delivery; False for a duplicate. Raises asyncio.QueueFull
+        when the backlog is full, leaving the key unclaimed.
+        """
+        self._ensure_started()
+        if not self.idempotency.claim(delivery.key):
+            return False
+        try:
+            self._queue.put_nowait(delivery)
+        except asyncio.QueueFull:
+            self.idempotency.release(delivery.key)
+            raise
+        return True
+
+    async def join(self):
+        if self._queue is not None:
+            await self._queue.join()
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._maxsize)
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self._workers:
+            self._tasks.append(asyncio.create_task(self._work()))
+
+    async def _work(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self._batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            failed = batch
+            try:
+                failed = await asyncio.to_thread(self._store_batch, batch)
+                if failed:
+                    await asyncio.to_thread(self._defer, failed)
+            except Exception:
+                # Not even kept for a retry; let the vendor's redelivery in.
+                for delivery in failed:
+                    self.idempotency.release(delivery.key)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _store_delivery(self, delivery: Delivery) -> int:
+        samples = parse_delivery(delivery)
+        samples.sort(key=lambda s: s.patient_id)
+        return self._store.insert_many(samples)
+
+    def _store_batch(self, batch: list[Delivery]) -> list[Delivery]:
+        """Store each delivery; returns the ones that failed."""
+        failed = []
+        for delivery in batch:
+            try:
+                self._store_delivery(delivery)
+            except Exception:
+                failed.append(delivery)
+        return failed
+
+    def _backoff(self, attempts: int) -> float:
+        return time.time() + self._retry_interval * 2 ** min(attempts - 1, 10)
+
+    def _defer(self, deliveries: list[Delivery]):
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO webhook_retries VALUES (?, ?, ?, 1, ?)",
+                (
+                    (d.key, d.source_id, d.body, self._backoff(1))
+                    for d in deliveries
+                ),
+            )
+
+    def retry_due(self, now: float | None = None) -> int:
+        """
+        Store the failed deliveries whose retry is due, up to `batch_size`;
+        those failing again back off further, or are dead-lettered once they
+        reach `max_attempts`. Returns the number stored.
+        """
+        db.ensure_schema(SCHEMA)
+        conn = db.connection()
+        rows = conn.execute(
+            "SELECT key, source_id, body, attempts FROM webhook_retries "
+            "WHERE next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+            (time.time() if now is None else now, self._batch_size),
+        ).fetchall()
+        stored = 0
+        for key, source_id, body, attempts in rows:
+            try:
+                self._store_delivery(Delivery(source_id, key, body))
+            except Exception:
+                with conn:
+                    if attempts + 1 >= self._max_attempts:
+                        conn.execute(
+                            "INSERT OR REPLACE INTO webhook_failed "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (key, source_id, body, attempts + 1, time.time()),
+                        )
+                        conn.execute(
+                            "DELETE FROM webhook_retries WHERE key = ?", (key,)
+                        )
+                    else:
+                        conn.execute(
+                            "UPDATE webhook_retries SET attempts = ?, "
+                            "next_attempt_at = ? WHERE key = ?",
+                            (attempts + 1, self._backoff(attempts + 1), key),
+                        )
+                continue
+            with conn:
+                conn.execute("DELETE FROM webhook_retries WHERE key = ?", (key,))
+            stored += 1
+        return stored
+
+    def pending_retries(self) -> int:
+        db.ensure_schema(SCHEMA)
+        (count,) = db.connection().execute(
+            "SELECT COUNT(*) FROM webhook_retries"
+        ).fetchone()
+        return count
+
+    def failed_deliveries(self) -> int:
+        db.ensure_schema(SCHEMA)
+        (count,) = db.connection().execute(
+            "SELECT COUNT(*) FROM webhook_failed"
+        ).fetchone()
+        return count
+
+    async def run_retries(self):
+        while True:
+            await asyncio.sleep(self._retry_interval)
+            with contextlib.suppress(Exception):
+                await asyncio.to_thread(self.retry_due)
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self._retry_task is not None:
+            self._retry_task.cancel()
+            self._retry_task = None
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self):
+        self._retry_task = asyncio.create_task(self.run_retries())
+        try:
+            yield
+        finally:
+            self.close()
+
+
+webhook_queue = WebhookQueue()
@@ -1,5 +1,7 @@
 import reflex as rx
+from app.states.condition_state import ConditionState
 from app.states.global_state import GlobalState
+from app.states.symptom_state import SymptomState
 
 
 class AuthState(rx.State):
@@ -27,7 +29,11 @@ class AuthState(rx.State):
                 self.error_message = ""
                 state = await self.get_state(GlobalState)
                 state.set_role_patient()
-                return rx.redirect("/")
+                return [
+                    rx.redirect("/"),
+                    SymptomState.index_notes,
+                    ConditionState.index_notes,
+                ]
             else:
                 self.error_message = "Invalid Patient credentials."
         elif self.login_mode == "admin":
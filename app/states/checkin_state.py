@@ -1,65 +1,218 @@
 import reflex as rx
+from app.config import settings
 from app.schemas.checkin import CheckIn
 from app.enums import CheckInType
+from app.states.global_state import GlobalState
+from app.services.checkin_store import checkin_feed
+from app.services.sentiment import sentiment_batcher
+from app.services.transcription import transcription_queue
+from app.services.uploads import UploadTooLarge, safe_suffix, save_upload
+import asyncio
 import datetime
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
+VOICE_UPLOAD_ID = "voice_upload"
+VOICE_SUFFIXES = {".webm", ".ogg", ".mp3", ".m4a", ".wav"}
+TRANSCRIBING_PLACEHOLDER = "Transcribing voice note..."
+
+DEFAULT_CHECKINS: list[CheckIn] = [
+    CheckIn(
+        id="chk1",
+        type=CheckInType.VOICE,
+        content="Feeling much better today after the new protocol. Sleep was solid.",
+        timestamp="Today, 9:00 AM",
+        sentiment_score=0.8,
+    ),
+    CheckIn(
+        id="chk2",
+        type=CheckInType.TEXT,
+        content="Noticed some mild nausea after taking supplements.",
+        timestamp="Yesterday, 8:30 PM",
+        sentiment_score=-0.2,
+    ),
+]
+
 
 class CheckInState(rx.State):
-    checkins: list[CheckIn] = [
-        CheckIn(
-            id="chk1",
-            type=CheckInType.VOICE,
-            content="Feeling much better today after the new protocol. Sleep was solid.",
-            timestamp="Today, 9:00 AM",
-            sentiment_score=0.8,
-        ),
-        CheckIn(
-            id="chk2",
-            type=CheckInType.TEXT,
-            content="Noticed some mild nausea after taking supplements.",
-            timestamp="Yesterday, 8:30 PM",
-            sentiment_score=-0.2,
-        ),
-    ]
-    is_voice_recording: bool = False
+    checkins: list[CheckIn] = []
+    history: list[CheckIn] = []
+    history_cursor: int = 0
+    history_page: int = 0
+    pending_transcriptions: int = 0
     new_note_content: str = ""
+    _page_cursors: list[int] = []
+
+    @rx.event
+    async def load_feed(self):
+        """
+        Load the bounded recent feed; older entries stay in storage until the
+        patient pages back through them.
+        """
+        patient_id = (await self.get_state(GlobalState)).patient_id
+        if not patient_id:
+            return
+        checkin_feed.seed(patient_id, DEFAULT_CHECKINS)
+        self.checkins = checkin_feed.recent(patient_id)
+        self._reset_history()
+
+    def _feed_tail_seq(self) -> int:
+        if len(self.checkins) < checkin_feed.feed_size:
+            return 0
+        return self.checkins[-1].seq
+
+    def _reset_history(self):
+        """Show only the feed, with paging starting again right after it."""
+        self.history = []
+        self.history_cursor = self._feed_tail_seq()
+        self.history_page = 0
+        self._page_cursors = []
+
+    async def _show_page(self, cursor: int):
+        patient_id = (await self.get_state(GlobalState)).patient_id
+        self.history, self.history_cursor = checkin_feed.history(patient_id, cursor)
+        self.history_page = len(self._page_cursors)
+
+    @rx.event
+    async def load_older(self):
+        """
+        Replace the shown history page with the next older one. Only one page
+        is held on the client, so every event sends at most a page of entries
+        however far back the patient goes.
+        """
+        if not self.history_cursor:
+            return
+        self._page_cursors.append(self.history_cursor)
+        await self._show_page(self.history_cursor)
 
     @rx.event
-    def toggle_voice_recording(self):
-        self.is_voice_recording = not self.is_voice_recording
-        if self.is_voice_recording:
-            return rx.toast("Listening... (Simulated)")
-        else:
-            self.checkins.insert(
-                0,
-                CheckIn(
-                    id=str(uuid.uuid4())[:8],
-                    type=CheckInType.VOICE,
-                    content="(Voice Transcript) I'm feeling energetic today.",
-                    timestamp="Just now",
-                    sentiment_score=0.9,
-                ),
+    async def load_newer(self):
+        if not self._page_cursors:
+            return
+        self._page_cursors.pop()
+        if not self._page_cursors:
+            self._reset_history()
+            return
+        await self._show_page(self._page_cursors[-1])
+
+    @rx.event(background=True)
+    async def score_checkin(self, checkin_id: str, content: str):
+        """
+        Score a saved note off the event loop and patch the feed when done.
+        A scoring failure is logged and leaves the note unscored.
+        """
+        try:
+            score = await sentiment_batcher.score(content)
+        except Exception:
+            logger.exception("Could not score check-in %s", checkin_id)
+            return
+        async with self:
+            patient_id = (await self.get_state(GlobalState)).patient_id
+        await asyncio.to_thread(
+            checkin_feed.update, patient_id, checkin_id, sentiment_score=score
+        )
+        async with self:
+            self._patch_checkin(checkin_id, sentiment_score=score)
+
+    async def _record(self, checkin: CheckIn) -> CheckIn | None:
+        """
+        Store `checkin` at the top of the feed. The entry it pushes out of the
+        feed is not moved into the shown history page; paging restarts after
+        the new feed tail and "Load older" fetches it from storage again.
+        """
+        patient_id = (await self.get_state(GlobalState)).patient_id
+        if not patient_id:
+            return None
+        stored = checkin_feed.append(patient_id, checkin)
+        self.checkins = [stored, *self.checkins[: checkin_feed.feed_size - 1]]
+        self._reset_history()
+        return stored
+
+    def _patch_checkin(self, checkin_id: str, **fields):
+        self.checkins = [
+            c.model_copy(update=fields) if c.id == checkin_id else c
+            for c in self.checkins
+        ]
+
+    @rx.event
+    async def upload_voice_note(self, files: list[rx.UploadFile]):
+        """
+        Save a recorded voice note to disk and queue it for transcription;
+        the check-in shows a placeholder until the transcript arrives.
+        """
+        if not files or not (await self.get_state(GlobalState)).patient_id:
+            return
+        if transcription_queue.is_full():
+            return rx.toast("Transcription is busy. Please try again in a moment.")
+        file = files[0]
+        try:
+            path, _ = await save_upload(
+                file,
+                rx.get_upload_dir() / "voice",
+                safe_suffix(file.name, VOICE_SUFFIXES),
+                max_bytes=settings.voice_upload_max_bytes,
             )
-            return rx.toast("Voice log saved.")
+        except UploadTooLarge:
+            return rx.toast("That recording is too large.")
+        try:
+            job_id = transcription_queue.submit(path)
+        except asyncio.QueueFull:
+            path.unlink(missing_ok=True)
+            return rx.toast("Transcription is busy. Please try again in a moment.")
+        stored = await self._record(
+            CheckIn(
+                id=str(uuid.uuid4())[:8],
+                type=CheckInType.VOICE,
+                content=TRANSCRIBING_PLACEHOLDER,
+                timestamp=datetime.datetime.now().strftime("%b %d, %I:%M %p"),
+                audio_url=f"voice/{path.name}",
+            )
+        )
+        self.pending_transcriptions += 1
+        return [
+            rx.clear_selected_files(VOICE_UPLOAD_ID),
+            rx.toast("Voice log saved. Transcribing..."),
+            CheckInState.finish_transcription(stored.id, job_id),
+        ]
+
+    @rx.event(background=True)
+    async def finish_transcription(self, checkin_id: str, job_id: str):
+        try:
+            content = await transcription_queue.result(job_id)
+        except Exception:
+            content = "(Voice note) Transcription failed; the recording is still available."
+        async with self:
+            patient_id = (await self.get_state(GlobalState)).patient_id
+        await asyncio.to_thread(
+            checkin_feed.update, patient_id, checkin_id, content=content
+        )
+        async with self:
+            self._patch_checkin(checkin_id, content=content)
+            self.pending_transcriptions = max(0, self.pending_transcriptions - 1)
+        return CheckInState.score_checkin(checkin_id, content)
 
     @rx.event
     def set_new_note_content(self, content: str):
         self.new_note_content = content
 
     @rx.event
-    def save_text_note(self):
+    async def save_text_note(self):
         if not self.new_note_content.strip():
             return rx.toast("Note cannot be empty.")
-        self.checkins.insert(
-            0,
+        stored = await self._record(
             CheckIn(
                 id=str(uuid.uuid4())[:8],
                 type=CheckInType.TEXT,
                 content=self.new_note_content,
-                timestamp="Just now",
-                sentiment_score=0.5,
-            ),
+                timestamp=datetime.datetime.now().strftime("%b %d, %I:%M %p"),
+            )
         )
+        if stored is None:
+            return
         self.new_note_content = ""
-        return rx.toast("Text log saved.")
\ No newline at end of file
+        return [
+            rx.toast("Text log saved."),
+            CheckInState.score_checkin(stored.id, stored.content),
+        ]
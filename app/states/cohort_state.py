@@ -1,7 +1,11 @@
 import reflex as rx
 from typing import Optional
-from app.models import CohortPatient
+from app.config import settings
+from app.models import CohortPatient, NoteHit
 from app.enums import PatientStatus
+from app.services.epigenetic_clock import epigenetic_ages, run_clock_directory
+from app.services.notes_index import notes_index
+import asyncio
 import random
 
 
@@ -14,6 +18,10 @@ class CohortState(rx.State):
     status_filter: str = "All"
     selected_patient: Optional[CohortPatient] = None
     is_detail_open: bool = False
+    note_query: str = ""
+    note_hits: list[NoteHit] = []
+    note_has_more: bool = False
+    is_running_clocks: bool = False
     patients: list[CohortPatient] = [
         CohortPatient(
             id="pat_001",
@@ -136,6 +144,49 @@ class CohortState(rx.State):
     def patients_this_month(self) -> int:
         return 2
 
+    @rx.event
+    def load_epigenetic_ages(self):
+        """
+        Attach each patient's latest epigenetic age, from the first configured
+        clock that has scored them.
+        """
+        latest = [epigenetic_ages.latest(clock) for clock in settings.epigenetic_clocks]
+        patients = []
+        for patient in self.patients:
+            found = (ages[patient.id] for ages in latest if patient.id in ages)
+            age = next(found, None)
+            if age is not None:
+                patient = patient.model_copy(
+                    update={"epigenetic_age": age.age, "epigenetic_clock": age.clock}
+                )
+            patients.append(patient)
+        self.patients = patients
+
+    @rx.event(background=True)
+    async def run_epigenetic_clocks(self):
+        """Score the methylation files waiting in the import directory."""
+        async with self:
+            if self.is_running_clocks:
+                return
+            self.is_running_clocks = True
+        try:
+            ages = await asyncio.to_thread(run_clock_directory)
+        except Exception:
+            async with self:
+                self.is_running_clocks = False
+            yield rx.toast("Epigenetic clock run failed.")
+            return
+        async with self:
+            self.is_running_clocks = False
+            self.load_epigenetic_ages()
+        if not ages:
+            yield rx.toast("No methylation files or clock coefficients to score.")
+            return
+        yield rx.toast(
+            f"Scored {len({a.sample_id for a in ages})} samples with "
+            f"{len({a.clock for a in ages})} clock(s)."
+        )
+
     @rx.event
     def set_search_query(self, query: str):
         self.search_query = query
@@ -148,11 +199,37 @@ class CohortState(rx.State):
     def open_detail_modal(self, patient: CohortPatient):
         self.selected_patient = patient
         self.is_detail_open = True
+        self._reset_note_search()
 
     @rx.event
     def close_detail_modal(self):
         self.is_detail_open = False
         self.selected_patient = None
+        self._reset_note_search()
+
+    def _reset_note_search(self):
+        self.note_query = ""
+        self.note_hits = []
+        self.note_has_more = False
+
+    @rx.event
+    def set_note_query(self, query: str):
+        """Search the selected patient's notes; results are ranked by relevance."""
+        self.note_query = query
+        if self.selected_patient is None:
+            return
+        self.note_hits, self.note_has_more = notes_index.search(
+            self.selected_patient.id, query
+        )
+
+    @rx.event
+    def load_more_notes(self):
+        if self.selected_patient is None or not self.note_has_more:
+            return
+        page, self.note_has_more = notes_index.search(
+            self.selected_patient.id, self.note_query, offset=len(self.note_hits)
+        )
+        self.note_hits.extend(page)
 
     @rx.event
     def handle_detail_modal_open_change(self, is_open: bool):
@@ -1,6 +1,8 @@
 import reflex as rx
 from app.schemas.condition import Condition
-from app.enums import ConditionStatus, ConditionSeverity
+from app.enums import ConditionStatus, ConditionSeverity, NoteKind
+from app.services.notes_index import notes_index
+from app.states.global_state import GlobalState
 
 
 class ConditionState(rx.State):
@@ -58,6 +60,20 @@ class ConditionState(rx.State):
     def set_filter(self, status: str):
         self.filter_status = status
 
+    @rx.event
+    async def index_notes(self):
+        """Make the patient's condition descriptions searchable by clinicians."""
+        patient_id = (await self.get_state(GlobalState)).patient_id
+        if patient_id:
+            notes_index.upsert_many(
+                patient_id,
+                NoteKind.CONDITION,
+                [
+                    (c.id, f"{c.name}: {c.description}", c.last_updated)
+                    for c in self.conditions
+                ],
+            )
+
     @rx.event
     def add_condition(self):
         return rx.toast("Add Condition feature coming soon.")
\ No newline at end of file
@@ -1,6 +1,41 @@
 import reflex as rx
 from app.schemas.datasource import DataSource
 from app.enums import DataSourceType, DataSourceStatus
+from app.models import GenomeVariant
+from app.services.apple_health import read_export
+from app.services.source_registry import source_registry
+from app.services.uploads import safe_suffix, save_upload
+from app.services.vcf_import import (
+    apoe_genotype,
+    genome_directory,
+    genome_store,
+    read_vcf,
+)
+from app.services.wearable_sync import (
+    SyncBatch,
+    SyncProgress,
+    import_directory,
+    wearable_sync,
+)
+from app.states.global_state import GlobalState
+from pathlib import Path
+from typing import Callable, Iterator
+import time
+
+APPLE_HEALTH_SOURCE_ID = "ds2"
+HEALTH_EXPORT_UPLOAD_ID = "health_export_upload"
+LAB_SOURCE_ID = "ds3"
+GENOME_SOURCE_ID = "ds4"
+GENOME_UPLOAD_ID = "genome_upload"
+CGM_SOURCE_ID = "ds5"
+
+
+def _format_ago(seconds: float) -> str:
+    for unit, size in (("day", 86400), ("hour", 3600), ("min", 60)):
+        if seconds >= size:
+            count = int(seconds // size)
+            return f"{count} {unit}{'s' if count != 1 else ''} ago"
+    return "Just now"
 
 
 class DataSourceState(rx.State):
@@ -22,13 +57,29 @@ class DataSourceState(rx.State):
             icon="activity",
         ),
         DataSource(
-            id="ds3",
+            id=LAB_SOURCE_ID,
             name="LabCorp Results",
             type=DataSourceType.FILE,
             status=DataSourceStatus.DISCONNECTED,
             last_sync="2 weeks ago",
             icon="file-text",
         ),
+        DataSource(
+            id=GENOME_SOURCE_ID,
+            name="Genome (VCF)",
+            type=DataSourceType.FILE,
+            status=DataSourceStatus.DISCONNECTED,
+            last_sync="Never",
+            icon="dna",
+        ),
+        DataSource(
+            id=CGM_SOURCE_ID,
+            name="Dexcom G7 CGM",
+            type=DataSourceType.WEARABLE,
+            status=DataSourceStatus.DISCONNECTED,
+            last_sync="Never",
+            icon="droplet",
+        ),
     ]
     filter_type: str = "Devices & Wearables"
     filter_options: list[str] = [
@@ -38,6 +89,10 @@ class DataSourceState(rx.State):
         "Import History",
         "Connected Devices & Wearables",
     ]
+    genome_variants: list[GenomeVariant] = []
+    apoe_genotype: str = ""
+    _health_export_path: str = ""
+    _genome_path: str = ""
 
     @rx.var
     def filtered_sources(self) -> list[DataSource]:
@@ -61,5 +116,193 @@ class DataSourceState(rx.State):
         self.filter_type = filter_type
 
     @rx.event
-    def sync_source(self, source_id: str):
-        return rx.toast("Sync started...")
\ No newline at end of file
+    async def load_sources(self):
+        """
+        Register connected sources with the sync scheduler and show the
+        status and sync time it recorded for each.
+        """
+        patient_id = (await self.get_state(GlobalState)).patient_id
+        if not patient_id:
+            return
+        for source in self.sources:
+            if source.status == DataSourceStatus.CONNECTED:
+                source_registry.connect(patient_id, source.id, source.type)
+        now = time.time()
+        for connection in source_registry.connections(patient_id):
+            if connection.last_sync_at is None or wearable_sync.is_running(
+                patient_id, connection.source_id
+            ):
+                continue
+            self._update_source(
+                connection.source_id,
+                status=connection.status,
+                last_sync=_format_ago(now - connection.last_sync_at),
+            )
+        self._load_genome(patient_id)
+
+    def _load_genome(self, patient_id: str):
+        self.genome_variants = genome_store.variants(patient_id)
+        self.apoe_genotype = apoe_genotype(self.genome_variants)
+
+    def _update_source(self, source_id: str, **fields):
+        self.sources = [
+            s.model_copy(update=fields) if s.id == source_id else s
+            for s in self.sources
+        ]
+
+    @rx.event(background=True)
+    async def sync_source(self, source_id: str):
+        async for update in self._run_sync(source_id):
+            yield update
+
+    @rx.event
+    async def upload_health_export(self, files: list[rx.UploadFile]):
+        """Stream an Apple Health export to disk, then import it in the background."""
+        if not files:
+            return
+        file = files[0]
+        suffix = safe_suffix(file.name, {".xml", ".zip"})
+        if not suffix:
+            return rx.toast("Upload an Apple Health export.xml or export.zip file.")
+        if any(
+            s.id == APPLE_HEALTH_SOURCE_ID and s.status == DataSourceStatus.SYNCING
+            for s in self.sources
+        ):
+            return rx.toast("Apple Health is already syncing.")
+        patient_id = (await self.get_state(GlobalState)).patient_id
+        path, _ = await save_upload(
+            file, import_directory(patient_id, "uploads"), suffix
+        )
+        self._health_export_path = str(path)
+        return [
+            rx.clear_selected_files(HEALTH_EXPORT_UPLOAD_ID),
+            DataSourceState.import_health_export,
+        ]
+
+    @rx.event(background=True)
+    async def import_health_export(self):
+        async with self:
+            export = Path(self._health_export_path)
+            self._health_export_path = ""
+        if not export.name:
+            return
+        try:
+            async for update in self._run_sync(
+                APPLE_HEALTH_SOURCE_ID,
+                lambda patient_id, source_id: read_export(
+                    export, patient_id, source_id
+                ),
+            ):
+                yield update
+        finally:
+            export.unlink(missing_ok=True)
+
+    @rx.event
+    async def upload_genome(self, files: list[rx.UploadFile]):
+        """Stream a VCF to the patient's genome directory, then scan it."""
+        if not files:
+            return
+        file = files[0]
+        suffix = safe_suffix(file.name, {".vcf", ".gz", ".bgz"})
+        if not suffix:
+            return rx.toast("Upload a .vcf, .vcf.gz or .vcf.bgz genome file.")
+        if any(
+            s.id == GENOME_SOURCE_ID and s.status == DataSourceStatus.SYNCING
+            for s in self.sources
+        ):
+            return rx.toast("A genome import is already running.")
+        patient_id = (await self.get_state(GlobalState)).patient_id
+        path, _ = await save_upload(file, genome_directory(patient_id), suffix)
+        self._genome_path = str(path)
+        return [
+            rx.clear_selected_files(GENOME_UPLOAD_ID),
+            DataSourceState.import_genome,
+        ]
+
+    @rx.event(background=True)
+    async def import_genome(self):
+        async with self:
+            genome = Path(self._genome_path)
+            self._genome_path = ""
+            patient_id = (await self.get_state(GlobalState)).patient_id
+        if not genome.name:
+            return
+        async for update in self._run_sync(
+            GENOME_SOURCE_ID,
+            lambda patient_id, source_id: read_vcf(genome, patient_id, source_id),
+            summary=lambda _: "Genome imported; longevity panel updated.",
+        ):
+            yield update
+        async with self:
+            self._load_genome(patient_id)
+
+    async def _run_sync(
+        self,
+        source_id: str,
+        batches: Callable[[str, str], Iterator[SyncBatch]] | None = None,
+        summary: Callable[[SyncProgress], str] | None = None,
+    ):
+        """
+        Run a sync for the source, streaming throttled progress into its card
+        and ending in CONNECTED or ERROR. `batches` overrides the source's own
+        feed, e.g. with an uploaded file, and `summary` the closing toast.
+        """
+        async with self:
+            patient_id = (await self.get_state(GlobalState)).patient_id
+            source = next((s for s in self.sources if s.id == source_id), None)
+            if not patient_id or source is None:
+                return
+            busy = source.status == DataSourceStatus.SYNCING
+            busy = busy or wearable_sync.is_running(patient_id, source_id)
+            if not busy:
+                self._update_source(
+                    source_id,
+                    status=DataSourceStatus.SYNCING,
+                    sync_progress=0,
+                    synced_records=0,
+                )
+        if busy:
+            yield rx.toast(f"{source.name} is already syncing. Try again when it ends.")
+            return
+        yield rx.toast(f"Syncing {source.name}...")
+
+        async def report(progress: SyncProgress):
+            async with self:
+                self._update_source(
+                    source_id,
+                    sync_progress=progress.percent,
+                    synced_records=progress.records,
+                )
+
+        started = time.monotonic()
+        try:
+            result = await wearable_sync.run(
+                patient_id,
+                source_id,
+                report,
+                source.type,
+                batches(patient_id, source_id) if batches is not None else None,
+            )
+        except Exception:
+            async with self:
+                self._update_source(
+                    source_id, status=DataSourceStatus.ERROR, sync_progress=0
+                )
+            yield rx.toast(f"Sync failed for {source.name}.")
+            return
+        rate = result.records / max(time.monotonic() - started, 1e-3)
+        async with self:
+            self._update_source(
+                source_id,
+                status=DataSourceStatus.CONNECTED,
+                last_sync="Just now",
+                sync_progress=100,
+                synced_records=result.records,
+            )
+        if summary is not None:
+            yield rx.toast(summary(result))
+            return
+        yield rx.toast(
+            f"{source.name}: {result.inserted} new of {result.records} records "
+            f"({rate:,.0f} records/s)."
+        )
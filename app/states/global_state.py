@@ -9,6 +9,7 @@ class GlobalState(rx.State):
 
     current_role: str = "guest"
     user_name: str = "Guest User"
+    patient_id: str = ""
     is_role_selector_open: bool = False
 
     @rx.var
@@ -31,6 +32,7 @@ class GlobalState(rx.State):
     def set_role_admin(self):
         self.current_role = "admin"
         self.user_name = "Dr. Alistair Vance"
+        self.patient_id = ""
         self.is_role_selector_open = False
         return rx.toast("Welcome, Dr. Vance", position="top-center")
 
@@ -38,6 +40,7 @@ class GlobalState(rx.State):
     def set_role_patient(self):
         self.current_role = "patient"
         self.user_name = "Elena Fisher"
+        self.patient_id = "pat_001"
         self.is_role_selector_open = False
         return rx.toast("Welcome, Elena", position="top-center")
 
@@ -61,6 +64,7 @@ class GlobalState(rx.State):
     def logout(self):
         self.current_role = "guest"
         self.user_name = "Guest"
+        self.patient_id = ""
         self.is_role_selector_open = False
         return rx.redirect("/login")
 
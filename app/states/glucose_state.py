@@ -0,0 +1,39 @@
+import reflex as rx
+from app.models import GlucoseDay
+from app.services.cgm import glucose_summaries
+from app.states.global_state import GlobalState
+import asyncio
+import datetime
+
+
+class GlucoseState(rx.State):
+    glucose_days: list[GlucoseDay] = []
+
+    @rx.var
+    def latest_glucose(self) -> GlucoseDay:
+        return self.glucose_days[-1] if self.glucose_days else GlucoseDay()
+
+    @rx.event(background=True)
+    async def load_glucose(self):
+        """Refresh the CGM days touched since the last visit, off the event loop."""
+        async with self:
+            patient_id = (await self.get_state(GlobalState)).patient_id
+        if not patient_id:
+            return
+        days = await asyncio.to_thread(glucose_summaries.recent, patient_id)
+        async with self:
+            self.glucose_days = [
+                GlucoseDay(
+                    date=datetime.datetime.fromtimestamp(
+                        d.day * 86400, datetime.timezone.utc
+                    ).strftime("%b %d"),
+                    readings=d.readings,
+                    mean=d.mean,
+                    cv=d.cv,
+                    tir=d.tir,
+                    tbr=d.tbr,
+                    tar=d.tar,
+                    mage=d.mage,
+                )
+                for d in days
+            ]
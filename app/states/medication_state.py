@@ -1,5 +1,13 @@
 import reflex as rx
-from app.schemas.medication import Medication
+from app.config import settings
+from app.schemas.medication import Medication, WindowAdherence
+from app.services.dose_log import dose_log
+from app.states.global_state import GlobalState
+
+
+def _percent(rate: float | None) -> int:
+    """Adherence as a percentage; nothing due yet counts as full adherence."""
+    return round(100 * rate) if rate is not None else 100
 
 
 class MedicationState(rx.State):
@@ -23,8 +31,50 @@ class MedicationState(rx.State):
             adherence_score=100,
         ),
     ]
-    overall_efficacy_score: int = 88
+    overall_efficacy_score: int = 100
+
+    def _load_adherence(self, patient_id: str):
+        """
+        Per-medication and overall adherence from the dose log's counters:
+        the score over `settings.adherence_overall_window` days and the
+        other `settings.adherence_windows` next to it.
+        """
+        overall = settings.adherence_overall_window
+        medications = []
+        for med in self.medications:
+            rates = dose_log.adherence(patient_id, med.id)
+            medications.append(
+                med.model_copy(
+                    update={
+                        "adherence_score": _percent(rates[overall]),
+                        "adherence_windows": [
+                            WindowAdherence(days=days, percent=_percent(rate))
+                            for days, rate in rates.items()
+                            if days != overall
+                        ],
+                    }
+                )
+            )
+        self.medications = medications
+        self.overall_efficacy_score = _percent(
+            dose_log.overall(patient_id, [med.id for med in self.medications])
+        )
+
+    @rx.event
+    async def load_adherence(self):
+        patient_id = (await self.get_state(GlobalState)).patient_id
+        if not patient_id:
+            return
+        dose_log.seed(patient_id, {med.id: med.frequency for med in self.medications})
+        for med in self.medications:
+            dose_log.schedule(patient_id, med.id, med.frequency)
+        self._load_adherence(patient_id)
 
     @rx.event
-    def mark_taken(self, med_id: str):
+    async def mark_taken(self, med_id: str):
+        patient_id = (await self.get_state(GlobalState)).patient_id
+        if not patient_id or not any(med.id == med_id for med in self.medications):
+            return
+        dose_log.record(patient_id, med_id)
+        self._load_adherence(patient_id)
         return rx.toast("Medication marked as taken.")
\ No newline at end of file
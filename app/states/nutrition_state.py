@@ -1,45 +1,244 @@
 import reflex as rx
-from app.schemas.nutrition import DailyNutrition, Meal, FoodItem
+from app.config import settings
+from app.schemas.nutrition import DailyNutrition, Meal, FoodItem, FoodMatch
 from app.enums import MealType
+from app.services.food_db import food_db
+from app.services.meal_photos import (
+    PHOTO_SUFFIXES,
+    media_directory,
+    meal_photos,
+    photo_url,
+)
+from app.services.nutrition_ledger import nutrition_ledger
+from app.services.uploads import UploadTooLarge, safe_suffix, save_upload
+from app.states.global_state import GlobalState
+import asyncio
+import datetime
+import uuid
+from pathlib import Path
+
+MEAL_PHOTO_UPLOAD_ID = "meal_photo_upload"
+
+DEFAULT_MEALS: list[Meal] = [
+    Meal(
+        id="m1",
+        type=MealType.BREAKFAST,
+        time="08:00 AM",
+        food_items=[
+            FoodItem(name="Oatmeal", calories=150, protein=5, carbs=27, fat=3),
+            FoodItem(name="Berries", calories=50, protein=1, carbs=12, fat=0),
+        ],
+    ),
+    Meal(
+        id="m2",
+        type=MealType.LUNCH,
+        time="12:30 PM",
+        food_items=[
+            FoodItem(
+                name="Grilled Chicken Salad",
+                calories=350,
+                protein=30,
+                carbs=10,
+                fat=15,
+            )
+        ],
+    ),
+]
 
 
 class NutritionState(rx.State):
     current_day: DailyNutrition = DailyNutrition(
-        date="Today",
-        meals=[
-            Meal(
-                id="m1",
-                type=MealType.BREAKFAST,
-                time="08:00 AM",
-                food_items=[
-                    FoodItem(name="Oatmeal", calories=150, protein=5, carbs=27, fat=3),
-                    FoodItem(name="Berries", calories=50, protein=1, carbs=12, fat=0),
-                ],
-                total_calories=200,
-            ),
-            Meal(
-                id="m2",
-                type=MealType.LUNCH,
-                time="12:30 PM",
-                food_items=[
-                    FoodItem(
-                        name="Grilled Chicken Salad",
-                        calories=350,
-                        protein=30,
-                        carbs=10,
-                        fat=15,
-                    )
-                ],
-                total_calories=350,
-            ),
-        ],
-        nutrition_score=76,
+        date="Today", meals=[], nutrition_score=76
     )
+    total_calories: int = 0
+    total_protein: float = 0.0
+    total_carbs: float = 0.0
+    total_fat: float = 0.0
+    weekly_macros: list[dict[str, str | float]] = []
+
+    is_meal_dialog_open: bool = False
+    meal_type: str = MealType.BREAKFAST
+    food_query: str = ""
+    food_results: list[FoodMatch] = []
+    meal_draft: list[FoodMatch] = []
+    meal_photo: str = ""
+    is_processing_photo: bool = False
+
+    @rx.var
+    def meal_photo_thumb(self) -> str:
+        return photo_url(self.meal_photo, "thumb") if self.meal_photo else ""
 
     @rx.var
-    def total_calories(self) -> int:
-        return sum((m.total_calories for m in self.current_day.meals))
+    def draft_calories(self) -> int:
+        return round(sum((f.calories * f.grams / 100 for f in self.meal_draft)))
+
+    def _load_day(self, patient_id: str):
+        """Today's meals and the macro rollups, read from the ledger."""
+        today = datetime.date.today().isoformat()
+        self.current_day = self.current_day.model_copy(
+            update={"meals": nutrition_ledger.day_meals(patient_id, today)}
+        )
+        totals = nutrition_ledger.day_totals(patient_id, today)
+        self.total_calories = round(totals.calories)
+        self.total_protein = totals.protein
+        self.total_carbs = totals.carbs
+        self.total_fat = totals.fat
+        self.weekly_macros = [
+            {
+                "week": datetime.date.fromisoformat(week.start).strftime("%b %d"),
+                "protein": week.totals.protein,
+                "carbs": week.totals.carbs,
+                "fat": week.totals.fat,
+            }
+            for week in nutrition_ledger.weeks(patient_id)
+        ]
+
+    @rx.event
+    async def load_nutrition(self):
+        patient_id = (await self.get_state(GlobalState)).patient_id
+        if not patient_id:
+            return
+        nutrition_ledger.seed(
+            patient_id, datetime.date.today().isoformat(), DEFAULT_MEALS
+        )
+        self._load_day(patient_id)
+
+    @rx.event
+    async def remove_food_item(self, item_id: int):
+        patient_id = (await self.get_state(GlobalState)).patient_id
+        if not patient_id:
+            return
+        nutrition_ledger.remove_item(patient_id, item_id)
+        self._load_day(patient_id)
+
+    @rx.event(background=True)
+    async def log_meal(self):
+        """Open the meal dialog and map the food index off the event loop."""
+        async with self:
+            self.is_meal_dialog_open = True
+            self.food_query = ""
+            self.food_results = []
+            self.meal_draft = []
+            self.meal_photo = ""
+        await asyncio.to_thread(food_db.load)
+
+    @rx.event
+    def handle_meal_dialog_open_change(self, is_open: bool):
+        self.is_meal_dialog_open = is_open
+
+    @rx.event
+    def set_meal_type(self, meal_type: str):
+        self.meal_type = meal_type
+
+    @rx.event
+    def set_food_query(self, query: str):
+        """Autocomplete from the local food database on each keystroke."""
+        self.food_query = query
+        self.food_results = [
+            FoodMatch(
+                fdc_id=food.fdc_id,
+                name=food.name,
+                category=food.category,
+                calories=food.calories,
+                protein=food.protein,
+                carbs=food.carbs,
+                fat=food.fat,
+            )
+            for food in food_db.search(query)
+        ]
+
+    @rx.event
+    def add_food(self, fdc_id: int):
+        food = next((f for f in self.food_results if f.fdc_id == fdc_id), None)
+        if food is None:
+            return
+        self.meal_draft.append(food)
+        self.food_query = ""
+        self.food_results = []
+
+    @rx.event
+    def set_draft_grams(self, index: int, grams: str):
+        try:
+            value = float(grams)
+        except ValueError:
+            return
+        if value > 0 and 0 <= index < len(self.meal_draft):
+            self.meal_draft[index] = self.meal_draft[index].model_copy(
+                update={"grams": value}
+            )
+
+    @rx.event
+    async def upload_meal_photo(self, files: list[rx.UploadFile]):
+        """
+        Stream the photo to disk, then resize it in the background; the meal
+        only ever links to the resized variants.
+        """
+        if not files:
+            return
+        file = files[0]
+        suffix = safe_suffix(file.name, PHOTO_SUFFIXES)
+        if not suffix:
+            return rx.toast("Please upload a JPEG, PNG or WebP photo.")
+        try:
+            path, digest = await save_upload(
+                file,
+                media_directory().parent / "incoming",
+                suffix,
+                max_bytes=settings.meal_photo_max_bytes,
+            )
+        except UploadTooLarge:
+            return rx.toast("That photo is too large.")
+        self.is_processing_photo = True
+        return [
+            rx.clear_selected_files(MEAL_PHOTO_UPLOAD_ID),
+            NutritionState.finish_meal_photo(str(path), digest),
+        ]
+
+    @rx.event(background=True)
+    async def finish_meal_photo(self, path: str, digest: str):
+        try:
+            key = await meal_photos.process(Path(path), digest)
+        except Exception:
+            key = ""
+        async with self:
+            self.is_processing_photo = False
+            self.meal_photo = key
+        if not key:
+            return rx.toast("Could not read that photo.")
+
+    @rx.event
+    def remove_draft_food(self, index: int):
+        if 0 <= index < len(self.meal_draft):
+            self.meal_draft.pop(index)
 
     @rx.event
-    def log_meal(self):
-        return rx.toast("Meal logging coming soon.")
\ No newline at end of file
+    async def save_meal(self):
+        if not self.meal_draft:
+            return rx.toast("Add at least one food to log a meal.")
+        patient_id = (await self.get_state(GlobalState)).patient_id
+        if not patient_id:
+            return
+        items = [
+            FoodItem(
+                name=f"{food.name} ({food.grams:g} g)",
+                calories=round(food.calories * food.grams / 100),
+                protein=round(food.protein * food.grams / 100, 1),
+                carbs=round(food.carbs * food.grams / 100, 1),
+                fat=round(food.fat * food.grams / 100, 1),
+            )
+            for food in self.meal_draft
+        ]
+        meal = Meal(
+            id=str(uuid.uuid4())[:8],
+            type=MealType(self.meal_type),
+            time=datetime.datetime.now().strftime("%I:%M %p"),
+            food_items=items,
+        )
+        if self.meal_photo:
+            meal.image_url = photo_url(self.meal_photo)
+        nutrition_ledger.add_meal(patient_id, datetime.date.today().isoformat(), meal)
+        self._load_day(patient_id)
+        self.meal_draft = []
+        self.meal_photo = ""
+        self.is_meal_dialog_open = False
+        return rx.toast("Meal logged.")
\ No newline at end of file
@@ -1,54 +1,140 @@
 import reflex as rx
+from reflex.utils import prerequisites
 from typing import Optional
 import uuid
 from datetime import datetime
-from app.models import TreatmentProtocol, ProtocolRequest
+from app.config import settings
+from app.models import (
+    FacetCount,
+    ProtocolRecommendation,
+    ProtocolRequest,
+    TreatmentProtocol,
+)
 from app.states.global_state import GlobalState
-from app.enums import TreatmentCategory, TreatmentFrequency, TreatmentStatus
+from app.states.cohort_state import CohortState
+from app.enums import (
+    ProtocolRequestStatus,
+    TreatmentCategory,
+    TreatmentFrequency,
+    TreatmentStatus,
+)
+from app.services.protocol_catalog import apply_changes, catalog
+from app.services.recommender import recommender
+from app.services.protocol_search import FACET_FIELDS, search_index
+from app.services.protocol_queue import REQUESTS_TOPIC, request_queue
+from app.services.pubsub import drain, pubsub
+
+ADMIN_PROTOCOLS_ROUTE = "/admin/protocols"
+
+
+def _is_connected(client_token: str) -> bool:
+    """Whether the browser tab behind `client_token` still has a websocket."""
+    namespace = prerequisites.get_and_validate_app().app.event_namespace
+    return namespace is None or client_token in namespace.token_to_sid
 
 
 class ProtocolState(rx.State):
-    protocols: list[TreatmentProtocol] = [
-        TreatmentProtocol(
-            id="p1",
-            name="NAD+ Loading Phase",
-            category=TreatmentCategory.IV_THERAPY,
-            description="Intensive NAD+ therapy to restore cellular energy levels.",
-            duration="4 Weeks",
-            frequency=TreatmentFrequency.BI_WEEKLY,
-            biomarker_targets=["NAD+", "Sirtuin Activity"],
-            status=TreatmentStatus.ACTIVE,
-        ),
-        TreatmentProtocol(
-            id="p2",
-            name="Epithalon Cycle",
-            category=TreatmentCategory.PEPTIDES,
-            description="Telomere length restoration and circadian rhythm reset.",
-            duration="10 Days",
-            frequency=TreatmentFrequency.DAILY,
-            biomarker_targets=["Biological Age", "Melatonin"],
-            status=TreatmentStatus.ACTIVE,
-        ),
-        TreatmentProtocol(
-            id="p3",
-            name="Hyperbaric Oxygen 2.0",
-            category=TreatmentCategory.HYPERBARIC,
-            description="Deep tissue oxygenation for stem cell mobilization.",
-            duration="20 Sessions",
-            frequency=TreatmentFrequency.BI_WEEKLY,
-            biomarker_targets=["Stem Cells", "Inflammation"],
-            status=TreatmentStatus.ACTIVE,
-        ),
-    ]
-    requests: list[ProtocolRequest] = []
+    visible_protocols: list[TreatmentProtocol] = []
+    search_query: str = ""
+    category_filter: str = ""
+    frequency_filter: str = ""
+    status_filter: str = ""
+    category_facets: list[FacetCount] = []
+    frequency_facets: list[FacetCount] = []
+    status_facets: list[FacetCount] = []
+    recommendations: list[ProtocolRecommendation] = []
+    pending_requests: list[ProtocolRequest] = []
     is_add_modal_open: bool = False
     is_request_modal_open: bool = False
     selected_protocol: Optional[TreatmentProtocol] = None
     request_reason: str = ""
+    selected_request_ids: list[str] = []
+    bulk_protocol_id: str = ""
+    bulk_date_from: str = ""
+    bulk_date_to: str = ""
+    _is_watching_requests: bool = False
+    _protocols: list[TreatmentProtocol] = []
+    _catalog_version: int = 0
+    _catalog_hash: str = ""
+
+    @rx.event
+    def sync_catalog(self):
+        """
+        Bring this session's copy of the catalog up to date by replaying only
+        the changes since the version it last saw; no-op when the content hash
+        is unchanged. The copy is backend-only, so the client receives just
+        the protocols currently visible on the page.
+        """
+        if self._catalog_hash == catalog.content_hash:
+            return
+        changes = catalog.changes_since(self._catalog_version)
+        if changes is None:
+            self._protocols = catalog.protocols()
+        else:
+            self._protocols = apply_changes(self._protocols, changes)
+        self._catalog_version = catalog.version
+        self._catalog_hash = catalog.content_hash
+        self._refresh_search()
 
-    @rx.var
-    def pending_requests(self) -> list[ProtocolRequest]:
-        return [r for r in self.requests if r.status == "pending"]
+    def _refresh_search(self):
+        filters = {
+            "category": self.category_filter,
+            "frequency": self.frequency_filter,
+            "status": self.status_filter,
+        }
+        by_id = {protocol.id: protocol for protocol in self._protocols}
+        self.visible_protocols = [
+            by_id[protocol_id]
+            for protocol_id in search_index.search(self.search_query, filters)
+            if protocol_id in by_id
+        ]
+        counts = search_index.facet_counts(self.search_query, filters)
+        self.category_facets = [
+            FacetCount(value=value, count=counts["category"].get(value, 0))
+            for value in TreatmentCategory
+        ]
+        self.frequency_facets = [
+            FacetCount(value=value, count=counts["frequency"].get(value, 0))
+            for value in TreatmentFrequency
+        ]
+        self.status_facets = [
+            FacetCount(value=value, count=counts["status"].get(value, 0))
+            for value in TreatmentStatus
+        ]
+
+    @rx.event
+    def set_search_query(self, query: str):
+        self.search_query = query
+        self._refresh_search()
+
+    @rx.event
+    def toggle_facet(self, field: str, value: str):
+        if field not in FACET_FIELDS:
+            return
+        current = getattr(self, f"{field}_filter")
+        setattr(self, f"{field}_filter", "" if current == value else value)
+        self._refresh_search()
+
+    @rx.event
+    def clear_filters(self):
+        self.search_query = ""
+        self.category_filter = ""
+        self.frequency_filter = ""
+        self.status_filter = ""
+        self._refresh_search()
+
+    @rx.event
+    async def load_recommendations(self):
+        global_state = await self.get_state(GlobalState)
+        cohort_state = await self.get_state(CohortState)
+        recommender.rank_cohort(cohort_state.patients)
+        patient = next(
+            (p for p in cohort_state.patients if p.id == global_state.patient_id),
+            None,
+        )
+        self.recommendations = (
+            recommender.recommendations(patient) if patient is not None else []
+        )
 
     @rx.event
     def toggle_add_modal(self, is_open: bool):
@@ -63,15 +149,21 @@ class ProtocolState(rx.State):
             description=form_data.get("description", ""),
             duration=form_data.get("duration", ""),
             frequency=form_data.get("frequency", ""),
-            biomarker_targets=form_data.get("biomarker_targets", "").split(","),
+            biomarker_targets=[
+                target.strip()
+                for target in form_data.get("biomarker_targets", "").split(",")
+                if target.strip()
+            ],
         )
-        self.protocols.append(new_protocol)
+        catalog.add(new_protocol)
+        self.sync_catalog()
         self.is_add_modal_open = False
         return rx.toast("Protocol created successfully.")
 
     @rx.event
     def delete_protocol(self, protocol_id: str):
-        self.protocols = [p for p in self.protocols if p.id != protocol_id]
+        catalog.delete(protocol_id)
+        self.sync_catalog()
         return rx.toast("Protocol deleted.")
 
     @rx.event
@@ -94,33 +186,122 @@ class ProtocolState(rx.State):
         self.is_add_modal_open = is_open
 
     @rx.event
-    def submit_request(self, form_data: dict):
+    async def submit_request(self, form_data: dict):
         if not self.selected_protocol:
             return
-        new_request = ProtocolRequest(
-            id=str(uuid.uuid4())[:8],
-            patient_name=GlobalState.user_name,
-            protocol_id=self.selected_protocol.id,
-            protocol_name=self.selected_protocol.name,
-            status="pending",
-            reason=form_data.get("reason", ""),
-            date=datetime.now().strftime("%Y-%m-%d"),
+        global_state = await self.get_state(GlobalState)
+        await request_queue.submit(
+            ProtocolRequest(
+                id=str(uuid.uuid4())[:8],
+                patient_name=global_state.user_name,
+                protocol_id=self.selected_protocol.id,
+                protocol_name=self.selected_protocol.name,
+                status=ProtocolRequestStatus.PENDING,
+                reason=form_data.get("reason", ""),
+                date=datetime.now().strftime("%Y-%m-%d"),
+            )
         )
-        self.requests.append(new_request)
         self.is_request_modal_open = False
         self.selected_protocol = None
         return rx.toast("Request submitted to clinic administration.")
 
+    @rx.event(background=True)
+    async def watch_requests(self):
+        """
+        Keep this admin session in sync with the shared request queue.
+        Subscribes before taking the snapshot so no submission is missed, and
+        exits once the session navigates away from the admin protocols page
+        or its tab disconnects, checked at least every
+        `settings.session_check_interval` seconds while nothing is published.
+        """
+        async with self:
+            if self._is_watching_requests:
+                return
+            self._is_watching_requests = True
+            client_token = self.router.session.client_token
+        try:
+            async with pubsub.listen(REQUESTS_TOPIC) as queue:
+                async with self:
+                    self.pending_requests = request_queue.pending()
+                while True:
+                    messages = await drain(queue, settings.session_check_interval)
+                    if not _is_connected(client_token):
+                        return
+                    async with self:
+                        if self.router.url.path != ADMIN_PROTOCOLS_ROUTE:
+                            return
+                        if messages:
+                            self.pending_requests = request_queue.pending()
+        finally:
+            async with self:
+                self._is_watching_requests = False
+
+    @rx.event
+    async def approve_request(self, request_id: str):
+        if await request_queue.transition(request_id, ProtocolRequestStatus.APPROVED):
+            return rx.toast("Protocol request approved.")
+        return rx.toast("This request was already processed.")
+
     @rx.event
-    def approve_request(self, request_id: str):
-        for req in self.requests:
-            if req.id == request_id:
-                req.status = "approved"
-        return rx.toast("Protocol request approved.")
+    async def reject_request(self, request_id: str):
+        if await request_queue.transition(request_id, ProtocolRequestStatus.REJECTED):
+            return rx.toast("Protocol request rejected.")
+        return rx.toast("This request was already processed.")
 
     @rx.event
-    def reject_request(self, request_id: str):
-        for req in self.requests:
-            if req.id == request_id:
-                req.status = "rejected"
-        return rx.toast("Protocol request rejected.")
\ No newline at end of file
+    def toggle_request_selection(self, request_id: str):
+        if request_id in self.selected_request_ids:
+            self.selected_request_ids.remove(request_id)
+        else:
+            self.selected_request_ids.append(request_id)
+
+    @rx.event
+    def clear_request_selection(self):
+        self.selected_request_ids = []
+
+    @rx.event
+    def set_bulk_protocol_id(self, protocol_id: str):
+        self.bulk_protocol_id = protocol_id
+
+    @rx.event
+    def set_bulk_date_from(self, date: str):
+        self.bulk_date_from = date
+
+    @rx.event
+    def set_bulk_date_to(self, date: str):
+        self.bulk_date_to = date
+
+    async def _bulk_transition(
+        self, request_ids: list[str], status: ProtocolRequestStatus
+    ):
+        changed = await request_queue.transition_many(request_ids, status)
+        self.selected_request_ids = []
+        if not changed:
+            return rx.toast("No pending requests matched.")
+        return rx.toast(f"{len(changed)} protocol requests {status}.")
+
+    @rx.event
+    async def approve_selected(self):
+        return await self._bulk_transition(
+            self.selected_request_ids, ProtocolRequestStatus.APPROVED
+        )
+
+    @rx.event
+    async def reject_selected(self):
+        return await self._bulk_transition(
+            self.selected_request_ids, ProtocolRequestStatus.REJECTED
+        )
+
+    @rx.event
+    async def approve_matching(self):
+        request_ids = request_queue.select_pending(
+            self.bulk_protocol_id, self.bulk_date_from, self.bulk_date_to
+        )
+        return await self._bulk_transition(request_ids, ProtocolRequestStatus.APPROVED)
+
+    @rx.event
+    async def reject_matching(self):
+        request_ids = request_queue.select_pending(
+            self.bulk_protocol_id, self.bulk_date_from, self.bulk_date_to
+        )
+        return await self._bulk_transition(request_ids, ProtocolRequestStatus.REJECTED)
@@ -0,0 +1,73 @@
+import reflex as rx
+from app.models import RecoveryDay
+from app.services.daily_summary import daily_summaries
+from app.states.global_state import GlobalState
+import asyncio
+import datetime
+
+
+class RecoveryState(rx.State):
+    recovery_days: list[RecoveryDay] = []
+
+    @rx.var
+    def latest_recovery(self) -> RecoveryDay:
+        return self.recovery_days[-1] if self.recovery_days else RecoveryDay()
+
+    @rx.var
+    def hrv_value(self) -> str:
+        rmssd = self.latest_recovery.rmssd
+        return f"{rmssd:.0f} ms" if rmssd is not None else "--"
+
+    @rx.var
+    def hrv_status(self) -> str:
+        """The latest night's RMSSD against the mean of the nights before it."""
+        values = [d.rmssd for d in self.recovery_days if d.rmssd is not None]
+        if len(values) < 2:
+            return "BASELINE" if values else "NO DATA"
+        baseline = sum(values[:-1]) / (len(values) - 1)
+        return "ABOVE BASELINE" if values[-1] >= baseline else "BELOW BASELINE"
+
+    @rx.var
+    def resting_hr_value(self) -> str:
+        resting = self.latest_recovery.resting_hr
+        return f"{resting:.0f} bpm" if resting is not None else "--"
+
+    @rx.var
+    def sleep_value(self) -> str:
+        day = self.latest_recovery
+        if day.efficiency is None:
+            return "--"
+        hours, minutes = divmod(round(day.asleep), 60)
+        return f"{hours}h {minutes}m · {day.efficiency:.0f}%"
+
+    @rx.var
+    def sleep_status(self) -> str:
+        efficiency = self.latest_recovery.efficiency
+        if efficiency is None:
+            return "NO DATA"
+        return "OPTIMAL" if efficiency >= 85 else "LOW"
+
+    @rx.event(background=True)
+    async def load_recovery(self):
+        """Summarize the days touched by syncs since the last visit, off the loop."""
+        async with self:
+            patient_id = (await self.get_state(GlobalState)).patient_id
+        if not patient_id:
+            return
+        days = await asyncio.to_thread(daily_summaries.recent, patient_id)
+        async with self:
+            self.recovery_days = [
+                RecoveryDay(
+                    date=datetime.datetime.fromtimestamp(
+                        d.day * 86400, datetime.timezone.utc
+                    ).strftime("%b %d"),
+                    rmssd=d.rmssd,
+                    sdnn=d.sdnn,
+                    resting_hr=d.resting_hr,
+                    asleep=d.asleep,
+                    efficiency=d.efficiency,
+                    deep=d.deep,
+                    rem=d.rem,
+                )
+                for d in days
+            ]
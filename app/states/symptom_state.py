@@ -1,5 +1,8 @@
 import reflex as rx
+from app.enums import NoteKind
 from app.schemas.symptom import Symptom
+from app.services.notes_index import notes_index
+from app.states.global_state import GlobalState
 
 
 class SymptomState(rx.State):
@@ -26,6 +29,20 @@ class SymptomState(rx.State):
     def set_view_mode(self, mode: str):
         self.view_mode = mode
 
+    @rx.event
+    async def index_notes(self):
+        """Make the patient's symptom notes searchable by clinicians."""
+        patient_id = (await self.get_state(GlobalState)).patient_id
+        if patient_id:
+            notes_index.upsert_many(
+                patient_id,
+                NoteKind.SYMPTOM,
+                [
+                    (s.id, f"{s.name}: {s.notes}" if s.notes else s.name, s.timestamp)
+                    for s in self.symptoms
+                ],
+            )
+
     @rx.event
     def log_symptom(self):
         return rx.toast("Symptom logging coming soon.")
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+Gorilla chunk files against plain SQLite rows for a year of minute heart
+rate, through TimeSeriesStore as the app writes and reads it.
+
+    python -m benchmarks.bench_chunk_store [--days 365] [--repeat 3]
+
+Reports bytes per point on disk, ingest time, full-range decode throughput
+and the time to read one week for a chart. Each store runs in its own
+temporary data directory.
+"""
+
+import argparse
+import math
+import random
+import tempfile
+import time
+from pathlib import Path
+from app.config import settings
+from app.services import db
+from app.services.chunk_store import chunk_store
+from app.services.timeseries import Sample, timeseries
+
+METRIC = "heart_rate"
+SOURCE = "ds1"
+WEEK = 7 * 86400
+
+
+def minute_heart_rate(
+    patient_id: str, days: int, start: int = 1_700_000_040
+) -> list[Sample]:
+    """Smooth daily rhythm plus noise, rounded to whole beats like devices do."""
+    rng = random.Random(0)
+    return [
+        Sample(
+            patient_id,
+            METRIC,
+            start + 60 * i,
+            float(round(62 + 12 * math.sin(i * math.tau / 1440) + rng.gauss(0, 3))),
+            SOURCE,
+        )
+        for i in range(days * 1440)
+    ]
+
+
+def disk_bytes(directory: Path) -> int:
+    db.connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+def best(repeat: int, fn) -> tuple[float, object]:
+    seconds, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        seconds = min(seconds, time.perf_counter() - started)
+    return seconds, result
+
+
+def run(days: int, chunked: bool, repeat: int) -> dict[str, float]:
+    # A patient per store, so the dedup index sees no replays.
+    patient_id = "bench-chunks" if chunked else "bench-rows"
+    samples = minute_heart_rate(patient_id, days)
+    metrics = list(settings.chunked_metrics)
+    if not chunked:
+        settings.chunked_metrics = [m for m in metrics if m != METRIC]
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            settings.data_dir = directory
+            started = time.perf_counter()
+            for i in range(0, len(samples), 10_000):
+                timeseries.insert_many(samples[i : i + 10_000])
+            ingest = time.perf_counter() - started
+            first, last = samples[0].ts, samples[-1].ts + 1
+            read_all, (timestamps, _) = best(
+                repeat, lambda: timeseries.series(patient_id, METRIC, first, last)
+            )
+            assert len(timestamps) == len(samples)
+            read_week, _ = best(
+                repeat,
+                lambda: timeseries.series(patient_id, METRIC, last - WEEK, last),
+            )
+            size = disk_bytes(Path(directory))
+            if chunked:
+                size = chunk_store.series(patient_id, METRIC).nbytes()
+            return {
+                "points": len(samples),
+                "bytes": size / len(samples),
+                "ingest": ingest,
+                "read_all": read_all,
+                "read_week": read_week,
+            }
+    finally:
+        settings.chunked_metrics = metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    data_dir = settings.data_dir
+    print(f"{args.days * 1440:,} minute heart-rate points, best of {args.repeat}")
+    try:
+        for label, chunked in (("chunk files", True), ("SQLite rows", False)):
+            r = run(args.days, chunked, args.repeat)
+            print(
+                f"  {label:<12} {r['bytes']:6.2f} bytes/point  "
+                f"ingest {r['ingest']:5.2f} s  "
+                f"full decode {r['read_all']:5.2f} s "
+                f"({r['points'] / r['read_all'] / 1000:,.0f}k points/s)  "
+                f"one week {r['read_week'] * 1000:6.1f} ms"
+            )
+    finally:
+        settings.data_dir = data_dir
+
+
+if __name__ == "__main__":
+    main()
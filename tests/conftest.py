@@ -0,0 +1,9 @@
+import pytest
+from app.config import settings
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Keep every test's database, chunk files and imports in a temp dir."""
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    return tmp_path
@@ -0,0 +1,120 @@
+import tracemalloc
+import zipfile
+import pytest
+from app.enums import SampleMetric
+from app.services.apple_health import parse_export_date, read_export
+
+HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE HealthData [
+<!ELEMENT HealthData (ExportDate,Me,(Record|Workout)*)>
+]>
+<HealthData locale="en_US">
+ <ExportDate value="2024-02-02 09:00:00 -0800"/>
+ <Me HKCharacteristicTypeIdentifierDateOfBirth="1970-01-01"/>
+"""
+FIRST = 1706803200  # 2024-02-01 08:00:00 -0800
+
+
+def record(kind: str, start: str, value: str, end: str | None = None) -> str:
+    end = end or start
+    return (
+        f' <Record type="{kind}" sourceName="Watch" unit="count/min" '
+        f'startDate="{start}" endDate="{end}" value="{value}">\n'
+        '  <MetadataEntry key="HKMetadataKeyHeartRateMotionContext" value="0"/>\n'
+        " </Record>\n"
+    )
+
+
+def stamp(seconds: int) -> str:
+    hours, rest = divmod(8 * 3600 + seconds, 3600)
+    return f"2024-02-01 {hours:02d}:{rest // 60:02d}:{rest % 60:02d} -0800"
+
+
+def write_export(path, heart_rates: int) -> list[tuple[str, int, float]]:
+    """Write an export; return the (metric, ts, value) it should yield."""
+    expected = []
+    with path.open("w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for i in range(heart_rates):
+            f.write(record("HKQuantityTypeIdentifierHeartRate", stamp(i), "61"))
+            expected.append((SampleMetric.HEART_RATE, FIRST + i, 61.0))
+        hrv = "HKQuantityTypeIdentifierHeartRateVariabilitySDNN"
+        sleep = "HKCategoryTypeIdentifierSleepAnalysis"
+        asleep = "HKCategoryValueSleepAnalysisAsleepCore"
+        in_bed = "HKCategoryValueSleepAnalysisInBed"
+        f.write(record("HKQuantityTypeIdentifierStepCount", stamp(0), "120"))
+        f.write(record(hrv, stamp(0), "42.5"))
+        f.write(record(sleep, stamp(0), asleep, stamp(5400)))
+        f.write(record(sleep, stamp(0), in_bed, stamp(9000)))
+        expected += [
+            (SampleMetric.STEPS, FIRST, 120.0),
+            (SampleMetric.HRV, FIRST, 42.5),
+            (SampleMetric.SLEEP, FIRST, 90.0),
+        ]
+        # Unknown types, bad values and workouts are skipped.
+        f.write(record("HKQuantityTypeIdentifierBodyMass", stamp(0), "80"))
+        f.write(record("HKQuantityTypeIdentifierHeartRate", stamp(0), "n/a"))
+        f.write(record("HKQuantityTypeIdentifierHeartRate", "yesterday", "70"))
+        f.write(
+            ' <Workout workoutActivityType="HKWorkoutActivityTypeRunning">\n'
+            + record("HKQuantityTypeIdentifierHeartRate", stamp(0), "150").replace(
+                "Record", "WorkoutEvent"
+            )
+            + " </Workout>\n</HealthData>\n"
+        )
+    return expected
+
+
+def read_all(path, batch_size: int = 1000):
+    batches = list(read_export(path, "pat_001", "ds2", batch_size))
+    samples = [(s.metric, s.ts, s.value) for b in batches for s in b.samples]
+    return batches, samples
+
+
+def test_parse_export_date_honours_the_offset():
+    assert parse_export_date("2024-02-01 08:00:00 -0800") == FIRST
+    assert parse_export_date("2024-02-01 21:30:00 +0530") == FIRST
+    assert parse_export_date("2024-02-01 16:00:00 +0000") == FIRST
+
+
+@pytest.mark.parametrize("zipped", [False, True])
+def test_export_is_read_in_batches_with_progress(data_dir, zipped):
+    xml = data_dir / "export.xml"
+    expected = write_export(xml, 2500)
+    path = xml
+    if zipped:
+        path = data_dir / "export.zip"
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.write(xml, "apple_health_export/export.xml")
+    batches, samples = read_all(path)
+    assert samples == expected
+    assert [len(b.samples) for b in batches] == [1000, 1000, 503]
+    total = xml.stat().st_size
+    assert all(b.total == total for b in batches)
+    done = [b.done for b in batches]
+    assert done == sorted(done) and done[0] < total and done[-1] == total
+
+
+def test_archive_without_an_export_is_rejected(data_dir):
+    path = data_dir / "export.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("apple_health_export/export_cda.xml", "<ClinicalDocument/>")
+    with pytest.raises(ValueError):
+        read_all(path)
+
+
+def test_memory_stays_flat_as_the_export_grows(data_dir):
+    def peak(records: int) -> int:
+        path = data_dir / f"export-{records}.xml"
+        write_export(path, records)
+        tracemalloc.start()
+        try:
+            for _ in read_export(path, "pat_001", "ds2", batch_size=500):
+                pass
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small, large = peak(2_000), peak(20_000)
+    # Ten times the records: the peak is set by the batch, not the file.
+    assert large < 2 * small
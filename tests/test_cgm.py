@@ -0,0 +1,119 @@
+import shutil
+from pathlib import Path
+import pytest
+from app.enums import SampleMetric
+from app.services.cgm import (
+    MMOL_TO_MG_DL,
+    DailyGlucose,
+    GlucoseSummaries,
+    export_columns,
+    mage,
+    parse_reading,
+    read_cgm_exports,
+    summarize_day,
+)
+from app.services.timeseries import Sample, TimeSeriesStore
+
+FIXTURES = Path(__file__).parent / "fixtures"
+DAY = 19844  # 2024-05-01
+
+
+def glucose(ts: int, value: float) -> Sample:
+    return Sample("pat_001", SampleMetric.GLUCOSE, ts, value, "ds4")
+
+
+def test_mage_counts_only_reversals_larger_than_one_sd():
+    # Rises of 80, falls of 120 and 100; the 10 and 5 mg/dL wiggles are noise.
+    values = [100, 180, 170, 175, 60, 65, 160]
+    assert mage(values, 53.3) == pytest.approx((80 + 120 + 100) / 3)
+    assert mage([100, 200, 100, 200, 100], 54.8) == 100.0
+    assert mage([100, 120, 110], 30.0) == 0.0
+    assert mage([], 10.0) == mage([120, 120], 0.0) == 0.0
+
+
+def test_summarize_day_range_boundaries_are_in_range():
+    summary = summarize_day(DAY, [69.9, 70.0, 180.0, 180.1])
+    assert (summary.tir, summary.tbr, summary.tar) == (50.0, 25.0, 25.0)
+    flat = summarize_day(DAY, [110.0])
+    assert flat == DailyGlucose(DAY, 1, 110.0, 0.0, 0.0, 100.0, 0.0, 0.0, 0.0)
+
+
+def test_export_columns_recognize_both_vendors():
+    dexcom = export_columns(
+        ["Index", "Timestamp (YYYY-MM-DDThh:mm:ss)", "Event Type", "Event Subtype"]
+        + ["Glucose Value (mg/dL)", "Glucose Rate of Change (mg/dL/min)"]
+    )
+    assert dexcom == (1, [4], 1.0, 2)
+    libre = export_columns(
+        ["Device", "Serial Number", "Device Timestamp", "Record Type"]
+        + ["Historic Glucose mmol/L", "Scan Glucose mmol/L", "Notes"]
+    )
+    assert libre == (2, [4, 5], MMOL_TO_MG_DL, None)
+    assert export_columns(["Glucose Data", "Generated on", "05-03-2024"]) is None
+
+
+def test_parse_reading_converts_units_and_sensor_limits():
+    libre = export_columns(
+        ["Device Timestamp", "Historic Glucose mmol/L", "Scan Glucose mmol/L"]
+    )
+    row = ["05-02-2024 08:22", "", "8.6"]
+    assert parse_reading(row, libre, "pat_001", "ds4") == glucose(1714638120, 154.9)
+    for raw, value in (("Low", 40.0), ("HIGH", 400.0)):
+        reading = parse_reading(["05-02-2024 08:22", raw], libre, "pat_001", "ds4")
+        assert reading.value == value
+    assert parse_reading(["05-02-2024 08:22", "", ""], libre, "p", "ds4") is None
+    assert parse_reading(["not a time", "5.0"], libre, "p", "ds4") is None
+
+
+def test_vendor_exports_give_known_daily_metrics(data_dir):
+    imports = data_dir / "cgm"
+    imports.mkdir()
+    for name in ("dexcom_clarity.csv", "libreview.csv"):
+        shutil.copy(FIXTURES / name, imports)
+    store = TimeSeriesStore()
+    for batch in read_cgm_exports(imports, "pat_001", "ds4"):
+        store.insert_many(batch.samples)
+    summaries = GlucoseSummaries(store)
+    assert summaries.recent("pat_001") == [
+        # Dexcom, mg/dL: 100 180 170 175 60 65 160 High Low.
+        DailyGlucose(DAY, 9, 150.0, 108.7, 72.4, 55.6, 33.3, 11.1, 273.3),
+        # LibreView, mmol/L with one scan: 5.0 9.0 8.6 3.5 Low High 7.0.
+        DailyGlucose(DAY + 1, 7, 148.0, 120.0, 81.1, 57.1, 28.6, 14.3, 252.0),
+    ]
+
+
+def test_refresh_recomputes_only_touched_days():
+    store = TimeSeriesStore()
+    summaries = GlucoseSummaries(store)
+    store.insert_many(
+        glucose((DAY + d) * 86400 + i * 300, 100 + d)
+        for d in range(3)
+        for i in range(4)
+    )
+    assert summaries.refresh("pat_001") == 3
+    assert summaries.refresh("pat_001") == 0
+    store.insert_many([glucose((DAY + 1) * 86400 + 3600, 201)])
+    assert summaries.refresh("pat_001") == 1
+    assert [(s.day, s.readings, s.mean) for s in summaries.recent("pat_001")] == [
+        (DAY, 4, 100.0),
+        (DAY + 1, 5, 121.0),
+        (DAY + 2, 4, 102.0),
+    ]
+
+
+def test_failed_refresh_keeps_the_days_touched():
+    class FailingStore(TimeSeriesStore):
+        fail = True
+
+        def series(self, *args):
+            if self.fail:
+                raise OSError("disk error")
+            return super().series(*args)
+
+    store = FailingStore()
+    summaries = GlucoseSummaries(store)
+    store.insert_many([glucose(DAY * 86400, 100)])
+    with pytest.raises(OSError):
+        summaries.refresh("pat_001")
+    store.fail = False
+    assert summaries.refresh("pat_001") == 1
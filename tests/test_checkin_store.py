@@ -0,0 +1,29 @@
+import pytest
+from app.enums import CheckInType
+from app.schemas.checkin import CheckIn
+from app.services.checkin_store import CheckInFeed
+
+SEED = [
+    CheckIn(
+        id="chk1",
+        type=CheckInType.TEXT,
+        content="Slept well, energy is up.",
+        timestamp="2024-05-01 08:00",
+    )
+]
+
+
+def test_every_patient_gets_the_seeded_ids():
+    feed = CheckInFeed()
+    feed.seed("pat_001", SEED)
+    feed.seed("pat_002", SEED)
+    assert [c.id for c in feed.recent("pat_002")] == ["chk1"]
+
+    feed.update("pat_002", "chk1", sentiment_score=0.8)
+    (history, _) = feed.history("pat_001", 2**62)
+    assert history[0].sentiment_score == 0
+
+
+def test_check_ins_need_a_patient():
+    with pytest.raises(ValueError):
+        CheckInFeed().append("", SEED[0])
@@ -0,0 +1,133 @@
+import math
+import statistics
+import pytest
+from app.enums import SampleMetric
+from app.services.daily_summary import (
+    DailySummaries,
+    DailySummary,
+    hrv,
+    resting_heart_rate,
+    summary_days,
+)
+from app.services.timeseries import Sample, TimeSeriesStore
+
+DAY = 19844  # 2024-05-01, the summary day the night ends on
+MIDNIGHT = DAY * 86400
+AWAKE, LIGHT, DEEP, REM = range(4)
+
+
+def beats(start: int, intervals: list[float]) -> tuple[list[int], list[float]]:
+    """Beat times in ms for back-to-back intervals starting at `start` ms."""
+    timestamps = []
+    for rr in intervals:
+        start += int(rr)
+        timestamps.append(start)
+    return timestamps, intervals
+
+
+def test_hrv_of_known_intervals():
+    count, rmssd, sdnn = hrv(*beats(0, [800, 810, 790, 820]))
+    assert count == 4
+    # Successive differences 10, -20, 30; deviations from 805 are ±5, ±15.
+    assert rmssd == pytest.approx(math.sqrt((100 + 400 + 900) / 3))
+    assert sdnn == pytest.approx(math.sqrt((25 + 25 + 225 + 225) / 3))
+
+
+def test_hrv_skips_gaps_artifacts_and_implausible_beats():
+    timestamps, intervals = beats(0, [800, 820])
+    # A beat 10 s later is not adjacent: no difference across the gap.
+    later, more = beats(timestamps[-1] + 10_000, [900, 880])
+    timestamps += later
+    intervals += more
+    # A 30% jump is an artifact and a 250 ms interval is implausible; both are
+    # dropped and the beat after each is not differenced against them.
+    timestamps += [timestamps[-1] + 1150, timestamps[-1] + 1400]
+    intervals += [1150, 250]
+    count, rmssd, sdnn = hrv(timestamps, intervals)
+    assert count == 4
+    assert rmssd == pytest.approx(math.sqrt((20**2 + 20**2) / 2))
+    assert sdnn == pytest.approx(statistics.stdev([800, 820, 900, 880]))
+    assert hrv([800], [800]) == (1, None, None)
+    assert hrv([], []) == (0, None, None)
+
+
+def test_resting_heart_rate_is_the_lowest_half_hour_mean():
+    timestamps = [60 * i for i in range(120)]
+    values = [70.0] * 40 + [50.0] * 30 + [52.0] * 10 + [75.0] * 40
+    assert resting_heart_rate(timestamps, values) == 50.0
+    assert resting_heart_rate([0, 60], [40.0, 40.0]) is None
+    # Sparse readings: never three within a window.
+    assert resting_heart_rate([0, 1800, 3600], [40.0, 40.0, 40.0]) is None
+
+
+def test_summary_days_overlap_the_utc_day_and_the_next():
+    assert list(summary_days(DAY)) == [DAY, DAY + 1]
+    assert list(summary_days(DAY, offset=0)) == [DAY]
+
+
+def test_a_night_across_midnight_is_one_summary_day():
+    store = TimeSeriesStore()
+    bedtime = MIDNIGHT - 2 * 3600
+    stages = [AWAKE] * 60 + [LIGHT] * 500 + [DEEP] * 200 + [REM] * 200
+    store.insert_many(
+        Sample("pat_001", SampleMetric.SLEEP_STAGE, bedtime + 30 * i, stage, "ds1")
+        for i, stage in enumerate(stages)
+    )
+    heart_rate = [62.0] * 60 + [48.0] * 40 + [58.0] * 380
+    store.insert_many(
+        Sample("pat_001", SampleMetric.HEART_RATE, bedtime + 60 * i, bpm, "ds1")
+        for i, bpm in enumerate(heart_rate)
+    )
+    # One beat run either side of midnight, and one after noon, which belongs
+    # to the next summary day.
+    runs = [
+        beats((MIDNIGHT - 600) * 1000, [1000, 1010, 990]),
+        beats((MIDNIGHT + 600) * 1000, [1000, 1020, 1000]),
+        beats((MIDNIGHT + 13 * 3600) * 1000, [700, 710]),
+    ]
+    store.insert_many(
+        Sample("pat_001", SampleMetric.RR_INTERVAL, ts, rr, "ds1")
+        for timestamps, intervals in runs
+        for ts, rr in zip(timestamps, intervals)
+    )
+    summaries = DailySummaries(store)
+    assert summaries.refresh("pat_001") == 3
+    night, afternoon = summaries.recent("pat_001")
+    assert night == DailySummary(
+        DAY,
+        6,
+        round(math.sqrt((10**2 + 20**2 + 20**2 + 20**2) / 4), 1),
+        round(statistics.stdev([1000, 1010, 990, 1000, 1020, 1000]), 1),
+        48.0,
+        480.0,
+        450.0,
+        93.8,
+        30.0,
+        250.0,
+        100.0,
+        100.0,
+    )
+    assert (afternoon.day, afternoon.beats, afternoon.rmssd) == (DAY + 1, 2, 10.0)
+    assert afternoon.time_in_bed == 0.0 and afternoon.efficiency is None
+    assert summaries.refresh("pat_001") == 0
+
+
+def test_refresh_recomputes_only_the_touched_days():
+    store = TimeSeriesStore()
+    summaries = DailySummaries(store)
+    for day in (DAY, DAY + 3):
+        store.insert_many(
+            Sample("pat_001", SampleMetric.HEART_RATE, day * 86400 + 60 * i, 60, "ds1")
+            for i in range(5)
+        )
+    assert summaries.refresh("pat_001") == 4
+    later = (DAY + 3) * 86400 + 7200
+    store.insert_many(
+        Sample("pat_001", SampleMetric.HEART_RATE, later + 60 * i, 40, "ds1")
+        for i in range(5)
+    )
+    assert summaries.refresh("pat_001") == 2
+    assert [(s.day, s.resting_hr) for s in summaries.recent("pat_001")] == [
+        (DAY, 60.0),
+        (DAY + 3, 40.0),
+    ]
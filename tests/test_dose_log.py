@@ -0,0 +1,45 @@
+import random
+import pytest
+from app.enums import TreatmentFrequency
+from app.services.dose_log import DAY, SLOT_SECONDS, AdherenceTracker
+
+WINDOWS = [7, 30, 90]
+
+
+def recount(slot_seconds, started, doses, now, window):
+    """Slots taken and due in `window` straight from the list of doses."""
+    size = max(1, window * DAY // slot_seconds)
+    current = now // slot_seconds
+    taken = {ts // slot_seconds for ts in doses}
+    start = min(taken | {started // slot_seconds})
+    in_window = {slot for slot in taken if current - size < slot <= current}
+    due = min(size, current - start + 1) - (current not in taken)
+    return len(in_window), max(0, due)
+
+
+@pytest.mark.parametrize(
+    "frequency",
+    [TreatmentFrequency.DAILY, TreatmentFrequency.WEEKLY, TreatmentFrequency.MONTHLY],
+)
+def test_counters_match_a_recount_of_the_log(frequency):
+    rng = random.Random(frequency)
+    slot_seconds = SLOT_SECONDS[frequency]
+    now = started = 1_700_000_000
+    tracker = AdherenceTracker(slot_seconds, started, WINDOWS)
+    doses: list[int] = []
+    for _ in range(3000):
+        roll = rng.random()
+        if roll < 0.4:
+            now += rng.randint(0, 3 * slot_seconds)
+        elif roll < 0.9:
+            doses.append(now)
+            tracker.add(now)
+        else:
+            late = now - rng.randint(0, 100 * DAY)
+            doses.append(late)
+            tracker.add(late)
+        tracker.advance(now)
+        for window in WINDOWS:
+            assert tracker.counts(window) == recount(
+                slot_seconds, started, doses, now, window
+            )
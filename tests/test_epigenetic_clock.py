@@ -0,0 +1,135 @@
+import math
+import random
+import pytest
+from app.services.epigenetic_clock import (
+    Clock,
+    RangeSums,
+    _blocks,
+    byte_ranges,
+    clock_ages,
+    horvath_age,
+    load_clock,
+    read_header,
+    score_range,
+)
+
+SAMPLES = ["S1", "S2", "S3", "S4"]
+
+
+def write_matrix(path, rows: dict[str, list[float | None]], delimiter: str = ","):
+    lines = [delimiter.join(['"ID_REF"', *(f'"{s}"' for s in SAMPLES)])]
+    for cpg, betas in rows.items():
+        fields = ["NA" if beta is None else repr(beta) for beta in betas]
+        lines.append(delimiter.join([f'"{cpg}"', *fields]))
+    path.write_bytes(("\r\n".join(lines) + "\r\n").encode())
+
+
+def random_matrix(rng: random.Random, count: int) -> dict[str, list[float | None]]:
+    return {
+        f"cg{i:08d}": [
+            None if rng.random() < 0.1 else round(rng.random(), 4) for _ in SAMPLES
+        ]
+        for i in range(count)
+    }
+
+
+def naive_sums(rows, clock: Clock) -> RangeSums:
+    """Dense dot product with mean imputation, row by row."""
+    sums = [0.0] * len(SAMPLES)
+    matched = 0
+    for cpg, coefficient in clock.weights.items():
+        betas = rows.get(cpg)
+        present = [beta for beta in betas or [] if beta is not None]
+        if not present:
+            continue
+        mean = sum(present) / len(present)
+        for i, beta in enumerate(betas):
+            sums[i] += coefficient * (mean if beta is None else beta)
+        matched += 1
+    return RangeSums({clock.name: sums}, {clock.name: matched})
+
+
+def score_in_ranges(path, clocks: list[Clock], chunk: int) -> RangeSums:
+    samples, delimiter, start = read_header(path)
+    assert samples == SAMPLES
+    sums = {clock.name: [0.0] * len(samples) for clock in clocks}
+    matched = dict.fromkeys(sums, 0)
+    for lo, hi in byte_ranges(start, path.stat().st_size, chunk):
+        part = score_range(str(path), lo, hi, len(samples), delimiter, clocks)
+        for name, values in part.sums.items():
+            sums[name] = [a + b for a, b in zip(sums[name], values)]
+            matched[name] += part.matched[name]
+    return RangeSums(sums, matched)
+
+
+@pytest.mark.parametrize("chunk", [1, 13, 97, 1 << 20])
+def test_every_line_belongs_to_exactly_one_range(tmp_path, chunk):
+    path = tmp_path / "matrix.csv"
+    write_matrix(path, random_matrix(random.Random(chunk), 50))
+    _, _, start = read_header(path)
+    data = path.read_bytes()[start:]
+    ranges = byte_ranges(start, path.stat().st_size, chunk)
+    assert ranges[0][0] == start and ranges[-1][1] == path.stat().st_size
+    assert all(prev[1] == lo for prev, (lo, _) in zip(ranges, ranges[1:]))
+    assert b"".join(b for lo, hi in ranges for b in _blocks(path, lo, hi)) == data
+
+
+@pytest.mark.parametrize("delimiter", [",", "\t"])
+def test_ranges_sum_to_the_naive_dot_product(tmp_path, delimiter):
+    rng = random.Random(7)
+    rows = random_matrix(rng, 400)
+    rows["cg_all_missing"] = [None] * len(SAMPLES)
+    path = tmp_path / "matrix.txt"
+    write_matrix(path, rows, delimiter)
+    cpgs = rng.sample(sorted(rows), 60) + ["cg_all_missing", "cg_not_on_array"]
+    clocks = [
+        Clock("a", 0.5, {cpg: rng.uniform(-2, 2) for cpg in cpgs}),
+        Clock("b", -1.0, {cpg: rng.uniform(-2, 2) for cpg in cpgs[::3]}),
+    ]
+    for chunk in (61, 500, 1 << 20):
+        totals = score_in_ranges(path, clocks, chunk)
+        for clock in clocks:
+            expected = naive_sums(rows, clock)
+            assert totals.matched[clock.name] == expected.matched[clock.name]
+            assert totals.sums[clock.name] == pytest.approx(
+                expected.sums[clock.name]
+            )
+
+
+def test_missing_betas_take_the_mean_of_the_other_samples(tmp_path):
+    path = tmp_path / "matrix.csv"
+    write_matrix(path, {"cg1": [0.2, None, 0.4, None], "cg2": [None] * 4})
+    clock = Clock("c", 0.0, {"cg1": 10.0, "cg2": 1.0})
+    totals = score_in_ranges(path, [clock], 1 << 20)
+    assert totals.sums["c"] == pytest.approx([2.0, 3.0, 4.0, 3.0])
+    assert totals.matched["c"] == 1
+
+
+def test_horvath_age_inverts_the_log_linear_transform():
+    assert horvath_age(0.0) == 20.0
+    assert horvath_age(1.0) == 41.0
+    assert horvath_age(-1.0) == pytest.approx(21 * math.exp(-1) - 1)
+    for age in (0.5, 5.0, 19.9, 20.0, 35.0, 80.0):
+        if age <= 20:
+            score = math.log(age + 1) - math.log(21)
+        else:
+            score = (age - 20) / 21
+        assert horvath_age(score) == pytest.approx(age)
+
+
+def test_clock_ages_apply_transform_and_skip_low_coverage(tmp_path):
+    coefficients = tmp_path / "horvath.csv"
+    coefficients.write_text(
+        "CpGmarker,CoefficientTraining\n(Intercept),0.5\ncg1,1.0\ncg2,-1.0\ncg3,0\n"
+    )
+    clock = load_clock(coefficients, "horvath")
+    assert clock == Clock("horvath", 0.5, {"cg1": 1.0, "cg2": -1.0}, "horvath")
+    totals = RangeSums({"horvath": [0.5, -1.0]}, {"horvath": 2})
+    ages = clock_ages(["S1", "S2"], totals, [clock], patient_id="pat_001")
+    assert [(age.sample_id, age.age, age.coverage) for age in ages] == [
+        ("S1", 41.0, 1.0),
+        ("S2", round(21 * math.exp(-0.5) - 1, 2), 1.0),
+    ]
+    assert all(age.patient_id == "pat_001" for age in ages)
+    partial = RangeSums({"horvath": [0.5, -1.0]}, {"horvath": 1})
+    assert clock_ages(["S1", "S2"], partial, [clock], min_coverage=0.8) == []
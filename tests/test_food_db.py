@@ -0,0 +1,103 @@
+import os
+import shutil
+from pathlib import Path
+import pytest
+from app.services.food_db import FoodDatabase, compile_index, read_foods, trigrams
+from app.services.notes_index import tokenize
+
+FOODS = Path(__file__).parent.parent / "app" / "data" / "foods.csv"
+
+
+@pytest.fixture
+def source(data_dir) -> Path:
+    path = data_dir / "foods.csv"
+    shutil.copy(FOODS, path)
+    return path
+
+
+def names(foods) -> list[str]:
+    return [food.name for food in foods]
+
+
+def test_trigrams_of_a_prefix_are_trigrams_of_the_word():
+    assert trigrams("chi") == {"$ch", "chi"}
+    assert trigrams("chi") <= trigrams("chicken")
+
+
+@pytest.mark.parametrize("prefix", ["b", "br", "chick", "raw", "salmon", "oil"])
+def test_prefix_search_matches_every_food_with_a_word_starting_so(source, prefix):
+    db = FoodDatabase(source, source.with_name("foods.bin"))
+    expected = {
+        name
+        for _, name, _, _ in read_foods(source)
+        if any(word.startswith(prefix) for word in tokenize(name))
+    }
+    assert expected
+    assert set(names(db.search(prefix, limit=len(db)))) == expected
+
+
+def test_search_ranks_and_intersects_tokens(source):
+    db = FoodDatabase(source, source.with_name("foods.bin"))
+    assert names(db.search("broc raw")) == ["Broccoli, raw"]
+    # Both breast cuts, the raw one first as it is the shorter description.
+    assert names(db.search("chicken breast")) == [
+        "Chicken, broilers or fryers, breast, meat only, raw",
+        "Chicken, broilers or fryers, breast, meat only, cooked, roasted",
+    ]
+    assert db.search("chicken zzzqqq") == []
+    assert db.search("") == db.search("raw", limit=0) == []
+
+
+@pytest.mark.parametrize(
+    "typo, word, raw",
+    [
+        ("chiken", "Chicken", "Chicken, broilers or fryers, breast, meat only, raw"),
+        ("brocoli", "Broccoli", "Broccoli, raw"),
+    ],
+)
+def test_misspelt_word_falls_back_to_trigrams(source, typo, word, raw):
+    db = FoodDatabase(source, source.with_name("foods.bin"))
+    found = names(db.search(typo))
+    assert found and found[0].startswith(word)
+    assert all(word.lower() in name.lower() for name in found)
+    assert names(db.search(f"{typo} raw"))[0] == raw
+
+
+def test_short_tokens_never_fall_back_to_trigrams(source):
+    db = FoodDatabase(source, source.with_name("foods.bin"))
+    assert db.search("xq") == []
+    assert db.search("zzzqqq") == []
+
+
+def test_index_is_rebuilt_when_the_csv_changes(source):
+    index = source.with_name("foods.bin")
+    db = FoodDatabase(source, index)
+    assert not db._is_current()
+    count = len(db)
+    assert db._is_current()
+    compiled = index.stat().st_mtime_ns
+
+    # Same content, new mtime: stale.
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert not FoodDatabase(source, index)._is_current()
+
+    with source.open("a", encoding="utf-8") as f:
+        f.write('999999,"Kohlrabi, raw",Vegetables,27,1.7,6.2,0.1,3.6\n')
+    fresh = FoodDatabase(source, index)
+    assert names(fresh.search("kohl")) == ["Kohlrabi, raw"]
+    assert len(fresh) == count + 1
+    assert fresh._is_current()
+    assert index.stat().st_mtime_ns != compiled
+    # The already-mapped database keeps serving its own snapshot.
+    assert db.search("kohl") == []
+
+
+def test_truncated_index_is_stale(source):
+    index = source.with_name("foods.bin")
+    compile_index(source, index)
+    db = FoodDatabase(source, index)
+    assert db._is_current()
+    index.write_bytes(index.read_bytes()[:10])
+    assert not db._is_current()
+    assert names(db.search("brocoli"))[0] == "Broccoli, raw"
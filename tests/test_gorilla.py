@@ -0,0 +1,32 @@
+import random
+import pytest
+from app.services import gorilla
+
+
+def roundtrip(timestamps: list[int], values: list[float]):
+    payload = gorilla.encode(timestamps, values)
+    assert gorilla.decode(payload, timestamps[0], len(timestamps)) == (
+        timestamps,
+        values,
+    )
+
+
+def test_regular_and_jittered_series():
+    rng = random.Random(7)
+    timestamps = [1_700_000_000 + 60 * i + rng.randint(-3, 3) for i in range(500)]
+    values = [round(rng.gauss(62, 4), 1) for _ in timestamps]
+    roundtrip(timestamps, values)
+
+
+@pytest.mark.parametrize("gap", [2**31 - 1, 2**31, 3_000_000_000, 2**40])
+def test_gaps_wider_than_32_bits(gap: int):
+    roundtrip([0, 1000, 1000 + gap, 1000 + gap + 1000], [812.0, 790.0, 805.5, 799.0])
+
+
+def test_wide_negative_delta_of_delta():
+    roundtrip([0, 3_000_000_000, 3_000_000_001], [1.0, 2.0, 3.0])
+
+
+def test_rejects_gaps_beyond_64_bits():
+    with pytest.raises(ValueError):
+        gorilla.encode([-(2**62), 2**62, 2**62 + 1], [0.0, 0.0, 0.0])
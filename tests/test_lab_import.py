@@ -0,0 +1,29 @@
+from app.enums import BiomarkerMetricName as M
+from app.services.lab_import import LabBatchImporter, read_lab_source
+from app.services.timeseries import timeseries
+from app.states.datasource_state import LAB_SOURCE_ID
+
+NIGHTLY_CSV = """patient_id,test,result,units,collected
+pat_001,HGB,14.1,g/dL,2024-05-01T08:00:00
+pat_002,HGB,12.9,g/dL,2024-05-01T09:00:00
+pat_002,HGB,n/a,g/dL,2024-05-01T09:00:00
+"""
+
+
+def test_sync_without_an_import_directory_reads_nothing(data_dir):
+    assert list(read_lab_source("pat_001", LAB_SOURCE_ID)) == []
+    assert not (data_dir / "imports").exists()
+
+
+def test_nightly_batch_imports_every_patient_and_moves_the_files(data_dir):
+    importer = LabBatchImporter(source_id=LAB_SOURCE_ID)
+    inbox = importer.inbox()
+    inbox.mkdir()
+    (inbox / "results.csv").write_text(NIGHTLY_CSV)
+    result = importer.run_once()
+    assert (result.files, result.inserted, result.rejected) == (1, 2, 1)
+    for patient_id, value in (("pat_001", 14.1), ("pat_002", 12.9)):
+        (sample,) = timeseries.range(patient_id, str(M.HEMOGLOBIN), 0, 2**62)
+        assert (sample.value, sample.source) == (value, LAB_SOURCE_ID)
+    assert [p.name for p in (inbox / "processed").iterdir()] == ["results.csv"]
+    assert importer.run_once() is None
@@ -0,0 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from app.services.meal_photos import FORMATS, render_variants
+
+SIZES = {"thumb": 16, "card": 64}
+
+
+def test_concurrent_renders_of_one_photo_leave_complete_variants(tmp_path):
+    source = tmp_path / "photo.png"
+    Image.new("RGB", (300, 200), "orange").save(source)
+    out = tmp_path / "meals"
+    out.mkdir()
+    with ThreadPoolExecutor(4) as pool:
+        for future in [
+            pool.submit(render_variants, str(source), str(out), "k" * 24, SIZES)
+            for _ in range(4)
+        ]:
+            future.result()
+    assert not list(out.glob(".*.part"))
+    for size, edge in SIZES.items():
+        for ext in FORMATS:
+            with Image.open(out / f"{'k' * 24}-{size}.{ext}") as variant:
+                assert max(variant.size) == edge
@@ -0,0 +1,22 @@
+from app.enums import NoteKind
+from app.services.notes_index import NotesIndex
+
+
+def refs(hits):
+    return [hit.ref_id for hit in hits]
+
+
+def test_prefix_terms_follow_removed_and_reindexed_notes():
+    index = NotesIndex()
+    index.upsert("pat_001", NoteKind.SYMPTOM, "s1", "Migraine after poor sleep")
+    index.upsert("pat_001", NoteKind.SYMPTOM, "s2", "Mild headache")
+    assert index._expand_prefix("mi") == ["migraine", "mild"]
+    assert refs(index.search("pat_001", "migr")[0]) == ["s1"]
+
+    index.upsert("pat_001", NoteKind.SYMPTOM, "s1", "Slept well")
+    assert index._expand_prefix("mi") == ["mild"]
+    assert index.search("pat_001", "migr") == ([], False)
+
+    index.remove("pat_001", NoteKind.SYMPTOM, "s2")
+    assert index._expand_prefix("mi") == []
+    assert refs(index.search("pat_001", "slep")[0]) == ["s1"]
@@ -0,0 +1,118 @@
+import datetime
+import random
+from collections import defaultdict
+import pytest
+from app.enums import MealType
+from app.schemas.nutrition import FoodItem, Meal
+from app.services import db
+from app.services.nutrition_ledger import MacroTotals, NutritionLedger
+
+SUNDAY = datetime.date(2024, 5, 5)
+MACROS = ("calories", "protein", "carbs", "fat")
+
+
+def monday(day: str) -> str:
+    date = datetime.date.fromisoformat(day)
+    return (date - datetime.timedelta(days=date.weekday())).isoformat()
+
+
+def item(rng: random.Random) -> FoodItem:
+    return FoodItem(
+        name="food",
+        calories=rng.randint(0, 900),
+        protein=round(rng.uniform(0, 60), 1),
+        carbs=round(rng.uniform(0, 120), 1),
+        fat=round(rng.uniform(0, 50), 1),
+    )
+
+
+def summed(group_by: str) -> dict[tuple[str, str], list[float]]:
+    """Item count and macro sums straight from meal_items."""
+    key = {
+        "day": "day",
+        "week": "date(day, '-' || ((strftime('%w', day) + 6) % 7) || ' days')",
+        "meal": "meal_id",
+    }[group_by]
+    rows = db.connection().execute(
+        f"SELECT patient_id, {key}, COUNT(*), SUM(calories), SUM(protein), "
+        f"SUM(carbs), SUM(fat) FROM meal_items GROUP BY patient_id, {key}"
+    )
+    return {(row[0], row[1]): list(row[2:]) for row in rows}
+
+
+def rollup(table: str, column: str) -> dict[tuple[str, str], list[float]]:
+    rows = db.connection().execute(
+        f"SELECT patient_id, {column}, items, {', '.join(MACROS)} FROM {table}"
+    )
+    return {(row[0], row[1]): list(row[2:]) for row in rows}
+
+
+def assert_rollups_match(expected: dict, actual: dict):
+    assert actual.keys() == expected.keys()
+    for key, values in expected.items():
+        assert actual[key] == pytest.approx(values, abs=1e-6)
+
+
+def test_week_is_named_after_its_monday():
+    ledger = NutritionLedger()
+    rng = random.Random(1)
+    for offset in range(-1, 9):
+        day = (SUNDAY + datetime.timedelta(days=offset)).isoformat()
+        meal = Meal(
+            id=day, type=MealType.LUNCH, time="12:00 PM", food_items=[item(rng)]
+        )
+        ledger.add_meal("pat_001", day, meal)
+    weeks = [week.start for week in ledger.weeks("pat_001")]
+    assert weeks == ["2024-04-29", "2024-05-06", "2024-05-13"]
+    assert [monday(day) for day in ("2024-05-05", "2024-05-06")] == weeks[:2]
+
+
+def test_rollups_match_item_sums_after_random_removals():
+    rng = random.Random(48)
+    ledger = NutritionLedger()
+    meals_of = defaultdict(list)
+    for n in range(120):
+        patient_id = rng.choice(["pat_001", "pat_002"])
+        # Saturday to Tuesday: two week boundaries, Sunday/Monday included.
+        day = (SUNDAY + datetime.timedelta(days=rng.randint(-1, 9))).isoformat()
+        meal = Meal(
+            id=f"m{n}",
+            type=rng.choice(list(MealType)),
+            time="08:00 AM",
+            food_items=[item(rng) for _ in range(rng.randint(1, 4))],
+        )
+        stored = ledger.add_meal(patient_id, day, meal)
+        meals_of[patient_id].append(stored)
+        assert stored.total_calories == sum(i.calories for i in meal.food_items)
+
+    items = [
+        (patient_id, food.id)
+        for patient_id, meals in meals_of.items()
+        for meal in meals
+        for food in meal.food_items
+    ]
+    rng.shuffle(items)
+    for step, (patient_id, item_id) in enumerate(items[: len(items) * 3 // 4]):
+        ledger.remove_item(patient_id, item_id)
+        if step % 25 == 0:
+            # Removing a missing or another patient's item changes nothing.
+            ledger.remove_item("pat_003", item_id)
+            assert_rollups_match(summed("day"), rollup("nutrition_days", "day"))
+        assert_rollups_match(summed("week"), rollup("nutrition_weeks", "week"))
+    assert_rollups_match(summed("day"), rollup("nutrition_days", "day"))
+    assert_rollups_match(summed("meal"), rollup("meals", "id"))
+    # Meals and periods whose last item went are gone, not left at zero.
+    (empty,) = db.connection().execute(
+        "SELECT COUNT(*) FROM meals WHERE items = 0"
+    ).fetchone()
+    assert empty == 0
+    assert summed("week").keys() == {
+        (patient_id, monday(day)) for patient_id, day in summed("day")
+    }
+
+    for patient_id in meals_of:
+        for week in ledger.weeks(patient_id, limit=10):
+            sums = summed("week")[(patient_id, week.start)]
+            assert week.totals.items == sums[0]
+            assert week.totals.calories == round(sums[1])
+    assert ledger.day_totals("pat_003", SUNDAY.isoformat()) == MacroTotals()
@@ -0,0 +1,50 @@
+from app.models import TreatmentProtocol
+from app.services.protocol_catalog import (
+    DEFAULT_PROTOCOLS,
+    ProtocolCatalog,
+    apply_changes,
+)
+
+
+def protocol(protocol_id: str) -> TreatmentProtocol:
+    return TreatmentProtocol(
+        id=protocol_id,
+        name=f"Protocol {protocol_id}",
+        category="other",
+        description="",
+        duration="",
+        frequency="",
+    )
+
+
+def test_replaying_changes_matches_the_catalog():
+    catalog = ProtocolCatalog(DEFAULT_PROTOCOLS)
+    start, cached = catalog.version, catalog.protocols()
+    catalog.add(protocol("x1"))
+    catalog.delete("p2")
+    catalog.add(protocol("x2"))
+    replayed = apply_changes(cached, catalog.changes_since(start))
+    assert replayed == catalog.protocols()
+    assert catalog.changes_since(catalog.version) == []
+
+
+def test_versions_from_before_a_restart_get_a_full_snapshot():
+    before = ProtocolCatalog(DEFAULT_PROTOCOLS)
+    before.add(protocol("x1"))
+    before.add(protocol("x2"))
+    stale = before.version
+    after = ProtocolCatalog(DEFAULT_PROTOCOLS)
+    assert after.changes_since(stale) is None
+    after.add(protocol("y1"))
+    after.add(protocol("y2"))
+    assert after.version != stale
+    assert after.changes_since(stale) is None
+
+
+def test_a_truncated_log_needs_a_full_snapshot():
+    catalog = ProtocolCatalog(DEFAULT_PROTOCOLS, history=2)
+    start = catalog.version
+    for i in range(3):
+        catalog.add(protocol(f"x{i}"))
+    assert catalog.changes_since(start) is None
+    assert len(catalog.changes_since(start + 1)) == 2
@@ -0,0 +1,195 @@
+"""
+Several admin and patient sessions sharing one request queue, simulated on
+one event loop the way the Reflex backend runs their handlers.
+"""
+
+import asyncio
+import random
+from app.enums import ProtocolRequestStatus
+from app.models import ProtocolRequest
+from app.services.protocol_queue import REQUESTS_TOPIC, ProtocolRequestQueue
+from app.services.pubsub import PubSub, drain
+
+ADMINS = 3
+SUBMISSIONS = 50
+
+
+def request(i: int) -> ProtocolRequest:
+    return ProtocolRequest(
+        id=f"req{i}",
+        patient_name=f"Patient {i}",
+        protocol_id="p1",
+        protocol_name="NAD+ Infusion",
+        date="2024-05-01",
+    )
+
+
+async def admin_session(bus: PubSub, queue: ProtocolRequestQueue, ready, seen):
+    """Mirrors ProtocolState.watch_requests: subscribe, snapshot, drain."""
+    async with bus.listen(REQUESTS_TOPIC) as inbox:
+        pending = {r.id for r in queue.pending()}
+        ready.release()
+        while len(pending) < SUBMISSIONS:
+            await drain(inbox, timeout=1.0)
+            pending = {r.id for r in queue.pending()}
+    seen.append(pending)
+
+
+def test_every_admin_sees_every_concurrent_submission():
+    async def simulate():
+        bus = PubSub()
+        queue = ProtocolRequestQueue(bus)
+        ready = asyncio.Semaphore(0)
+        seen: list[set[str]] = []
+        admins = [
+            asyncio.create_task(admin_session(bus, queue, ready, seen))
+            for _ in range(ADMINS)
+        ]
+        for _ in range(ADMINS):
+            await ready.acquire()
+        await asyncio.gather(*(queue.submit(request(i)) for i in range(SUBMISSIONS)))
+        await asyncio.wait_for(asyncio.gather(*admins), 5)
+        assert bus.subscriber_count(REQUESTS_TOPIC) == 0
+        return seen
+
+    seen = asyncio.run(simulate())
+    assert seen == [{f"req{i}" for i in range(SUBMISSIONS)}] * ADMINS
+
+
+def test_racing_decisions_apply_once():
+    async def simulate():
+        queue = ProtocolRequestQueue(PubSub())
+        await queue.submit(request(0))
+        decisions = [ProtocolRequestStatus.APPROVED, ProtocolRequestStatus.REJECTED] * 3
+        return queue, await asyncio.gather(
+            *(queue.transition("req0", status) for status in decisions)
+        )
+
+    queue, results = asyncio.run(simulate())
+    applied = [result for result in results if result is not None]
+    assert len(applied) == 1
+    assert queue.get("req0").status == applied[0].status
+    assert queue.pending() == []
+
+
+def test_idle_watchers_wake_up_to_check_their_session():
+    async def simulate():
+        bus = PubSub()
+        async with bus.listen(REQUESTS_TOPIC) as inbox:
+            idle = await drain(inbox, timeout=0.01)
+            bus.publish(REQUESTS_TOPIC, "req0")
+            bus.publish(REQUESTS_TOPIC, "req1")
+            return idle, await drain(inbox, timeout=0.01)
+
+    assert asyncio.run(simulate()) == ([], ["req0", "req1"])
+
+
+def dated(i: int, protocol_id: str, date: str) -> ProtocolRequest:
+    return request(i).model_copy(update={"protocol_id": protocol_id, "date": date})
+
+
+def test_select_pending_filters_by_protocol_and_inclusive_dates():
+    async def simulate():
+        queue = ProtocolRequestQueue(PubSub())
+        for i, (protocol_id, date) in enumerate(
+            [
+                ("p1", "2024-04-30"),
+                ("p1", "2024-05-01"),
+                ("p2", "2024-05-03"),
+                ("p1", "2024-05-05"),
+                ("p1", "2024-05-06"),
+            ]
+        ):
+            await queue.submit(dated(i, protocol_id, date))
+        await queue.transition("req3", ProtocolRequestStatus.APPROVED)
+        return queue
+
+    queue = asyncio.run(simulate())
+    assert queue.select_pending() == ["req0", "req1", "req2", "req4"]
+    assert queue.select_pending("p1") == ["req0", "req1", "req4"]
+    assert queue.select_pending(date_from="2024-05-01", date_to="2024-05-05") == [
+        "req1",
+        "req2",
+    ]
+    assert queue.select_pending("p1", date_to="2024-05-01") == ["req0", "req1"]
+    assert queue.select_pending("p3") == []
+
+
+def test_transition_many_applies_once_and_publishes_once():
+    async def simulate():
+        bus = PubSub()
+        queue = ProtocolRequestQueue(bus)
+        for i in range(6):
+            await queue.submit(request(i))
+        await queue.transition("req1", ProtocolRequestStatus.REJECTED)
+        async with bus.listen(REQUESTS_TOPIC) as inbox:
+            ids = ["req0", "req1", "missing", "req2", "req0", "req3"]
+            changed, racing = await asyncio.gather(
+                queue.transition_many(ids, ProtocolRequestStatus.APPROVED),
+                queue.transition_many(["req3", "req4"], ProtocolRequestStatus.REJECTED),
+            )
+            messages = await drain(inbox, timeout=0.01)
+            nothing = await queue.transition_many(
+                ["req0", "req9"], ProtocolRequestStatus.APPROVED
+            )
+            return queue, changed, racing, messages, nothing
+
+    queue, changed, racing, messages, nothing = asyncio.run(simulate())
+    assert [r.id for r in changed] == ["req0", "req2", "req3"]
+    assert all(r.status == ProtocolRequestStatus.APPROVED for r in changed)
+    # The second batch ran after the first released the lock; req3 was taken.
+    assert [r.id for r in racing] == ["req4"]
+    assert messages == [["req0", "req2", "req3"], ["req4"]]
+    assert nothing == []
+    assert queue.get("req1").status == ProtocolRequestStatus.REJECTED
+    assert [r.id for r in queue.pending()] == ["req5"]
+
+
+def test_status_buckets_agree_with_a_scan_of_all_requests():
+    rng = random.Random(28)
+    statuses = [ProtocolRequestStatus.APPROVED, ProtocolRequestStatus.REJECTED]
+
+    async def simulate():
+        queue = ProtocolRequestQueue(PubSub())
+        snapshot = held = None
+        for step in range(400):
+            i = rng.randrange(60)
+            if rng.random() < 0.5:
+                # Resubmitting a decided request puts it back in pending.
+                await queue.submit(request(i))
+            elif rng.random() < 0.8:
+                await queue.transition(f"req{i}", rng.choice(statuses))
+            else:
+                ids = [f"req{rng.randrange(60)}" for _ in range(5)]
+                await queue.transition_many(ids, rng.choice(statuses))
+            if step == 200:
+                snapshot = [(r.id, r.status) for r in queue.pending()]
+                held = queue.pending()
+            for status in ProtocolRequestStatus:
+                scanned = [r.id for r in queue.all() if r.status == status]
+                bucket = [r.id for r in queue.by_status(status)]
+                assert sorted(bucket) == sorted(scanned)
+            assert queue.counts() == {
+                status: len(queue.by_status(status))
+                for status in ProtocolRequestStatus
+            }
+        # Transitions replace entries, so a held snapshot never changes.
+        assert [(r.id, r.status) for r in held] == snapshot
+
+    asyncio.run(simulate())
+
+
+def test_buckets_keep_arrival_order():
+    async def simulate():
+        queue = ProtocolRequestQueue(PubSub())
+        for i in (3, 1, 2, 0):
+            await queue.submit(request(i))
+        await queue.transition("req1", ProtocolRequestStatus.APPROVED)
+        await queue.transition("req3", ProtocolRequestStatus.APPROVED)
+        await queue.submit(request(1))
+        return queue
+
+    queue = asyncio.run(simulate())
+    assert [r.id for r in queue.pending()] == ["req2", "req0", "req1"]
+    assert [r.id for r in queue.approved()] == ["req3"]
+    assert queue.rejected() == []
@@ -0,0 +1,96 @@
+import random
+from app.models import TreatmentProtocol
+from app.services.protocol_catalog import DEFAULT_PROTOCOLS, ProtocolCatalog
+from app.services.protocol_search import FACET_FIELDS, ProtocolSearchIndex, tokenize
+
+WORDS = ["nad+", "infusion", "peptide", "repair", "oxygen", "sleep", "stress", "bpc"]
+CATEGORIES = ["peptides", "iv", "hb"]
+FREQUENCIES = ["Daily", "Weekly", "Monthly"]
+STATUSES = ["Active", "Paused"]
+
+
+def random_protocol(rng: random.Random, protocol_id: str) -> TreatmentProtocol:
+    return TreatmentProtocol(
+        id=protocol_id,
+        name=" ".join(rng.sample(WORDS, 2)).title(),
+        category=rng.choice(CATEGORIES),
+        description=" ".join(rng.choices(WORDS, k=3)),
+        duration="4 weeks",
+        frequency=rng.choice(FREQUENCIES),
+        biomarker_targets=rng.sample(["NAD+", "hs-CRP", "Vitamin D"], 1),
+        status=rng.choice(STATUSES),
+    )
+
+
+def matches(protocol: TreatmentProtocol, query: str, filters: dict[str, str]):
+    text = " ".join([protocol.name, protocol.description, *protocol.biomarker_targets])
+    tokens = tokenize(text)
+    return all(
+        any(token.startswith(term) for token in tokens) for term in tokenize(query)
+    ) and all(
+        not value or str(getattr(protocol, field)) == value
+        for field, value in filters.items()
+    )
+
+
+def scanned_counts(protocols, query: str, filters: dict[str, str]):
+    counts = {}
+    for field in FACET_FIELDS:
+        others = {f: v for f, v in filters.items() if f != field}
+        counts[field] = {}
+        for protocol in protocols:
+            value = str(getattr(protocol, field))
+            hit = matches(protocol, query, others)
+            counts[field][value] = counts[field].get(value, 0) + hit
+    return counts
+
+
+def test_search_and_facets_agree_with_a_scan_as_the_catalog_changes():
+    rng = random.Random(30)
+    catalog = ProtocolCatalog(DEFAULT_PROTOCOLS)
+    index = ProtocolSearchIndex.from_catalog(catalog)
+    for step in range(300):
+        protocol_id = f"x{rng.randrange(40)}"
+        if rng.random() < 0.7:
+            # Re-adding an id replaces its tokens and facet values.
+            catalog.add(random_protocol(rng, protocol_id))
+        else:
+            catalog.delete(protocol_id)
+        query = " ".join(w[: rng.randint(1, len(w))] for w in rng.sample(WORDS, 2))
+        query = rng.choice(["", query.split()[0], query])
+        filters = {
+            "category": rng.choice(["", *CATEGORIES]),
+            "status": rng.choice(["", *STATUSES]),
+        }
+        protocols = catalog.protocols()
+        assert index.search(query, filters) == [
+            p.id for p in protocols if matches(p, query, filters)
+        ]
+        assert index.facet_counts(query, filters) == scanned_counts(
+            protocols, query, filters
+        )
+
+
+def test_facet_counts_ignore_the_fields_own_filter():
+    catalog = ProtocolCatalog([])
+    index = ProtocolSearchIndex.from_catalog(catalog)
+    rng = random.Random(1)
+    for protocol_id, category, frequency in [
+        ("a", "iv", "Weekly"),
+        ("b", "iv", "Daily"),
+        ("c", "hb", "Weekly"),
+    ]:
+        update = {"category": category, "frequency": frequency, "status": "Active"}
+        catalog.add(random_protocol(rng, protocol_id).model_copy(update=update))
+    counts = index.facet_counts(filters={"category": "iv"})
+    # Choosing "hb" instead would still give one result.
+    assert counts["category"] == {"iv": 2, "hb": 1}
+    assert counts["frequency"] == {"Weekly": 1, "Daily": 1}
+    assert index.search(filters={"category": "iv", "frequency": "Weekly"}) == ["a"]
+    # An edit keeps the protocol's place in the results.
+    catalog.add(catalog.get("a").model_copy(update={"frequency": "Daily"}))
+    assert index.search() == ["a", "b", "c"]
+    assert index.facet_counts()["frequency"] == {"Daily": 2, "Weekly": 1}
+    catalog.delete("c")
+    assert index.facet_counts()["category"] == {"iv": 2}
+    assert index.search("zzz") == []
@@ -0,0 +1,130 @@
+import random
+import pytest
+from app.config import settings
+from app.models import CohortPatient, TreatmentProtocol
+from app.services import recommender as recommender_module
+from app.services.protocol_catalog import ProtocolCatalog
+from app.services.recommender import ProtocolRecommender, marker_gap
+
+MARKERS = {str(m.name): m for m in settings.supported_biomarkers}
+TARGETS = ["NAD+", "Sirtuin Activity", "Inflammation", "CRP", "Stress", "Bone Health"]
+
+
+def patient(patient_id: str, biomarkers: dict[str, float]) -> CohortPatient:
+    return CohortPatient(
+        id=patient_id,
+        name=patient_id,
+        email="",
+        phone="",
+        status="Active",
+        age=50,
+        biological_age=48.0,
+        active_protocols=[],
+        last_visit="",
+        longevity_score=80,
+        joined_date="",
+        biomarkers=biomarkers,
+    )
+
+
+def protocol(protocol_id: str, targets: list[str]) -> TreatmentProtocol:
+    return TreatmentProtocol(
+        id=protocol_id,
+        name=protocol_id.upper(),
+        category="iv",
+        description="",
+        duration="",
+        frequency="Weekly",
+        biomarker_targets=targets,
+    )
+
+
+def naive_ranking(
+    subject: CohortPatient, protocols: list[TreatmentProtocol]
+) -> list[tuple[str, float, list[str]]]:
+    """Each protocol scored by the summed gaps of the markers it targets."""
+    scored = []
+    for p in protocols:
+        targets = {t.lower() for t in p.biomarker_targets}
+        hits = [
+            (name, marker_gap(subject.biomarkers[name], config))
+            for name, config in MARKERS.items()
+            if name in subject.biomarkers
+            and targets & {name.lower(), *(a.lower() for a in config.aliases)}
+        ]
+        hits = [(name, gap) for name, gap in hits if gap > 0]
+        if hits:
+            scored.append((p.id, sum(gap for _, gap in hits), [n for n, _ in hits]))
+    return sorted(scored, key=lambda item: item[1], reverse=True)
+
+
+def test_marker_gap_is_measured_in_range_widths():
+    nad = MARKERS["NAD+"]
+    assert marker_gap(30.0, nad) == 0.0
+    assert marker_gap(20.0, nad) == marker_gap(40.0, nad) == 0.0
+    assert marker_gap(10.0, nad) == pytest.approx(0.5)
+    assert marker_gap(60.0, nad) == pytest.approx(1.0)
+    point = nad.model_copy(update={"optimal_range_min": 5, "optimal_range_max": 5})
+    assert marker_gap(7.0, point) == 2.0
+
+
+def test_recommendations_match_a_naive_ranking():
+    rng = random.Random(31)
+    protocols = [
+        protocol(f"p{i}", rng.sample(TARGETS, rng.randint(0, 3))) for i in range(12)
+    ]
+    recommender = ProtocolRecommender(ProtocolCatalog(protocols))
+    cohort = [
+        patient(
+            f"pat_{i:03d}",
+            {
+                name: round(rng.uniform(0, 2 * config.optimal_range_max), 1)
+                for name, config in MARKERS.items()
+                if rng.random() < 0.8
+            },
+        )
+        for i in range(40)
+    ]
+    recommender.rank_cohort(cohort)
+    for subject in cohort:
+        expected = naive_ranking(subject, protocols)[:3]
+        actual = recommender.recommendations(subject)
+        assert [(r.protocol_id, r.markers) for r in actual] == [
+            (protocol_id, markers) for protocol_id, _, markers in expected
+        ]
+        assert [r.score for r in actual] == [round(s, 3) for _, s, _ in expected]
+
+
+def test_rankings_are_recomputed_only_when_markers_or_catalog_change(monkeypatch):
+    rows = []
+
+    def counting_matmul(left, right):
+        rows.append(len(left))
+        return matmul(left, right)
+
+    matmul = recommender_module.matmul
+    monkeypatch.setattr(recommender_module, "matmul", counting_matmul)
+    catalog = ProtocolCatalog([protocol("p1", ["NAD+"]), protocol("p2", ["CRP"])])
+    recommender = ProtocolRecommender(catalog)
+    low_nad = patient("pat_001", {"NAD+": 10.0})
+    high_crp = patient("pat_002", {"hs-CRP": 3.0})
+
+    recommender.rank_cohort([low_nad, high_crp])
+    recommender.rank_cohort([low_nad, high_crp])
+    assert [r.protocol_id for r in recommender.recommendations(low_nad)] == ["p1"]
+    assert rows == [2]
+
+    lower_nad = low_nad.model_copy(update={"biomarkers": {"NAD+": 5.0}})
+    recommender.rank_cohort([lower_nad, high_crp])
+    assert rows == [2, 1]
+    assert recommender.recommendations(lower_nad)[0].score == 0.75
+
+    catalog.add(protocol("p3", ["CRP", "NAD+"]))
+    recommender.rank_cohort([lower_nad, high_crp])
+    assert rows == [2, 1, 2]
+    assert [r.protocol_id for r in recommender.recommendations(high_crp)] == [
+        "p2",
+        "p3",
+    ]
+    # A patient with every marker in range gets no recommendations.
+    assert recommender.recommendations(patient("pat_003", {"NAD+": 30.0})) == []
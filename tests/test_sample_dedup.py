@@ -0,0 +1,105 @@
+from app.services.sample_dedup import SampleDeduplicator
+from app.services.timeseries import Sample, TimeSeriesStore
+
+HOUR = 1_700_002_800  # a bucket start for hourly metrics
+
+
+def apple_health(metric: str, ts: int, value: float) -> Sample:
+    return Sample("pat_001", metric, ts, value, "ds2")
+
+
+def test_keeps_same_source_records_in_one_bucket():
+    store = TimeSeriesStore()
+    samples = [
+        apple_health("steps", HOUR + 60, 500),
+        apple_health("steps", HOUR + 1200, 700),
+        apple_health("steps", HOUR + 2400, 900),
+        apple_health("sleep", HOUR + 300, 20),
+        apple_health("sleep", HOUR + 1800, 30),
+    ]
+    assert store.insert_many(samples) == 5
+    steps = store.range("pat_001", "steps", HOUR, HOUR + 3600)
+    assert sum(sample.value for sample in steps) == 2100
+    sleep = store.range("pat_001", "sleep", HOUR, HOUR + 3600)
+    assert sum(sample.value for sample in sleep) == 50
+    assert store.insert_many(samples) == 0
+
+
+def test_drops_only_exact_replays():
+    dedup = SampleDeduplicator(
+        lambda patient_id, since: [("steps", HOUR + 60, "ds2")],
+        lambda *args: [],
+        clock=lambda: HOUR + 3600,
+    )
+    keep, replacing = dedup.filter(
+        [apple_health("steps", HOUR + 60, 500), apple_health("steps", HOUR + 61, 5)]
+    )
+    assert [sample.ts for sample in keep] == [HOUR + 61]
+    assert replacing == []
+
+
+def test_buckets_before_the_window_are_read_from_storage():
+    lookups = []
+
+    def lookup(patient_id, metric, start, end):
+        lookups.append((metric, start, end))
+        return [(HOUR + 60, "ds2")]
+
+    dedup = SampleDeduplicator(
+        lambda patient_id, since: [], lookup, horizon=86400, clock=lambda: HOUR * 2
+    )
+    keep, _ = dedup.filter(
+        [
+            apple_health("steps", HOUR + 60, 500),
+            apple_health("steps", HOUR + 61, 5),
+            apple_health("steps", HOUR + 3660, 7),
+            Sample("pat_001", "steps", HOUR + 90, 9, "ds3"),
+        ]
+    )
+    assert [sample.ts for sample in keep] == [HOUR + 61, HOUR + 3660]
+    assert lookups == [("steps", HOUR, HOUR + 7200)]
+
+
+def test_the_window_is_reloaded_once_it_falls_behind():
+    now = [HOUR]
+    loads = []
+
+    def load(patient_id, since):
+        loads.append(since)
+        return []
+
+    dedup = SampleDeduplicator(
+        load, lambda *args: [], horizon=3600, clock=lambda: now[0]
+    )
+    dedup.filter([apple_health("steps", HOUR, 1)])
+    now[0] += 3600
+    dedup.filter([apple_health("steps", now[0], 1)])
+    now[0] += 1
+    dedup.filter([apple_health("steps", now[0], 1)])
+    assert loads == [HOUR - 3600, HOUR + 1]
+
+
+def test_higher_priority_source_takes_the_bucket_over():
+    store = TimeSeriesStore()
+    store.insert_many(
+        [apple_health("steps", HOUR + 60, 500), apple_health("steps", HOUR + 120, 700)]
+    )
+    oura = [
+        Sample("pat_001", "steps", HOUR + 90, 600, "ds1"),
+        Sample("pat_001", "steps", HOUR + 150, 650, "ds1"),
+    ]
+    assert store.insert_many(oura) == 2
+    stored = store.range("pat_001", "steps", HOUR, HOUR + 3600)
+    assert [(s.source, s.value) for s in stored] == [("ds1", 600), ("ds1", 650)]
+    fitbit = [Sample("pat_001", "steps", HOUR + 200, 1, "ds3")]
+    assert store.insert_many(fitbit) == 0
+
+
+def test_reload_from_storage_keeps_owner_and_replays():
+    TimeSeriesStore().insert_many(
+        [apple_health("steps", HOUR + 60, 500), apple_health("steps", HOUR + 120, 700)]
+    )
+    store = TimeSeriesStore()
+    assert store.insert_many([apple_health("steps", HOUR + 60, 500)]) == 0
+    assert store.insert_many([apple_health("steps", HOUR + 180, 900)]) == 1
+    assert store.insert_many([Sample("pat_001", "steps", HOUR, 1, "ds3")]) == 0
@@ -0,0 +1,218 @@
+import asyncio
+import random
+import pytest
+from app.config import settings
+from app.enums import DataSourceStatus, DataSourceType
+from app.services import source_registry as registry_module
+from app.services.source_registry import SourceRegistry, next_sync_time
+from app.services.sync_scheduler import SyncScheduler, TokenBucket
+from app.services.timeseries import Sample
+from app.services.wearable_sync import SyncBatch, SyncInProgress, WearableSync
+
+START = 1_700_000_000.0
+
+
+class FakeClock:
+    """Both the monotonic clock of the buckets and the registry's wall clock."""
+
+    def __init__(self, now: float = START):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+class FakeSync:
+    """
+    Records started syncs; each runs until `finish` is set, then schedules
+    the next one as a successful sync would.
+    """
+
+    def __init__(self, registry: SourceRegistry, busy: frozenset = frozenset()):
+        self.registry = registry
+        self.busy = busy
+        self.started: list[str] = []
+        self.finish = asyncio.Event()
+
+    def is_running(self, patient_id: str, source_id: str) -> bool:
+        return False
+
+    async def run(self, patient_id, source_id, on_progress, source_type):
+        if source_id in self.busy:
+            raise SyncInProgress(source_id)
+        self.started.append(source_id)
+        await self.finish.wait()
+        self.registry.record_success(patient_id, source_id, 0)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(registry_module, "time", clock)
+    return clock
+
+
+def connect_due(clock: FakeClock, sources: dict[str, str]) -> SourceRegistry:
+    registry = SourceRegistry()
+    for source_id, source_type in sources.items():
+        registry.connect("pat_001", source_id, source_type)
+    # The first sync is jittered over up to twice the interval.
+    clock.advance(2 * settings.sync_interval + 1)
+    return registry
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_token_bucket_refills_at_its_rate_up_to_the_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(60.0, burst=3, clock=clock)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert not bucket.available()
+    clock.advance(0.5)
+    assert not bucket.try_acquire()
+    clock.advance(0.5)
+    assert bucket.try_acquire() and not bucket.available()
+    clock.advance(3600)
+    assert sum(bucket.try_acquire() for _ in range(10)) == 3
+    # The default burst is ten seconds' worth, and at least one.
+    for rate, burst in ((1.0, 1), (60.0, 10), (120.0, 20)):
+        bucket = TokenBucket(rate, clock=clock)
+        assert sum(bucket.try_acquire() for _ in range(30)) == burst
+
+
+def test_next_sync_time_is_jittered_around_the_delay(clock):
+    random.seed(40)
+    times = [next_sync_time(900.0, 0.1) for _ in range(500)]
+    assert all(START + 810 <= t <= START + 990 for t in times)
+    assert max(times) - min(times) > 150
+    assert next_sync_time(60.0, 0.0) == START + 60
+
+
+def test_failure_backs_off_and_success_advances_the_cursor(clock):
+    registry = SourceRegistry()
+    sync = WearableSync(registry=registry)
+    seen = []
+    feeds = [
+        [],
+        [Sample("pat_001", "steps", 1_700_000_500, 10, "ds1")],
+        [Sample("pat_001", "steps", 1_600_000_000, 5, "ds1")],
+    ]
+
+    def reader(patient_id, source_id, since):
+        seen.append(since)
+        if not feeds[0]:
+            feeds.pop(0)
+            raise OSError("device offline")
+        yield SyncBatch(feeds.pop(0), 1, 1)
+
+    async def _ignore(progress):
+        pass
+
+    sync.register_reader(DataSourceType.WEARABLE, reader)
+    with pytest.raises(OSError):
+        asyncio.run(sync.run("pat_001", "ds1", _ignore))
+    failed = registry.get("pat_001", "ds1")
+    assert failed.status == DataSourceStatus.ERROR and failed.cursor == 0
+    backoff = settings.sync_error_backoff
+    low, high = 1 - settings.sync_jitter, 1 + settings.sync_jitter
+    assert START + backoff * low <= failed.next_sync_at <= START + backoff * high
+
+    clock.advance(backoff * 2)
+    asyncio.run(sync.run("pat_001", "ds1", _ignore))
+    synced = registry.get("pat_001", "ds1")
+    assert synced.status == DataSourceStatus.CONNECTED
+    assert synced.cursor == 1_700_000_500
+    assert synced.last_sync_at == int(clock.now)
+    interval = settings.sync_interval
+    due_from, due_to = clock.now + interval * low, clock.now + interval * high
+    assert due_from <= synced.next_sync_at <= due_to
+
+    # A late-arriving older sample never moves the cursor back.
+    asyncio.run(sync.run("pat_001", "ds1", _ignore))
+    assert registry.cursor("pat_001", "ds1") == 1_700_000_500
+    assert seen == [0, 0, 1_700_000_500]
+
+
+def test_poll_fills_free_slots_only(clock):
+    sources = {f"ds{i}": DataSourceType.WEARABLE for i in range(5)}
+    registry = connect_due(clock, sources)
+    sync = FakeSync(registry)
+    scheduler = SyncScheduler(
+        sync, registry, max_concurrency=2, rate_limits={}, clock=clock
+    )
+
+    async def simulate():
+        await scheduler.poll()
+        await settle()
+        assert len(sync.started) == scheduler.active == 2
+        await scheduler.poll()
+        await settle()
+        assert len(sync.started) == 2
+        sync.finish.set()
+        await settle()
+        assert scheduler.active == 0
+        await scheduler.poll()
+        await settle()
+        assert len(sync.started) == 4 and len(set(sync.started)) == 4
+
+    asyncio.run(simulate())
+
+
+def test_rate_limited_types_stay_due_and_start_once_refilled(clock):
+    sources = {"ds1": DataSourceType.API, "ds2": DataSourceType.API}
+    sources["ds3"] = DataSourceType.WEARABLE
+    registry = connect_due(clock, sources)
+    sync = FakeSync(registry)
+    sync.finish.set()
+    # One API start per minute, no burst beyond one.
+    scheduler = SyncScheduler(
+        sync, registry, max_concurrency=8, rate_limits={"API": 1.0}, clock=clock
+    )
+
+    async def simulate():
+        await scheduler.poll()
+        await settle()
+        assert "ds3" in sync.started
+        assert len({"ds1", "ds2"} & set(sync.started)) == 1
+        waiting = ({"ds1", "ds2"} - set(sync.started)).pop()
+        # Still due, not postponed: the limit holds neither a slot nor a delay.
+        assert registry.get("pat_001", waiting).next_sync_at <= clock.now
+        await scheduler.poll()
+        await settle()
+        assert waiting not in sync.started
+        clock.advance(60)
+        await scheduler.poll()
+        await settle()
+        assert sync.started.count(waiting) == 1
+
+    asyncio.run(simulate())
+
+
+def test_source_already_syncing_is_postponed_by_one_poll(clock):
+    registry = connect_due(clock, {"ds1": DataSourceType.WEARABLE})
+    sync = FakeSync(registry, busy=frozenset({"ds1"}))
+    scheduler = SyncScheduler(
+        sync, registry, rate_limits={}, poll_interval=5.0, clock=clock
+    )
+
+    async def simulate():
+        await scheduler.poll()
+        assert scheduler.active == 1
+        # The postponement is written from a worker thread.
+        while scheduler.active:
+            await asyncio.sleep(0.001)
+
+    asyncio.run(simulate())
+    assert sync.started == []
+    postponed = registry.get("pat_001", "ds1").next_sync_at
+    assert clock.now + 4.5 <= postponed <= clock.now + 5.5
+    assert registry.due(10) == []
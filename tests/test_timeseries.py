@@ -0,0 +1,22 @@
+from app.config import settings
+from app.services.chunk_store import chunk_store
+from app.services.timeseries import Sample, TimeSeriesStore
+
+DAY_MS = 86_400_000
+
+
+def test_millisecond_series_survives_long_gaps_in_a_chunk(monkeypatch):
+    monkeypatch.setattr(settings, "series_chunk_points", 8)
+    start = 1_700_000_000_000
+    timestamps = [start + 800 * i for i in range(4)]
+    timestamps += [start + 30 * DAY_MS + 800 * i for i in range(4)]
+    samples = [Sample("pat_001", "rr_interval", ts, 800.0, "ds1") for ts in timestamps]
+    store = TimeSeriesStore()
+    assert store.insert_many(samples) == 8
+
+    (chunk,) = chunk_store.series("pat_001", "rr_interval").chunks
+    assert (chunk.count, chunk.last_ts) == (8, timestamps[-1])
+    assert store.series("pat_001", "rr_interval", start, start + 31 * DAY_MS) == (
+        timestamps,
+        [800.0] * 8,
+    )
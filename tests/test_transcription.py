@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import pytest
+from app.services.transcription import StubBackend, TranscriptionQueue
+
+
+class BlockingBackend:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def transcribe(self, audio_path) -> str:
+        self.release.wait(5)
+        return audio_path.name
+
+
+def test_the_stub_backend_reports_the_recording_size(tmp_path):
+    audio = tmp_path / "note.webm"
+    audio.write_bytes(b"\0" * 3000)
+    assert StubBackend().transcribe(audio).startswith("(Voice note, 2 KB)")
+
+
+def test_a_full_queue_pushes_back_until_workers_catch_up(tmp_path):
+    async def simulate():
+        backend = BlockingBackend()
+        queue = TranscriptionQueue(backend, maxsize=2, workers=1)
+        jobs = [queue.submit(tmp_path / "a.webm")]
+        await asyncio.sleep(0.01)
+        jobs += [queue.submit(tmp_path / f"{name}.webm") for name in "bc"]
+        assert queue.is_full()
+        with pytest.raises(asyncio.QueueFull):
+            queue.submit(tmp_path / "d.webm")
+        backend.release.set()
+        results = [await queue.result(job) for job in jobs]
+        queue.submit(tmp_path / "e.webm")
+        queue.close()
+        return results
+
+    assert asyncio.run(simulate()) == ["a.webm", "b.webm", "c.webm"]
+
+
+def test_closing_fails_jobs_still_waiting(tmp_path):
+    async def simulate():
+        backend = BlockingBackend()
+        queue = TranscriptionQueue(backend, maxsize=4, workers=1)
+        jobs = [queue.submit(tmp_path / f"{name}.webm") for name in "ab"]
+        await asyncio.sleep(0.01)
+        queue.close()
+        backend.release.set()
+        for job in jobs:
+            with pytest.raises(RuntimeError):
+                await asyncio.wait_for(queue.result(job), 1)
+
+    asyncio.run(simulate())
@@ -0,0 +1,32 @@
+import asyncio
+import io
+import pytest
+from app.services.uploads import UploadTooLarge, save_upload
+
+
+class Upload:
+    def __init__(self, data: bytes):
+        self._data = io.BytesIO(data)
+        self.reads = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        self.reads += 1
+        return self._data.read(size)
+
+
+def test_uploads_within_the_limit_are_kept(tmp_path):
+    path, digest = asyncio.run(
+        save_upload(Upload(b"abc"), tmp_path, ".wav", max_bytes=3)
+    )
+    assert path.read_bytes() == b"abc"
+    assert path.suffix == ".wav"
+    assert len(digest) == 64
+
+
+def test_oversized_uploads_stop_mid_stream(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.services.uploads.CHUNK_SIZE", 4)
+    upload = Upload(b"x" * 64)
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(save_upload(upload, tmp_path, max_bytes=10))
+    assert upload.reads == 3
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,87 @@
+import gzip
+import pytest
+from app.services import db
+from app.services.vcf_import import (
+    BGZF,
+    apoe_genotype,
+    bgzf_block,
+    detect_format,
+    genome_store,
+    read_vcf,
+)
+
+PANEL_CALLS = {
+    # rsid: (chrom, pos, ref, alt, GT, expected genotype)
+    "rs429358": ("19", 44908684, "T", "C", "0/1", "T/C"),
+    "rs7412": ("19", 44908822, "C", "T", "0|0", "C/C"),
+    "rs1801133": ("1", 11796321, "G", "A", "1/1", "A/A"),
+}
+HEADER = (
+    b"##fileformat=VCFv4.2\n"
+    b"#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tS1\n"
+)
+FIRST_POS = {"1": 11_000_000, "19": 44_800_000}
+
+
+def record(chrom: str, pos: int, rsid: str, ref: str, alt: str, gt: str) -> bytes:
+    fields = [f"chr{chrom}", str(pos), rsid, ref, alt, "50", "PASS", ".", "GT:DP"]
+    return "\t".join([*fields, f"{gt}:30"]).encode() + b"\n"
+
+
+def vcf_lines() -> list[bytes]:
+    """Several hundred KB over chromosomes 1 and 19, panel calls included."""
+    lines = []
+    for chrom, first in FIRST_POS.items():
+        calls = [c for c in PANEL_CALLS.items() if c[1][0] == chrom]
+        positions = [first + 37 * i for i in range(6000)]
+        records = {pos: record(chrom, pos, ".", "A", "G", "0/1") for pos in positions}
+        for rsid, (_, pos, ref, alt, gt, _) in calls:
+            records[pos] = record(chrom, pos, rsid, ref, alt, gt)
+        lines += [records[pos] for pos in sorted(records)]
+    return lines
+
+
+def write(path, data: bytes, fmt: str):
+    if fmt == "gzip":
+        path.write_bytes(gzip.compress(data))
+    elif fmt == "bgzf":
+        # Odd block sizes, so records and lines straddle block boundaries.
+        step = 40_001
+        blocks = [bgzf_block(data[i : i + step]) for i in range(0, len(data), step)]
+        path.write_bytes(b"".join(blocks) + bgzf_block(b""))
+    else:
+        path.write_bytes(data)
+
+
+@pytest.mark.parametrize(
+    "fmt, name", [("plain", "g1.vcf"), ("gzip", "g2.vcf.gz"), ("bgzf", "g3.vcf.bgz")]
+)
+def test_imports_every_format_alike(data_dir, fmt, name):
+    lines = vcf_lines()
+    path = data_dir / name
+    write(path, HEADER + b"".join(lines), fmt)
+    patient_id = f"pat_{fmt}"
+    batches = list(read_vcf(path, patient_id, "ds4"))
+    assert batches[-1].done == batches[-1].total
+
+    variants = {v.rsid: v for v in genome_store.variants(patient_id)}
+    assert {rsid: v.genotype for rsid, v in variants.items()} == {
+        rsid: call[5] for rsid, call in PANEL_CALLS.items()
+    }
+    assert variants["rs429358"].chrom == "19"
+    assert apoe_genotype(variants.values()) == "ε3/ε4"
+
+    if fmt == "gzip":
+        assert not path.exists()
+        assert detect_format(data_dir / "g2.vcf.bgz") == BGZF
+    (blocks,) = db.connection().execute(
+        "SELECT count(*) FROM genome_index WHERE file_id = ?", (name.split(".")[0],)
+    ).fetchone()
+    assert blocks > 5
+    for line in (lines[0], lines[2999], lines[6000], lines[9001], lines[-1]):
+        chrom, pos = line.split(b"\t")[:2]
+        assert genome_store.lookup(patient_id, chrom.decode(), int(pos)) == [
+            line.rstrip(b"\n")
+        ]
+    assert genome_store.lookup(patient_id, "19", 44_800_001) == []
+    assert genome_store.lookup(patient_id, "2", 11_000_000) == []
@@ -0,0 +1,20 @@
+import asyncio
+from app.enums import DataSourceStatus, DataSourceType
+from app.services.lab_import import read_lab_source
+from app.services.source_registry import source_registry
+from app.services.vcf_import import read_genome_source
+from app.services.wearable_sync import WearableSync
+
+
+async def _ignore(progress):
+    pass
+
+
+def test_scheduled_genome_sync_does_not_run_the_lab_reader():
+    sync = WearableSync()
+    sync.register_reader(DataSourceType.FILE, read_lab_source, source_id="ds3")
+    sync.register_reader(DataSourceType.FILE, read_genome_source, source_id="ds4")
+    progress = asyncio.run(sync.run("pat_001", "ds4", _ignore, DataSourceType.FILE))
+    assert progress.records == 0
+    connection = source_registry.get("pat_001", "ds4")
+    assert connection.status == DataSourceStatus.CONNECTED
@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+import pytest
+from starlette.testclient import TestClient
+from app.api import api
+from app.config import settings
+from app.services.timeseries import TimeSeriesStore
+from app.services.webhooks import Delivery, WebhookQueue, delivery_key
+
+BODY = json.dumps(
+    {
+        "patient_id": "pat_001",
+        "records": [{"metric": "heart_rate", "timestamp": 1_700_000_000, "value": 61}],
+    }
+).encode()
+
+
+def sign(body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def client():
+    with TestClient(api) as client:
+        yield client
+
+
+def test_refuses_webhooks_without_a_secret(client, monkeypatch):
+    monkeypatch.setattr(settings, "webhook_secret", "")
+    response = client.post("/api/webhooks/ds1", content=BODY)
+    assert response.status_code == 503
+
+
+def test_requires_a_valid_signature(client, monkeypatch):
+    monkeypatch.setattr(settings, "webhook_secret", "s3cret")
+    unsigned = client.post("/api/webhooks/ds1", content=BODY)
+    assert unsigned.status_code == 401
+    forged = client.post(
+        "/api/webhooks/ds1", content=BODY, headers={"X-Signature": sign(BODY, "x")}
+    )
+    assert forged.status_code == 401
+
+
+class FlakyStore(TimeSeriesStore):
+    """Fails writes for `broken` patients until they are fixed."""
+
+    def __init__(self):
+        super().__init__()
+        self.broken = {"pat_bad"}
+
+    def insert_many(self, samples):
+        if any(sample.patient_id in self.broken for sample in samples):
+            raise OSError("disk I/O error")
+        return super().insert_many(samples)
+
+
+def delivery(patient_id: str, ts: int) -> Delivery:
+    body = json.dumps(
+        {
+            "patient_id": patient_id,
+            "records": [{"metric": "steps", "timestamp": ts, "value": 40}],
+        }
+    ).encode()
+    return Delivery("ds1", delivery_key("ds1", "", body), body)
+
+
+def test_failed_deliveries_are_kept_and_retried():
+    store = FlakyStore()
+    queue = WebhookQueue(store, retry_interval=60)
+
+    async def deliver():
+        for patient_id in ("pat_001", "pat_bad", "pat_002"):
+            assert queue.accept(delivery(patient_id, 1))
+        await queue.join()
+        queue.close()
+
+    asyncio.run(deliver())
+    assert len(store.range("pat_001", "steps", 0, 10)) == 1
+    assert len(store.range("pat_002", "steps", 0, 10)) == 1
+    assert queue.pending_retries() == 1
+
+    assert queue.retry_due(now=time.time() + 60) == 0
+    store.broken.clear()
+    assert queue.retry_due(now=time.time() + 60) == 0
+    assert queue.retry_due(now=time.time() + 120) == 1
+    assert len(store.range("pat_bad", "steps", 0, 10)) == 1
+    assert queue.pending_retries() == 0
+
+
+def test_deliveries_failing_every_attempt_are_dead_lettered():
+    store = FlakyStore()
+    queue = WebhookQueue(store, retry_interval=60, max_attempts=3)
+
+    async def deliver():
+        assert queue.accept(delivery("pat_bad", 1))
+        await queue.join()
+        queue.close()
+
+    asyncio.run(deliver())
+    later = time.time() + 10**6
+    assert queue.retry_due(now=later) == 0
+    assert (queue.pending_retries(), queue.failed_deliveries()) == (1, 0)
+    assert queue.retry_due(now=later) == 0
+    assert (queue.pending_retries(), queue.failed_deliveries()) == (0, 1)